@@ -0,0 +1,117 @@
+"""
+Agendamento maior-primeiro (LPT) - PDFs longos não começam por último.
+
+Com vários trabalhadores, a ordem das pastas deixa um PDF de 1.500 páginas
+começar no fim e definir sozinho o tempo do lote. O custo de cada tarefa é
+estimado pelo número de páginas (lido do xref, sem extrair texto) e pelo
+tempo por página de execuções anteriores; as tarefas vão para o pool da
+maior para a menor, e as pequenas preenchem os intervalos.
+
+Histórico em JSON (custo_paginas.json no diretório de saída):
+    {"segundos": 812.4, "paginas": 40211, "tarefas": 950}
+"""
+
+import heapq
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence, TypeVar
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+ARQUIVO_HISTORICO = "custo_paginas.json"
+
+# Sem histórico: segundos por página (detecção) e por tarefa (abrir, hash, preflight)
+SEGUNDOS_POR_PAGINA_PADRAO = 0.01
+SEGUNDOS_POR_TAREFA = 0.05
+
+
+def contar_paginas(pdf_path: str) -> Optional[int]:
+    """Número de páginas (só o xref é lido; None se o arquivo não abrir)."""
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return None
+
+
+def ordenar_maior_primeiro(itens: Iterable[T], custo: Callable[[T], float]) -> List[T]:
+    """Itens do maior para o menor custo (empates na ordem original)."""
+    return sorted(itens, key=custo, reverse=True)
+
+
+def simular_duracao(custos: Sequence[float], trabalhadores: int) -> float:
+    """
+    Tempo total do lote com `trabalhadores` pegando tarefas na ordem dada.
+
+    Cada tarefa vai para o trabalhador que ficar livre primeiro (como no pool).
+    """
+    livres = [0.0] * max(1, trabalhadores)
+    for custo in custos:
+        heapq.heappush(livres, heapq.heappop(livres) + custo)
+    return max(livres)
+
+
+class HistoricoCusto:
+    """
+    Tempo por página de execuções anteriores (persistido em JSON).
+
+    Example:
+        >>> historico = HistoricoCusto(Path("outputs/custo_paginas.json"))
+        >>> historico.estimar(1500)
+        15.05
+        >>> historico.registrar(1500, 12.3)
+        >>> historico.salvar()
+    """
+
+    def __init__(self, caminho: Optional[Path] = None):
+        self.caminho = Path(caminho) if caminho else None
+        self.segundos = 0.0
+        self.paginas = 0
+        self.tarefas = 0
+        if self.caminho and self.caminho.exists():
+            try:
+                with open(self.caminho, encoding="utf-8") as f:
+                    dados = json.load(f)
+                self.segundos = float(dados["segundos"])
+                self.paginas = int(dados["paginas"])
+                self.tarefas = int(dados["tarefas"])
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Histórico de custo ignorado ({self.caminho}): {e}")
+
+    @property
+    def segundos_por_pagina(self) -> float:
+        if self.paginas == 0:
+            return SEGUNDOS_POR_PAGINA_PADRAO
+        return max(0.0, self.segundos - self.tarefas * SEGUNDOS_POR_TAREFA) / self.paginas
+
+    def estimar(self, paginas: Optional[int]) -> float:
+        """Segundos estimados para uma tarefa (páginas desconhecidas: só o custo fixo)."""
+        return SEGUNDOS_POR_TAREFA + (paginas or 0) * self.segundos_por_pagina
+
+    def registrar(self, paginas: Optional[int], segundos: float) -> None:
+        """Soma uma tarefa medida ao histórico (sem páginas: ignorada)."""
+        if not paginas:
+            return
+        self.segundos += segundos
+        self.paginas += paginas
+        self.tarefas += 1
+
+    def salvar(self) -> None:
+        if self.caminho is None:
+            return
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({
+                "segundos": round(self.segundos, 3),
+                "paginas": self.paginas,
+                "tarefas": self.tarefas
+            }, f)
+        os.replace(temporario, self.caminho)
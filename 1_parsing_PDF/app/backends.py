@@ -0,0 +1,106 @@
+"""
+Backends de extração - OpenAI ou servidor compatível local (base_url).
+
+Backfills em massa podem rodar contra um servidor OpenAI-compatível na própria
+VPS (vLLM, llama.cpp, Ollama...): sem latência de WAN e sem custo por token.
+
+Configuração (.env):
+    LLM_BACKEND=local
+    LOCAL_LLM_BASE_URL=http://127.0.0.1:8000/v1
+    LOCAL_LLM_MODEL=qwen2.5-7b-instruct
+    LOCAL_LLM_MODEL_ESCALONAMENTO=            # opcional
+    LOCAL_LLM_API_KEY=local                   # opcional
+    LOCAL_LLM_JSON_SCHEMA=false               # servidor aceita json_schema strict?
+    LOCAL_LLM_PROMPT=compacta                 # completa | compacta
+"""
+
+import os
+import logging
+from typing import List, Mapping, Optional
+
+from .schemas import BackendLLM
+
+logger = logging.getLogger(__name__)
+
+
+BACKENDS = ("openai", "local")
+
+
+def _booleano(valor: Optional[str], padrao: bool) -> bool:
+    if valor is None or valor.strip() == "":
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes")
+
+
+def carregar_backend(nome: str = "openai", ambiente: Optional[Mapping[str, str]] = None) -> BackendLLM:
+    """
+    Configuração do backend a partir das variáveis de ambiente.
+
+    Args:
+        nome: "openai" ou "local"
+        ambiente: Variáveis (padrão: os.environ)
+
+    Returns:
+        BackendLLM
+
+    Raises:
+        ValueError: Backend desconhecido ou variável obrigatória ausente
+    """
+    ambiente = os.environ if ambiente is None else ambiente
+
+    if nome == "openai":
+        return BackendLLM(
+            nome="openai",
+            base_url=ambiente.get("OPENAI_BASE_URL") or None,
+            api_key=ambiente.get("OPENAI_API_KEY") or "",
+            modelo=ambiente.get("OPENAI_MODEL") or "gpt-4o-mini",
+            modelo_escalonamento=ambiente.get("OPENAI_MODEL_ESCALONAMENTO") or None
+        )
+
+    if nome == "local":
+        base_url = ambiente.get("LOCAL_LLM_BASE_URL")
+        modelo = ambiente.get("LOCAL_LLM_MODEL")
+        if not base_url or not modelo:
+            raise ValueError("Backend local exige LOCAL_LLM_BASE_URL e LOCAL_LLM_MODEL")
+        return BackendLLM(
+            nome="local",
+            base_url=base_url,
+            api_key=ambiente.get("LOCAL_LLM_API_KEY") or "local",
+            modelo=modelo,
+            modelo_escalonamento=ambiente.get("LOCAL_LLM_MODEL_ESCALONAMENTO") or None,
+            variante_prompt=ambiente.get("LOCAL_LLM_PROMPT") or "compacta",
+            json_schema=_booleano(ambiente.get("LOCAL_LLM_JSON_SCHEMA"), False)
+        )
+
+    raise ValueError(f"Backend desconhecido: {nome} (opções: {', '.join(BACKENDS)})")
+
+
+def verificar_saude(client, backend: BackendLLM) -> List[str]:
+    """
+    Verificação na inicialização: servidor responde e serve os modelos configurados.
+
+    Args:
+        client: Cliente OpenAI apontando para o backend
+        backend: Configuração do backend
+
+    Returns:
+        Modelos servidos
+
+    Raises:
+        RuntimeError: Servidor inacessível ou modelo não servido
+    """
+    try:
+        modelos = [modelo.id for modelo in client.models.list()]
+    except Exception as e:
+        raise RuntimeError(f"Backend {backend.nome} inacessível em {backend.base_url}: {e}") from e
+
+    # Alguns servidores não listam modelos: sem lista, não há o que conferir
+    if modelos:
+        for modelo in filter(None, [backend.modelo, backend.modelo_escalonamento]):
+            if modelo not in modelos:
+                raise RuntimeError(
+                    f"Modelo {modelo} não servido por {backend.nome} (disponíveis: {', '.join(modelos)})"
+                )
+
+    logger.info(f"🩺 Backend {backend.nome} OK ({backend.base_url or 'api.openai.com'}): {len(modelos)} modelo(s)")
+    return modelos
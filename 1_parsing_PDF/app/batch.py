@@ -0,0 +1,309 @@
+"""
+Modo Batch API - Extração assíncrona para reprocessamentos completos (backfills).
+
+Ciclo de vida:
+1. preparar: payloads da etapa de detecção → JSONL de requisições
+2. enviar: upload do JSONL, criação do batch e polling até terminar
+3. mesclar: respostas → mesma validação/saída da extração síncrona
+
+Arquivos no diretório do batch:
+- requisicoes.jsonl: entrada da Batch API (custom_id = hash do PDF + CPF;
+  ofícios gigantes: uma requisição por bloco, custom_id + "#bloco<n>")
+- payloads.jsonl: payloads da detecção, chaveados pelo mesmo custom_id
+- resultados_preparacao.jsonl: PDFs resolvidos na detecção (falhas e rejeitados
+  sem LLM), que entram direto no CSV final
+- lote.json: estado do batch (id, status, arquivos)
+- respostas.jsonl: saída da Batch API
+"""
+
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .schemas import PayloadExtracao
+
+logger = logging.getLogger(__name__)
+
+
+ENDPOINT_CHAT = "/v1/chat/completions"
+STATUS_FINAIS = {"completed", "failed", "expired", "cancelled"}
+
+ARQUIVO_REQUISICOES = "requisicoes.jsonl"
+ARQUIVO_PAYLOADS = "payloads.jsonl"
+ARQUIVO_RESULTADOS_PREPARACAO = "resultados_preparacao.jsonl"
+ARQUIVO_LOTE = "lote.json"
+ARQUIVO_RESPOSTAS = "respostas.jsonl"
+
+SEPARADOR_BLOCO = "#bloco"
+
+
+def ids_requisicao(payload: PayloadExtracao) -> List[str]:
+    """custom_ids das requisições de um payload (um por bloco no map-reduce)."""
+    if not payload.blocos:
+        return [payload.id_requisicao]
+    return [f"{payload.id_requisicao}{SEPARADOR_BLOCO}{indice}" for indice in range(len(payload.blocos))]
+
+
+def escrever_requisicoes(
+    payloads: Iterable[PayloadExtracao],
+    processador: Any,
+    diretorio: Path
+) -> int:
+    """
+    Grava o JSONL de requisições da Batch API e os payloads correspondentes.
+
+    Payloads com blocos (ofício gigante) viram uma requisição por bloco; as
+    respostas são mescladas em mesclar_payload, como no map-reduce síncrono.
+
+    Args:
+        payloads: Payloads da etapa de detecção
+        processador: ProcessadorOficio (monta o corpo de cada requisição)
+        diretorio: Diretório do batch
+
+    Returns:
+        Número de requisições gravadas
+    """
+    diretorio.mkdir(parents=True, exist_ok=True)
+    total = 0
+
+    with open(diretorio / ARQUIVO_REQUISICOES, 'w', encoding='utf-8') as f_req, \
+         open(diretorio / ARQUIVO_PAYLOADS, 'w', encoding='utf-8') as f_payload:
+        for payload in payloads:
+            blocos = payload.blocos or [None]
+            for custom_id, bloco in zip(ids_requisicao(payload), blocos):
+                requisicao = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": ENDPOINT_CHAT,
+                    "body": processador.montar_requisicao(payload, bloco=bloco)
+                }
+                f_req.write(json.dumps(requisicao, ensure_ascii=False) + "\n")
+                total += 1
+            f_payload.write(payload.model_dump_json() + "\n")
+
+    logger.info(f"📝 {total} requisição(ões) gravada(s) em {diretorio / ARQUIVO_REQUISICOES}")
+    return total
+
+
+def enviar_lote(client: Any, diretorio: Path) -> str:
+    """
+    Faz upload do JSONL e cria o batch.
+
+    Args:
+        client: Cliente OpenAI (ou compatível, via base_url)
+        diretorio: Diretório do batch
+
+    Returns:
+        ID do batch criado
+    """
+    with open(diretorio / ARQUIVO_REQUISICOES, 'rb') as f:
+        arquivo = client.files.create(file=f, purpose="batch")
+
+    lote = client.batches.create(
+        input_file_id=arquivo.id,
+        endpoint=ENDPOINT_CHAT,
+        completion_window="24h"
+    )
+    salvar_estado(diretorio, lote)
+    logger.info(f"🚀 Batch criado: {lote.id} (arquivo {arquivo.id})")
+    return lote.id
+
+
+def aguardar_lote(
+    client: Any,
+    batch_id: str,
+    diretorio: Path,
+    intervalo: float = 60,
+    timeout: Optional[float] = None
+) -> Any:
+    """
+    Consulta o batch até atingir um status final.
+
+    Args:
+        client: Cliente OpenAI
+        batch_id: ID do batch
+        diretorio: Diretório do batch (estado é salvo a cada consulta)
+        intervalo: Segundos entre consultas
+        timeout: Tempo máximo de espera em segundos (None = sem limite)
+
+    Returns:
+        Objeto Batch final
+
+    Raises:
+        TimeoutError: Se o timeout for atingido
+    """
+    inicio = time.time()
+
+    while True:
+        lote = client.batches.retrieve(batch_id)
+        salvar_estado(diretorio, lote)
+
+        contagem = getattr(lote, "request_counts", None)
+        if contagem:
+            logger.info(f"⏳ Batch {batch_id}: {lote.status} ({contagem.completed}/{contagem.total})")
+        else:
+            logger.info(f"⏳ Batch {batch_id}: {lote.status}")
+
+        if lote.status in STATUS_FINAIS:
+            return lote
+
+        if timeout is not None and time.time() - inicio > timeout:
+            raise TimeoutError(f"Batch {batch_id} não terminou em {timeout:.0f}s (status: {lote.status})")
+
+        time.sleep(intervalo)
+
+
+def baixar_respostas(client: Any, lote: Any, diretorio: Path) -> Path:
+    """
+    Baixa a saída (e os erros, se houver) do batch para respostas.jsonl.
+
+    Args:
+        client: Cliente OpenAI
+        lote: Objeto Batch final
+        diretorio: Diretório do batch
+
+    Returns:
+        Caminho do arquivo de respostas
+    """
+    caminho = diretorio / ARQUIVO_RESPOSTAS
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for arquivo_id in (lote.output_file_id, getattr(lote, "error_file_id", None)):
+            if not arquivo_id:
+                continue
+            conteudo = client.files.content(arquivo_id).text
+            f.write(conteudo if conteudo.endswith("\n") or not conteudo else conteudo + "\n")
+
+    logger.info(f"📥 Respostas salvas em {caminho}")
+    return caminho
+
+
+def ler_payloads(diretorio: Path) -> Dict[str, PayloadExtracao]:
+    """
+    Lê os payloads gravados na preparação.
+
+    Args:
+        diretorio: Diretório do batch
+
+    Returns:
+        Dicionário custom_id → payload
+    """
+    payloads = {}
+    with open(diretorio / ARQUIVO_PAYLOADS, encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                payload = PayloadExtracao.model_validate_json(linha)
+                payloads[payload.id_requisicao] = payload
+    return payloads
+
+
+def ler_respostas(diretorio: Path) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Lê a saída da Batch API.
+
+    Args:
+        diretorio: Diretório do batch
+
+    Returns:
+        Dicionário custom_id → {"conteudo": str | None, "erro": str | None}
+    """
+    respostas = {}
+    caminho = diretorio / ARQUIVO_RESPOSTAS
+    if not caminho.exists():
+        return respostas
+
+    with open(caminho, encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            resposta = registro.get("response") or {}
+            corpo = resposta.get("body") or {}
+
+            if registro.get("error") or resposta.get("status_code", 200) != 200:
+                erro = registro.get("error") or corpo.get("error") or f"HTTP {resposta.get('status_code')}"
+                respostas[registro["custom_id"]] = {"conteudo": None, "erro": str(erro)}
+                continue
+
+            try:
+                conteudo = corpo["choices"][0]["message"]["content"]
+                respostas[registro["custom_id"]] = {"conteudo": conteudo, "erro": None}
+            except (KeyError, IndexError, TypeError) as e:
+                respostas[registro["custom_id"]] = {"conteudo": None, "erro": f"Resposta sem conteúdo: {e}"}
+
+    return respostas
+
+
+def mesclar_payload(
+    payload: PayloadExtracao,
+    respostas: Dict[str, Dict[str, Optional[str]]],
+    processador: Any
+) -> Dict[str, Any]:
+    """
+    Resultado de um payload a partir das respostas do batch.
+
+    Com blocos, os blocos que responderam são mesclados (como no map-reduce
+    síncrono); só é erro se nenhum respondeu.
+
+    Args:
+        payload: Payload da preparação
+        respostas: Saída de ler_respostas
+        processador: ProcessadorOficio (validação e resultado)
+
+    Returns:
+        Dict com resultado do processamento
+    """
+    registros = [respostas.get(custom_id) for custom_id in ids_requisicao(payload)]
+    conteudos = [registro["conteudo"] if registro else None for registro in registros]
+
+    if all(conteudo is None for conteudo in conteudos):
+        erros = [registro["erro"] for registro in registros if registro and registro["erro"]]
+        erro = erros[0] if erros else "sem resposta no batch"
+        return processador._criar_resultado_erro(
+            payload.cpf, payload.pdf_path, f"Falha na extração LLM (batch): {erro}"
+        )
+
+    if payload.blocos:
+        return processador.concluir_respostas_blocos(payload, conteudos)
+    return processador.concluir_resposta_llm(payload, conteudos[0])
+
+
+def salvar_estado(diretorio: Path, lote: Any) -> None:
+    """Grava o estado atual do batch em lote.json (permite retomar o polling)."""
+    estado = {
+        "id": lote.id,
+        "status": lote.status,
+        "input_file_id": getattr(lote, "input_file_id", None),
+        "output_file_id": getattr(lote, "output_file_id", None),
+        "error_file_id": getattr(lote, "error_file_id", None)
+    }
+    with open(diretorio / ARQUIVO_LOTE, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+
+
+def ler_estado(diretorio: Path) -> Optional[Dict[str, Any]]:
+    """Lê lote.json, se existir."""
+    caminho = diretorio / ARQUIVO_LOTE
+    if not caminho.exists():
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def gravar_resultados_preparacao(diretorio: Path, resultados: List[Dict[str, Any]]) -> None:
+    """Grava os resultados já prontos na detecção (viram linhas do CSV na mesclagem)."""
+    diretorio.mkdir(parents=True, exist_ok=True)
+    with open(diretorio / ARQUIVO_RESULTADOS_PREPARACAO, 'w', encoding='utf-8') as f:
+        for resultado in resultados:
+            f.write(json.dumps(resultado, ensure_ascii=False, default=str) + "\n")
+
+
+def ler_resultados_preparacao(diretorio: Path) -> List[Dict[str, Any]]:
+    """Lê os resultados já prontos na detecção."""
+    caminho = diretorio / ARQUIVO_RESULTADOS_PREPARACAO
+    if not caminho.exists():
+        return []
+    with open(caminho, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
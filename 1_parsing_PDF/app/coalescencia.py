@@ -0,0 +1,99 @@
+"""
+Coalescência de chamadas em voo (single-flight).
+
+O mesmo PDF de processo é baixado em várias pastas de CPF; quando o texto
+selecionado é idêntico, o prompt também é. Chamadas idênticas simultâneas
+compartilham UMA execução e o seu resultado (ou exceção).
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def chave_requisicao(parametros: Dict[str, Any]) -> str:
+    """
+    Hash do corpo da requisição (modelo, mensagens, formato de resposta).
+
+    Args:
+        parametros: Parâmetros de chat.completions.create
+
+    Returns:
+        SHA-256 hexadecimal do JSON canônico
+    """
+    canonico = json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+class _Chamada:
+    """Estado de uma chamada em voo"""
+
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class ChamadasEmVoo:
+    """
+    Single-flight: a primeira chamada de uma chave executa; as simultâneas
+    com a mesma chave esperam e recebem o mesmo resultado.
+
+    Não é cache: terminada a chamada, a chave sai do mapa e a próxima executa de novo.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._em_voo: Dict[str, _Chamada] = {}
+        self.coalescidas = 0
+
+    def executar(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa `funcao` ou aguarda a execução em voo com a mesma chave.
+
+        Args:
+            chave: Identificador da requisição (ex: chave_requisicao)
+            funcao: Chamada a executar (sem argumentos)
+
+        Returns:
+            Tupla (resultado, compartilhado): compartilhado=True se o resultado
+            veio de outra chamada em voo
+
+        Raises:
+            Exception: A mesma exceção da execução compartilhada
+        """
+        with self._trava:
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_voo[chave] = chamada
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            logger.info(f"🔗 Requisição idêntica em voo, aguardando resultado ({chave[:12]})")
+            chamada.concluida.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado, True
+
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado, False
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_voo[chave]
+            chamada.concluida.set()
+
+    def em_voo(self) -> int:
+        """Número de chamadas distintas em execução."""
+        with self._trava:
+            return len(self._em_voo)
@@ -0,0 +1,262 @@
+"""
+Concorrência adaptativa - quantas tarefas em voo, ajustado pela carga observada.
+
+Um número fixo de PDFs em paralelo é pouco numa VPS grande e demais numa
+pequena (ou com a cota do LLM apertada). O controle sobe a concorrência
+enquanto a vazão melhora e recua quando aparecem sinais de saturação:
+
+    - 429 do LLM           → corte multiplicativo (metade), no máximo uma vez por janela
+    - CPU acima do limite  → -1
+    - latência p95 > 2x a de referência → -1
+    - vazão caiu na janela → inverte a direção (passou do ponto ótimo)
+    - vazão subiu          → segue na mesma direção (+1 ou -1)
+    - fila vazia           → mantém (não há o que paralelizar)
+
+Avaliação a cada `janela` segundos, com o relógio injetável (testes).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+JANELA_SEGUNDOS = 10.0
+
+# Variação mínima de vazão entre janelas para contar como melhora/piora
+MARGEM_VAZAO = 0.05
+
+FATOR_REDUCAO = 0.5
+LIMITE_CPU = 0.90
+FATOR_LATENCIA = 2.0
+
+_FIM = object()
+
+
+class MedidorCPU:
+    """
+    Uso de CPU da máquina (0-1) entre leituras, de /proc/stat.
+
+    Sem /proc: carga média de 1 minuto / núcleos (getloadavg); sem nenhum dos
+    dois (Windows), None.
+    """
+
+    def __init__(self):
+        self._anterior = self._ler_proc()
+
+    @staticmethod
+    def _ler_proc():
+        try:
+            with open("/proc/stat", encoding="ascii") as f:
+                campos = [int(valor) for valor in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        ocioso = campos[3] + (campos[4] if len(campos) > 4 else 0)  # idle + iowait
+        return sum(campos), ocioso
+
+    def ler(self) -> Optional[float]:
+        atual = self._ler_proc()
+        if atual is not None and self._anterior is not None:
+            total = atual[0] - self._anterior[0]
+            ocioso = atual[1] - self._anterior[1]
+            self._anterior = atual
+            return 1 - ocioso / total if total > 0 else None
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None
+
+
+class ControleConcorrencia:
+    """
+    Limite de tarefas em voo ajustado por subida aditiva / corte multiplicativo
+    (thread-safe).
+
+    Example:
+        >>> controle = ControleConcorrencia(inicial=4, maximo=32)
+        >>> for resultado in executar_adaptativo(executor, processar, payloads, controle):
+        ...     ...
+        >>> controle.limite
+        11
+    """
+
+    def __init__(
+        self,
+        inicial: int = 4,
+        minimo: int = 1,
+        maximo: int = 32,
+        janela: float = JANELA_SEGUNDOS,
+        limite_cpu: Optional[float] = LIMITE_CPU,
+        relogio: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            inicial: Tarefas em voo no início
+            minimo: Limite mínimo
+            maximo: Limite máximo (tamanho do pool)
+            janela: Segundos entre avaliações
+            limite_cpu: Uso de CPU (0-1) a partir do qual recua (None = ignora CPU)
+            relogio: Fonte de tempo
+        """
+        self.minimo = minimo
+        self.maximo = maximo
+        self.limite = max(minimo, min(inicial, maximo))
+        self.janela = janela
+        self.limite_cpu = limite_cpu
+        self._relogio = relogio
+        self._trava = threading.Lock()
+        self._inicio_janela = relogio()
+        self._concluidas = 0
+        self._limitacoes = 0
+        self._vazao_anterior: Optional[float] = None
+        self._direcao = 1
+        self._latencia_referencia: Optional[float] = None
+        self.ajustes = 0
+        self.cortes = 0
+        self.maximo_atingido = self.limite
+
+    def concluida(self) -> None:
+        """Uma tarefa terminou (vazão)."""
+        with self._trava:
+            self._concluidas += 1
+
+    def limitada(self) -> None:
+        """LLM respondeu 429 (ou outro sinal de throttling)."""
+        with self._trava:
+            self._limitacoes += 1
+
+    def hora_de_avaliar(self) -> bool:
+        return self._relogio() - self._inicio_janela >= self.janela
+
+    def avaliar(
+        self,
+        uso_cpu: Optional[float] = None,
+        latencia_p95: Optional[float] = None,
+        fila: Optional[int] = None
+    ) -> int:
+        """
+        Fecha a janela e ajusta o limite.
+
+        Args:
+            uso_cpu: Uso de CPU da máquina (0-1)
+            latencia_p95: p95 da latência do LLM (segundos)
+            fila: Tarefas esperando para entrar (0 = nada a paralelizar)
+
+        Returns:
+            Novo limite
+        """
+        with self._trava:
+            agora = self._relogio()
+            duracao = max(agora - self._inicio_janela, 1e-9)
+            vazao = self._concluidas / duracao
+            limitacoes = self._limitacoes
+            self._inicio_janela = agora
+            self._concluidas = 0
+            self._limitacoes = 0
+
+            if latencia_p95 is not None and self._latencia_referencia is None:
+                self._latencia_referencia = latencia_p95
+
+            anterior = self.limite
+            if limitacoes:
+                self.limite = int(self.limite * FATOR_REDUCAO)
+                self.cortes += 1
+                self._direcao = 1
+                motivo = f"{limitacoes} limitação(ões) 429"
+            elif self.limite_cpu is not None and uso_cpu is not None and uso_cpu > self.limite_cpu:
+                self.limite -= 1
+                motivo = f"CPU {uso_cpu:.0%}"
+            elif (
+                latencia_p95 is not None and self._latencia_referencia
+                and latencia_p95 > self._latencia_referencia * FATOR_LATENCIA
+            ):
+                self.limite -= 1
+                motivo = f"latência p95 {latencia_p95:.1f}s"
+            elif fila == 0:
+                motivo = "fila vazia"
+            elif self._vazao_anterior is None or vazao > self._vazao_anterior * (1 + MARGEM_VAZAO):
+                self.limite += self._direcao
+                motivo = f"vazão {vazao:.2f}/s subiu"
+            elif vazao < self._vazao_anterior * (1 - MARGEM_VAZAO):
+                self._direcao = -self._direcao
+                self.limite += self._direcao
+                motivo = f"vazão {vazao:.2f}/s caiu"
+            else:
+                motivo = "vazão estável"
+
+            self.limite = max(self.minimo, min(self.limite, self.maximo))
+            self._vazao_anterior = vazao
+            self.maximo_atingido = max(self.maximo_atingido, self.limite)
+            if self.limite != anterior:
+                self.ajustes += 1
+                logger.info(f"🎚️ Concorrência {anterior} → {self.limite} ({motivo})")
+            return self.limite
+
+    def relatorio(self) -> Dict[str, Any]:
+        return {
+            "limite_final": self.limite,
+            "limite_maximo_atingido": self.maximo_atingido,
+            "ajustes": self.ajustes,
+            "cortes_429": self.cortes
+        }
+
+
+def executar_adaptativo(
+    executor: Executor,
+    funcao: Callable[[Any], Any],
+    itens: Iterable[Any],
+    controle: ControleConcorrencia,
+    sinais: Optional[Callable[[], Dict[str, Optional[float]]]] = None,
+    ordenado: bool = True
+) -> Iterator[Any]:
+    """
+    Executa `funcao` para cada item com no máximo `controle.limite` em voo.
+
+    O executor deve ter `controle.maximo` trabalhadores; o limite decide
+    quantos ficam ocupados.
+
+    Args:
+        executor: Pool de threads ou processos
+        funcao: Tarefa por item
+        itens: Itens (consumidos sob demanda; a fila é o que ainda não entrou)
+        controle: Controle de concorrência
+        sinais: Sinais da avaliação (ex: {"uso_cpu": ..., "latencia_p95": ...})
+        ordenado: Resultados na ordem dos itens (False = na ordem de conclusão)
+
+    Yields:
+        Resultados
+    """
+    pendentes = iter(itens)
+    proximo = next(pendentes, _FIM)
+    futuros: deque = deque()  # ordem de envio (ainda não entregues; só se ordenado)
+    em_voo = set()
+
+    while proximo is not _FIM or em_voo:
+        while proximo is not _FIM and len(em_voo) < controle.limite:
+            futuro = executor.submit(funcao, proximo)
+            if ordenado:
+                futuros.append(futuro)
+            em_voo.add(futuro)
+            proximo = next(pendentes, _FIM)
+
+        concluidos, em_voo = wait(em_voo, timeout=1.0, return_when=FIRST_COMPLETED)
+        for _ in concluidos:
+            controle.concluida()
+
+        if ordenado:
+            while futuros and futuros[0].done():
+                yield futuros.popleft().result()
+        else:
+            for futuro in concluidos:
+                yield futuro.result()
+
+        if controle.hora_de_avaliar():
+            controle.avaliar(fila=0 if proximo is _FIM else 1, **(sinais() if sinais else {}))
+
+    while futuros:
+        yield futuros.popleft().result()
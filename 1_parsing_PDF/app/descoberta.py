@@ -0,0 +1,165 @@
+"""
+Descoberta do corpus - PDFs de data/consultas/<CPF>/*.pdf sem varrer tudo de novo.
+
+Em disco de rede com dezenas de milhares de pastas de CPF, `glob("*/*.pdf")`
+leva minutos antes do primeiro PDF. Aqui cada pasta é lida com `os.scandir`
+em threads (o custo é latência de I/O, não CPU) e o resultado vai para um
+manifesto com o mtime de cada pasta: na próxima execução só as pastas cujo
+mtime mudou (PDF adicionado, removido ou renomeado) são relidas; as demais
+custam um stat.
+
+Manifesto em JSON (manifesto_pdfs.json no diretório de saída):
+    {"raiz": "/data/consultas",
+     "pastas": {"10493829865": {"mtime_ns": 1729080000000000000, "pdfs": ["a.pdf"]}}}
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+ARQUIVO_MANIFESTO = "manifesto_pdfs.json"
+
+TRABALHADORES_DESCOBERTA = 16
+
+# Pastas por tarefa (uma tarefa por pasta custa mais que o stat em disco local)
+PASTAS_POR_TAREFA = 64
+
+# Pasta alterada há menos que isso pode mudar de novo no mesmo tick do mtime
+# (NFS: resolução de 1s); fica no manifesto sem mtime e é relida na próxima vez
+MARGEM_MTIME_NS = 2_000_000_000
+
+
+class ManifestoCorpus:
+    """
+    PDFs por pasta de CPF com o mtime da pasta (persistido em JSON).
+
+    Example:
+        >>> manifesto = ManifestoCorpus(Path("outputs/manifesto_pdfs.json"))
+        >>> pdfs = sorted(descobrir("../data/consultas", manifesto))
+        >>> manifesto.salvar()
+    """
+
+    def __init__(self, caminho: Optional[Path] = None):
+        self.caminho = Path(caminho) if caminho else None
+        self.raiz: Optional[str] = None
+        self.pastas: Dict[str, Dict[str, Any]] = {}
+        self.estatisticas = {"pastas_lidas": 0, "pastas_reaproveitadas": 0}
+        if self.caminho and self.caminho.exists():
+            try:
+                with open(self.caminho, encoding="utf-8") as f:
+                    dados = json.load(f)
+                self.raiz = dados["raiz"]
+                self.pastas = dados["pastas"]
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Manifesto ignorado ({self.caminho}): {e}")
+
+    def anterior(self, raiz: str) -> Dict[str, Dict[str, Any]]:
+        """Pastas da última varredura (vazio se o manifesto é de outra raiz)."""
+        return self.pastas if self.raiz == raiz else {}
+
+    def salvar(self) -> None:
+        if self.caminho is None:
+            return
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"raiz": self.raiz, "pastas": self.pastas}, f)
+        os.replace(temporario, self.caminho)
+
+
+def _listar_pdfs(pasta: str) -> List[str]:
+    """Nomes dos arquivos .pdf de uma pasta (os mesmos de Path.glob("*.pdf"))."""
+    with os.scandir(pasta) as entradas:
+        return sorted(
+            entrada.name for entrada in entradas
+            if entrada.name.endswith(".pdf") and entrada.is_file()
+        )
+
+
+def _ler_pasta(
+    pasta: str,
+    anterior: Optional[Dict[str, Any]],
+    limite_mtime_ns: int
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Entrada do manifesto para uma pasta (relida só se o mtime mudou).
+
+    Returns:
+        (entrada ou None se a pasta sumiu, True se foi relida)
+    """
+    try:
+        mtime_ns = os.stat(pasta).st_mtime_ns
+        if anterior is not None and anterior.get("mtime_ns") == mtime_ns:
+            return anterior, False
+        pdfs = _listar_pdfs(pasta)
+    except OSError as e:
+        logger.warning(f"Pasta ignorada na descoberta ({pasta}): {e}")
+        return None, True
+    return {"mtime_ns": mtime_ns if mtime_ns < limite_mtime_ns else None, "pdfs": pdfs}, True
+
+
+def _ler_bloco(
+    raiz: str,
+    nomes: List[str],
+    anteriores: Dict[str, Dict[str, Any]],
+    limite_mtime_ns: int
+) -> List[Tuple[str, Optional[Dict[str, Any]], bool]]:
+    """(nome, entrada, relida) de cada pasta do bloco."""
+    return [
+        (nome, *_ler_pasta(os.path.join(raiz, nome), anteriores.get(nome), limite_mtime_ns))
+        for nome in nomes
+    ]
+
+
+def descobrir(
+    base_dir,
+    manifesto: Optional[ManifestoCorpus] = None,
+    trabalhadores: int = TRABALHADORES_DESCOBERTA
+) -> Iterator[Path]:
+    """
+    PDFs de <base_dir>/<pasta>/*.pdf, entregues à medida que as pastas são lidas.
+
+    A ordem é a de conclusão (quem precisa de ordem estável ordena). Com
+    manifesto, pastas com o mesmo mtime não são relidas e o manifesto é
+    atualizado (incluindo pastas removidas); salvar() fica com o chamador.
+
+    Args:
+        base_dir: Diretório com uma pasta por CPF
+        manifesto: Manifesto da varredura anterior (None = sem cache)
+        trabalhadores: Threads de leitura de pastas
+
+    Yields:
+        Caminhos dos PDFs
+    """
+    raiz = os.fspath(base_dir)
+    manifesto = manifesto or ManifestoCorpus()
+    anteriores = manifesto.anterior(os.path.abspath(raiz))
+    limite_mtime_ns = time.time_ns() - MARGEM_MTIME_NS
+
+    with os.scandir(raiz) as entradas:
+        pastas = [entrada.name for entrada in entradas if entrada.is_dir()]
+
+    atuais: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, trabalhadores)) as executor:
+        futuros = [
+            executor.submit(_ler_bloco, raiz, pastas[i:i + PASTAS_POR_TAREFA], anteriores, limite_mtime_ns)
+            for i in range(0, len(pastas), PASTAS_POR_TAREFA)
+        ]
+        for futuro in as_completed(futuros):
+            for nome, entrada, relida in futuro.result():
+                if entrada is None:
+                    continue
+                atuais[nome] = entrada
+                manifesto.estatisticas["pastas_lidas" if relida else "pastas_reaproveitadas"] += 1
+                for pdf in entrada["pdfs"]:
+                    yield Path(raiz) / nome / pdf
+
+    manifesto.raiz = os.path.abspath(raiz)
+    manifesto.pastas = atuais
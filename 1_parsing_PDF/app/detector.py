@@ -6,9 +6,12 @@ Versão 2.0 - Otimizado para buscar múltiplos ofícios e validar CPF
 import re
 import logging
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, Union
 import pymupdf
 
+from .normalizacao import TextoNormalizado, normalizar, normalizar_termos
+from .paginas import DocumentoPaginas, FaixaOficio
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,22 +28,20 @@ class DetectorOficio:
     """
     
     def __init__(self):
+        # Palavras-chave comparadas com o texto normalizado (sem acentos, minúsculas):
+        # uma grafia basta - "OFÍCIO" também encontra "OFICIO"
+        
         # Critério 1A: Títulos específicos de ofícios requisitórios
         self.keywords_titulo = [
             "OFÍCIO REQUISITÓRIO Nº",
-            "OFICIO REQUISITORIO Nº", 
             "OFÍCIO REQUISITÓRIO N°",
-            "OFICIO REQUISITORIO N°",
             "OFÍCIO REQUISITÓRIO NÚMERO",
-            "OFICIO REQUISITORIO NUMERO",
-            "OFÍCIO REQUISITÓRIO",
-            "OFICIO REQUISITORIO"
+            "OFÍCIO REQUISITÓRIO"
         ]
         
         # Critério 1B: Cabeçalho oficial obrigatório
         self.keywords_cabecalho = [
-            "TRIBUNAL DE JUSTIÇA DO ESTADO DE SÃO PAULO",
-            "TRIBUNAL DE JUSTICA DO ESTADO DE SAO PAULO"
+            "TRIBUNAL DE JUSTIÇA DO ESTADO DE SÃO PAULO"
         ]
         
         # Critério 1C: Vara específica de fazenda pública
@@ -52,8 +53,35 @@ class DetectorOficio:
         # Critério 2: Padrão CNJ conforme especificação
         self.padrao_cnj = re.compile(r'\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}')
         
+        # Processo rotulado ("Processo nº: 0000000-00...") tem prioridade sobre CNJ solto
+        self.padrao_processo_rotulado = re.compile(
+            r'PROCESSO[^\n\d]{0,30}(\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4})',
+            re.IGNORECASE
+        )
+        
+        # Requerente/credor: nome até o fim da linha (ofício rejeitado sem LLM)
+        self.padrao_requerente = re.compile(
+            r'(?:REQUERENTE|CREDOR|EXEQUENTE)(?:\s*\(\w{1,2}\))?(?:\s*\(S\))?\s*:\s*([^\n]+)',
+            re.IGNORECASE
+        )
+        
         # Critério 3: Estrutura de endereçamento
         self.estrutura_vara = "AO JUÍZO DA"
+        self.estruturas_enderecamento = [
+            "AO EXCELENTÍSSIMO SENHOR",
+            "AO EXMO. SR.",
+            "AO EXMO. SENHOR",
+            "AO JUÍZO DA",
+            "À EXCELENTÍSSIMA SENHORA",
+            "À EXMA. SRA."
+        ]
+        
+        # Classificação rápida: início de ofício exige título/cabeçalho (critério 1)
+        # ou endereçamento (critério 3) no topo da página
+        self.termos_cabecalho = normalizar_termos([
+            "OFÍCIO", "TRIBUNAL DE JUSTIÇA",
+            "AO EXCELENTÍSSIMO", "AO EXMO", "AO JUÍZO", "À EXCELENTÍSSIMA", "À EXMA"
+        ])
         
         # Heurística para fim do ofício: assinatura + página curta
         self.indicadores_fim = [
@@ -66,8 +94,20 @@ class DetectorOficio:
         ]
         
         self.tamanho_minimo_pagina = 500  # chars
+        
+        # Formas normalizadas (calculadas uma vez)
+        self._titulos = normalizar_termos(self.keywords_titulo)
+        self._cabecalhos = normalizar_termos(self.keywords_cabecalho)
+        self._varas = normalizar_termos(self.keywords_vara)
+        self._contexto_requisicao = normalizar_termos(["VALOR GLOBAL DA REQUISIÇÃO", "REQUERENTE:"])
+        self._estruturas = normalizar_termos(self.estruturas_enderecamento)
+        self._indicadores_fim = normalizar_termos(self.indicadores_fim)
     
-    def buscar_todos_oficios(self, pdf_path: str) -> List[Dict[str, Any]]:
+    def buscar_todos_oficios(
+        self,
+        pdf_path: str,
+        paginas: Optional[DocumentoPaginas] = None
+    ) -> List[Dict[str, Any]]:
         """
         Busca TODOS os ofícios requisitórios no PDF.
         
@@ -75,13 +115,15 @@ class DetectorOficio:
         
         Args:
             pdf_path: Caminho para o arquivo PDF
+            paginas: Texto das páginas já aberto (evita reler o PDF)
             
         Returns:
-            Lista de dicionários, cada um contendo:
+            Lista de ofícios (FaixaOficio com `paginas`; dicionários se o PDF
+            foi aberto aqui), cada um lido como:
             {
                 'pagina_inicio': int (1-indexed),
                 'paginas': List[int] (1-indexed),
-                'texto': str
+                'texto': str (juntado a cada acesso a partir das páginas)
             }
             
         Example:
@@ -92,70 +134,58 @@ class DetectorOficio:
         try:
             logger.info(f"Buscando todos ofícios em: {pdf_path}")
             
-            doc = pymupdf.open(pdf_path)
-            oficios = []
+            doc = paginas or DocumentoPaginas(pdf_path)
+            faixas = []
             
+            # Só os números das páginas: o texto fica no DocumentoPaginas
             paginas_oficio_atual = []
-            texto_oficio_atual = ""
             em_oficio = False
             
             for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                texto_pagina = page.get_text()
+                # Fora de ofício, página sem termos de início no cabeçalho é descartada
+                # sem extrair o texto inteiro (só com classificação rápida)
+                if not em_oficio and not doc.candidata(page_num, self.termos_cabecalho):
+                    continue
                 
-                criterios = self._avaliar_criterios(texto_pagina)
+                pagina_normalizada = doc.normalizado(page_num)
+                
+                criterios = self._avaliar_criterios(pagina_normalizada)
                 
                 # Detectou início de NOVO ofício
                 if criterios >= 2:
                     # Se já estava em um ofício, salvar o anterior
                     if em_oficio and paginas_oficio_atual:
-                        oficios.append({
-                            'pagina_inicio': paginas_oficio_atual[0],
-                            'paginas': paginas_oficio_atual.copy(),
-                            'texto': texto_oficio_atual
-                        })
+                        faixas.append(paginas_oficio_atual)
                         logger.info(f"Ofício completo: páginas {paginas_oficio_atual}")
                     
                     # Iniciar novo ofício
                     em_oficio = True
                     paginas_oficio_atual = [page_num + 1]
-                    texto_oficio_atual = texto_pagina
                     logger.info(f"Ofício iniciado na página {page_num + 1} ({criterios}/3 critérios)")
                 
                 # Continuação do ofício atual
                 elif em_oficio:
-                    # Verificar se é fim do ofício
-                    if self._eh_fim_oficio(texto_pagina):
-                        # Adicionar página final e salvar ofício
-                        paginas_oficio_atual.append(page_num + 1)
-                        texto_oficio_atual += f"\n\n--- PÁGINA {page_num + 1} ---\n\n{texto_pagina}"
-                        
-                        oficios.append({
-                            'pagina_inicio': paginas_oficio_atual[0],
-                            'paginas': paginas_oficio_atual.copy(),
-                            'texto': texto_oficio_atual
-                        })
+                    paginas_oficio_atual.append(page_num + 1)
+                    
+                    # Fim do ofício: página final já incluída
+                    if self._eh_fim_oficio(pagina_normalizada):
+                        faixas.append(paginas_oficio_atual)
                         logger.info(f"Ofício finalizado: páginas {paginas_oficio_atual}")
                         
                         # Resetar
                         em_oficio = False
                         paginas_oficio_atual = []
-                        texto_oficio_atual = ""
-                    else:
-                        # Continua no ofício
-                        paginas_oficio_atual.append(page_num + 1)
-                        texto_oficio_atual += f"\n\n--- PÁGINA {page_num + 1} ---\n\n{texto_pagina}"
             
             # Se ainda estava em ofício ao final do PDF
             if em_oficio and paginas_oficio_atual:
-                oficios.append({
-                    'pagina_inicio': paginas_oficio_atual[0],
-                    'paginas': paginas_oficio_atual,
-                    'texto': texto_oficio_atual
-                })
+                faixas.append(paginas_oficio_atual)
                 logger.info(f"Ofício final: páginas {paginas_oficio_atual}")
             
-            doc.close()
+            oficios = [FaixaOficio(doc, paginas_faixa) for paginas_faixa in faixas]
+            if paginas is None:
+                # Documento aberto aqui: texto materializado antes de fechar
+                oficios = [dict(oficio) for oficio in oficios]
+                doc.fechar()
             logger.info(f"✅ Total de ofícios encontrados: {len(oficios)}")
             return oficios
             
@@ -194,6 +224,51 @@ class DetectorOficio:
         logger.debug(f"❌ CPF {cpf_formatado} NÃO encontrado neste ofício")
         return False
     
+    def extrair_processo_origem(self, texto_oficio: str) -> Optional[str]:
+        """
+        Extrai o número CNJ do processo por regex.
+        
+        Prioriza o número rotulado como "Processo"; senão, o primeiro CNJ do texto.
+        
+        Args:
+            texto_oficio: Texto extraído do ofício
+            
+        Returns:
+            Número CNJ ou None
+        """
+        match = self.padrao_processo_rotulado.search(texto_oficio)
+        if match:
+            return match.group(1)
+        
+        match = self.padrao_cnj.search(texto_oficio)
+        return match.group(0) if match else None
+    
+    def extrair_requerente(self, texto_oficio: str) -> Optional[str]:
+        """
+        Extrai o nome do requerente/credor por regex (em MAIÚSCULAS).
+        
+        Corta o que vier depois do nome na mesma linha (CPF, documento, separadores).
+        
+        Args:
+            texto_oficio: Texto extraído do ofício
+            
+        Returns:
+            Nome em maiúsculas ou None
+            
+        Example:
+            >>> detector.extrair_requerente("Requerente: Regina Dias - CPF 116.713.778-77")
+            'REGINA DIAS'
+        """
+        for match in self.padrao_requerente.finditer(texto_oficio):
+            nome = re.split(r'\s*[,;(]|\s+[-–]\s|\s+(?:CPF|CNPJ|RG)\b|\d', match.group(1), flags=re.IGNORECASE)[0]
+            nome = " ".join(nome.split()).strip(" .:")
+            
+            # Nome precisa de pelo menos duas palavras com letras
+            if len(nome) >= 3 and len(re.findall(r'[^\W\d_]{2,}', nome)) >= 2:
+                return nome.upper()
+        
+        return None
+    
     def detectar_oficio(self, pdf_path: str) -> Tuple[List[int], str]:
         """
         Método legado para compatibilidade com V1.
@@ -217,39 +292,36 @@ class DetectorOficio:
         primeiro_oficio = oficios[0]
         return primeiro_oficio['paginas'], primeiro_oficio['texto']
     
-    def _avaliar_criterios(self, texto: str) -> int:
+    def _avaliar_criterios(self, texto: Union[str, TextoNormalizado]) -> int:
         """
         Avalia quantos critérios de detecção são atendidos pelo texto.
         
         Args:
-            texto: Texto da página a ser analisada
+            texto: Texto da página a ser analisada (original ou já normalizado)
             
         Returns:
             Número de critérios atendidos (0-3)
         """
         criterios_atendidos = 0
-        texto_upper = texto.upper()
+        pagina = normalizar(texto)
         
         # Critério 1: Validação hierárquica de ofício requisitório
         score_criterio1 = 0
         
         # 1A: Título específico do ofício (peso 3)
-        titulo_encontrado = any(titulo.upper() in texto_upper for titulo in self.keywords_titulo)
-        if titulo_encontrado:
+        if pagina.contem_algum(self._titulos):
             score_criterio1 += 3
         
         # 1B: Cabeçalho oficial obrigatório (peso 3)
-        cabecalho_encontrado = any(cabecalho.upper() in texto_upper for cabecalho in self.keywords_cabecalho)
-        if cabecalho_encontrado:
+        if pagina.contem_algum(self._cabecalhos):
             score_criterio1 += 3
         
         # 1C: Vara de fazenda pública (peso 2)
-        vara_encontrada = any(vara.upper() in texto_upper for vara in self.keywords_vara)
-        if vara_encontrada:
+        if pagina.contem_algum(self._varas):
             score_criterio1 += 2
         
         # 1D: Contexto específico de requisição (peso 1)
-        if "VALOR GLOBAL DA REQUISIÇÃO" in texto_upper or "REQUERENTE:" in texto_upper:
+        if pagina.contem_algum(self._contexto_requisicao):
             score_criterio1 += 1
         
         # Critério 1 atendido se score >= 5 (garantindo elementos essenciais)
@@ -257,46 +329,32 @@ class DetectorOficio:
             criterios_atendidos += 1
         
         # Critério 2: Padrão CNJ
-        if self.padrao_cnj.search(texto):
+        if self.padrao_cnj.search(pagina.original):
             criterios_atendidos += 1
         
         # Critério 3: Estrutura vara específica para ofícios requisitórios
-        estruturas_validas = [
-            "AO EXCELENTÍSSIMO SENHOR",
-            "AO EXMO. SR.",
-            "AO EXMO. SENHOR",
-            "AO JUÍZO DA",
-            "À EXCELENTÍSSIMA SENHORA",
-            "À EXMA. SRA."
-        ]
-        
-        for estrutura in estruturas_validas:
-            if estrutura.upper() in texto_upper:
-                criterios_atendidos += 1
-                break
+        if pagina.contem_algum(self._estruturas):
+            criterios_atendidos += 1
         
         return criterios_atendidos
     
-    def _eh_fim_oficio(self, texto: str) -> bool:
+    def _eh_fim_oficio(self, texto: Union[str, TextoNormalizado]) -> bool:
         """
         Detecta se a página representa o fim do ofício usando heurísticas.
         
         Args:
-            texto: Texto da página
+            texto: Texto da página (original ou já normalizado)
             
         Returns:
             True se for provavelmente o fim do ofício
         """
-        texto_upper = texto.upper()
+        pagina = normalizar(texto)
         
         # Buscar indicadores de assinatura
-        tem_assinatura = any(
-            indicador.upper() in texto_upper 
-            for indicador in self.indicadores_fim
-        )
+        tem_assinatura = pagina.contem_algum(self._indicadores_fim)
         
         # Página muito curta pode indicar fim
-        pagina_curta = len(texto) < self.tamanho_minimo_pagina
+        pagina_curta = len(pagina.original) < self.tamanho_minimo_pagina
         
         # Fim do ofício = assinatura + página curta
         return tem_assinatura and pagina_curta
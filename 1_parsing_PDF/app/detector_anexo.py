@@ -6,9 +6,12 @@ Compatível com Windows Server 2022.
 import re
 import logging
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 import pymupdf
 
+from .normalizacao import TextoNormalizado, normalizar, normalizar_termo, normalizar_termos
+from .paginas import DocumentoPaginas
+
 
 logger = logging.getLogger(__name__)
 
@@ -47,12 +50,24 @@ class DetectorAnexoII:
         # Padrão para detectar estrutura tabular do ANEXO II
         self.padrao_credor = re.compile(r"CREDOR\s+N[ºO]\.?:\s*\d+", re.I)
 
-    def detectar_anexo_ii(self, pdf_path: str) -> Tuple[List[int], str]:
+        # Classificação rápida: título "ANEXO ..." no topo da página
+        self.termos_cabecalho = normalizar_termos(["ANEXO"])
+
+        # Padrões aplicados ao texto normalizado (sem acentos, minúsculas): "AG[ÊE]NCIA" vira "ag[ee]ncia"
+        self._marcadores = [re.compile(normalizar_termo(m)) for m in self.marcadores_anexo]
+        self._campos = [re.compile(normalizar_termo(c)) for c in self.campos_esperados]
+
+    def detectar_anexo_ii(
+        self,
+        pdf_path: str,
+        paginas: Optional[DocumentoPaginas] = None
+    ) -> Tuple[List[int], str]:
         """
         Detecta páginas contendo ANEXO II no PDF.
 
         Args:
             pdf_path: Caminho para o arquivo PDF (compatível com Windows)
+            paginas: Texto das páginas já aberto (evita reler o PDF)
 
         Returns:
             Tupla contendo:
@@ -67,27 +82,29 @@ class DetectorAnexoII:
             pdf_path = str(Path(pdf_path).resolve())
             logger.info(f"Iniciando detecção de ANEXO II em: {pdf_path}")
 
-            doc = pymupdf.open(pdf_path)
+            doc = paginas or DocumentoPaginas(pdf_path)
             paginas_anexo = []
 
             # Analisar cada página
             for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                texto_pagina = page.get_text()
+                if not doc.candidata(page_num, self.termos_cabecalho):
+                    continue
 
                 # Verificar marcadores do ANEXO II
-                if self._eh_pagina_anexo_ii(texto_pagina):
+                if self._eh_pagina_anexo_ii(doc.normalizado(page_num)):
                     paginas_anexo.append(page_num + 1)  # 1-indexed
                     logger.info(f"ANEXO II detectado na página {page_num + 1}")
 
-            doc.close()
-
             if not paginas_anexo:
+                if paginas is None:
+                    doc.fechar()
                 logger.info(f"Nenhum ANEXO II detectado em {Path(pdf_path).name}")
                 return [], ""
 
-            # Extrair texto completo das páginas do ANEXO II
-            texto_completo = self._extrair_texto_anexo(pdf_path, paginas_anexo)
+            # Extrair texto completo das páginas do ANEXO II (já lidas acima)
+            texto_completo = self._extrair_texto_anexo(pdf_path, paginas_anexo, doc)
+            if paginas is None:
+                doc.fechar()
 
             logger.info(f"ANEXO II encontrado em {len(paginas_anexo)} página(s): {paginas_anexo}")
             return paginas_anexo, texto_completo
@@ -96,65 +113,67 @@ class DetectorAnexoII:
             logger.error(f"Erro ao detectar ANEXO II em {pdf_path}: {e}")
             raise
 
-    def _eh_pagina_anexo_ii(self, texto: str) -> bool:
+    def _eh_pagina_anexo_ii(self, texto: Union[str, TextoNormalizado]) -> bool:
         """
         Verifica se a página contém ANEXO II usando critérios múltiplos.
 
         Args:
-            texto: Texto da página
+            texto: Texto da página (original ou já normalizado)
 
         Returns:
             True se a página contém ANEXO II
         """
-        texto_upper = texto.upper()
+        pagina = normalizar(texto)
 
         # Critério 1: Marcador "ANEXO II" presente
         marcador_encontrado = False
-        for marcador in self.marcadores_anexo:
-            if re.search(marcador, texto_upper):
+        for marcador in self._marcadores:
+            if marcador.search(pagina.texto):
                 marcador_encontrado = True
-                logger.debug(f"Marcador encontrado: {marcador}")
+                logger.debug(f"Marcador encontrado: {marcador.pattern}")
                 break
 
         if not marcador_encontrado:
             return False
 
         # Critério 2: Pelo menos 3 campos esperados presentes
-        campos_encontrados = 0
-        for campo in self.campos_esperados:
-            if re.search(campo, texto_upper):
-                campos_encontrados += 1
+        campos_encontrados = sum(1 for campo in self._campos if campo.search(pagina.texto))
 
         if campos_encontrados >= 3:
             logger.debug(f"ANEXO II confirmado: {campos_encontrados} campos encontrados")
             return True
 
         # Critério 3: Estrutura de credor presente (formato tabular)
-        if self.padrao_credor.search(texto):
+        if self.padrao_credor.search(pagina.original):
             logger.debug("ANEXO II confirmado: estrutura de credor detectada")
             return True
 
         return False
 
-    def _extrair_texto_anexo(self, pdf_path: str, paginas: List[int]) -> str:
+    def _extrair_texto_anexo(
+        self,
+        pdf_path: str,
+        paginas: List[int],
+        documento: Optional[DocumentoPaginas] = None
+    ) -> str:
         """
         Extrai texto completo das páginas identificadas como ANEXO II.
 
         Args:
             pdf_path: Caminho para o arquivo PDF
             paginas: Lista de páginas (1-indexed) que contêm ANEXO II
+            documento: Texto das páginas já aberto (evita reler o PDF)
 
         Returns:
             Texto completo do ANEXO II
         """
         try:
             pdf_path = str(Path(pdf_path).resolve())
-            doc = pymupdf.open(pdf_path)
+            doc = documento or DocumentoPaginas(pdf_path)
             texto_completo = ""
 
             for page_num in paginas:
-                page = doc.load_page(page_num - 1)  # Converter para 0-indexed
-                texto_pagina = page.get_text()
+                texto_pagina = doc.texto(page_num - 1)  # Converter para 0-indexed
 
                 # Adicionar separador entre páginas
                 if texto_completo:
@@ -162,7 +181,8 @@ class DetectorAnexoII:
 
                 texto_completo += texto_pagina
 
-            doc.close()
+            if documento is None:
+                doc.fechar()
 
             logger.debug(f"Texto ANEXO II extraído: {len(texto_completo)} caracteres")
             return texto_completo
@@ -233,27 +253,24 @@ class DetectorAnexoII:
 
             for page_num in range(len(doc)):
                 page = doc.load_page(page_num)
-                texto = page.get_text()
-                texto_upper = texto.upper()
+                pagina = normalizar(page.get_text())
 
                 # Verificar marcador
-                for marcador in self.marcadores_anexo:
-                    if re.search(marcador, texto_upper):
-                        stats["paginas_com_marcador"].append(page_num + 1)
-                        break
+                if any(marcador.search(pagina.texto) for marcador in self._marcadores):
+                    stats["paginas_com_marcador"].append(page_num + 1)
 
                 # Contar campos encontrados
-                campos_encontrados = []
-                for campo in self.campos_esperados:
-                    if re.search(campo, texto_upper):
-                        campos_encontrados.append(campo)
+                campos_encontrados = [
+                    campo for campo, padrao in zip(self.campos_esperados, self._campos)
+                    if padrao.search(pagina.texto)
+                ]
 
                 if campos_encontrados:
                     stats["paginas_com_campos"].append(page_num + 1)
                     stats["campos_por_pagina"][page_num + 1] = campos_encontrados
 
                 # Verificar se atende critério de detecção
-                if self._eh_pagina_anexo_ii(texto):
+                if self._eh_pagina_anexo_ii(pagina):
                     stats["paginas_detectadas"].append(page_num + 1)
 
             doc.close()
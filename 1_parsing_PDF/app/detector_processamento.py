@@ -5,8 +5,10 @@ Versão 2.0 - Otimizado para extração seletiva de páginas
 
 import re
 import logging
-from typing import Optional, Tuple
-import pymupdf
+from typing import Optional, Tuple, Union
+
+from .normalizacao import TextoNormalizado, normalizar, normalizar_termo, normalizar_termos
+from .paginas import DocumentoPaginas
 
 logger = logging.getLogger(__name__)
 
@@ -30,12 +32,21 @@ class DetectorProcessamento:
             "DEPRE - Diretoria de Execuções de Precatórios"
         ]
         
+        # Classificação rápida: título no topo da página
+        self.termos_cabecalho = normalizar_termos(["PROCESSAMENTO"])
+        
+        # Indicadores comparados com o texto normalizado (sem acentos, minúsculas)
+        self._depre = normalizar_termos(["DEPRE", "DIRETORIA DE EXECUÇÕES"])
+        self._numero_ordem = normalizar_termos(["Nº DE ORDEM", "NÚMERO DO PRECATÓRIO"])
+        self._com_informacao = normalizar_termos(["PROCESSAMENTO COM INFORMAÇÃO"])
+        
         # Keywords para identificar REJEIÇÃO
         self.keywords_rejeicao = [
             "NOTA DE REJEIÇÃO",
             "REJEIÇÃO",
             "irregularidade(s) passível(eis) de REJEIÇÃO"
         ]
+        self._rejeicao = [normalizar_termo(keyword) for keyword in self.keywords_rejeicao]
         
         # Padrão regex para número de ordem no PROCESSAMENTO: 822/2026
         self.padrao_numero_ordem = re.compile(
@@ -56,7 +67,8 @@ class DetectorProcessamento:
         self, 
         pdf_path: str, 
         inicio: int = 0,
-        limite: int = 50
+        limite: int = 50,
+        paginas: Optional[DocumentoPaginas] = None
     ) -> Tuple[Optional[int], Optional[str]]:
         """
         Detecta página com PROCESSAMENTO após o ofício/ANEXO II.
@@ -65,6 +77,7 @@ class DetectorProcessamento:
             pdf_path: Caminho para o arquivo PDF
             inicio: Página para começar busca (0-indexed)
             limite: Máximo de páginas para buscar após início
+            paginas: Texto das páginas já aberto (evita reler o PDF)
             
         Returns:
             Tupla (numero_pagina, texto_pagina) ou (None, None) se não encontrado
@@ -78,23 +91,27 @@ class DetectorProcessamento:
         try:
             logger.info(f"Buscando PROCESSAMENTO a partir da página {inicio + 1}")
             
-            doc = pymupdf.open(pdf_path)
+            doc = paginas or DocumentoPaginas(pdf_path)
             total_paginas = len(doc)
             
             # Limitar busca
             fim = min(inicio + limite, total_paginas)
             
             for page_num in range(inicio, fim):
-                page = doc.load_page(page_num)
-                texto = page.get_text()
+                if not doc.candidata(page_num, self.termos_cabecalho):
+                    continue
+                
+                texto = doc.texto(page_num)
                 
                 # Verificar se tem "PROCESSAMENTO" no texto
-                if self._eh_pagina_processamento(texto):
+                if self._eh_pagina_processamento(doc.normalizado(page_num)):
                     logger.info(f"✅ PROCESSAMENTO detectado na página {page_num + 1}")
-                    doc.close()
+                    if paginas is None:
+                        doc.fechar()
                     return (page_num + 1, texto)  # 1-indexed
             
-            doc.close()
+            if paginas is None:
+                doc.fechar()
             logger.warning(f"⚠️ PROCESSAMENTO não encontrado (buscou {fim - inicio} páginas)")
             return (None, None)
             
@@ -102,27 +119,31 @@ class DetectorProcessamento:
             logger.error(f"❌ Erro ao detectar PROCESSAMENTO: {e}")
             return (None, None)
     
-    def _eh_pagina_processamento(self, texto: str) -> bool:
+    def _eh_pagina_processamento(self, texto: Union[str, TextoNormalizado]) -> bool:
         """
         Verifica se texto contém indicadores de página PROCESSAMENTO.
         
         Args:
-            texto: Texto da página
+            texto: Texto da página (original ou já normalizado)
             
         Returns:
             True se é página PROCESSAMENTO
         """
-        texto_upper = texto.upper()
+        pagina = normalizar(texto)
         
         # Verificar keywords principais
-        tem_titulo = "PROCESSAMENTO" in texto_upper
-        tem_depre = "DEPRE" in texto_upper or "DIRETORIA DE EXECUÇÕES" in texto_upper
-        tem_numero_ordem = "Nº DE ORDEM" in texto_upper or "NÚMERO DO PRECATÓRIO" in texto_upper
+        tem_titulo = pagina.contem_algum(self.termos_cabecalho)
+        tem_depre = pagina.contem_algum(self._depre)
+        tem_numero_ordem = pagina.contem_algum(self._numero_ordem)
         
         # Precisa ter pelo menos título + um dos outros
         return tem_titulo and (tem_depre or tem_numero_ordem)
     
-    def eh_oficio_rejeitado(self, texto: str) -> bool:
+    def processamento_com_informacao(self, texto: Union[str, TextoNormalizado]) -> bool:
+        """"PROCESSAMENTO COM INFORMAÇÃO" no texto (com ou sem acentos)."""
+        return normalizar(texto).contem_algum(self._com_informacao)
+    
+    def eh_oficio_rejeitado(self, texto: Union[str, TextoNormalizado]) -> bool:
         """
         Verifica se o texto indica que o ofício foi rejeitado.
         
@@ -130,26 +151,26 @@ class DetectorProcessamento:
         Ofícios com número de ordem foram ACEITOS pelo DEPRE.
         
         Args:
-            texto: Texto da página
+            texto: Texto da página (original ou já normalizado)
             
         Returns:
             True se é ofício rejeitado
         """
-        texto_upper = texto.upper()
+        pagina = normalizar(texto)
         
         # 🔴 REGRA CRÍTICA: Se tem "PROCESSAMENTO COM INFORMAÇÃO" → NÃO é rejeitado
-        if "PROCESSAMENTO COM INFORMAÇÃO" in texto_upper or "PROCESSAMENTO COM INFORMACAO" in texto_upper:
+        if self.processamento_com_informacao(pagina):
             logger.info("✅ PROCESSAMENTO COM INFORMAÇÃO detectado → Ofício ACEITO (não rejeitado)")
             return False
         
         # 🔴 REGRA CRÍTICA: Se tem número de ordem → NÃO é rejeitado
-        if self.extrair_numero_ordem(texto):
+        if self.extrair_numero_ordem(pagina.original):
             logger.info("✅ Número de ordem detectado → Ofício ACEITO (não rejeitado)")
             return False
         
         # Verificar keywords de rejeição
-        for keyword in self.keywords_rejeicao:
-            if keyword.upper() in texto_upper:
+        for keyword, normalizada in zip(self.keywords_rejeicao, self._rejeicao):
+            if normalizada in pagina:
                 logger.warning(f"⚠️ Keyword de rejeição encontrada: {keyword}")
                 return True
         
@@ -0,0 +1,165 @@
+"""
+Disjuntor do LLM e caixa de saída (store-and-forward).
+
+Quando a API cai ou a cota acaba, cada PDF falharia com "Falha na extração LLM"
+e a detecção (cara em CPU) teria de rodar de novo. Com o disjuntor aberto, o
+payload já preparado vai para uma caixa de saída em disco; quando o disjuntor
+fecha, a caixa é drenada sem repetir a detecção.
+
+Estados:
+    fechado     → chamadas normais; falhas de disponibilidade seguidas abrem
+    aberto      → nenhuma chamada até passar a espera
+    meio_aberto → uma chamada de sonda; sucesso fecha, falha reabre (espera dobra)
+"""
+
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, List
+
+from .schemas import PayloadExtracao
+
+logger = logging.getLogger(__name__)
+
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+# Falhas de disponibilidade seguidas até abrir
+LIMITE_FALHAS = 5
+
+ESPERA_INICIAL = 30.0
+ESPERA_MAXIMA = 600.0
+
+
+class LLMIndisponivel(Exception):
+    """Chamada recusada: disjuntor aberto."""
+
+
+class Disjuntor:
+    """
+    Circuit breaker das chamadas ao LLM (thread-safe).
+
+    Example:
+        >>> if disjuntor.permitir():
+        ...     try:
+        ...         chamar()
+        ...         disjuntor.registrar_sucesso()
+        ...     except APIConnectionError:
+        ...         disjuntor.registrar_falha()
+    """
+
+    def __init__(
+        self,
+        limite_falhas: int = LIMITE_FALHAS,
+        espera_inicial: float = ESPERA_INICIAL,
+        espera_maxima: float = ESPERA_MAXIMA,
+        relogio: Callable[[], float] = time.monotonic
+    ):
+        self.limite_falhas = limite_falhas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._relogio = relogio
+        self._trava = threading.Lock()
+        self.estado = FECHADO
+        self.falhas_consecutivas = 0
+        self.aberturas = 0
+        self._espera = espera_inicial
+        self._reabrir_em = 0.0
+
+    def permitir(self) -> bool:
+        """
+        Se a chamada pode seguir. Passada a espera do disjuntor aberto, libera
+        UMA sonda (meio_aberto); as demais continuam recusadas até o resultado dela.
+        """
+        with self._trava:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO and self._relogio() >= self._reabrir_em:
+                self.estado = MEIO_ABERTO
+                logger.info("🔌 Disjuntor meio aberto: enviando chamada de sonda")
+                return True
+            return False
+
+    def aberto(self) -> bool:
+        """Se chamadas seriam recusadas agora (sem consumir a sonda)."""
+        with self._trava:
+            if self.estado == ABERTO:
+                return self._relogio() < self._reabrir_em
+            return self.estado == MEIO_ABERTO
+
+    def instavel(self) -> bool:
+        """Disjuntor não fechado ou última chamada falhou por indisponibilidade."""
+        with self._trava:
+            return self.estado != FECHADO or self.falhas_consecutivas > 0
+
+    def segundos_para_sonda(self) -> float:
+        """Tempo até a próxima sonda (0 se já pode chamar)."""
+        with self._trava:
+            if self.estado != ABERTO:
+                return 0.0
+            return max(0.0, self._reabrir_em - self._relogio())
+
+    def registrar_sucesso(self) -> None:
+        """Servidor respondeu: fecha o disjuntor."""
+        with self._trava:
+            self.falhas_consecutivas = 0
+            if self.estado != FECHADO:
+                logger.info("✅ Disjuntor fechado: LLM disponível novamente")
+            self.estado = FECHADO
+            self._espera = self.espera_inicial
+
+    def registrar_falha(self) -> None:
+        """Falha de disponibilidade (rede, timeout, 429, 5xx)."""
+        with self._trava:
+            self.falhas_consecutivas += 1
+            if self.estado == MEIO_ABERTO:
+                self._espera = min(self._espera * 2, self.espera_maxima)
+                self._abrir()
+            elif self.estado == FECHADO and self.falhas_consecutivas >= self.limite_falhas:
+                self._abrir()
+
+    def _abrir(self) -> None:
+        self.estado = ABERTO
+        self.aberturas += 1
+        self._reabrir_em = self._relogio() + self._espera
+        logger.warning(
+            f"🔌 Disjuntor aberto ({self.falhas_consecutivas} falhas seguidas): "
+            f"nova tentativa em {self._espera:.0f}s"
+        )
+
+
+class CaixaSaida:
+    """
+    Payloads à espera do LLM, um JSON por requisição (hash do PDF + CPF).
+
+    Escrita atômica (arquivo temporário + rename): sobrevive à queda do processo.
+    """
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.pendentes())
+
+    def guardar(self, payload: PayloadExtracao) -> Path:
+        """Grava (ou regrava) o payload na caixa."""
+        caminho = self.diretorio / f"{payload.id_requisicao}.json"
+        temporario = caminho.with_suffix(".tmp")
+        temporario.write_text(payload.model_dump_json(), encoding="utf-8")
+        os.replace(temporario, caminho)
+        return caminho
+
+    def pendentes(self) -> List[Path]:
+        """Payloads guardados, do mais antigo para o mais novo."""
+        return sorted(self.diretorio.glob("*.json"), key=lambda p: p.stat().st_mtime_ns)
+
+    def carregar(self, caminho: Path) -> PayloadExtracao:
+        return PayloadExtracao.model_validate_json(Path(caminho).read_text(encoding="utf-8"))
+
+    def remover(self, caminho: Path) -> None:
+        Path(caminho).unlink(missing_ok=True)
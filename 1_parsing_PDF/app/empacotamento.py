@@ -0,0 +1,121 @@
+"""
+Empacotamento de documentos curtos - vários ofícios numa única chamada ao LLM.
+
+Ofícios de formato antigo e notas de rejeição têm poucas centenas de caracteres,
+mas cada um pagaria sozinho o bloco de instruções (~2k tokens). Agrupando-os sob
+um orçamento de tokens, o custo fixo do prompt é dividido pelo pacote.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List
+
+from .schemas import PayloadExtracao
+
+logger = logging.getLogger(__name__)
+
+
+# Aproximação para texto em português (sem tokenizer no pipeline)
+CARACTERES_POR_TOKEN = 4
+
+# Documento acima disso vai sozinho (extração normal)
+LIMITE_TOKENS_DOCUMENTO = 1000
+
+# Orçamento de tokens dos documentos de um pacote (instruções não contam)
+ORCAMENTO_TOKENS_PACOTE = 4000
+
+# Limite de documentos por pacote (saída cresce ~300 tokens por documento)
+MAXIMO_DOCUMENTOS_PACOTE = 8
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa de tokens de um texto."""
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def elegivel(payload: PayloadExtracao, limite_tokens: int = LIMITE_TOKENS_DOCUMENTO) -> bool:
+    """Se o documento é curto o suficiente para ir num pacote."""
+    return estimar_tokens(payload.texto) <= limite_tokens
+
+
+def agrupar(
+    payloads: Iterable[PayloadExtracao],
+    orcamento_tokens: int = ORCAMENTO_TOKENS_PACOTE,
+    maximo_documentos: int = MAXIMO_DOCUMENTOS_PACOTE
+) -> List[List[PayloadExtracao]]:
+    """
+    Agrupa documentos em pacotes sob o orçamento de tokens (ordem preservada).
+
+    Args:
+        payloads: Payloads elegíveis
+        orcamento_tokens: Máximo de tokens de documento por pacote
+        maximo_documentos: Máximo de documentos por pacote
+
+    Returns:
+        Lista de pacotes (cada pacote é uma lista de payloads)
+    """
+    pacotes: List[List[PayloadExtracao]] = []
+    atual: List[PayloadExtracao] = []
+    tokens_atual = 0
+
+    for payload in payloads:
+        tokens = estimar_tokens(payload.texto)
+        if atual and (tokens_atual + tokens > orcamento_tokens or len(atual) >= maximo_documentos):
+            pacotes.append(atual)
+            atual, tokens_atual = [], 0
+        atual.append(payload)
+        tokens_atual += tokens
+
+    if atual:
+        pacotes.append(atual)
+
+    return pacotes
+
+
+def identificar(pacote: List[PayloadExtracao]) -> Dict[str, PayloadExtracao]:
+    """IDs curtos por documento do pacote (doc1, doc2, ...) → payload."""
+    return {f"doc{indice}": payload for indice, payload in enumerate(pacote, 1)}
+
+
+def separar_respostas(conteudo: str, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Demultiplexa a resposta do pacote por id_documento.
+
+    Itens com ID desconhecido ou repetido são descartados (o documento
+    correspondente cai para a extração individual).
+
+    Args:
+        conteudo: JSON {"documentos": [...]} retornado pelo LLM
+        ids: IDs enviados no pacote
+
+    Returns:
+        Dicionário id → dados do documento (sem id_documento)
+
+    Raises:
+        ValueError: Se a resposta não tiver a lista "documentos"
+    """
+    dados = json.loads(conteudo)
+    documentos = dados.get("documentos") if isinstance(dados, dict) else None
+    if not isinstance(documentos, list):
+        raise ValueError("Resposta do pacote sem lista 'documentos'")
+
+    esperados = set(ids)
+    respostas: Dict[str, Dict[str, Any]] = {}
+    repetidos = set()
+
+    for documento in documentos:
+        if not isinstance(documento, dict):
+            continue
+        id_documento = str(documento.pop("id_documento", ""))
+        if id_documento not in esperados:
+            logger.warning(f"⚠️ Pacote: id_documento desconhecido '{id_documento}'")
+            continue
+        if id_documento in respostas:
+            repetidos.add(id_documento)
+        respostas[id_documento] = documento
+
+    for id_documento in repetidos:
+        logger.warning(f"⚠️ Pacote: id_documento repetido '{id_documento}'")
+        del respostas[id_documento]
+
+    return respostas
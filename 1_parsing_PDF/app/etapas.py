@@ -0,0 +1,336 @@
+"""
+Etapas desacopladas - A (detecção → payloads em disco) e B (payloads → LLM).
+
+A etapa A (validação do PDF, segmentação, CPF, rejeição, texto do prompt) não
+chama o LLM: roda antes, em todos os núcleos. A etapa B lê só os payloads,
+sem abrir PDFs, com concorrência própria, e pode ser repetida (ex: outro
+modelo ou prompt) quantas vezes for preciso.
+
+Diretório das etapas:
+    payloads/<hash>-<cpf>-<nome>.json    um payload compacto por PDF
+    deteccao.jsonl                       resultados finais da etapa A (falhas, rejeitados por regex)
+"""
+
+import os
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .concorrencia import ControleConcorrencia, MedidorCPU, executar_adaptativo
+from .agendamento import SEGUNDOS_POR_TAREFA, HistoricoCusto, contar_paginas, ordenar_maior_primeiro
+from .ocr import CacheOCR, MotorOCR
+from .preflight import Farejo, farejar
+from .processador import ProcessadorOficio
+from .schemas import PayloadExtracao
+
+logger = logging.getLogger(__name__)
+
+
+DIRETORIO_PAYLOADS = "payloads"
+ARQUIVO_DETECCAO = "deteccao.jsonl"
+
+# Etapa A não chama o LLM: o cliente é criado mas nunca usado
+CHAVE_SEM_LLM = "sem-llm"
+
+
+def gravar_payload(diretorio: Path, payload: PayloadExtracao) -> Path:
+    """Grava o payload (campos com valor padrão omitidos), escrita atômica."""
+    pasta = Path(diretorio) / DIRETORIO_PAYLOADS
+    pasta.mkdir(parents=True, exist_ok=True)
+    caminho = pasta / f"{payload.id_requisicao}.json"
+    temporario = caminho.with_suffix(".tmp")
+    temporario.write_text(payload.model_dump_json(exclude_defaults=True), encoding="utf-8")
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def ler_payloads(diretorio: Path) -> List[PayloadExtracao]:
+    """Payloads da etapa A, ordenados pelo caminho do PDF."""
+    pasta = Path(diretorio) / DIRETORIO_PAYLOADS
+    payloads = [
+        PayloadExtracao.model_validate_json(caminho.read_text(encoding="utf-8"))
+        for caminho in pasta.glob("*.json")
+    ]
+    return sorted(payloads, key=lambda p: p.pdf_path)
+
+
+def gravar_resultados_deteccao(diretorio: Path, resultados: List[Dict[str, Any]]) -> None:
+    """Grava os resultados que a etapa A já resolve (sem etapa B)."""
+    Path(diretorio).mkdir(parents=True, exist_ok=True)
+    with open(Path(diretorio) / ARQUIVO_DETECCAO, 'w', encoding='utf-8') as f:
+        for resultado in resultados:
+            f.write(json.dumps(resultado, ensure_ascii=False, default=str) + "\n")
+
+
+def ler_resultados_deteccao(diretorio: Path) -> List[Dict[str, Any]]:
+    caminho = Path(diretorio) / ARQUIVO_DETECCAO
+    if not caminho.exists():
+        return []
+    with open(caminho, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+# ===== Etapa A =====
+
+_processador_deteccao: Optional[ProcessadorOficio] = None
+
+
+def _processador_do_trabalhador() -> ProcessadorOficio:
+    """Um processador por processo (detectores e cache de layouts próprios)."""
+    global _processador_deteccao
+    if _processador_deteccao is None:
+        _processador_deteccao = ProcessadorOficio(CHAVE_SEM_LLM, {})
+    return _processador_deteccao
+
+
+def configurar_trabalhador(
+    ocr_cache: Optional[Path] = None,
+    classificacao_rapida: bool = False,
+    max_paginas_memoria: Optional[int] = None
+) -> None:
+    """
+    Opções do processador do trabalhador. OCR com um processo por trabalhador:
+    a etapa já usa todos os núcleos.
+    """
+    processador = _processador_do_trabalhador()
+    processador.classificacao_rapida = classificacao_rapida
+    processador.max_paginas_memoria = max_paginas_memoria
+    if ocr_cache is not None:
+        processador.ocr = MotorOCR(trabalhadores=1, cache=CacheOCR(ocr_cache))
+
+
+def detectar_grupo(
+    pdfs: List[str],
+    hash_pdf: Optional[str] = None,
+    farejo: Optional[Farejo] = None
+) -> List[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Etapa A de um grupo de PDFs (cópias do mesmo arquivo vão juntas: uma segmentação).
+
+    Args:
+        pdfs: Caminhos dos PDFs
+        hash_pdf: Hash comum das cópias (None = arquivo único)
+        farejo: farejar() do processo principal (mesmo conteúdo: vale para as cópias)
+
+    Returns:
+        Por PDF: (payload JSON, None) ou (None, resultado final)
+    """
+    processador = _processador_do_trabalhador()
+    if hash_pdf and len(pdfs) > 1:
+        processador.layouts.reservar(hash_pdf, pdfs)
+
+    saidas: List[Tuple[Optional[str], Optional[Dict[str, Any]]]] = []
+    for pdf in pdfs:
+        cpf = Path(pdf).parent.name
+        try:
+            payload, resultado_erro = processador.preparar_payload(pdf, cpf, farejo)
+        except Exception as e:
+            logger.error(f"Erro ao preparar {Path(pdf).name}: {e}")
+            payload, resultado_erro = None, processador._criar_resultado_erro(cpf, pdf, str(e))
+
+        if payload is None:
+            saidas.append((None, resultado_erro or processador._criar_resultado_erro(
+                cpf, pdf, "PDF ou pasta de CPF inválidos"
+            )))
+            continue
+
+        resultado_regex = processador.resolver_sem_llm(payload)
+        if resultado_regex is not None:
+            # Vai para JSON: datas e Decimal como texto
+            saidas.append((None, json.loads(json.dumps(resultado_regex, default=str))))
+        else:
+            saidas.append((payload.model_dump_json(), None))
+
+    return saidas
+
+
+def _detectar_grupo_medido(
+    pdfs: List[str],
+    hash_pdf: Optional[str] = None,
+    farejo: Optional[Farejo] = None
+) -> Tuple[List[Tuple[Optional[str], Optional[Dict[str, Any]]]], float]:
+    """detectar_grupo com o tempo gasto no trabalhador (histórico do agendamento)."""
+    inicio = time.time()
+    saidas = detectar_grupo(pdfs, hash_pdf, farejo)
+    return saidas, time.time() - inicio
+
+
+def _detectar_indice(tarefa):
+    """_detectar_grupo_medido de (índice, (pdfs, hash, farejo)) - a concorrência adaptativa devolve o índice junto."""
+    indice, argumentos = tarefa
+    return indice, _detectar_grupo_medido(*argumentos)
+
+
+def preparar_pdf(pdf: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Etapa A de um PDF no trabalhador supervisionado (ver supervisor.py).
+
+    Sem resolver por regex: a etapa LLM do runner decide (e conta) isso.
+
+    Returns:
+        (payload JSON, None) ou (None, resultado final)
+    """
+    processador = _processador_do_trabalhador()
+    payload, resultado_erro = processador.preparar_payload(pdf, Path(pdf).parent.name)
+    if payload is None:
+        return None, resultado_erro or processador._criar_resultado_erro(
+            Path(pdf).parent.name, pdf, "PDF ou pasta de CPF inválidos"
+        )
+    return payload.model_dump_json(), None
+
+
+def detectar(
+    grupos: List[Tuple[Optional[str], List[Path]]],
+    diretorio: Path,
+    trabalhadores: Optional[int] = None,
+    ocr_cache: Optional[Path] = None,
+    classificacao_rapida: bool = False,
+    max_paginas_memoria: Optional[int] = None,
+    historico: Optional[HistoricoCusto] = None,
+    controle: Optional[ControleConcorrencia] = None
+) -> Iterator[Tuple[int, int]]:
+    """
+    Etapa A em paralelo (processos): grava um payload por PDF e os resultados finais.
+
+    PDFs recusados ao farejar (cabeçalho/trailer) viram resultado final sem
+    passar pelos trabalhadores. Com vários trabalhadores, os grupos vão para
+    o pool do maior para o menor custo estimado (páginas x tempo por página
+    do histórico; ver agendamento.py).
+
+    Args:
+        grupos: (hash das cópias ou None, PDFs) - ver agrupar_por_conteudo
+        diretorio: Diretório das etapas
+        trabalhadores: Processos (padrão: todos os núcleos; 1 = no processo atual)
+        ocr_cache: Com OCR das páginas digitalizadas, diretório do texto por hash
+            de página (compartilhado entre os trabalhadores; None = sem OCR)
+        classificacao_rapida: Detectores descartam páginas pelo cabeçalho
+        max_paginas_memoria: Textos de página guardados por PDF (None = todos)
+        historico: Tempo por página de execuções anteriores (atualizado aqui;
+            quem chama salva)
+        controle: Grupos em voo ajustados pela vazão (pool com controle.maximo
+            processos; None = `trabalhadores` fixos)
+
+    Raises:
+        RuntimeError: Se o OCR foi pedido e o Tesseract não está instalado
+
+    Yields:
+        (payloads gravados, resultados finais) acumulados, a cada grupo concluído
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    historico = historico or HistoricoCusto()
+    resultados: List[Dict[str, Any]] = []
+    gravados = 0
+
+    # No processo atual também: falta do Tesseract aparece antes de subir o pool
+    configurar_trabalhador(ocr_cache, classificacao_rapida, max_paginas_memoria)
+
+    def consumir(saidas):
+        nonlocal gravados
+        for payload_json, resultado in saidas:
+            if payload_json is not None:
+                gravar_payload(diretorio, PayloadExtracao.model_validate_json(payload_json))
+                gravados += 1
+            else:
+                resultados.append(resultado)
+
+    # Preflight barato no processo principal: arquivo ruim não ocupa um trabalhador
+    # (cópias têm o mesmo conteúdo: basta farejar a primeira)
+    tarefas = []
+    paginas: List[Optional[int]] = []  # por tarefa (xref: barato, sem extrair texto)
+    for hash_pdf, pdfs in grupos:
+        farejo = farejar(str(pdfs[0])) if pdfs else None
+        motivo = farejo[0] if farejo else None
+        if motivo is None:
+            # Trabalhador recebe o farejo: não relê cabeçalho e trailer
+            tarefas.append(([str(pdf) for pdf in pdfs], hash_pdf, farejo))
+            paginas.append(contar_paginas(str(pdfs[0])))
+            continue
+        processador = _processador_do_trabalhador()
+        consumir([
+            (None, processador._criar_resultado_erro(Path(pdf).parent.name, str(pdf), f"PDF inválido: {motivo}"))
+            for pdf in pdfs
+        ])
+        yield gravados, len(resultados)
+
+    if trabalhadores == 1:
+        for indice, tarefa in enumerate(tarefas):
+            saidas, segundos = _detectar_grupo_medido(*tarefa)
+            historico.registrar(paginas[indice], segundos)
+            consumir(saidas)
+            yield gravados, len(resultados)
+    else:
+        # Segmentação é uma por grupo; cada cópia a mais custa só o fixo
+        def custo(indice):
+            return historico.estimar(paginas[indice]) + (len(tarefas[indice][0]) - 1) * SEGUNDOS_POR_TAREFA
+
+        ordem = ordenar_maior_primeiro(range(len(tarefas)), custo)
+        with ProcessPoolExecutor(
+            max_workers=controle.maximo if controle else trabalhadores,
+            initializer=configurar_trabalhador,
+            initargs=(ocr_cache, classificacao_rapida, max_paginas_memoria)
+        ) as executor:
+            if controle is None:
+                futuros = {executor.submit(_detectar_grupo_medido, *tarefas[indice]): indice for indice in ordem}
+                concluidos = ((futuros[futuro], futuro.result()) for futuro in as_completed(futuros))
+            else:
+                concluidos = executar_adaptativo(
+                    executor, _detectar_indice, [(indice, tarefas[indice]) for indice in ordem],
+                    controle, ordenado=False
+                )
+            for indice, (saidas, segundos) in concluidos:
+                historico.registrar(paginas[indice], segundos)
+                consumir(saidas)
+                yield gravados, len(resultados)
+
+    gravar_resultados_deteccao(diretorio, resultados)
+
+
+# ===== Etapa B =====
+
+def sinais_llm(processador: ProcessadorOficio, medidor: Optional[MedidorCPU] = None):
+    """Sinais da concorrência adaptativa do LLM: uso de CPU e p95 da latência."""
+    medidor = medidor or MedidorCPU()
+    return lambda: {"uso_cpu": medidor.ler(), "latencia_p95": processador.latencias.percentil(95)}
+
+
+def extrair(
+    diretorio: Path,
+    processador: ProcessadorOficio,
+    concorrencia: int = 4,
+    controle: Optional[ControleConcorrencia] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Etapa B: LLM + validação de cada payload (não abre os PDFs).
+
+    Args:
+        diretorio: Diretório das etapas
+        processador: Processador com cliente LLM configurado
+        concorrencia: Payloads em paralelo (threads)
+        controle: Payloads em voo ajustados por vazão, 429 e latência do LLM
+            (substitui `concorrencia`)
+
+    Yields:
+        Resultados na ordem dos payloads
+    """
+    def processar(payload: PayloadExtracao) -> Dict[str, Any]:
+        try:
+            return processador.processar_payload(payload)
+        except Exception as e:
+            logger.error(f"Erro ao processar {payload.pdf}: {e}")
+            return processador._criar_resultado_erro(payload.cpf, payload.pdf_path, str(e))
+
+    if controle is None:
+        processador.definir_concorrencia(concorrencia)
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            yield from executor.map(processar, ler_payloads(diretorio))
+        return
+
+    processador.definir_concorrencia(controle.maximo, controle)
+    with ThreadPoolExecutor(max_workers=controle.maximo) as executor:
+        yield from executar_adaptativo(
+            executor, processar, ler_payloads(diretorio), controle,
+            sinais=sinais_llm(processador)
+        )
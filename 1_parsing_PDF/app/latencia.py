@@ -0,0 +1,177 @@
+"""
+Latência das chamadas LLM - timeouts adaptativos e requisições com hedge.
+
+- Histograma deslizante das latências das últimas chamadas bem-sucedidas
+- Timeout por requisição = p99 × fator (limitado), em vez do padrão do cliente
+- Hedge: se a resposta não chegou no p95, dispara uma duplicata e usa a que
+  voltar primeiro; um orçamento limita as duplicatas a uma fração das chamadas
+"""
+
+import math
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Até juntar amostras suficientes, vale o timeout padrão e não há hedge
+MINIMO_AMOSTRAS = 20
+JANELA_AMOSTRAS = 200
+
+TIMEOUT_PADRAO = 120.0
+TIMEOUT_MINIMO = 15.0
+TIMEOUT_MAXIMO = 300.0
+FATOR_TIMEOUT = 3.0
+
+PERCENTIL_HEDGE = 95
+
+# Duplicatas permitidas: 5% das chamadas
+FRACAO_HEDGE = 0.05
+
+
+class ControleLatencia:
+    """
+    Histograma deslizante de latências + orçamento de hedge (thread-safe).
+    """
+
+    def __init__(
+        self,
+        janela: int = JANELA_AMOSTRAS,
+        minimo_amostras: int = MINIMO_AMOSTRAS,
+        fracao_hedge: float = FRACAO_HEDGE
+    ):
+        self._trava = threading.Lock()
+        self._amostras: deque = deque(maxlen=janela)
+        self.minimo_amostras = minimo_amostras
+        self.fracao_hedge = fracao_hedge
+        self.chamadas = 0
+        self.hedges = 0
+        self.hedges_vencedores = 0
+
+    def registrar(self, segundos: float) -> None:
+        """Registra a latência de uma chamada bem-sucedida."""
+        with self._trava:
+            self._amostras.append(segundos)
+
+    def percentil(self, p: float) -> Optional[float]:
+        """
+        Percentil das latências da janela.
+
+        Args:
+            p: Percentil (0-100)
+
+        Returns:
+            Latência em segundos ou None se não houver amostras suficientes
+        """
+        with self._trava:
+            if len(self._amostras) < self.minimo_amostras:
+                return None
+            ordenadas = sorted(self._amostras)
+
+        indice = min(len(ordenadas) - 1, max(0, math.ceil(p / 100 * len(ordenadas)) - 1))
+        return ordenadas[indice]
+
+    def timeout(self) -> float:
+        """Timeout da próxima requisição: p99 × fator, entre o mínimo e o máximo."""
+        p99 = self.percentil(99)
+        if p99 is None:
+            return TIMEOUT_PADRAO
+        return min(TIMEOUT_MAXIMO, max(TIMEOUT_MINIMO, p99 * FATOR_TIMEOUT))
+
+    def atraso_hedge(self) -> Optional[float]:
+        """Quanto esperar antes de disparar a duplicata (p95), ou None sem histórico."""
+        return self.percentil(PERCENTIL_HEDGE)
+
+    def nova_chamada(self) -> None:
+        """Conta uma chamada (base do orçamento de hedge)."""
+        with self._trava:
+            self.chamadas += 1
+
+    def hedge_venceu(self) -> None:
+        """Conta uma duplicata que respondeu antes da original."""
+        with self._trava:
+            self.hedges_vencedores += 1
+
+    def reservar_hedge(self) -> bool:
+        """Consome o orçamento de hedge; False se as duplicatas já passaram da fração."""
+        with self._trava:
+            if self.hedges + 1 > self.fracao_hedge * max(self.chamadas, 1):
+                return False
+            self.hedges += 1
+            return True
+
+    def relatorio(self) -> Dict[str, Any]:
+        """Percentis e uso do hedge."""
+        return {
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+            "chamadas": self.chamadas,
+            "hedges": self.hedges,
+            "hedges_vencedores": self.hedges_vencedores
+        }
+
+
+def executar_com_hedge(
+    executor: Executor,
+    funcao: Callable[[], Any],
+    controle: ControleLatencia
+) -> Tuple[Any, bool]:
+    """
+    Executa `funcao`; se não terminar no p95 e houver orçamento, dispara uma
+    duplicata e devolve o primeiro resultado bem-sucedido.
+
+    O atraso do hedge conta a partir do início da chamada, não do envio ao
+    pool: tempo na fila (pool cheio) não dispara duplicatas.
+
+    A chamada perdedora não é cancelada (a API não permite); seu resultado é
+    descartado quando chegar.
+
+    Args:
+        executor: Pool onde as chamadas rodam
+        funcao: Chamada a executar (sem argumentos)
+        controle: Histograma e orçamento de hedge
+
+    Returns:
+        Tupla (resultado, veio_do_hedge)
+
+    Raises:
+        Exception: Erro da chamada (ou da última, se ambas falharem)
+    """
+    controle.nova_chamada()
+
+    atraso = controle.atraso_hedge()
+    if atraso is None:
+        return executor.submit(funcao).result(), False
+
+    iniciada = threading.Event()
+
+    def primeira_chamada():
+        iniciada.set()
+        return funcao()
+
+    primeira = executor.submit(primeira_chamada)
+    iniciada.wait()
+
+    feitas, _ = wait([primeira], timeout=atraso)
+    if feitas or not controle.reservar_hedge():
+        return primeira.result(), False
+
+    logger.info(f"🏁 Resposta passou do p95 ({atraso:.1f}s), disparando requisição duplicada")
+    segunda = executor.submit(funcao)
+
+    pendentes = {primeira, segunda}
+    erro: Optional[BaseException] = None
+    while pendentes:
+        feitas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in feitas:
+            if futuro.exception() is None:
+                if futuro is segunda:
+                    controle.hedge_venceu()
+                return futuro.result(), futuro is segunda
+            erro = futuro.exception()
+
+    raise erro
@@ -0,0 +1,182 @@
+"""
+Map-reduce para ofícios gigantes (>100 páginas) - nenhuma página descartada.
+
+1. map: o ofício é dividido em blocos de páginas sob um orçamento de tokens;
+   cada bloco é extraído em paralelo (conjunto parcial de campos)
+2. reduce: mesclagem determinística dos parciais
+   - primeiro valor não-nulo, na ordem de prioridade dos blocos
+   - valores monetários vêm juntos do mesmo bloco, preferindo o que fecha
+     (bruto = líquido + juros, total >= líquido)
+   - flags (idoso, doença grave, PcD, anomalia): verdadeiro se algum bloco disser
+"""
+
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from .empacotamento import estimar_tokens
+from .validacao import TOLERANCIA_VALORES
+
+logger = logging.getLogger(__name__)
+
+
+# Orçamento de tokens de texto por bloco (cabe com folga no contexto do modelo)
+ORCAMENTO_TOKENS_BLOCO = 30_000
+
+# Chamadas simultâneas por ofício
+MAXIMO_BLOCOS_PARALELOS = 4
+
+# Bloco com ANEXO II / PROCESSAMENTO / NOTA DE REJEIÇÃO (sempre o último)
+MARCADOR_ANEXOS = "=== SEÇÕES ANEXAS AO OFÍCIO ==="
+
+CAMPOS_VALORES = [
+    "valor_principal_liquido",
+    "valor_principal_bruto",
+    "juros_moratorios",
+    "valor_total_requisitado"
+]
+
+# Dados bancários e número de ordem: ANEXO II e PROCESSAMENTO são a fonte
+CAMPOS_PREFERIR_ANEXOS = {
+    "numero_ordem", "banco", "agencia", "conta", "conta_tipo",
+    "cpf_titular_conta", "tipo_levantamento", "dados_bancarios_advogado"
+}
+
+CAMPOS_QUALQUER_VERDADEIRO = {"idoso", "doenca_grave", "pcd", "anomalia", "rejeitado"}
+
+CAMPOS_CONCATENADOS = {"observacoes", "descricao_anomalia"}
+
+
+def dividir_paginas(
+    paginas: List[Tuple[int, str]],
+    orcamento_tokens: int = ORCAMENTO_TOKENS_BLOCO
+) -> List[str]:
+    """
+    Agrupa páginas consecutivas em blocos sob o orçamento de tokens.
+
+    Página maior que o orçamento vai sozinha num bloco (nunca é cortada).
+
+    Args:
+        paginas: Lista de (número da página 1-indexed, texto)
+        orcamento_tokens: Máximo de tokens por bloco
+
+    Returns:
+        Lista de textos dos blocos
+    """
+    blocos: List[str] = []
+    atual = ""
+    tokens_atual = 0
+
+    for numero, texto in paginas:
+        trecho = f"\n\n--- PÁGINA {numero} ---\n\n{texto}"
+        tokens = estimar_tokens(trecho)
+        if atual and tokens_atual + tokens > orcamento_tokens:
+            blocos.append(atual.strip())
+            atual, tokens_atual = "", 0
+        atual += trecho
+        tokens_atual += tokens
+
+    if atual:
+        blocos.append(atual.strip())
+
+    return blocos
+
+
+def bloco_anexos(texto_anexos: str) -> str:
+    """Bloco final com as seções anexas (ANEXO II, PROCESSAMENTO, NOTA DE REJEIÇÃO)."""
+    return f"{MARCADOR_ANEXOS}\n\n{texto_anexos.strip()}"
+
+
+def eh_bloco_anexos(bloco: str) -> bool:
+    """Se o bloco é o das seções anexas."""
+    return bloco.startswith(MARCADOR_ANEXOS)
+
+
+def _decimal(valor: Any) -> Optional[Decimal]:
+    if valor is None or isinstance(valor, bool):
+        return None
+    try:
+        return Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _valores_consistentes(parcial: Dict[str, Any]) -> bool:
+    """Os quatro valores presentes e fechando (mesmas regras de validacao.py)."""
+    liquido, bruto, juros, total = (_decimal(parcial.get(campo)) for campo in CAMPOS_VALORES)
+    if None in (liquido, bruto, juros, total):
+        return False
+    return abs(bruto - (liquido + juros)) <= TOLERANCIA_VALORES and total + TOLERANCIA_VALORES >= liquido
+
+
+def _escolher_valores(parciais: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Valores monetários de UM bloco: o primeiro consistente; senão o mais completo.
+
+    Misturar líquido de um bloco com bruto de outro gera combinações que
+    nenhum trecho do ofício afirma.
+    """
+    for parcial in parciais:
+        if _valores_consistentes(parcial):
+            return {campo: parcial.get(campo) for campo in CAMPOS_VALORES}
+
+    melhor: Dict[str, Any] = {}
+    melhor_contagem = 0
+    for parcial in parciais:
+        contagem = sum(1 for campo in CAMPOS_VALORES if parcial.get(campo) is not None)
+        if contagem > melhor_contagem:
+            melhor = {campo: parcial.get(campo) for campo in CAMPOS_VALORES}
+            melhor_contagem = contagem
+
+    return melhor
+
+
+def mesclar_parciais(
+    parciais: List[Dict[str, Any]],
+    parciais_anexos: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Reduce: mescla os campos extraídos de cada bloco.
+
+    Args:
+        parciais: Dados de cada bloco do ofício, na ordem das páginas
+        parciais_anexos: Dados do bloco de seções anexas (se houver)
+
+    Returns:
+        Dicionário único de dados do ofício
+    """
+    parciais_anexos = parciais_anexos or []
+    ordem_oficio = parciais + parciais_anexos
+    ordem_anexos = parciais_anexos + parciais
+
+    campos: List[str] = []
+    for parcial in ordem_oficio:
+        campos.extend(campo for campo in parcial if campo not in campos)
+
+    dados: Dict[str, Any] = {}
+
+    for campo in campos:
+        if campo in CAMPOS_VALORES:
+            continue
+
+        ordem = ordem_anexos if campo in CAMPOS_PREFERIR_ANEXOS else ordem_oficio
+        valores = [parcial.get(campo) for parcial in ordem if parcial.get(campo) not in (None, "")]
+
+        if campo in CAMPOS_QUALQUER_VERDADEIRO:
+            dados[campo] = True if any(v is True for v in valores) else (valores[0] if valores else None)
+        elif campo in CAMPOS_CONCATENADOS:
+            distintos = list(dict.fromkeys(str(v) for v in valores))
+            dados[campo] = " | ".join(distintos) if distintos else None
+        else:
+            dados[campo] = valores[0] if valores else None
+
+    # Valores: todos do mesmo bloco; lacunas completadas pela ordem normal
+    valores = _escolher_valores(ordem_oficio)
+    for campo in CAMPOS_VALORES:
+        valor = valores.get(campo)
+        if valor is None:
+            valor = next((p[campo] for p in ordem_oficio if p.get(campo) is not None), None)
+        dados[campo] = valor
+
+    logger.debug(f"Map-reduce: {len(ordem_oficio)} parcial(is) mesclado(s)")
+    return dados
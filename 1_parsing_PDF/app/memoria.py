@@ -0,0 +1,81 @@
+"""
+Pico de memória (RSS) por PDF.
+
+No Linux, o pico do processo (VmHWM) é zerado antes de cada PDF via
+/proc/self/clear_refs: o valor lido no fim é o pico daquele PDF. Sem esse
+recurso (outros sistemas), informa o pico do processo desde o início
+(resource) ou nada (Windows).
+
+Com PDFs processados em threads no mesmo processo, o pico é do processo
+inteiro no período, não só do PDF. O supervisor (ver supervisor.py) mede o
+processo filho pelo pid.
+"""
+
+import sys
+from typing import Optional
+
+
+def _campo_status(campo: str, pid: Optional[int]) -> Optional[float]:
+    """Campo em KB de /proc/<pid>/status, em MB (None sem /proc ou processo já encerrado)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith(campo):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """RSS atual de um processo em MB (padrão: o atual; None se não houver como medir)."""
+    return _campo_status("VmRSS:", pid)
+
+
+def pico_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Pico de RSS de um processo em MB (padrão: o atual; None se não houver como medir)."""
+    pico = _campo_status("VmHWM:", pid)
+    if pico is not None or pid is not None:
+        return pico
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: KB no Linux, bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def zerar_pico(pid: Optional[int] = None) -> bool:
+    """Zera o pico de RSS de um processo (só Linux). Retorna False se não suportado."""
+    try:
+        with open(f"/proc/{pid or 'self'}/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MedicaoMemoria:
+    """
+    Pico de RSS durante um bloco.
+
+    Example:
+        >>> with MedicaoMemoria() as medicao:
+        ...     processar(pdf)
+        >>> medicao.pico_mb
+        182.4
+    """
+
+    def __init__(self):
+        self.pico_mb: Optional[float] = None
+        self.isolado = False
+
+    def __enter__(self):
+        self.isolado = zerar_pico()
+        return self
+
+    def __exit__(self, *args):
+        pico = pico_rss_mb()
+        self.pico_mb = round(pico, 1) if pico is not None else None
@@ -0,0 +1,113 @@
+"""
+Texto normalizado de páginas - minúsculas, sem acentos, espaços colapsados.
+
+Os detectores comparam palavras-chave contra a forma normalizada de cada
+página, calculada uma vez (operações em C: NFD, translate, casefold, regex).
+Uma só grafia por palavra-chave: "OFÍCIO" também encontra "OFICIO", "Ofício"
+e "OFÍCIO\\nREQUISITÓRIO" quebrado em duas linhas.
+
+O mapa de posições (normalizado → original) é montado só quando pedido,
+para recortar o trecho original de uma ocorrência.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional, Union
+
+_ESPACOS = re.compile(r"\s+")
+
+# Marcas combinantes (acentos, cedilha, til) que sobram da decomposição NFD
+_ACENTOS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+def normalizar_termo(termo: str) -> str:
+    """
+    Forma normalizada de um texto ou palavra-chave.
+
+    Também serve para padrões regex sem classes em maiúsculas (\\S, \\D, \\W).
+    """
+    sem_acentos = _ACENTOS.sub("", unicodedata.normalize("NFD", termo))
+    return _ESPACOS.sub(" ", sem_acentos.casefold()).strip()
+
+
+def normalizar_termos(termos: List[str]) -> List[str]:
+    """Palavras-chave normalizadas, sem duplicatas (ordem preservada)."""
+    return list(dict.fromkeys(normalizar_termo(termo) for termo in termos))
+
+
+class TextoNormalizado:
+    """
+    Texto de uma página na forma normalizada, com caminho de volta ao original.
+
+    Example:
+        >>> pagina = normalizar("OFÍCIO  REQUISITÓRIO")
+        >>> "oficio requisitorio" in pagina
+        True
+        >>> pagina.trecho_original(0, 6)
+        'OFÍCIO'
+    """
+
+    __slots__ = ("original", "texto", "_mapa")
+
+    def __init__(self, original: str):
+        self.original = original
+        self.texto = normalizar_termo(original)
+        self._mapa: Optional[List[int]] = None
+
+    def __contains__(self, termo: str) -> bool:
+        return termo in self.texto
+
+    def __len__(self) -> int:
+        return len(self.texto)
+
+    def contem_algum(self, termos: List[str]) -> bool:
+        """Algum dos termos (já normalizados) presente."""
+        return any(termo in self.texto for termo in termos)
+
+    @property
+    def mapa(self) -> List[int]:
+        """Posição no original de cada caractere do texto normalizado (montado sob demanda)."""
+        if self._mapa is None:
+            mapa: List[int] = []
+            espaco_pendente = False
+            for posicao, caractere in enumerate(self.original):
+                if caractere.isspace():
+                    espaco_pendente = bool(mapa)
+                    continue
+                convertido = normalizar_termo(caractere)
+                if not convertido:
+                    continue
+                if espaco_pendente:
+                    mapa.append(posicao - 1)
+                    espaco_pendente = False
+                mapa.extend([posicao] * len(convertido))
+            self._mapa = mapa
+        return self._mapa
+
+    def posicao_original(self, posicao: int) -> int:
+        """Posição no texto original do caractere `posicao` do normalizado."""
+        return self.mapa[posicao]
+
+    def trecho_original(self, inicio: int, fim: int) -> str:
+        """Trecho original correspondente a texto[inicio:fim]."""
+        if inicio >= fim:
+            return ""
+        return self.original[self.mapa[inicio]:self.mapa[fim - 1] + 1]
+
+
+@lru_cache(maxsize=256)
+def _normalizar(texto: str) -> TextoNormalizado:
+    return TextoNormalizado(texto)
+
+
+def normalizar(texto: Union[str, TextoNormalizado]) -> TextoNormalizado:
+    """
+    Texto normalizado (memorizado: predicados chamados com a mesma página não repetem o trabalho).
+
+    Args:
+        texto: Texto original ou já normalizado
+    """
+    if isinstance(texto, TextoNormalizado):
+        return texto
+    return _normalizar(texto)
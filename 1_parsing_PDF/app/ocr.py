@@ -0,0 +1,221 @@
+"""
+OCR seletivo - só páginas sem camada de texto (digitalizadas).
+
+Páginas digitais não pagam nada: o texto nativo já foi extraído pelos
+detectores. Páginas com texto nativo vazio ou quase vazio passam pelo
+Tesseract (via pymupdf, mesmo motor do resto do projeto) em um pool de
+processos; o texto reconhecido entra no DocumentoPaginas e os detectores
+o leem como se fosse nativo.
+
+Resultados guardados por hash da página (conteúdo + imagens): a mesma folha
+digitalizada em outro processo, ou numa nova execução com cache em disco,
+não é reconhecida de novo.
+
+Requer Tesseract instalado com o idioma "por" (apt install tesseract-ocr
+tesseract-ocr-por) ou TESSDATA_PREFIX apontando para o tessdata.
+"""
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pymupdf
+
+from .paginas import DocumentoPaginas
+from .preflight import MINIMO_CARACTERES_PAGINA
+
+logger = logging.getLogger(__name__)
+
+
+IDIOMA_PADRAO = "por"
+DPI_PADRAO = 300
+
+
+def tessdata_disponivel() -> Optional[str]:
+    """Diretório do tessdata ou None se o Tesseract não estiver instalado."""
+    try:
+        return pymupdf.get_tessdata()
+    except RuntimeError:
+        return None
+
+
+def hash_pagina(doc: pymupdf.Document, indice: int) -> str:
+    """
+    Hash do conteúdo de uma página: content stream + imagens (bytes brutos).
+
+    A mesma folha digitalizada tem o mesmo hash em PDFs diferentes.
+    """
+    pagina = doc.load_page(indice)
+    sha = hashlib.sha256(pagina.read_contents())
+    for imagem in pagina.get_images(full=True):
+        sha.update(doc.xref_stream_raw(imagem[0]) or b"")
+    return sha.hexdigest()
+
+
+def reconhecer_paginas(
+    pdf_path: str,
+    indices: List[int],
+    idioma: str = IDIOMA_PADRAO,
+    dpi: int = DPI_PADRAO
+) -> Dict[int, str]:
+    """
+    OCR de páginas de um PDF (roda no processo trabalhador).
+
+    Args:
+        pdf_path: Caminho do PDF
+        indices: Páginas (0-indexed)
+        idioma: Idioma(s) do Tesseract
+        dpi: Resolução da renderização
+
+    Returns:
+        Dicionário índice → texto reconhecido
+    """
+    textos = {}
+    with pymupdf.open(pdf_path) as doc:
+        for indice in indices:
+            pagina = doc.load_page(indice)
+            textpage = pagina.get_textpage_ocr(language=idioma, dpi=dpi, full=True)
+            textos[indice] = pagina.get_text(textpage=textpage)
+    return textos
+
+
+class CacheOCR:
+    """
+    Texto reconhecido por hash da página, em memória e opcionalmente em disco
+    (um arquivo por página: processos trabalhadores e execuções seguintes reaproveitam).
+    """
+
+    def __init__(self, diretorio: Optional[Path] = None):
+        self.diretorio = Path(diretorio) if diretorio else None
+        self._textos: Dict[str, str] = {}
+        if self.diretorio:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def obter(self, hash_pag: str) -> Optional[str]:
+        if hash_pag in self._textos:
+            return self._textos[hash_pag]
+        if self.diretorio:
+            caminho = self.diretorio / f"{hash_pag}.txt"
+            if caminho.exists():
+                self._textos[hash_pag] = caminho.read_text(encoding="utf-8")
+                return self._textos[hash_pag]
+        return None
+
+    def guardar(self, hash_pag: str, texto: str) -> None:
+        self._textos[hash_pag] = texto
+        if self.diretorio:
+            caminho = self.diretorio / f"{hash_pag}.txt"
+            temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+            temporario.write_text(texto, encoding="utf-8")
+            os.replace(temporario, caminho)
+
+
+class MotorOCR:
+    """
+    OCR das páginas sem camada de texto de um DocumentoPaginas.
+
+    Example:
+        >>> motor = MotorOCR(cache=CacheOCR(Path("outputs/ocr_cache")))
+        >>> motor.completar(documento)   # antes da detecção
+    """
+
+    def __init__(
+        self,
+        trabalhadores: Optional[int] = None,
+        idioma: str = IDIOMA_PADRAO,
+        dpi: int = DPI_PADRAO,
+        cache: Optional[CacheOCR] = None
+    ):
+        """
+        Args:
+            trabalhadores: Processos de OCR (padrão: todos os núcleos; 1 = no processo atual)
+            idioma: Idioma(s) do Tesseract
+            dpi: Resolução da renderização
+            cache: Cache de texto por hash de página (padrão: só em memória)
+
+        Raises:
+            RuntimeError: Se o Tesseract não estiver instalado
+        """
+        if tessdata_disponivel() is None:
+            raise RuntimeError(
+                "OCR requer Tesseract (apt install tesseract-ocr tesseract-ocr-por) "
+                "ou TESSDATA_PREFIX configurado"
+            )
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.idioma = idioma
+        self.dpi = dpi
+        self.cache = cache or CacheOCR()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.estatisticas = {"paginas_ocr": 0, "paginas_cache": 0}
+
+    def paginas_sem_texto(self, documento: DocumentoPaginas) -> List[int]:
+        """
+        Páginas com texto nativo vazio ou quase vazio (0-indexed).
+
+        Com classificação rápida, cabeçalho com texto basta para descartar a
+        página sem extrair o texto inteiro.
+        """
+        return [
+            indice for indice in range(len(documento))
+            if len(documento.cabecalho(indice).strip()) < MINIMO_CARACTERES_PAGINA
+            and len(documento.texto(indice).strip()) < MINIMO_CARACTERES_PAGINA
+        ]
+
+    def completar(self, documento: DocumentoPaginas) -> int:
+        """
+        Troca o texto nativo das páginas digitalizadas pelo texto do OCR.
+
+        Args:
+            documento: Documento usado pelos detectores
+
+        Returns:
+            Número de páginas com texto do OCR (reconhecidas agora ou em cache)
+        """
+        indices = self.paginas_sem_texto(documento)
+        if not indices:
+            return 0
+
+        hashes = {indice: documento.com_documento(lambda doc: hash_pagina(doc, indice)) for indice in indices}
+        pendentes: List[int] = []
+        for indice in indices:
+            texto = self.cache.obter(hashes[indice])
+            if texto is None:
+                pendentes.append(indice)
+            else:
+                documento.definir_texto(indice, texto)
+                self.estatisticas["paginas_cache"] += 1
+
+        if pendentes:
+            logger.info(f"🔎 OCR de {len(pendentes)} página(s): {Path(documento.pdf_path).name}")
+            for indice, texto in self._reconhecer(documento.pdf_path, pendentes):
+                self.cache.guardar(hashes[indice], texto)
+                documento.definir_texto(indice, texto)
+                self.estatisticas["paginas_ocr"] += 1
+
+        return len(indices)
+
+    def _reconhecer(self, pdf_path: str, indices: List[int]) -> List[Tuple[int, str]]:
+        """OCR em paralelo: páginas divididas entre os processos."""
+        if self.trabalhadores == 1 or len(indices) == 1:
+            return list(reconhecer_paginas(pdf_path, indices, self.idioma, self.dpi).items())
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.trabalhadores)
+
+        fatias = [indices[i::self.trabalhadores] for i in range(self.trabalhadores) if indices[i::self.trabalhadores]]
+        futuros = [
+            self._executor.submit(reconhecer_paginas, pdf_path, fatia, self.idioma, self.dpi)
+            for fatia in fatias
+        ]
+        textos: List[Tuple[int, str]] = []
+        for futuro in futuros:
+            textos.extend(futuro.result().items())
+        return textos
+
+    def encerrar(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,526 @@
+"""
+Texto de páginas e layout de PDFs - segmentação feita uma vez por arquivo único.
+
+O mesmo PDF de processo (mesmo nome CNJ, mesmo conteúdo) aparece em várias
+pastas de CPF. O layout (texto das páginas + ofícios, ANEXO II e PROCESSAMENTO
+detectados) depende só do conteúdo; cada CPF resolve o seu ofício a partir dele.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import pymupdf
+
+from .normalizacao import TextoNormalizado, normalizar_termo
+
+logger = logging.getLogger(__name__)
+
+
+# Classificação rápida: fração do topo da página lida para decidir o tipo
+FRACAO_CABECALHO = 0.35
+
+# Extração paralela: PDFs a partir deste número de páginas são divididos em faixas
+LIMIAR_PAGINAS_PARALELO = 300
+
+# Layouts de cópias pendentes guardados ao mesmo tempo (os mais antigos saem)
+MAXIMO_LAYOUTS = 8
+
+
+def _recorte_cabecalho(pagina: pymupdf.Page, fracao: float) -> pymupdf.Rect:
+    retangulo = pagina.rect
+    return pymupdf.Rect(
+        retangulo.x0, retangulo.y0,
+        retangulo.x1, retangulo.y0 + retangulo.height * fracao
+    )
+
+
+def _contem_termo(texto: str, termos: List[str]) -> bool:
+    """Algum termo (já normalizado, ver normalizacao.py) no texto."""
+    normalizado = normalizar_termo(texto)
+    return any(termo in normalizado for termo in termos)
+
+
+def extrair_faixa(
+    pdf_path: str,
+    inicio: int,
+    fim: int,
+    fracao_cabecalho: Optional[float] = None,
+    termos: Optional[List[str]] = None
+) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    Texto das páginas [inicio, fim) - roda em outro processo, com handle pymupdf próprio.
+
+    Com classificação rápida (fracao_cabecalho e termos), extrai o cabeçalho de
+    todas as páginas e o texto inteiro só das candidatas.
+
+    Returns:
+        (textos, cabeçalhos) por índice (0-indexed)
+    """
+    textos: Dict[int, str] = {}
+    cabecalhos: Dict[int, str] = {}
+    with pymupdf.open(pdf_path) as doc:
+        for indice in range(inicio, fim):
+            pagina = doc.load_page(indice)
+            if fracao_cabecalho is not None and termos:
+                cabecalhos[indice] = pagina.get_text(clip=_recorte_cabecalho(pagina, fracao_cabecalho))
+                if not _contem_termo(cabecalhos[indice], termos):
+                    continue
+            textos[indice] = pagina.get_text()
+    return textos, cabecalhos
+
+
+class DocumentoPaginas:
+    """
+    Texto das páginas de um PDF, extraído sob demanda e guardado (índices 0-indexed).
+
+    Com classificação rápida, os detectores descartam páginas pelo texto do
+    cabeçalho (retângulo do topo, extração recortada): o texto inteiro só é
+    extraído das páginas candidatas e das que vão para o prompt.
+
+    Com memória limitada (max_paginas_memoria), só as páginas usadas mais
+    recentemente ficam guardadas; as demais são extraídas de novo se pedidas.
+    Texto de OCR nunca é descartado (reconhecer de novo custa caro).
+
+    Example:
+        >>> with DocumentoPaginas("processo.pdf") as documento:
+        ...     texto = documento.texto(0)
+    """
+
+    def __init__(
+        self,
+        pdf_path: str,
+        doc: Optional[pymupdf.Document] = None,
+        fracao_cabecalho: Optional[float] = None,
+        max_paginas_memoria: Optional[int] = None
+    ):
+        """
+        Args:
+            pdf_path: Caminho do PDF
+            doc: Documento já aberto (ex: pelo preflight) - evita reabrir o arquivo
+            fracao_cabecalho: Classificação rápida pelo topo da página (ex:
+                FRACAO_CABECALHO; None = sempre pelo texto inteiro)
+            max_paginas_memoria: Textos de página guardados (LRU; None = todos)
+        """
+        self.pdf_path = str(pdf_path)
+        self._doc = doc if doc is not None else pymupdf.open(self.pdf_path)
+        self._total = len(self._doc)
+        self._textos: "OrderedDict[int, str]" = OrderedDict()
+        self._fixos: Dict[int, str] = {}
+        self._cabecalhos: Dict[int, str] = {}
+        self._normalizados: Dict[int, TextoNormalizado] = {}
+        self._trava = threading.Lock()
+        self.fracao_cabecalho = fracao_cabecalho
+        self.max_paginas_memoria = max_paginas_memoria
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def texto(self, indice: int) -> str:
+        """
+        Texto de uma página.
+
+        Args:
+            indice: Índice da página (0-indexed)
+
+        Returns:
+            Texto da página
+
+        Raises:
+            IndexError: Se a página não existir
+        """
+        if not 0 <= indice < self._total:
+            raise IndexError(f"Página {indice} fora do documento ({self._total} páginas)")
+
+        with self._trava:
+            if indice in self._fixos:
+                return self._fixos[indice]
+            if indice in self._textos:
+                self._textos.move_to_end(indice)
+                return self._textos[indice]
+            if self._doc is None:
+                self._doc = pymupdf.open(self.pdf_path)
+            texto = self._textos[indice] = self._doc.load_page(indice).get_text()
+            self._limitar()
+            return texto
+
+    def _tem_texto(self, indice: int) -> bool:
+        return indice in self._textos or indice in self._fixos
+
+    def _limitar(self) -> None:
+        """Descarta os textos usados há mais tempo além de max_paginas_memoria (com a trava)."""
+        if self.max_paginas_memoria is None:
+            return
+        while len(self._textos) > self.max_paginas_memoria:
+            indice, _ = self._textos.popitem(last=False)
+            self._normalizados.pop(indice, None)
+
+    def normalizado(self, indice: int) -> TextoNormalizado:
+        """
+        Texto da página normalizado (sem acentos, minúsculas, espaços colapsados),
+        calculado uma vez; os detectores comparam palavras-chave com ele.
+        """
+        texto = self.texto(indice)
+        with self._trava:
+            normalizado = self._normalizados.get(indice)
+            if normalizado is None or normalizado.original is not texto:
+                normalizado = self._normalizados[indice] = TextoNormalizado(texto)
+            return normalizado
+
+    def cabecalho(self, indice: int) -> str:
+        """
+        Texto do topo da página (recorte de `fracao_cabecalho` da altura).
+
+        Sem classificação rápida, ou com o texto inteiro já extraído, devolve o texto inteiro.
+        """
+        if self.fracao_cabecalho is None or self._tem_texto(indice):
+            return self.texto(indice)
+
+        with self._trava:
+            if indice not in self._cabecalhos:
+                if self._doc is None:
+                    self._doc = pymupdf.open(self.pdf_path)
+                pagina = self._doc.load_page(indice)
+                self._cabecalhos[indice] = pagina.get_text(clip=_recorte_cabecalho(pagina, self.fracao_cabecalho))
+            return self._cabecalhos[indice]
+
+    def candidata(self, indice: int, termos: List[str]) -> bool:
+        """
+        Página pode ser do tipo procurado? (classificação rápida)
+
+        Algum termo (normalizado) no cabeçalho. Sem classificação rápida,
+        sempre True: o detector decide pelo texto inteiro.
+        """
+        if self.fracao_cabecalho is None or self._tem_texto(indice):
+            return True
+        return _contem_termo(self.cabecalho(indice), termos)
+
+    def incorporar(self, textos: Dict[int, str], cabecalhos: Dict[int, str]) -> None:
+        """Junta textos extraídos fora (ex: extrair_faixa); não sobrescreve os já guardados."""
+        with self._trava:
+            for indice, texto in textos.items():
+                if indice not in self._fixos:
+                    self._textos.setdefault(indice, texto)
+            for indice, texto in cabecalhos.items():
+                self._cabecalhos.setdefault(indice, texto)
+            self._limitar()
+
+    def definir_texto(self, indice: int, texto: str) -> None:
+        """Substitui o texto de uma página (ex: texto do OCR de página digitalizada); nunca descartado."""
+        if not 0 <= indice < self._total:
+            raise IndexError(f"Página {indice} fora do documento ({self._total} páginas)")
+        with self._trava:
+            self._textos.pop(indice, None)
+            self._fixos[indice] = texto
+
+    def com_documento(self, funcao: Callable[[pymupdf.Document], Any]) -> Any:
+        """Executa `funcao` com o documento aberto (reabre se já fechado)."""
+        with self._trava:
+            if self._doc is None:
+                self._doc = pymupdf.open(self.pdf_path)
+            return funcao(self._doc)
+
+    def fechar(self) -> None:
+        """Fecha o arquivo (textos já extraídos continuam disponíveis; os descartados reabrem o arquivo)."""
+        with self._trava:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+    def descartar(self) -> None:
+        """Descarta os textos extraídos (o de OCR fica); quem pedir de novo relê do arquivo."""
+        with self._trava:
+            self._textos.clear()
+            self._cabecalhos.clear()
+            self._normalizados.clear()
+
+
+class ExtracaoParalela:
+    """
+    Extração de PDFs grandes em faixas de páginas, uma por processo.
+
+    PDFs com 500-2.000 páginas dominam a cauda dos lotes quando um só núcleo
+    percorre página por página. Acima do limiar, as faixas são extraídas em
+    paralelo e juntadas no mesmo DocumentoPaginas que os detectores leem.
+
+    Example:
+        >>> extracao = ExtracaoParalela(trabalhadores=8)
+        >>> extracao.extrair(documento)   # antes da detecção
+    """
+
+    def __init__(self, trabalhadores: Optional[int] = None, limiar_paginas: int = LIMIAR_PAGINAS_PARALELO):
+        """
+        Args:
+            trabalhadores: Processos (padrão: todos os núcleos)
+            limiar_paginas: Páginas a partir das quais o PDF é dividido
+        """
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.limiar_paginas = limiar_paginas
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.documentos = 0
+
+    def extrair(self, documento: DocumentoPaginas, termos: Optional[List[str]] = None) -> bool:
+        """
+        Extrai o documento em faixas paralelas, se for grande o bastante.
+
+        Args:
+            documento: Documento usado pelos detectores
+            termos: Termos de cabeçalho dos detectores (classificação rápida)
+
+        Returns:
+            True se o documento foi extraído em paralelo
+        """
+        total = len(documento)
+        if self.trabalhadores < 2 or total < self.limiar_paginas:
+            return False
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.trabalhadores)
+
+        # Duas faixas por processo: páginas pesadas (imagens, tabelas) se distribuem melhor
+        tamanho = -(-total // (self.trabalhadores * 2))
+        futuros = [
+            self._executor.submit(
+                extrair_faixa, documento.pdf_path, inicio, min(inicio + tamanho, total),
+                documento.fracao_cabecalho, termos
+            )
+            for inicio in range(0, total, tamanho)
+        ]
+        for futuro in futuros:
+            documento.incorporar(*futuro.result())
+
+        self.documentos += 1
+        logger.info(f"⚡ {total} páginas extraídas em {len(futuros)} faixas paralelas")
+        return True
+
+    def encerrar(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class FaixaOficio(Mapping):
+    """
+    Ofício como faixa de páginas: o texto vem do DocumentoPaginas quando pedido.
+
+    Lido como o dicionário de antes ('pagina_inicio', 'paginas', 'texto'), mas
+    sem guardar o texto concatenado: `oficio['texto']` junta as páginas a cada
+    acesso (uma vez, na montagem do prompt); `textos()` percorre página a página.
+    """
+
+    _CHAVES = ("pagina_inicio", "paginas", "texto")
+
+    def __init__(self, documento: DocumentoPaginas, paginas: List[int]):
+        """
+        Args:
+            documento: Texto das páginas do PDF
+            paginas: Páginas do ofício (1-indexed)
+        """
+        self.documento = documento
+        self.paginas = paginas
+
+    def textos(self) -> Iterator[str]:
+        """Texto de cada página do ofício, em ordem."""
+        for pagina in self.paginas:
+            yield self.documento.texto(pagina - 1)
+
+    def juntar(self) -> str:
+        """Texto do ofício no formato de sempre (separador "--- PÁGINA n ---")."""
+        partes = [self.documento.texto(self.paginas[0] - 1)]
+        for pagina in self.paginas[1:]:
+            partes.append(f"\n\n--- PÁGINA {pagina} ---\n\n{self.documento.texto(pagina - 1)}")
+        return "".join(partes)
+
+    def __getitem__(self, chave: str) -> Any:
+        if chave == "pagina_inicio":
+            return self.paginas[0]
+        if chave == "paginas":
+            return self.paginas
+        if chave == "texto":
+            return self.juntar()
+        raise KeyError(chave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._CHAVES)
+
+    def __len__(self) -> int:
+        return len(self._CHAVES)
+
+    def __repr__(self) -> str:
+        return f"FaixaOficio(paginas={self.paginas})"
+
+
+class LayoutPDF:
+    """
+    Segmentação de um PDF que não depende do CPF.
+
+    Atributos:
+        paginas: Texto das páginas
+        oficios: Todos os ofícios detectados (FaixaOficio, ver DetectorOficio.buscar_todos_oficios)
+        anexo_ii: (páginas, texto) do ANEXO II
+    """
+
+    def __init__(
+        self,
+        paginas: DocumentoPaginas,
+        oficios: List[Mapping],
+        anexo_ii: Tuple[List[int], str]
+    ):
+        self.paginas = paginas
+        self.oficios = oficios
+        self.anexo_ii = anexo_ii
+        self._processamento: Dict[Tuple[int, int], Tuple[Optional[int], Optional[str]]] = {}
+
+    def processamento(
+        self,
+        inicio: int,
+        limite: int,
+        detectar: Callable[[], Tuple[Optional[int], Optional[str]]]
+    ) -> Tuple[Optional[int], Optional[str]]:
+        """PROCESSAMENTO a partir de `inicio` (memorizado: CPFs do mesmo ofício repetem a busca)."""
+        chave = (inicio, limite)
+        if chave not in self._processamento:
+            self._processamento[chave] = detectar()
+        return self._processamento[chave]
+
+    def aliviar(self) -> None:
+        """Entre uma cópia e outra: documento fechado e textos descartados, só a segmentação fica."""
+        self.paginas.fechar()
+        self.paginas.descartar()
+
+    def fechar(self) -> None:
+        self.paginas.fechar()
+
+
+class CacheLayouts:
+    """
+    Layouts compartilhados entre cópias do mesmo PDF.
+
+    Só guarda o layout de arquivos com cópias reservadas ainda por processar;
+    ao consumir (ou desistir de) a última reserva, o layout sai da memória.
+    Entre um uso e outro o layout guardado fica só com a segmentação (ver
+    LayoutPDF.aliviar), e no máximo `maximo` layouts ficam guardados: o usado
+    há mais tempo sai e as cópias que restarem segmentam de novo.
+    """
+
+    def __init__(self, maximo: int = MAXIMO_LAYOUTS):
+        self.maximo = maximo
+        self._trava = threading.Lock()
+        self._reservas: Dict[str, Set[str]] = {}
+        self._copias: Dict[str, str] = {}
+        self._layouts: "OrderedDict[str, LayoutPDF]" = OrderedDict()
+        self._em_uso: Dict[int, int] = {}
+        self.construidos = 0
+        self.reaproveitados = 0
+
+    def reservar(self, hash_pdf: str, copias: List) -> None:
+        """Anuncia as cópias do arquivo que ainda serão processadas (uma por pasta de CPF)."""
+        with self._trava:
+            for copia in copias:
+                caminho = os.fspath(copia)
+                self._reservas.setdefault(hash_pdf, set()).add(caminho)
+                self._copias[caminho] = hash_pdf
+
+    def desistir(self, pdf_path) -> None:
+        """Libera a reserva de uma cópia que não usou o layout (pasta inválida, PDF recusado, erro)."""
+        with self._trava:
+            hash_pdf = self._copias.get(os.fspath(pdf_path))
+            if hash_pdf is None:
+                return
+            layout = self._consumir(hash_pdf, os.fspath(pdf_path))
+        if layout is not None:
+            layout.fechar()
+
+    def _consumir(self, hash_pdf: str, caminho: Optional[str]) -> Optional[LayoutPDF]:
+        """Retira a reserva da cópia (com a trava); devolve o layout a fechar se era a última."""
+        pendentes = self._reservas.get(hash_pdf)
+        if pendentes is not None and caminho is not None:
+            pendentes.discard(caminho)
+            self._copias.pop(caminho, None)
+        if pendentes:
+            return None
+        self._reservas.pop(hash_pdf, None)
+        layout = self._layouts.pop(hash_pdf, None)
+        if layout is not None and not self._em_uso.get(id(layout)):
+            return layout
+        return None
+
+    def _excedentes(self) -> List[LayoutPDF]:
+        """Tira do cache os layouts além do máximo (com a trava); devolve os que ninguém usa."""
+        sobras = []
+        while len(self._layouts) > self.maximo:
+            _, layout = self._layouts.popitem(last=False)
+            if not self._em_uso.get(id(layout)):
+                sobras.append(layout)
+        return sobras
+
+    @contextmanager
+    def usar(
+        self,
+        hash_pdf: str,
+        construir: Callable[[], LayoutPDF],
+        pdf_path=None
+    ) -> Iterator[LayoutPDF]:
+        """
+        Layout do arquivo: reaproveitado se já construído, senão construído agora.
+
+        Args:
+            hash_pdf: SHA-256 do conteúdo do PDF
+            construir: Segmentação completa do PDF
+            pdf_path: Cópia em processamento (consome a sua reserva; None = sem reserva)
+
+        Yields:
+            LayoutPDF
+        """
+        caminho = os.fspath(pdf_path) if pdf_path is not None else None
+        with self._trava:
+            layout = self._layouts.get(hash_pdf)
+            if layout is not None:
+                self._layouts.move_to_end(hash_pdf)
+                self._em_uso[id(layout)] = self._em_uso.get(id(layout), 0) + 1
+                self.reaproveitados += 1
+
+        if layout is None:
+            layout = construir()
+            descartados = []
+            with self._trava:
+                self.construidos += 1
+                if self._reservas.get(hash_pdf, set()) - {caminho}:
+                    existente = self._layouts.setdefault(hash_pdf, layout)
+                    if existente is not layout:
+                        # Outra thread segmentou o mesmo arquivo ao mesmo tempo
+                        descartados.append(layout)
+                        layout = existente
+                    else:
+                        descartados.extend(self._excedentes())
+                self._em_uso[id(layout)] = self._em_uso.get(id(layout), 0) + 1
+            for descartado in descartados:
+                descartado.fechar()
+        else:
+            logger.info(f"♻️ Layout reaproveitado ({hash_pdf[:12]})")
+
+        try:
+            yield layout
+        finally:
+            with self._trava:
+                em_uso = self._em_uso.pop(id(layout)) - 1
+                if em_uso:
+                    self._em_uso[id(layout)] = em_uso
+                self._consumir(hash_pdf, caminho)
+                guardado = self._layouts.get(hash_pdf) is layout
+            if not em_uso:
+                if guardado:
+                    layout.aliviar()
+                else:
+                    layout.fechar()
@@ -0,0 +1,295 @@
+"""
+Pool de clientes LLM - várias chaves e endpoints compatíveis com OpenAI.
+
+Uma chave só limita a vazão ao seu RPM/TPM. O pool distribui cada requisição
+para o endpoint com mais orçamento restante na janela de um minuto (ponderado
+pelo peso configurado) e coloca em quarentena endpoints com erros seguidos.
+
+Configuração (.env):
+    OPENAI_API_KEYS=sk-a,sk-b                     # várias chaves, mesmo endpoint
+    OPENAI_ENDPOINTS=[{"api_key": "sk-a", "base_url": "https://...", "peso": 2,
+                       "rpm": 500, "tpm": 200000}, ...]
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from openai import OpenAI, APIConnectionError, APIStatusError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+JANELA_SEGUNDOS = 60.0
+
+# Erros transitórios seguidos até a quarentena
+LIMITE_ERROS_CONSECUTIVOS = 3
+QUARENTENA_SEGUNDOS = 60.0
+
+CARACTERES_POR_TOKEN = 4
+
+
+def erro_transitorio(erro: BaseException) -> bool:
+    """Erro que justifica tentar outro endpoint (rede, timeout, 429, 5xx)."""
+    if isinstance(erro, (APIConnectionError, RateLimitError)):
+        return True
+    return isinstance(erro, APIStatusError) and erro.status_code >= 500
+
+
+def estimar_tokens_requisicao(parametros: Dict[str, Any]) -> int:
+    """Tokens aproximados de uma requisição (prompt + resposta máxima)."""
+    caracteres = sum(len(str(m.get("content", ""))) for m in parametros.get("messages", []))
+    resposta = parametros.get("max_completion_tokens") or parametros.get("max_tokens") or 0
+    return caracteres // CARACTERES_POR_TOKEN + resposta
+
+
+class Endpoint:
+    """
+    Um cliente (chave + base_url) com seu uso na janela e estado de quarentena.
+
+    rpm/tpm = None: limite desconhecido, a escolha usa só a carga recente.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        client: Any,
+        peso: float = 1.0,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None
+    ):
+        self.nome = nome
+        self.client = client
+        self.peso = peso
+        self.rpm = rpm
+        self.tpm = tpm
+        self.em_voo = 0
+        self.erros_consecutivos = 0
+        self.quarentena_ate = 0.0
+        self.requisicoes = 0
+        self.erros = 0
+        self._uso: Deque[List] = deque()  # [momento, tokens] por requisição
+
+    def _limpar(self, agora: float) -> None:
+        while self._uso and agora - self._uso[0][0] > JANELA_SEGUNDOS:
+            self._uso.popleft()
+
+    def restante(self, agora: float) -> float:
+        """Fração do orçamento da janela ainda livre (0-1)."""
+        self._limpar(agora)
+        requisicoes = len(self._uso)
+        tokens = sum(t for _, t in self._uso)
+
+        fracoes = []
+        if self.rpm:
+            fracoes.append(1 - requisicoes / self.rpm)
+        if self.tpm:
+            fracoes.append(1 - tokens / self.tpm)
+        if not fracoes:
+            return 1 / (1 + requisicoes)
+        return max(0.0, min(fracoes))
+
+    def pontuacao(self, agora: float) -> float:
+        return self.peso * self.restante(agora) / (1 + self.em_voo)
+
+    def em_quarentena(self, agora: float) -> bool:
+        return agora < self.quarentena_ate
+
+
+class Reserva:
+    """Requisição em voo: endpoint escolhido e sua entrada na janela de uso."""
+
+    def __init__(self, endpoint: Endpoint, uso: List):
+        self.endpoint = endpoint
+        self.uso = uso
+
+
+class _Completions:
+    def __init__(self, pool: "PoolClientes"):
+        self._pool = pool
+
+    def create(self, **parametros):
+        return self._pool.criar(**parametros)
+
+
+class _Chat:
+    def __init__(self, pool: "PoolClientes"):
+        self.completions = _Completions(pool)
+
+
+class PoolClientes:
+    """
+    Cliente com a mesma interface de chat.completions.create do OpenAI,
+    distribuindo as requisições entre vários endpoints.
+
+    files/batches (Batch API) usam o primeiro endpoint.
+
+    Example:
+        >>> pool = PoolClientes.de_configuracao([{"api_key": "sk-a"}, {"api_key": "sk-b"}])
+        >>> pool.chat.completions.create(model="gpt-4o-mini", messages=[...])
+    """
+
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("Pool de clientes sem endpoints")
+        self.endpoints = endpoints
+        self._trava = threading.Lock()
+        self.chat = _Chat(self)
+
+    @classmethod
+    def de_configuracao(cls, configuracoes: List[Dict[str, Any]]) -> "PoolClientes":
+        """
+        Cria o pool a partir de dicts {"api_key", "base_url", "peso", "rpm", "tpm"}.
+
+        Com mais de um endpoint, o cliente não repete a requisição no mesmo
+        endpoint (max_retries=0): o pool tenta o próximo.
+        """
+        endpoints = []
+        for i, config in enumerate(configuracoes, 1):
+            opcoes = {"api_key": config["api_key"]}
+            if config.get("base_url"):
+                opcoes["base_url"] = config["base_url"]
+            if len(configuracoes) > 1:
+                opcoes["max_retries"] = 0
+            endpoints.append(Endpoint(
+                nome=config.get("nome") or f"endpoint{i}",
+                client=OpenAI(**opcoes),
+                peso=float(config.get("peso", 1.0)),
+                rpm=config.get("rpm"),
+                tpm=config.get("tpm")
+            ))
+        return cls(endpoints)
+
+    @property
+    def principal(self) -> Any:
+        return self.endpoints[0].client
+
+    @property
+    def files(self) -> Any:
+        return self.principal.files
+
+    @property
+    def batches(self) -> Any:
+        return self.principal.batches
+
+    def escolher(self, tokens: int, excluir: Optional[set] = None) -> Optional[Reserva]:
+        """
+        Reserva o endpoint com maior orçamento restante fora de quarentena.
+
+        Se todos estiverem em quarentena, usa o que sai dela primeiro.
+
+        Args:
+            tokens: Tokens estimados da requisição
+            excluir: Endpoints já tentados nesta requisição
+
+        Returns:
+            Reserva no endpoint escolhido (None se todos foram excluídos)
+        """
+        agora = time.time()
+        with self._trava:
+            candidatos = [e for e in self.endpoints if not excluir or e not in excluir]
+            if not candidatos:
+                return None
+
+            saudaveis = [e for e in candidatos if not e.em_quarentena(agora)]
+            if saudaveis:
+                escolhido = max(saudaveis, key=lambda e: e.pontuacao(agora))
+            else:
+                escolhido = min(candidatos, key=lambda e: e.quarentena_ate)
+
+            uso = [agora, tokens]
+            escolhido.em_voo += 1
+            escolhido.requisicoes += 1
+            escolhido._uso.append(uso)
+            return Reserva(escolhido, uso)
+
+    def registrar_sucesso(self, reserva: Reserva, response: Any) -> None:
+        """Libera a reserva; tokens reais substituem a estimativa desta requisição."""
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        with self._trava:
+            reserva.endpoint.em_voo -= 1
+            reserva.endpoint.erros_consecutivos = 0
+            if isinstance(total, int):
+                reserva.uso[1] = total
+
+    def registrar_erro(self, reserva: Reserva, transitorio: bool) -> None:
+        """Libera a reserva; erros transitórios seguidos levam à quarentena."""
+        endpoint = reserva.endpoint
+        with self._trava:
+            endpoint.em_voo -= 1
+            if not transitorio:
+                return
+            endpoint.erros += 1
+            endpoint.erros_consecutivos += 1
+            if endpoint.erros_consecutivos >= LIMITE_ERROS_CONSECUTIVOS:
+                endpoint.quarentena_ate = time.time() + QUARENTENA_SEGUNDOS
+                endpoint.erros_consecutivos = 0
+                logger.warning(f"🚧 {endpoint.nome} em quarentena por {QUARENTENA_SEGUNDOS:.0f}s")
+
+    def criar(self, **parametros) -> Any:
+        """
+        chat.completions.create no melhor endpoint; erro transitório tenta o próximo.
+
+        Raises:
+            Exception: Erro não transitório, ou o último erro se todos falharem
+        """
+        tokens = estimar_tokens_requisicao(parametros)
+        tentados = set()
+        while True:
+            reserva = self.escolher(tokens, excluir=tentados)
+            endpoint = reserva.endpoint
+            tentados.add(endpoint)
+            try:
+                response = endpoint.client.chat.completions.create(**parametros)
+            except Exception as e:
+                transitorio = erro_transitorio(e)
+                self.registrar_erro(reserva, transitorio)
+                if not transitorio or len(tentados) == len(self.endpoints):
+                    raise
+                logger.warning(f"⚠️ {endpoint.nome} falhou ({type(e).__name__}), tentando outro endpoint")
+                continue
+            self.registrar_sucesso(reserva, response)
+            return response
+
+    def relatorio(self) -> Dict[str, Dict[str, Any]]:
+        """Requisições, erros e quarentena por endpoint."""
+        agora = time.time()
+        with self._trava:
+            return {
+                e.nome: {
+                    "requisicoes": e.requisicoes,
+                    "erros": e.erros,
+                    "em_quarentena": e.em_quarentena(agora)
+                }
+                for e in self.endpoints
+            }
+
+
+def carregar_configuracao(
+    api_key: Optional[str],
+    chaves: Optional[str] = None,
+    endpoints: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Endpoints a partir das variáveis OPENAI_ENDPOINTS (JSON), OPENAI_API_KEYS
+    (chaves separadas por vírgula) ou OPENAI_API_KEY, nessa ordem.
+
+    Raises:
+        ValueError: Se OPENAI_ENDPOINTS não for uma lista JSON de objetos com api_key
+    """
+    if endpoints:
+        configuracoes = json.loads(endpoints)
+        if not isinstance(configuracoes, list) or not all(
+            isinstance(c, dict) and c.get("api_key") for c in configuracoes
+        ):
+            raise ValueError("OPENAI_ENDPOINTS deve ser uma lista de objetos com api_key")
+        return configuracoes
+
+    if chaves:
+        return [{"api_key": chave.strip()} for chave in chaves.split(",") if chave.strip()]
+
+    return [{"api_key": api_key}]
@@ -0,0 +1,205 @@
+"""
+Preflight de PDFs - recusa arquivos ruins antes de ocuparem um trabalhador.
+
+Fases, da mais barata para a mais cara:
+1. Farejar (sem abrir o documento): existência, extensão, tamanho,
+   cabeçalho %PDF- e trailer %%EOF.
+2. Abrir uma única vez: senha, arquivo corrompido, zero páginas e amostra
+   de páginas sem camada de texto.
+
+O documento aberto é devolvido como DocumentoPaginas (com o texto das
+páginas amostradas já guardado): a segmentação usa o mesmo handle e o
+arquivo não é aberto duas vezes. O veredito fica guardado por hash do
+conteúdo; cópias de um PDF recusado não chegam a ser abertas.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pymupdf
+
+from .paginas import DocumentoPaginas
+from .schemas import VereditoPDF
+
+logger = logging.getLogger(__name__)
+
+
+# Bytes lidos no início/fim do arquivo (o cabeçalho pode vir após lixo de até 1KB)
+BYTES_CABECALHO = 1024
+BYTES_TRAILER = 2048
+
+# Páginas amostradas para detectar ausência de camada de texto
+PAGINAS_AMOSTRA = 3
+
+# Página com menos caracteres que isso: sem camada de texto (digitalizada)
+MINIMO_CARACTERES_PAGINA = 100
+
+
+# (motivo da recusa ou None, trailer %%EOF presente, tamanho em bytes)
+Farejo = Tuple[Optional[str], bool, int]
+
+
+class PDFInvalido(Exception):
+    """PDF recusado no preflight."""
+
+
+def farejar(pdf_path: str) -> Farejo:
+    """
+    Verificação sem abrir o documento: só lê o início e o fim do arquivo.
+
+    Args:
+        pdf_path: Caminho do PDF
+
+    Returns:
+        (motivo da recusa ou None, trailer %%EOF presente, tamanho em bytes)
+    """
+    caminho = Path(pdf_path)
+    if caminho.suffix.lower() != '.pdf':
+        return "extensão diferente de .pdf", False, 0
+
+    try:
+        tamanho = os.stat(caminho).st_size
+        if tamanho == 0:
+            return "arquivo vazio", False, 0
+
+        with open(caminho, 'rb') as f:
+            cabecalho = f.read(BYTES_CABECALHO)
+            f.seek(max(0, tamanho - BYTES_TRAILER))
+            trailer = f.read()
+    except FileNotFoundError:
+        return "arquivo não encontrado", False, 0
+    except OSError as e:
+        return f"erro de leitura: {e}", False, 0
+
+    if b'%PDF-' not in cabecalho:
+        return "cabeçalho %PDF- ausente", False, tamanho
+
+    return None, b'%%EOF' in trailer, tamanho
+
+
+def indices_amostra(total: int, quantidade: int = PAGINAS_AMOSTRA) -> List[int]:
+    """Primeira, do meio e última páginas (índices 0-indexed, sem repetição)."""
+    if total <= quantidade:
+        return list(range(total))
+    passo = (total - 1) / (quantidade - 1)
+    return sorted({round(i * passo) for i in range(quantidade)})
+
+
+class Preflight:
+    """
+    Preflight com veredito guardado por hash do conteúdo.
+
+    Example:
+        >>> preflight = Preflight()
+        >>> veredito, documento = preflight.verificar("processo.pdf", hash_pdf)
+        >>> if documento is not None:
+        ...     texto = documento.texto(0)   # mesmo handle, sem reabrir
+    """
+
+    def __init__(self, paginas_amostra: int = PAGINAS_AMOSTRA):
+        self.paginas_amostra = paginas_amostra
+        self._vereditos: Dict[str, VereditoPDF] = {}
+        self._trava = threading.Lock()
+        self.estatisticas = {"verificados": 0, "recusados": 0, "em_cache": 0}
+
+    def em_cache(self, hash_pdf: Optional[str]) -> Optional[VereditoPDF]:
+        """Veredito já emitido para este conteúdo (None = ainda não verificado)."""
+        if hash_pdf is None:
+            return None
+        with self._trava:
+            veredito = self._vereditos.get(hash_pdf)
+            if veredito is not None:
+                self.estatisticas["em_cache"] += 1
+            return veredito
+
+    def verificar(
+        self,
+        pdf_path: str,
+        hash_pdf: Optional[str] = None,
+        farejo: Optional[Farejo] = None
+    ) -> Tuple[VereditoPDF, Optional[DocumentoPaginas]]:
+        """
+        Preflight completo; abre o documento no máximo uma vez.
+
+        Um veredito inválido em cache devolve sem tocar no arquivo. Um válido
+        em cache ainda abre o documento (a detecção precisa dele), mas pula a
+        amostragem.
+
+        Args:
+            pdf_path: Caminho do PDF
+            hash_pdf: Hash do conteúdo (None = sem cache)
+            farejo: Resultado de farejar() já obtido pelo chamador (None = fareja aqui)
+
+        Returns:
+            (veredito, documento aberto) - documento é None se o PDF foi recusado
+        """
+        cache = self.em_cache(hash_pdf)
+        if cache is not None and not cache.valido:
+            return cache, None
+
+        motivo, trailer_ok, tamanho = farejo or farejar(pdf_path)
+        if motivo:
+            return self._registrar(hash_pdf, VereditoPDF(valido=False, motivo=motivo, tamanho=tamanho)), None
+
+        try:
+            doc = pymupdf.open(pdf_path)
+        except Exception as e:
+            veredito = VereditoPDF(valido=False, motivo=f"corrompido: {e}", tamanho=tamanho, trailer_ok=trailer_ok)
+            return self._registrar(hash_pdf, veredito), None
+
+        if doc.needs_pass:
+            doc.close()
+            veredito = VereditoPDF(
+                valido=False, motivo="protegido por senha", tamanho=tamanho,
+                trailer_ok=trailer_ok, criptografado=True
+            )
+            return self._registrar(hash_pdf, veredito), None
+
+        if doc.page_count == 0:
+            doc.close()
+            veredito = VereditoPDF(valido=False, motivo="PDF sem páginas", tamanho=tamanho, trailer_ok=trailer_ok)
+            return self._registrar(hash_pdf, veredito), None
+
+        documento = DocumentoPaginas(pdf_path, doc=doc)
+        if cache is not None:
+            return cache, documento
+
+        try:
+            # Texto das páginas amostradas fica no DocumentoPaginas (a segmentação reaproveita)
+            sem_texto = all(
+                len(documento.texto(i).strip()) < MINIMO_CARACTERES_PAGINA
+                for i in indices_amostra(len(documento), self.paginas_amostra)
+            )
+        except Exception as e:
+            documento.fechar()
+            veredito = VereditoPDF(
+                valido=False, motivo=f"corrompido: {e}", paginas=doc.page_count,
+                tamanho=tamanho, trailer_ok=trailer_ok
+            )
+            return self._registrar(hash_pdf, veredito), None
+
+        if not trailer_ok or doc.is_repaired:
+            logger.warning(f"⚠️  PDF reparado ao abrir (truncado ou xref inválida): {Path(pdf_path).name}")
+
+        veredito = VereditoPDF(
+            valido=True,
+            paginas=len(documento),
+            tamanho=tamanho,
+            criptografado=bool(doc.is_encrypted),
+            trailer_ok=trailer_ok,
+            reparado=bool(doc.is_repaired),
+            sem_texto=sem_texto
+        )
+        return self._registrar(hash_pdf, veredito), documento
+
+    def _registrar(self, hash_pdf: Optional[str], veredito: VereditoPDF) -> VereditoPDF:
+        with self._trava:
+            self.estatisticas["verificados"] += 1
+            if not veredito.valido:
+                self.estatisticas["recusados"] += 1
+            if hash_pdf is not None:
+                self._vereditos[hash_pdf] = veredito
+        return veredito
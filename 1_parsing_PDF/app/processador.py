@@ -5,22 +5,53 @@ Versão 2.0 - Processa apenas páginas relevantes, valida CPF, extrai número de
 
 import os
 import json
+import hashlib
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-import pymupdf
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+from pydantic import ValidationError
 
 from .detector import DetectorOficio
 from .detector_anexo import DetectorAnexoII
 from .detector_processamento import DetectorProcessamento
-from .schemas import OficioRequisitorio
+from .schemas import OficioRequisitorio, PayloadExtracao, BackendLLM, CAMPOS_FORA_DO_LLM
+from .validacao import (
+    campos_obrigatorios_ausentes,
+    verificar_consistencia,
+    CAMPOS_EXIGIDOS_REJEITADO
+)
+from .prompts import (
+    montar_mensagens,
+    montar_mensagens_reparo,
+    montar_mensagens_reparo_json,
+    montar_mensagens_pacote,
+    formato_resposta,
+    formato_resposta_pacote,
+    aplicar_variante
+)
+from . import empacotamento
+from . import mapreduce
+from .coalescencia import ChamadasEmVoo, chave_requisicao
+from .paginas import CacheLayouts, DocumentoPaginas, ExtracaoParalela, LayoutPDF, FRACAO_CABECALHO
+from .latencia import ControleLatencia, executar_com_hedge
+from .pool_clientes import PoolClientes, erro_transitorio
+from .concorrencia import ControleConcorrencia
+from .disjuntor import CaixaSaida, Disjuntor, LLMIndisponivel
+from .preflight import Farejo, Preflight, PDFInvalido, farejar
+from .ocr import MotorOCR
+from .memoria import MedicaoMemoria
 
 logger = logging.getLogger(__name__)
 
+# Pool do LLM até o runner informar a concorrência (definir_concorrencia)
+TRABALHADORES_LLM = 16
+
 
 class ProcessadorOficio:
     """
@@ -34,17 +65,37 @@ class ProcessadorOficio:
     7. Salvar no PostgreSQL (upsert)
     """
     
-    def __init__(self, openai_api_key: str, db_config: Dict[str, Any]):
+    def __init__(
+        self,
+        openai_api_key: str,
+        db_config: Dict[str, Any],
+        modelo_gpt: str = "gpt-4o-mini",
+        modelo_escalonamento: Optional[str] = None,
+        endpoints: Optional[List[Dict[str, Any]]] = None,
+        backend: Optional[BackendLLM] = None
+    ):
         """
         Inicializa o processador V2.
         
         Args:
             openai_api_key: Chave da API OpenAI
             db_config: Configurações do banco PostgreSQL
+            modelo_gpt: Modelo barato usado na primeira extração
+            modelo_escalonamento: Modelo forte para reextração quando a primeira
+                falha na validação, omite campos obrigatórios ou tem valores
+                inconsistentes (None = sem cascata)
+            endpoints: Várias chaves/endpoints (ver pool_clientes.carregar_configuracao);
+                None = só openai_api_key
+            backend: Servidor compatível (base_url, modelos, variante de prompt,
+                suporte a json_schema); tem precedência sobre os parâmetros acima
         """
-        # Inicializar OpenAI client
-        self.client = OpenAI(api_key=openai_api_key)
-        self.modelo_gpt = "gpt-4o-mini"
+        # Inicializar OpenAI client (ou pool com a mesma interface)
+        if endpoints:
+            self.client = PoolClientes.de_configuracao(endpoints)
+        else:
+            self.client = OpenAI(api_key=openai_api_key)
+        self.modelo_gpt = modelo_gpt
+        self.modelo_escalonamento = modelo_escalonamento
         
         # Configurações do banco
         self.db_config = db_config
@@ -53,9 +104,120 @@ class ProcessadorOficio:
         self.detector = DetectorOficio()
         self.detector_anexo = DetectorAnexoII()
         self.detector_proc = DetectorProcessamento()  # NOVO!
+        
+        # Uso de tokens acumulado (inclui tokens servidos do cache de prompt)
+        self.estatisticas_llm = {
+            "chamadas": 0,
+            "tokens_prompt": 0,
+            "tokens_cache": 0,
+            "tokens_resposta": 0,
+            "reparos": 0,
+            "coalescidas": 0,
+            "limitadas": 0
+        }
+        
+        # Structured outputs: schema strict gerado de OficioRequisitorio
+        self.usar_json_schema = True
+        
+        # Ofício rejeitado: campos necessários saem por regex, LLM só como fallback
+        self.rejeitados_sem_llm = True
+        
+        # Ofício gigante: map-reduce em blocos paralelos em vez de descartar páginas
+        self.usar_mapreduce = True
+        self.maximo_blocos_paralelos = mapreduce.MAXIMO_BLOCOS_PARALELOS
+        
+        # Estatísticas são atualizadas por várias threads (map-reduce)
+        self._trava_estatisticas = threading.Lock()
+        
+        # Segmentação compartilhada entre cópias do mesmo PDF (ver agrupar_por_conteudo no runner)
+        self.layouts = CacheLayouts()
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        
+        # Validação barata antes da segmentação (veredito por hash do conteúdo)
+        self.preflight = Preflight()
+        
+        # OCR das páginas digitalizadas (configurado pelo runner; None = só texto nativo)
+        self.ocr: Optional[MotorOCR] = None
+        
+        # Classificação rápida: detectores descartam páginas pelo cabeçalho (extração recortada)
+        self.classificacao_rapida = False
+        
+        # PDFs muito grandes: faixas de páginas em processos (configurado pelo runner)
+        self.extracao_paralela: Optional[ExtracaoParalela] = None
+        
+        # Memória limitada: textos de página guardados por PDF (LRU; None = todos)
+        self.max_paginas_memoria: Optional[int] = None
+        
+        # Prompts idênticos simultâneos (mesmo PDF em pastas de CPF diferentes) → uma chamada
+        self.chamadas_em_voo = ChamadasEmVoo()
+        
+        # Concorrência adaptativa (configurada pelo runner): recebe os 429 do LLM
+        self.controle_concorrencia: Optional[ControleConcorrencia] = None
+        
+        # Cauda de latência: timeout adaptativo (p99) e duplicata no p95
+        self.latencias = ControleLatencia()
+        self.usar_hedge = True
+        self._trabalhadores_llm = TRABALHADORES_LLM
+        self._executor_llm = ThreadPoolExecutor(max_workers=self._trabalhadores_llm, thread_name_prefix="llm")
+        
+        # Cascata: em qual nível cada PDF foi resolvido
+        self.estatisticas_cascata = {
+            "resolvidos": {"regex": 0, "rapido": 0, "forte": 0},
+            "escalonamentos": 0,
+            "sem_solucao": 0
+        }
+        
+        # Empacotamento de documentos curtos (vários por chamada)
+        self.estatisticas_pacotes = {
+            "pacotes": 0,
+            "documentos": 0,
+            "fallbacks": 0
+        }
+        
+        # Queda/cota do LLM: disjuntor + caixa de saída (configurada pelo runner)
+        self.disjuntor = Disjuntor()
+        self.caixa_saida: Optional[CaixaSaida] = None
+        self.estatisticas_caixa = {"adiados": 0, "drenados": 0}
+        
+        # Bloco de instruções (ver prompts.VARIANTES_PROMPT)
+        self.variante_prompt = "completa"
+        
+        self.backend = backend
+        if backend is not None:
+            self.client = OpenAI(api_key=backend.api_key, base_url=backend.base_url)
+            self.modelo_gpt = backend.modelo
+            self.modelo_escalonamento = backend.modelo_escalonamento
+            self.usar_json_schema = backend.json_schema
+            self.variante_prompt = backend.variante_prompt
+            logger.info(f"Backend {backend.nome}: {backend.base_url or 'api.openai.com'} ({backend.modelo})")
 
         logger.info("ProcessadorOficio V2 inicializado")
     
+    def definir_concorrencia(
+        self,
+        concorrencia: int,
+        controle: Optional[ControleConcorrencia] = None
+    ) -> None:
+        """
+        Dimensiona o pool do LLM para `concorrencia` payloads simultâneos.
+        
+        Cada payload pode ter até `maximo_blocos_paralelos` chamadas em voo
+        (map-reduce), e cada chamada, uma duplicata de hedge: o pool tem uma
+        vaga para cada, e o limite real é o do chamador (ou do controle).
+        
+        Args:
+            concorrencia: Payloads em paralelo (com controle: controle.maximo)
+            controle: Concorrência adaptativa (recebe os 429 do LLM)
+        """
+        self.controle_concorrencia = controle
+        trabalhadores = 2 * concorrencia * self.maximo_blocos_paralelos
+        if trabalhadores <= self._trabalhadores_llm:
+            return
+        anterior = self._executor_llm
+        self._trabalhadores_llm = trabalhadores
+        self._executor_llm = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="llm")
+        anterior.shutdown(wait=False)
+    
     def processar_arquivo(self, pdf_path: str, cpf_numerico: str) -> Dict[str, Any]:
         """
         Processa um único arquivo PDF com validação de CPF.
@@ -67,284 +229,857 @@ class ProcessadorOficio:
             cpf_numerico: CPF esperado (apenas números)
             
         Returns:
-            Dict com resultado do processamento
+            Dict com resultado do processamento (inclui `memoria_pico_mb`)
         """
+        with MedicaoMemoria() as medicao:
+            resultado = self._processar_arquivo(pdf_path, cpf_numerico)
+        resultado["memoria_pico_mb"] = medicao.pico_mb
+        return resultado
+    
+    def _processar_arquivo(self, pdf_path: str, cpf_numerico: str) -> Dict[str, Any]:
         inicio = time.time()
         
         try:
-            logger.info(f"🔄 Iniciando processamento V2: {pdf_path}")
-            
-            # Validar arquivo PDF
-            if not self.detector.validar_pdf(pdf_path):
-                logger.error(f"❌ PDF inválido: {pdf_path}")
-                return None
-            
-            # 1. Extrair CPF da pasta
-            cpf_numerico = self._extrair_cpf_pasta(pdf_path)
-            if not cpf_numerico:
-                logger.error(f"❌ CPF inválido na pasta: {Path(pdf_path).parent.name}")
-                return None
-            
-            cpf_formatado = self._formatar_cpf(cpf_numerico)
-            logger.info(f"📋 CPF esperado: {cpf_formatado}")
+            # Etapa A: validação do PDF, ofício do CPF, ANEXO II, PROCESSAMENTO
+            payload, resultado_erro = self.preparar_payload(pdf_path, cpf_numerico)
+            if payload is None:
+                return resultado_erro
             
-            # 2. Buscar TODOS os ofícios no PDF
-            todos_oficios = self.detector.buscar_todos_oficios(pdf_path)
+            # Etapa B: extração LLM + validação
+            return self.processar_payload(payload, inicio)
             
-            if not todos_oficios:
-                logger.warning("⚠️ Nenhum ofício encontrado no PDF")
-                return self._criar_resultado_erro(
-                    cpf_numerico, 
-                    pdf_path, 
-                    "Nenhum ofício detectado"
-                )
-            
-            logger.info(f"📄 Encontrados {len(todos_oficios)} ofício(s) no PDF")
+        except Exception as e:
+            logger.error(f"❌ Erro no processamento V2: {e}")
+            import traceback
+            traceback.print_exc()
+            return {
+                "cpf": cpf_numerico,
+                "pdf": Path(pdf_path).name,
+                "sucesso": False,
+                "cpf_validado": False,
+                "erro": str(e),
+                "tempo_processamento": time.time() - inicio,
+                "num_oficios": 0
+            }
+
+    def preparar_payload(
+        self,
+        pdf_path: str,
+        cpf_numerico: str,
+        farejo: Optional[Farejo] = None
+    ) -> Tuple[Optional[PayloadExtracao], Optional[Dict[str, Any]]]:
+        """
+        Etapa de detecção: seleciona as páginas relevantes e monta o payload do LLM.
+        
+        Não chama o LLM: o payload pode ser enviado na hora (processar_payload),
+        em lote (Batch API) ou persistido para depois.
+        
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+            cpf_numerico: CPF esperado (apenas números)
+            farejo: Resultado de farejar() já obtido pelo chamador (None = fareja aqui)
             
-            # 3. Encontrar ofício com CPF correto
-            oficio_correto = None
-            for idx, oficio in enumerate(todos_oficios, 1):
-                logger.info(f"🔍 Verificando ofício {idx}/{len(todos_oficios)} (páginas {oficio['paginas']})")
-                
-                if self.detector.validar_cpf_no_oficio(oficio['texto'], cpf_formatado):
-                    logger.info(f"✅ CPF encontrado no ofício {idx}!")
-                    oficio_correto = oficio
-                    break
-                else:
-                    logger.info(f"❌ CPF não encontrado no ofício {idx}")
-            
-            if not oficio_correto:
-                logger.warning(f"⚠️ CPF {cpf_formatado} não encontrado em nenhum ofício")
-                return self._criar_resultado_erro(
-                    cpf_numerico,
-                    pdf_path,
-                    f"CPF {cpf_formatado} não encontrado (PDF tem {len(todos_oficios)} ofício(s))"
-                )
+        Returns:
+            Tupla (payload, resultado_erro):
+            - (payload, None) se o ofício do CPF foi encontrado
+            - (None, resultado_erro) se a detecção falhou
+            - (None, resultado_erro) se o PDF foi recusado no preflight
+            - (None, None) se a pasta do CPF é inválida
+        """
+        try:
+            return self._detectar_payload(pdf_path, farejo)
+        finally:
+            # Cópia que não chegou ao layout (pasta inválida, PDF recusado, erro) libera a reserva
+            self.layouts.desistir(pdf_path)
+    
+    def _detectar_payload(
+        self,
+        pdf_path: str,
+        farejo: Optional[Farejo]
+    ) -> Tuple[Optional[PayloadExtracao], Optional[Dict[str, Any]]]:
+        """Corpo de preparar_payload (o CPF vem da pasta do PDF)."""
+        logger.info(f"🔄 Iniciando processamento V2: {pdf_path}")
+        
+        # 1. Extrair CPF da pasta
+        cpf_numerico = self._extrair_cpf_pasta(pdf_path)
+        if not cpf_numerico:
+            logger.error(f"❌ CPF inválido na pasta: {Path(pdf_path).parent.name}")
+            return None, None
+        
+        # Preflight barato (cabeçalho/trailer) antes de ler o arquivo inteiro para o hash;
+        # farejado uma vez só: o preflight completo reaproveita o resultado
+        farejo = farejo or farejar(pdf_path)
+        motivo = farejo[0]
+        if motivo:
+            logger.error(f"❌ PDF inválido ({motivo}): {pdf_path}")
+            return None, self._criar_resultado_erro(cpf_numerico, pdf_path, f"PDF inválido: {motivo}")
+        
+        # 2. Segmentação do PDF: uma vez por arquivo único (cópias em outras pastas de CPF reaproveitam)
+        hash_pdf = self._hash_arquivo(pdf_path)
+        try:
+            with self._usar_layout(pdf_path, hash_pdf, farejo) as layout:
+                return self._montar_payload(pdf_path, cpf_numerico, hash_pdf, layout)
+        except PDFInvalido as e:
+            logger.error(f"❌ PDF inválido ({e}): {pdf_path}")
+            return None, self._criar_resultado_erro(cpf_numerico, pdf_path, f"PDF inválido: {e}")
+    
+    def _usar_layout(self, pdf_path: str, hash_pdf: str, farejo: Optional[Farejo] = None):
+        """
+        Layout do PDF via CacheLayouts; sem layout guardado, preflight e segmentação
+        com o mesmo documento aberto.
+        
+        Raises:
+            PDFInvalido: Se o PDF foi recusado no preflight (agora ou em outra cópia)
+        """
+        veredito = self.preflight.em_cache(hash_pdf)
+        if veredito is not None and not veredito.valido:
+            raise PDFInvalido(veredito.motivo)
+        
+        def construir() -> LayoutPDF:
+            veredito, paginas = self.preflight.verificar(pdf_path, hash_pdf, farejo)
+            if paginas is None:
+                raise PDFInvalido(veredito.motivo)
+            return self._segmentar_pdf(pdf_path, paginas)
+        
+        return self.layouts.usar(hash_pdf, construir, pdf_path)
+    
+    def _segmentar_pdf(self, pdf_path: str, paginas: Optional[DocumentoPaginas] = None) -> LayoutPDF:
+        """
+        Segmentação que não depende do CPF: texto das páginas (com OCR das
+        digitalizadas, se configurado), ofícios e ANEXO II.
+        
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+            paginas: Documento já aberto pelo preflight (None = abre aqui)
             
-            # 4. Detectar ANEXO II (após ofício correto)
-            ultima_pag_oficio = oficio_correto['paginas'][-1]
-            paginas_anexo, texto_anexo = self.detector_anexo.detectar_anexo_ii(pdf_path)
+        Returns:
+            LayoutPDF do arquivo
+        """
+        if paginas is None:
+            paginas = DocumentoPaginas(pdf_path)
+        if self.classificacao_rapida:
+            paginas.fracao_cabecalho = FRACAO_CABECALHO
+        paginas.max_paginas_memoria = self.max_paginas_memoria
+        if self.extracao_paralela is not None:
+            termos = (
+                self.detector.termos_cabecalho
+                + self.detector_anexo.termos_cabecalho
+                + self.detector_proc.termos_cabecalho
+            )
+            self.extracao_paralela.extrair(paginas, termos)
+        if self.ocr is not None:
+            # Páginas sem camada de texto: detectores leem o texto do OCR
+            self.ocr.completar(paginas)
+        return LayoutPDF(
+            paginas,
+            oficios=self.detector.buscar_todos_oficios(pdf_path, paginas=paginas),
+            anexo_ii=self.detector_anexo.detectar_anexo_ii(pdf_path, paginas=paginas)
+        )
+    
+    def _montar_payload(
+        self,
+        pdf_path: str,
+        cpf_numerico: str,
+        hash_pdf: str,
+        layout: LayoutPDF
+    ) -> Tuple[Optional[PayloadExtracao], Optional[Dict[str, Any]]]:
+        """
+        Resolve o ofício do CPF a partir do layout do PDF e monta o payload.
+        
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+            cpf_numerico: CPF da pasta (apenas números)
+            hash_pdf: SHA-256 do conteúdo do PDF
+            layout: Segmentação do PDF (possivelmente compartilhada)
             
-            # 5. Tentar extrair número de ordem do TÍTULO do ofício (PDFs antigos)
-            numero_ordem_titulo = self.detector_proc.extrair_numero_ordem_do_titulo(
-                oficio_correto['texto']
+        Returns:
+            Tupla (payload, resultado_erro) como em preparar_payload
+        """
+        cpf_formatado = self._formatar_cpf(cpf_numerico)
+        logger.info(f"📋 CPF esperado: {cpf_formatado}")
+        
+        # 2.1. TODOS os ofícios do PDF (do layout)
+        todos_oficios = layout.oficios
+        
+        if not todos_oficios:
+            logger.warning("⚠️ Nenhum ofício encontrado no PDF")
+            return None, self._criar_resultado_erro(
+                cpf_numerico, 
+                pdf_path, 
+                "Nenhum ofício detectado"
             )
+        
+        logger.info(f"📄 Encontrados {len(todos_oficios)} ofício(s) no PDF")
+        
+        # 3. Encontrar ofício com CPF correto (página a página: texto do ofício não é juntado)
+        oficio_correto = None
+        for idx, oficio in enumerate(todos_oficios, 1):
+            logger.info(f"🔍 Verificando ofício {idx}/{len(todos_oficios)} (páginas {oficio['paginas']})")
             
-            # 6. Detectar PROCESSAMENTO (PDFs novos) - buscar em mais páginas
-            inicio_proc = paginas_anexo[-1] - 1 if paginas_anexo else ultima_pag_oficio - 1
-            pagina_proc, texto_proc = self.detector_proc.detectar_processamento(
+            if any(
+                self.detector.validar_cpf_no_oficio(texto_pagina, cpf_formatado)
+                for texto_pagina in self._textos_oficio(layout, oficio)
+            ):
+                logger.info(f"✅ CPF encontrado no ofício {idx}!")
+                oficio_correto = oficio
+                break
+            else:
+                logger.info(f"❌ CPF não encontrado no ofício {idx}")
+        
+        if not oficio_correto:
+            logger.warning(f"⚠️ CPF {cpf_formatado} não encontrado em nenhum ofício")
+            return None, self._criar_resultado_erro(
+                cpf_numerico,
+                pdf_path,
+                f"CPF {cpf_formatado} não encontrado (PDF tem {len(todos_oficios)} ofício(s))"
+            )
+        
+        # 4. Detectar ANEXO II (após ofício correto)
+        ultima_pag_oficio = oficio_correto['paginas'][-1]
+        paginas_anexo, texto_anexo = layout.anexo_ii
+        
+        # 5. Tentar extrair número de ordem do TÍTULO do ofício (PDFs antigos)
+        numero_ordem_titulo = next(
+            (
+                numero for numero in map(
+                    self.detector_proc.extrair_numero_ordem_do_titulo,
+                    self._textos_oficio(layout, oficio_correto)
+                )
+                if numero
+            ),
+            None
+        )
+        
+        # 6. Detectar PROCESSAMENTO (PDFs novos) - buscar em mais páginas
+        inicio_proc = paginas_anexo[-1] - 1 if paginas_anexo else ultima_pag_oficio - 1
+        pagina_proc, texto_proc = layout.processamento(
+            inicio_proc,
+            100,  # Aumentar limite de busca
+            lambda: self.detector_proc.detectar_processamento(
                 pdf_path,
                 inicio=inicio_proc,
-                limite=100  # Aumentar limite de busca
+                limite=100,
+                paginas=layout.paginas
             )
+        )
+        
+        # 6.1. Verificar se ofício foi REJEITADO (ANTES de validar!)
+        # 🔴 REGRA CRÍTICA: Verificar ACEITAÇÃO primeiro (prioridade máxima)
+        oficio_rejeitado = False
+        motivo_rejeicao = None
+        tem_processamento_com_informacao = False
+        tem_numero_ordem = False
+        
+        # Verificar se tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem
+        if texto_proc:
+            if self.detector_proc.processamento_com_informacao(texto_proc):
+                tem_processamento_com_informacao = True
+                logger.info("✅ PROCESSAMENTO COM INFORMAÇÃO detectado → Ofício ACEITO")
             
-            # 6.1. Verificar se ofício foi REJEITADO (ANTES de validar!)
-            # 🔴 REGRA CRÍTICA: Verificar ACEITAÇÃO primeiro (prioridade máxima)
+            if self.detector_proc.extrair_numero_ordem(texto_proc):
+                tem_numero_ordem = True
+                logger.info("✅ Número de ordem detectado → Ofício ACEITO")
+        
+        # 🔴 PRIORIDADE: Se tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem → NÃO é rejeitado
+        if tem_processamento_com_informacao or tem_numero_ordem:
             oficio_rejeitado = False
-            motivo_rejeicao = None
-            tem_processamento_com_informacao = False
-            tem_numero_ordem = False
-            
-            # Verificar se tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem
-            if texto_proc:
-                texto_upper = texto_proc.upper()
-                if "PROCESSAMENTO COM INFORMAÇÃO" in texto_upper or "PROCESSAMENTO COM INFORMACAO" in texto_upper:
-                    tem_processamento_com_informacao = True
-                    logger.info("✅ PROCESSAMENTO COM INFORMAÇÃO detectado → Ofício ACEITO")
-                
-                if self.detector_proc.extrair_numero_ordem(texto_proc):
-                    tem_numero_ordem = True
-                    logger.info("✅ Número de ordem detectado → Ofício ACEITO")
-            
-            # 🔴 PRIORIDADE: Se tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem → NÃO é rejeitado
-            if tem_processamento_com_informacao or tem_numero_ordem:
-                oficio_rejeitado = False
-                logger.info("✅ Ofício ACEITO (tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem)")
+            logger.info("✅ Ofício ACEITO (tem PROCESSAMENTO COM INFORMAÇÃO ou número de ordem)")
+        else:
+            # Só verificar rejeição se NÃO tem indicadores de aceitação
+            # Buscar rejeição no texto do PROCESSAMENTO ou em páginas próximas
+            if texto_proc and self.detector_proc.eh_oficio_rejeitado(texto_proc):
+                oficio_rejeitado = True
+                motivo_rejeicao = self.detector_proc.extrair_motivo_rejeicao(texto_proc)
+                logger.warning(f"⚠️ OFÍCIO REJEITADO detectado na página {pagina_proc}!")
+                if motivo_rejeicao:
+                    logger.info(f"   Motivo: {motivo_rejeicao[:100]}...")
             else:
-                # Só verificar rejeição se NÃO tem indicadores de aceitação
-                # Buscar rejeição no texto do PROCESSAMENTO ou em páginas próximas
-                if texto_proc and self.detector_proc.eh_oficio_rejeitado(texto_proc):
-                    oficio_rejeitado = True
-                    motivo_rejeicao = self.detector_proc.extrair_motivo_rejeicao(texto_proc)
-                    logger.warning(f"⚠️ OFÍCIO REJEITADO detectado na página {pagina_proc}!")
-                    if motivo_rejeicao:
-                        logger.info(f"   Motivo: {motivo_rejeicao[:100]}...")
-                else:
-                    # Buscar rejeição em páginas próximas ao ofício
-                    logger.debug("Buscando NOTA DE REJEIÇÃO em páginas próximas...")
-                    for pag_offset in range(0, 50):
-                        pag_busca = ultima_pag_oficio + pag_offset
-                        try:
-                            doc = pymupdf.open(pdf_path)
-                            if pag_busca < len(doc):
-                                texto_busca = doc.load_page(pag_busca).get_text()
-                                if self.detector_proc.eh_oficio_rejeitado(texto_busca):
-                                    oficio_rejeitado = True
-                                    motivo_rejeicao = self.detector_proc.extrair_motivo_rejeicao(texto_busca)
-                                    logger.warning(f"⚠️ OFÍCIO REJEITADO detectado na página {pag_busca + 1}!")
-                                    if motivo_rejeicao:
-                                        logger.info(f"   Motivo: {motivo_rejeicao[:100]}...")
-                                    # Usar esse texto como PROCESSAMENTO
-                                    if not texto_proc:
-                                        texto_proc = texto_busca
-                                        pagina_proc = pag_busca
-                                    break
-                            doc.close()
-                        except Exception as e:
-                            logger.debug(f"Erro ao buscar rejeição na página {pag_busca}: {e}")
-                        break
-            
-            # 7. Montar texto relevante (APENAS páginas necessárias!)
-            # CHUNKING: Se ofício muito grande SEM ANEXO II/PROCESSAMENTO, reduzir
-            paginas_oficio = oficio_correto['paginas']
-            num_paginas = len(paginas_oficio)
-            
-            if num_paginas > 100 and not texto_anexo and not texto_proc:
-                logger.warning(f"⚠️ Ofício muito grande ({num_paginas} páginas) sem ANEXO II/PROCESSAMENTO")
-                logger.info(f"🔧 Aplicando CHUNKING: primeiras 50 + últimas 50 páginas")
-                
-                # Extrair apenas primeiras 50 + últimas 50 páginas
-                paginas_chunk = paginas_oficio[:50] + paginas_oficio[-50:]
-                
-                # Re-extrair texto apenas dessas páginas
-                doc = pymupdf.open(pdf_path)
-                texto_chunk = ""
-                for pag in paginas_chunk:
-                    texto_chunk += doc.load_page(pag).get_text() + "\n"
-                doc.close()
-                
-                texto_relevante = texto_chunk
-                logger.info(f"📄 Texto reduzido: {len(texto_relevante):,} chars (100 páginas)")
-            else:
-                texto_relevante = oficio_correto['texto']
+                # Buscar rejeição em páginas próximas ao ofício
+                logger.debug("Buscando NOTA DE REJEIÇÃO em páginas próximas...")
+                for pag_offset in range(0, 50):
+                    pag_busca = ultima_pag_oficio + pag_offset
+                    try:
+                        if pag_busca < len(layout.paginas):
+                            texto_busca = layout.paginas.texto(pag_busca)
+                            if self.detector_proc.eh_oficio_rejeitado(texto_busca):
+                                oficio_rejeitado = True
+                                motivo_rejeicao = self.detector_proc.extrair_motivo_rejeicao(texto_busca)
+                                logger.warning(f"⚠️ OFÍCIO REJEITADO detectado na página {pag_busca + 1}!")
+                                if motivo_rejeicao:
+                                    logger.info(f"   Motivo: {motivo_rejeicao[:100]}...")
+                                # Usar esse texto como PROCESSAMENTO
+                                if not texto_proc:
+                                    texto_proc = texto_busca
+                                    pagina_proc = pag_busca
+                                break
+                    except Exception as e:
+                        logger.debug(f"Erro ao buscar rejeição na página {pag_busca}: {e}")
+                    break
+        
+        # 7. Montar texto relevante (APENAS páginas necessárias!)
+        # CHUNKING: Se ofício muito grande SEM ANEXO II/PROCESSAMENTO, reduzir
+        paginas_oficio = oficio_correto['paginas']
+        num_paginas = len(paginas_oficio)
+        paginas_descartadas = False
+        
+        if num_paginas > 100 and not texto_anexo and not texto_proc:
+            logger.warning(f"⚠️ Ofício muito grande ({num_paginas} páginas) sem ANEXO II/PROCESSAMENTO")
+            logger.info(f"🔧 Aplicando CHUNKING: primeiras 50 + últimas 50 páginas")
             
-            if texto_anexo:
-                logger.info(f"📋 ANEXO II encontrado em {len(paginas_anexo)} página(s)")
-                texto_relevante += f"\n\n{'='*60}\n=== ANEXO II ===\n{'='*60}\n\n{texto_anexo}"
-            else:
-                logger.warning("⚠️ ANEXO II não encontrado")
-            
-            if texto_proc:
-                if oficio_rejeitado:
-                    logger.info(f"📋 NOTA DE REJEIÇÃO encontrada na página {pagina_proc}")
-                    texto_relevante += f"\n\n{'='*60}\n=== NOTA DE REJEIÇÃO ===\n{'='*60}\n\n{texto_proc}"
-                else:
-                    logger.info(f"📋 PROCESSAMENTO encontrado na página {pagina_proc}")
-                    texto_relevante += f"\n\n{'='*60}\n=== PROCESSAMENTO ===\n{'='*60}\n\n{texto_proc}"
-            elif numero_ordem_titulo:
-                logger.info(f"📋 Número de ordem extraído do TÍTULO: {numero_ordem_titulo}")
+            # Extrair apenas primeiras 50 + últimas 50 páginas
+            paginas_chunk = paginas_oficio[:50] + paginas_oficio[-50:]
+            texto_relevante = self._texto_paginas(layout.paginas, paginas_chunk)
+            paginas_descartadas = True
+            logger.info(f"📄 Texto reduzido: {len(texto_relevante):,} chars (100 páginas)")
+        else:
+            # Único ponto em que o texto do ofício é juntado
+            texto_relevante = oficio_correto['texto']
+        
+        # Seções anexas: ANEXO II + PROCESSAMENTO (ou NOTA DE REJEIÇÃO)
+        secoes_anexas = ""
+        if texto_anexo:
+            logger.info(f"📋 ANEXO II encontrado em {len(paginas_anexo)} página(s)")
+            secoes_anexas += f"\n\n{'='*60}\n=== ANEXO II ===\n{'='*60}\n\n{texto_anexo}"
+        else:
+            logger.warning("⚠️ ANEXO II não encontrado")
+        
+        if texto_proc:
+            if oficio_rejeitado:
+                logger.info(f"📋 NOTA DE REJEIÇÃO encontrada na página {pagina_proc}")
+                secoes_anexas += f"\n\n{'='*60}\n=== NOTA DE REJEIÇÃO ===\n{'='*60}\n\n{texto_proc}"
             else:
-                logger.warning("⚠️ PROCESSAMENTO não encontrado e número não está no título")
-            
-            # 8. Verificar tamanho e aplicar chunking adicional se necessário
-            # Estimativa conservadora: 1 token ≈ 2 chars (português), limite 128k tokens ≈ 256k chars
-            # Deixar margem de segurança: 200k chars
-            MAX_CHARS = 200_000
-            
-            if len(texto_relevante) > MAX_CHARS:
-                logger.warning(f"⚠️ Texto muito grande ({len(texto_relevante):,} chars > {MAX_CHARS:,})")
-                logger.info(f"🔧 Aplicando CHUNKING AGRESSIVO: primeiras 30 + últimas 30 páginas do ofício")
-                
-                # Re-extrair com chunking mais agressivo
-                paginas_chunk = paginas_oficio[:30] + paginas_oficio[-30:]
-                
-                doc = pymupdf.open(pdf_path)
-                texto_chunk = ""
-                for pag in paginas_chunk:
-                    texto_chunk += doc.load_page(pag).get_text() + "\n"
-                doc.close()
-                
-                texto_relevante = texto_chunk
-                
-                # Re-adicionar ANEXO II e PROCESSAMENTO (se houver)
-                if texto_anexo:
-                    texto_relevante += f"\n\n{'='*60}\n=== ANEXO II ===\n{'='*60}\n\n{texto_anexo}"
-                if texto_proc:
-                    if oficio_rejeitado:
-                        texto_relevante += f"\n\n{'='*60}\n=== NOTA DE REJEIÇÃO ===\n{'='*60}\n\n{texto_proc}"
-                    else:
-                        texto_relevante += f"\n\n{'='*60}\n=== PROCESSAMENTO ===\n{'='*60}\n\n{texto_proc}"
-                
-                logger.info(f"📄 Texto reduzido: {len(texto_relevante):,} chars (60 páginas + anexos)")
-            
-            # 9. Enviar ao LLM (muito menor!)
-            logger.info(f"🤖 Enviando {len(texto_relevante):,} chars para GPT-4o-mini")
-            logger.info(f"   Páginas enviadas: Ofício {oficio_correto['paginas']} + ANEXO II {paginas_anexo} + PROC {[pagina_proc] if pagina_proc else []}")
-            
-            dados_oficio = self._extrair_dados_llm(
-                texto_relevante, 
-                tem_anexo_ii=bool(texto_anexo),
-                tem_processamento=bool(texto_proc),
-                numero_ordem_titulo=numero_ordem_titulo,
-                oficio_rejeitado=oficio_rejeitado,
-                motivo_rejeicao=motivo_rejeicao
+                logger.info(f"📋 PROCESSAMENTO encontrado na página {pagina_proc}")
+                secoes_anexas += f"\n\n{'='*60}\n=== PROCESSAMENTO ===\n{'='*60}\n\n{texto_proc}"
+        elif numero_ordem_titulo:
+            logger.info(f"📋 Número de ordem extraído do TÍTULO: {numero_ordem_titulo}")
+        else:
+            logger.warning("⚠️ PROCESSAMENTO não encontrado e número não está no título")
+        
+        texto_relevante += secoes_anexas
+        
+        # 8. Verificar tamanho e aplicar chunking adicional se necessário
+        # Estimativa conservadora: 1 token ≈ 2 chars (português), limite 128k tokens ≈ 256k chars
+        # Deixar margem de segurança: 200k chars
+        MAX_CHARS = 200_000
+        
+        if len(texto_relevante) > MAX_CHARS:
+            logger.warning(f"⚠️ Texto muito grande ({len(texto_relevante):,} chars > {MAX_CHARS:,})")
+            logger.info(f"🔧 Aplicando CHUNKING AGRESSIVO: primeiras 30 + últimas 30 páginas do ofício")
+            
+            # Re-extrair com chunking mais agressivo + re-adicionar ANEXO II e PROCESSAMENTO
+            paginas_chunk = paginas_oficio[:30] + paginas_oficio[-30:]
+            texto_relevante = self._texto_paginas(layout.paginas, paginas_chunk) + secoes_anexas
+            paginas_descartadas = True
+            
+            logger.info(f"📄 Texto reduzido: {len(texto_relevante):,} chars (60 páginas + anexos)")
+        
+        # 8.1. Map-reduce: o texto reduzido descarta páginas → blocos com TODAS elas
+        blocos = []
+        if paginas_descartadas and self.usar_mapreduce:
+            blocos = mapreduce.dividir_paginas(self._textos_paginas(layout.paginas, paginas_oficio))
+            if secoes_anexas:
+                blocos.append(mapreduce.bloco_anexos(secoes_anexas))
+            logger.info(f"🧩 Map-reduce: {num_paginas} páginas em {len(blocos)} bloco(s)")
+        
+        # 9. Payload pronto para o LLM (muito menor!)
+        logger.info(f"   Páginas selecionadas: Ofício {oficio_correto['paginas']} + ANEXO II {paginas_anexo} + PROC {[pagina_proc] if pagina_proc else []}")
+        
+        payload = PayloadExtracao(
+            cpf=cpf_numerico,
+            pdf=Path(pdf_path).name,
+            pdf_path=str(pdf_path),
+            hash_pdf=hash_pdf,
+            texto=texto_relevante,
+            blocos=blocos,
+            paginas_oficio=oficio_correto['paginas'],
+            paginas_anexo=paginas_anexo,
+            pagina_processamento=pagina_proc,
+            num_oficios=len(todos_oficios),
+            tem_anexo_ii=bool(texto_anexo),
+            tem_processamento=bool(texto_proc),
+            numero_ordem_titulo=numero_ordem_titulo,
+            oficio_rejeitado=oficio_rejeitado,
+            motivo_rejeicao=motivo_rejeicao
+        )
+        return payload, None
+    
+    def processar_payload(
+        self,
+        payload: PayloadExtracao,
+        inicio: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Etapa LLM: extrai (em cascata), valida e monta o resultado final.
+        
+        Args:
+            payload: Payload montado por preparar_payload
+            inicio: Timestamp de início do processamento do PDF
+            
+        Returns:
+            Dict com resultado do processamento
+        """
+        inicio = inicio or time.time()
+        
+        # Ofício rejeitado: registro determinístico, sem LLM
+        resultado_regex = self.resolver_sem_llm(payload, inicio)
+        if resultado_regex is not None:
+            return resultado_regex
+        
+        # Disjuntor aberto: nem tenta, payload espera na caixa de saída
+        if self.caixa_saida is not None and self.disjuntor.aberto():
+            return self._adiar_payload(payload, inicio)
+        
+        if payload.blocos:
+            # 8. Ofício gigante: blocos em paralelo + mesclagem determinística
+            dados_oficio, oficio_validado, erro_validacao, nivel = self._extrair_mapreduce(payload)
+        else:
+            logger.info(f"🤖 Enviando {len(payload.texto):,} chars para {self.modelo_gpt}")
+            
+            # 8. Extrair + validar (Pydantic) em cascata: modelo barato → forte
+            dados_oficio, oficio_validado, erro_validacao, nivel = self._extrair_em_cascata(
+                payload.texto,
+                tem_anexo_ii=payload.tem_anexo_ii,
+                tem_processamento=payload.tem_processamento,
+                numero_ordem_titulo=payload.numero_ordem_titulo,
+                oficio_rejeitado=payload.oficio_rejeitado,
+                motivo_rejeicao=payload.motivo_rejeicao
             )
+        
+        if not dados_oficio:
+            if self.caixa_saida is not None and self.disjuntor.instavel():
+                return self._adiar_payload(payload, inicio)
+            logger.error("❌ Falha na extração LLM")
+            return self._criar_resultado_erro(
+                payload.cpf,
+                payload.pdf_path,
+                "Falha na extração LLM"
+            )
+        
+        if oficio_validado is None:
+            return self._resultado_validacao_falhou(payload, erro_validacao, inicio)
+        
+        logger.info(f"✅ Dados validados com sucesso (nível: {nivel})")
+        return self._finalizar_resultado(payload, oficio_validado, nivel, inicio)
+    
+    def _adiar_payload(self, payload: PayloadExtracao, inicio: float) -> Dict[str, Any]:
+        """Guarda o payload na caixa de saída; resultado marcado como adiado (não é erro)."""
+        caminho = self.caixa_saida.guardar(payload)
+        with self._trava_estatisticas:
+            self.estatisticas_caixa["adiados"] += 1
+        logger.warning(f"📮 LLM indisponível: {payload.pdf} ({payload.cpf}) adiado para {caminho.name}")
+        
+        resultado = self._criar_resultado_erro(
+            payload.cpf,
+            payload.pdf_path,
+            "LLM indisponível: adiado para a caixa de saída"
+        )
+        resultado["adiado"] = True
+        resultado["num_oficios"] = payload.num_oficios
+        resultado["tempo_processamento"] = time.time() - inicio
+        return resultado
+    
+    def drenar_caixa_saida(self) -> List[Dict[str, Any]]:
+        """
+        Processa os payloads da caixa de saída enquanto o disjuntor permitir.
+        
+        Cada arquivo só sai da caixa depois de processado; se o LLM cair de
+        novo, o payload é regravado e a drenagem para.
+        
+        Returns:
+            Resultados dos payloads processados (sucesso ou erro definitivo)
+        """
+        resultados: List[Dict[str, Any]] = []
+        if self.caixa_saida is None:
+            return resultados
+        
+        pendentes = self.caixa_saida.pendentes()
+        if pendentes and not self.disjuntor.aberto():
+            logger.info(f"📬 Drenando caixa de saída: {len(pendentes)} payload(s)")
+        
+        for caminho in pendentes:
+            if self.disjuntor.aberto():
+                break
             
-            if not dados_oficio:
-                logger.error("❌ Falha na extração LLM")
-                return self._criar_resultado_erro(
-                    cpf_numerico,
-                    pdf_path,
-                    "Falha na extração LLM"
-                )
+            payload = self.caixa_saida.carregar(caminho)
+            resultado = self.processar_payload(payload)
+            if resultado.get("adiado"):
+                break
             
-            # 8. Validar com Pydantic
-            try:
-                oficio_validado = OficioRequisitorio(**dados_oficio)
-                logger.info("✅ Dados validados com sucesso")
-            except Exception as e:
-                logger.error(f"❌ Erro na validação Pydantic: {e}")
-                return {
-                    "cpf": cpf_numerico,
-                    "pdf": Path(pdf_path).name,
-                    "sucesso": False,
-                    "cpf_validado": True,
-                    "erro": f"Validação falhou: {e}",
-                    "tempo_processamento": time.time() - inicio,
-                    "num_oficios": len(todos_oficios)
-                }
-            
-            # 8.1. Calcular flag IDOSO automaticamente
-            if oficio_validado.data_nascimento:
-                from datetime import date
-                hoje = date.today()
-                idade = hoje.year - oficio_validado.data_nascimento.year
-                
-                # Ajustar se ainda não fez aniversário este ano
-                if (hoje.month, hoje.day) < (oficio_validado.data_nascimento.month, oficio_validado.data_nascimento.day):
-                    idade -= 1
-                
-                # Atualizar flag idoso
-                oficio_validado.idoso = (idade >= 60)
-                logger.info(f"🎂 Idade calculada: {idade} anos → idoso={oficio_validado.idoso}")
+            self.caixa_saida.remover(caminho)
+            with self._trava_estatisticas:
+                self.estatisticas_caixa["drenados"] += 1
+            resultados.append(resultado)
+        
+        return resultados
+    
+    def resolver_sem_llm(
+        self,
+        payload: PayloadExtracao,
+        inicio: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Resolve o payload sem LLM quando possível (hoje: ofício rejeitado).
+        
+        Args:
+            payload: Payload montado por preparar_payload
+            inicio: Timestamp de início do processamento do PDF
+            
+        Returns:
+            Resultado de sucesso ou None (payload precisa do LLM)
+        """
+        if not (payload.oficio_rejeitado and self.rejeitados_sem_llm):
+            return None
+        
+        oficio = self._extrair_dados_rejeitado(payload)
+        if oficio is None:
+            return None
+        
+        with self._trava_estatisticas:
+            self.estatisticas_cascata["resolvidos"]["regex"] += 1
+        return self._finalizar_resultado(payload, oficio, "regex", inicio or time.time())
+    
+    def _extrair_dados_rejeitado(self, payload: PayloadExtracao) -> Optional[OficioRequisitorio]:
+        """
+        Monta o registro de um ofício rejeitado só com regex.
+        
+        Rejeitado não tem valores: bastam processo, requerente, CPF (da pasta)
+        e motivo (já extraído na detecção).
+        
+        Args:
+            payload: Payload de ofício rejeitado
+            
+        Returns:
+            OficioRequisitorio validado ou None (campos não encontrados → LLM)
+        """
+        dados = {
+            "processo_origem": self.detector.extrair_processo_origem(payload.texto),
+            "requerente_caps": self.detector.extrair_requerente(payload.texto),
+            "credor_cpf_cnpj": self._formatar_cpf(payload.cpf)
+        }
+        
+        ausentes = [campo for campo in CAMPOS_EXIGIDOS_REJEITADO if not dados[campo]]
+        if ausentes:
+            logger.info(f"🔎 Rejeitado sem {', '.join(ausentes)} por regex, usando LLM")
+            return None
+        
+        dados = self._complementar_dados(
+            dados,
+            numero_ordem_titulo=payload.numero_ordem_titulo,
+            oficio_rejeitado=True,
+            motivo_rejeicao=payload.motivo_rejeicao
+        )
+        
+        try:
+            oficio = OficioRequisitorio(**dados)
+        except ValidationError as e:
+            logger.info(f"🔎 Dados do rejeitado por regex inválidos ({e.error_count()} erro(s)), usando LLM")
+            return None
+        
+        logger.info(f"⚡ Ofício rejeitado resolvido por regex: {oficio.processo_origem}")
+        return oficio
+    
+    def processar_pacote(self, payloads: List[PayloadExtracao]) -> List[Dict[str, Any]]:
+        """
+        Extrai vários documentos curtos em UMA chamada e demultiplexa por PDF.
+        
+        Documento ausente na resposta, inválido ou com pendências (campo
+        obrigatório ausente, valores inconsistentes) cai para a extração
+        individual (processar_payload, com cascata). Falha do pacote inteiro
+        faz todos caírem.
+        
+        Args:
+            payloads: Payloads elegíveis (ver empacotamento.agrupar)
+            
+        Returns:
+            Lista de resultados na mesma ordem dos payloads
+        """
+        if len(payloads) == 1:
+            return [self.processar_payload(payloads[0])]
+        
+        inicio = time.time()
+        ids = empacotamento.identificar(payloads)
+        documentos = [
+            {"id": id_documento, "texto": payload.texto, "oficio_rejeitado": payload.oficio_rejeitado}
+            for id_documento, payload in ids.items()
+        ]
+        
+        logger.info(f"📦 Pacote com {len(payloads)} documentos para {self.modelo_gpt}")
+        
+        try:
+            response = self._chamar_llm(
+                montar_mensagens_pacote(documentos),
+                formato=formato_resposta_pacote()
+            )
+            respostas = empacotamento.separar_respostas(response.choices[0].message.content, ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Pacote falhou ({e}), extraindo individualmente")
+            respostas = {}
+        
+        with self._trava_estatisticas:
+            self.estatisticas_pacotes["pacotes"] += 1
+        
+        # Tempo da chamada rateado entre os documentos do pacote
+        inicio_rateado = time.time() - (time.time() - inicio) / len(payloads)
+        
+        resultados = []
+        for id_documento, payload in ids.items():
+            resultado = None
+            if id_documento in respostas:
+                resultado = self._concluir_do_pacote(payload, respostas[id_documento], inicio_rateado)
+            
+            if resultado is None:
+                with self._trava_estatisticas:
+                    self.estatisticas_pacotes["fallbacks"] += 1
+                resultado = self.processar_payload(payload)
             else:
-                logger.debug("⚠️ data_nascimento não disponível, flag idoso não calculada")
+                with self._trava_estatisticas:
+                    self.estatisticas_pacotes["documentos"] += 1
             
-            # 9. Retornar resultado de sucesso
-            logger.info("✅ Processamento V2 concluído com sucesso!")
-            return {
-                "cpf": cpf_numerico,
-                "pdf": Path(pdf_path).name,
-                "sucesso": True,
-                "cpf_validado": True,
-                "dados": oficio_validado.model_dump(),
-                "tempo_processamento": time.time() - inicio,
-                "num_oficios": len(todos_oficios)
-            }
+            resultados.append(resultado)
+        
+        return resultados
+    
+    def _concluir_do_pacote(
+        self,
+        payload: PayloadExtracao,
+        dados: Dict[str, Any],
+        inicio: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Valida os dados de um documento do pacote.
+        
+        Returns:
+            Resultado de sucesso ou None (documento deve ser extraído individualmente)
+        """
+        dados = self._complementar_dados(
+            dados,
+            numero_ordem_titulo=payload.numero_ordem_titulo,
+            oficio_rejeitado=payload.oficio_rejeitado,
+            motivo_rejeicao=payload.motivo_rejeicao
+        )
+        
+        try:
+            oficio_validado = self._validar_dados(dados, payload.texto)
+        except Exception as e:
+            logger.warning(f"⚠️ {payload.pdf}: validação falhou no pacote ({str(e)[:100]})")
+            return None
+        
+        problemas = campos_obrigatorios_ausentes(oficio_validado) + verificar_consistencia(oficio_validado)
+        if problemas:
+            logger.warning(f"⚠️ {payload.pdf}: pendências no pacote ({'; '.join(problemas)})")
+            return None
+        
+        with self._trava_estatisticas:
+            self.estatisticas_cascata["resolvidos"]["rapido"] += 1
+        return self._finalizar_resultado(payload, oficio_validado, "pacote", inicio)
+    
+    def concluir_resposta_llm(
+        self,
+        payload: PayloadExtracao,
+        conteudo: str,
+        nivel: str = "batch"
+    ) -> Dict[str, Any]:
+        """
+        Conclui um payload cuja resposta do LLM foi obtida fora daqui (Batch API).
+        
+        Passa pelo mesmo caminho da extração síncrona: parse (com reparo),
+        complemento dos dados detectados, validação (com reparo) e resultado.
+        
+        Args:
+            payload: Payload montado por preparar_payload
+            conteudo: Conteúdo (JSON) da resposta do LLM
+            nivel: Rótulo do nível/modo que gerou a resposta
+            
+        Returns:
+            Dict com resultado do processamento
+        """
+        inicio = time.time()
+        
+        try:
+            dados = json.loads(conteudo)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ Resposta não é JSON válido ({e}), tentando reparo")
+            try:
+                dados = json.loads(self._reparar_json(conteudo, str(e)))
+            except Exception as erro_reparo:
+                logger.error(f"❌ Reparo do JSON falhou: {erro_reparo}")
+                return self._criar_resultado_erro(payload.cpf, payload.pdf_path, "Falha na extração LLM")
+        
+        return self._concluir_dados(payload, dados, nivel, inicio)
+    
+    def concluir_respostas_blocos(
+        self,
+        payload: PayloadExtracao,
+        conteudos: List[Optional[str]],
+        nivel: str = "batch"
+    ) -> Dict[str, Any]:
+        """
+        Conclui um payload com blocos (map-reduce) cujas respostas vieram de fora (Batch API).
+        
+        Args:
+            payload: Payload com blocos
+            conteudos: Resposta de cada bloco, na ordem de payload.blocos (None = sem resposta)
+            nivel: Rótulo do nível/modo que gerou as respostas
             
+        Returns:
+            Dict com resultado do processamento
+        """
+        inicio = time.time()
+        
+        parciais: List[Optional[Dict[str, Any]]] = []
+        for conteudo in conteudos:
+            try:
+                parciais.append(self._ler_json_bloco(conteudo) if conteudo is not None else None)
+            except Exception as e:
+                logger.error(f"Erro na resposta do bloco: {e}")
+                parciais.append(None)
+        
+        dados = self._reduzir_blocos(payload.blocos, parciais)
+        if dados is None:
+            return self._criar_resultado_erro(payload.cpf, payload.pdf_path, "Falha na extração LLM")
+        
+        return self._concluir_dados(payload, dados, nivel, inicio)
+    
+    def _concluir_dados(
+        self,
+        payload: PayloadExtracao,
+        dados: Dict[str, Any],
+        nivel: str,
+        inicio: float
+    ) -> Dict[str, Any]:
+        """Complemento dos dados detectados, validação (com reparo) e resultado."""
+        dados = self._complementar_dados(
+            dados,
+            numero_ordem_titulo=payload.numero_ordem_titulo,
+            oficio_rejeitado=payload.oficio_rejeitado,
+            motivo_rejeicao=payload.motivo_rejeicao
+        )
+        
+        try:
+            oficio_validado = self._validar_dados(dados, payload.texto)
         except Exception as e:
-            logger.error(f"❌ Erro no processamento V2: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "cpf": cpf_numerico,
-                "pdf": Path(pdf_path).name,
-                "sucesso": False,
-                "cpf_validado": False,
-                "erro": str(e),
-                "tempo_processamento": time.time() - inicio,
-                "num_oficios": 0
-            }
+            return self._resultado_validacao_falhou(payload, str(e), inicio)
+        
+        problemas = campos_obrigatorios_ausentes(oficio_validado) + verificar_consistencia(oficio_validado)
+        if problemas:
+            logger.warning(f"⚠️ Extração com pendências ({nivel}): {'; '.join(problemas)}")
+        
+        return self._finalizar_resultado(payload, oficio_validado, nivel, inicio)
+    
+    def _resultado_validacao_falhou(
+        self,
+        payload: PayloadExtracao,
+        erro: str,
+        inicio: float
+    ) -> Dict[str, Any]:
+        """Resultado de erro quando os dados do LLM não passam na validação."""
+        logger.error(f"❌ Erro na validação Pydantic: {erro}")
+        return {
+            "cpf": payload.cpf,
+            "pdf": payload.pdf,
+            "sucesso": False,
+            "cpf_validado": True,
+            "erro": f"Validação falhou: {erro}",
+            "tempo_processamento": time.time() - inicio,
+            "num_oficios": payload.num_oficios
+        }
+    
+    def _finalizar_resultado(
+        self,
+        payload: PayloadExtracao,
+        oficio_validado: OficioRequisitorio,
+        nivel: str,
+        inicio: float
+    ) -> Dict[str, Any]:
+        """
+        Calcula campos derivados (idoso) e monta o resultado de sucesso.
+        
+        Args:
+            payload: Payload do PDF
+            oficio_validado: Dados validados
+            nivel: Nível/modo que produziu os dados
+            inicio: Timestamp de início do processamento
+            
+        Returns:
+            Dict com resultado de sucesso
+        """
+        # 8.1. Calcular flag IDOSO automaticamente
+        if oficio_validado.data_nascimento:
+            from datetime import date
+            hoje = date.today()
+            idade = hoje.year - oficio_validado.data_nascimento.year
+            
+            # Ajustar se ainda não fez aniversário este ano
+            if (hoje.month, hoje.day) < (oficio_validado.data_nascimento.month, oficio_validado.data_nascimento.day):
+                idade -= 1
+            
+            # Atualizar flag idoso
+            oficio_validado.idoso = (idade >= 60)
+            logger.info(f"🎂 Idade calculada: {idade} anos → idoso={oficio_validado.idoso}")
+        else:
+            logger.debug("⚠️ data_nascimento não disponível, flag idoso não calculada")
+        
+        # 9. Retornar resultado de sucesso
+        logger.info("✅ Processamento V2 concluído com sucesso!")
+        return {
+            "cpf": payload.cpf,
+            "pdf": payload.pdf,
+            "sucesso": True,
+            "cpf_validado": True,
+            "dados": oficio_validado.model_dump(),
+            "modelo": nivel,
+            "tempo_processamento": time.time() - inicio,
+            "num_oficios": payload.num_oficios
+        }
+    
+    def _textos_paginas(self, documento: DocumentoPaginas, paginas: List[int]) -> List[Tuple[int, str]]:
+        """
+        Texto de cada página (1-indexed).
+        
+        Args:
+            documento: Texto das páginas do PDF
+            paginas: Números das páginas (1-indexed)
+            
+        Returns:
+            Lista de (número da página, texto)
+        """
+        return [(pagina, documento.texto(pagina - 1)) for pagina in paginas]
+    
+    def _textos_oficio(self, layout: LayoutPDF, oficio: Dict[str, Any]) -> Iterator[str]:
+        """Texto de cada página do ofício, sob demanda (sem juntar o ofício inteiro)."""
+        for pagina in oficio['paginas']:
+            yield layout.paginas.texto(pagina - 1)
+    
+    def _texto_paginas(self, documento: DocumentoPaginas, paginas: List[int]) -> str:
+        """Texto concatenado das páginas (1-indexed), uma por linha de separação."""
+        return "".join(texto + "\n" for _, texto in self._textos_paginas(documento, paginas))
+    
+    def _hash_arquivo(self, pdf_path: str) -> str:
+        """
+        Hash SHA-256 do conteúdo do arquivo (identifica o mesmo PDF em pastas diferentes).
+        
+        Memorizado por caminho/tamanho/mtime: o runner já calcula o hash ao
+        agrupar cópias e a preparação não relê o arquivo.
+        
+        Args:
+            pdf_path: Caminho do arquivo
+            
+        Returns:
+            Hash hexadecimal
+        """
+        info = os.stat(pdf_path)
+        chave = (str(pdf_path), info.st_size, info.st_mtime_ns)
+        if chave in self._hashes:
+            return self._hashes[chave]
+        
+        sha = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+        
+        self._hashes[chave] = sha.hexdigest()
+        return self._hashes[chave]
+    
     
     def _extrair_cpf_pasta(self, pdf_path: str) -> Optional[str]:
         """
@@ -418,7 +1153,8 @@ class ProcessadorOficio:
         tem_processamento: bool = False,
         numero_ordem_titulo: Optional[str] = None,
         oficio_rejeitado: bool = False,
-        motivo_rejeicao: Optional[str] = None
+        motivo_rejeicao: Optional[str] = None,
+        modelo: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Extrai dados estruturados usando GPT-4o-mini.
@@ -432,195 +1168,35 @@ class ProcessadorOficio:
             numero_ordem_titulo: Número de ordem extraído do título (PDFs antigos)
             oficio_rejeitado: Se o ofício foi rejeitado
             motivo_rejeicao: Motivo da rejeição (se houver)
+            modelo: Modelo a usar (padrão: modelo_gpt)
             
         Returns:
             Dicionário com dados extraídos ou None
         """
+        json_str = ""
         try:
-            # Ajustar prompt se ofício rejeitado
-            nota_rejeicao = ""
-            if oficio_rejeitado:
-                nota_rejeicao = f"""
-⚠️ ATENÇÃO: Este ofício foi REJEITADO pelo DEPRE!
-- Extraia apenas os dados disponíveis no documento
-- Campos que não estiverem disponíveis devem ser null
-- Não invente valores
-- Marque rejeitado=true
-"""
-            
-            # Adicionar nota sobre anomalias
-            nota_anomalia = ""
-            if len(texto_oficio) < 500:
-                nota_anomalia = """
-⚠️ ATENÇÃO: Documento muito curto ou com formato anômalo!
-- Se o documento não seguir o padrão esperado, marque anomalia=true
-- Descreva o problema encontrado em descricao_anomalia
-- Extraia o que for possível
-"""
+            # Prefixo estático primeiro (cache de prompt), variáveis depois
+            mensagens = montar_mensagens(texto_oficio, oficio_rejeitado=oficio_rejeitado)
             
-            # Prompt V2 otimizado
-            prompt = f"""Você é um assistente especializado em extrair dados de Ofícios Requisitórios do TJSP.
-
-IMPORTANTE: Retorne JSON com estrutura FLAT (campos no nível raiz), NÃO use objetos aninhados!
-
-{nota_rejeicao}{nota_anomalia}
-
-DOCUMENTO: Ofício Requisitório do Tribunal de Justiça de São Paulo
-
-=== CAMPOS OBRIGATÓRIOS (nível raiz do JSON) ===
-
-- processo_origem: Número CNJ do processo (formato: 0000000-00.0000.0.00.0000)
-- requerente_caps: Nome TODO EM MAIÚSCULAS
-- numero_ordem: Número de ordem do RPV/Precatório (formato: XXXXX/YYYY)
-  ⚠️ ATENÇÃO - DIFERENÇA CRÍTICA:
-  * CORRETO: "644/2015", "2913/2023", "12345/2024" (formato: números/ano)
-  * ERRADO: "0181657-92.2021.8.26.0500" (isso é número do PROCESSO, não número de ordem!)
-  * Buscar no TÍTULO: "OFÍCIO REQUISITÓRIO Nº XXX/YYYY"
-  * OU na seção "PROCESSAMENTO": "Nº de Ordem: XXX/YYYY" ou "Ordem: XXX/YYYY"
-  * Se NÃO encontrar o número de ordem, retorne null (não invente!)
-- valor_principal_liquido: Valor principal líquido (número decimal)
-- valor_principal_bruto: Valor principal bruto (número decimal)
-- juros_moratorios: Juros moratórios (número decimal)
-- valor_total_requisitado: Valor total requisitado (número decimal)
-
-=== CAMPOS OPCIONAIS (nível raiz do JSON) ===
-
-DADOS BANCÁRIOS (ANEXO II):
-- banco: Código do banco (apenas números, ex: 341)
-- agencia: Número da agência
-- conta: Número da conta (com dígito)
-- conta_tipo: Tipo de conta (corrente/poupança)
-- dados_bancarios_advogado: Se dados são do advogado (true/false)
-- cpf_titular_conta: CPF do titular da conta
-
-CONTRIBUIÇÕES:
-- contrib_previdenciaria_iprem: INST.PREV. ou IPREMSAOPAULO (número)
-- contrib_previdenciaria_hspm: ASSIST.MÉD. ou HSPMSAOPAULO (número)
-
-DATAS (formato YYYY-MM-DD):
-- data_nascimento: Data de nascimento do credor
-- data_base_atualizacao: Data base para atualização
-- data_ajuizamento: Data de ajuizamento
-- data_transito_julgado: Data do trânsito em julgado
-
-PREFERÊNCIAS (true/false):
-- idoso: Credor com mais de 60 anos
-- doenca_grave: Portador de doença grave
-- pcd: Pessoa com deficiência
-
-OUTROS VALORES:
-- tipo_levantamento: Tipo de levantamento
-- valor_compensado: Valor compensado (número)
-- contribuicao_social: Contribuição social (número)
-- salario_pericial: Salário pericial (número)
-- assist_tecnico: Assistente técnico (número)
-- custas: Custas (número)
-- despesas: Despesas (número)
-- multas: Multas (número)
-
-OUTRAS INFORMAÇÕES:
-- vara: Vara responsável
-- credor_nome: Nome do credor
-- credor_cpf_cnpj: CPF/CNPJ do credor
-- devedor_ente: Ente devedor
-- advogado_nome: Nome do advogado
-- advogado_oab: OAB do advogado
-
-CONTROLE:
-- rejeitado: Se o ofício foi rejeitado (true/false)
-- motivo_rejeicao: Motivo da rejeição (se houver)
-- anomalia: Se o PDF tem formato anômalo (true/false)
-- descricao_anomalia: Descrição do problema encontrado (se houver)
-
-=== REGRAS CRÍTICAS ===
-
-1. ESTRUTURA: JSON FLAT (todos os campos no nível raiz, SEM objetos aninhados)
-2. Campos não encontrados = null
-3. Valores numéricos: SEM R$, SEM pontos de milhar, vírgula = ponto decimal
-4. Datas: formato YYYY-MM-DD
-5. Requerente: SEMPRE em MAIÚSCULAS
-6. Booleanos: true ou false (minúsculas)
-7. Número de ordem: buscar na seção "PROCESSAMENTO" (formato: XXX/YYYY)
-
-EXEMPLO DE ESTRUTURA CORRETA:
-{{
-  "processo_origem": "0035938-67.2018.8.26.0053",
-  "requerente_caps": "REGINA APARECIDA NARDES GARCIA DIAS",
-  "numero_ordem": "2913/2023",
-  "valor_principal_liquido": 17753.80,
-  "valor_principal_bruto": 37993.13,
-  "juros_moratorios": 20239.33,
-  "valor_total_requisitado": 37993.13,
-  "banco": "341",
-  "agencia": "3740",
-  "conta": "00000001341-6",
-  "vara": "1ª VARA DE FAZENDA PÚBLICA",
-  "data_base_atualizacao": "2020-02-29",
-  "idoso": false
-}}
-
-ATENÇÃO: numero_ordem é diferente de processo_origem!
-- processo_origem: 0035938-67.2018.8.26.0053 (número CNJ do processo)
-- numero_ordem: 2913/2023 (número do ofício/precatório)
-
-DOCUMENTO:
-{texto_oficio}
-
-Retorne APENAS JSON FLAT válido:"""
-
-            # Chamar GPT-4o-mini
-            response = self.client.chat.completions.create(
-                model=self.modelo_gpt,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Você é um assistente especializado em extração de dados estruturados de documentos jurídicos. Retorne apenas JSON válido."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0,  # Determinístico
-                response_format={"type": "json_object"}
-            )
+            response = self._chamar_llm(mensagens, modelo=modelo)
             
             # Extrair JSON da resposta
             json_str = response.choices[0].message.content
             
-            # Parse JSON
-            dados = json.loads(json_str)
-            
-            # Se número de ordem foi extraído do título e LLM não encontrou, usar o do título
-            if numero_ordem_titulo and not dados.get('numero_ordem'):
-                logger.info(f"📋 Usando número de ordem do título: {numero_ordem_titulo}")
-                dados['numero_ordem'] = numero_ordem_titulo
-            
-            # Adicionar flag de rejeição se detectada
-            if oficio_rejeitado:
-                dados['rejeitado'] = True
-                if motivo_rejeicao and not dados.get('motivo_rejeicao'):
-                    dados['motivo_rejeicao'] = motivo_rejeicao
-            
-            # Adicionar observações sobre campos não encontrados
-            campos_ausentes = []
-            campos_obrigatorios = [
-                'valor_principal_liquido', 'valor_principal_bruto', 
-                'juros_moratorios', 'valor_total_requisitado'
-            ]
-            
-            for campo in campos_obrigatorios:
-                if not dados.get(campo):
-                    campos_ausentes.append(campo)
-            
-            if campos_ausentes and not dados.get('observacoes'):
-                obs = f"Campos não encontrados: {', '.join(campos_ausentes)}"
-                dados['observacoes'] = obs
-                logger.warning(f"⚠️ {obs}")
+            # Parse JSON (com uma chamada de reparo se vier malformado)
+            try:
+                dados = json.loads(json_str)
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ Resposta não é JSON válido ({e}), tentando reparo")
+                json_str = self._reparar_json(json_str, str(e), modelo=modelo)
+                dados = json.loads(json_str)
             
-            # Detectar anomalias (formato não padrão)
-            if dados.get('anomalia') and not dados.get('descricao_anomalia'):
-                dados['descricao_anomalia'] = "PDF com formato anômalo detectado pelo LLM"
+            dados = self._complementar_dados(
+                dados,
+                numero_ordem_titulo=numero_ordem_titulo,
+                oficio_rejeitado=oficio_rejeitado,
+                motivo_rejeicao=motivo_rejeicao
+            )
             
             logger.debug(f"Dados extraídos: {list(dados.keys())}")
             return dados
@@ -633,6 +1209,514 @@ Retorne APENAS JSON FLAT válido:"""
             logger.error(f"Erro na chamada LLM: {e}")
             return None
     
+    def _complementar_dados(
+        self,
+        dados: Dict[str, Any],
+        numero_ordem_titulo: Optional[str] = None,
+        oficio_rejeitado: bool = False,
+        motivo_rejeicao: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Complementa a resposta do LLM com o que a detecção já sabe.
+        
+        Args:
+            dados: Dados retornados pelo LLM
+            numero_ordem_titulo: Número de ordem extraído do título (PDFs antigos)
+            oficio_rejeitado: Se o ofício foi rejeitado
+            motivo_rejeicao: Motivo da rejeição (se houver)
+            
+        Returns:
+            Dados complementados
+        """
+        # Se número de ordem foi extraído do título e LLM não encontrou, usar o do título
+        if numero_ordem_titulo and not dados.get('numero_ordem'):
+            logger.info(f"📋 Usando número de ordem do título: {numero_ordem_titulo}")
+            dados['numero_ordem'] = numero_ordem_titulo
+        
+        # Adicionar flag de rejeição se detectada
+        if oficio_rejeitado:
+            dados['rejeitado'] = True
+            if motivo_rejeicao and not dados.get('motivo_rejeicao'):
+                dados['motivo_rejeicao'] = motivo_rejeicao
+        
+        # Adicionar observações sobre campos não encontrados
+        campos_ausentes = []
+        campos_obrigatorios = [
+            'valor_principal_liquido', 'valor_principal_bruto', 
+            'juros_moratorios', 'valor_total_requisitado'
+        ]
+        
+        for campo in campos_obrigatorios:
+            if not dados.get(campo):
+                campos_ausentes.append(campo)
+        
+        if campos_ausentes and not dados.get('observacoes'):
+            obs = f"Campos não encontrados: {', '.join(campos_ausentes)}"
+            dados['observacoes'] = obs
+            logger.warning(f"⚠️ {obs}")
+        
+        # Detectar anomalias (formato não padrão)
+        if dados.get('anomalia') and not dados.get('descricao_anomalia'):
+            dados['descricao_anomalia'] = "PDF com formato anômalo detectado pelo LLM"
+        
+        return dados
+    
+    def _extrair_em_cascata(
+        self,
+        texto_oficio: str,
+        **parametros: Any
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[OficioRequisitorio], Optional[str], str]:
+        """
+        Extrai e valida com o modelo barato; escala para o modelo forte apenas se
+        a validação falhar, faltar campo obrigatório ou os valores não fecharem.
+        
+        Falha na chamada (timeout, disjuntor, 5xx, 429) não escala: a
+        indisponibilidade do modelo barato não vira tráfego no modelo caro.
+        
+        Args:
+            texto_oficio: Texto relevante enviado ao LLM
+            **parametros: Repassados para _extrair_dados_llm
+            
+        Returns:
+            Tupla (dados, oficio_validado, erro_validacao, nivel):
+            - dados None = falha na chamada LLM
+            - oficio_validado None = dados inválidos (erro_validacao explica)
+            - nivel: "rapido" ou "forte"
+        """
+        niveis = [("rapido", self.modelo_gpt)]
+        if self.modelo_escalonamento:
+            niveis.append(("forte", self.modelo_escalonamento))
+        
+        melhor = (None, None, None, "rapido")
+        problemas: List[str] = []
+        
+        for indice, (nivel, modelo) in enumerate(niveis):
+            oficio, erro = None, None
+            dados = self._extrair_dados_llm(texto_oficio, modelo=modelo, **parametros)
+            
+            if dados is None:
+                problemas = ["falha na chamada LLM"]
+                break
+            else:
+                try:
+                    oficio = self._validar_dados(dados, texto_oficio, modelo=modelo)
+                    problemas = campos_obrigatorios_ausentes(oficio)
+                    problemas = [f"campo ausente: {campo}" for campo in problemas]
+                    problemas += verificar_consistencia(oficio)
+                except Exception as e:
+                    erro = str(e)
+                    problemas = [f"validação: {erro[:200]}"]
+            
+            # Nível mais forte prevalece, exceto se piorar (inválido após válido)
+            if dados is not None and (oficio is not None or melhor[1] is None):
+                melhor = (dados, oficio, erro, nivel)
+            
+            if not problemas:
+                with self._trava_estatisticas:
+                    self.estatisticas_cascata["resolvidos"][nivel] += 1
+                return melhor
+            
+            if indice + 1 < len(niveis):
+                with self._trava_estatisticas:
+                    self.estatisticas_cascata["escalonamentos"] += 1
+                logger.warning(f"⬆️ Escalando para {niveis[indice + 1][1]}: {'; '.join(problemas)}")
+        
+        with self._trava_estatisticas:
+            self.estatisticas_cascata["sem_solucao"] += 1
+        logger.warning(f"⚠️ Extração com pendências ({melhor[3]}): {'; '.join(problemas)}")
+        return melhor
+    
+    def _extrair_mapreduce(
+        self,
+        payload: PayloadExtracao
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[OficioRequisitorio], Optional[str], str]:
+        """
+        Map-reduce: extrai cada bloco em paralelo e mescla os parciais.
+        
+        Args:
+            payload: Payload com blocos (ofício gigante)
+            
+        Returns:
+            Tupla (dados, oficio_validado, erro_validacao, nivel) como em _extrair_em_cascata
+        """
+        blocos = payload.blocos
+        logger.info(f"🧩 Map-reduce: {len(blocos)} bloco(s) para {self.modelo_gpt}")
+        
+        with ThreadPoolExecutor(max_workers=min(self.maximo_blocos_paralelos, len(blocos))) as executor:
+            parciais = list(executor.map(
+                lambda bloco: self._extrair_bloco(bloco, payload.oficio_rejeitado),
+                blocos
+            ))
+        
+        dados = self._reduzir_blocos(blocos, parciais)
+        if dados is None:
+            return None, None, None, "mapreduce"
+        
+        dados = self._complementar_dados(
+            dados,
+            numero_ordem_titulo=payload.numero_ordem_titulo,
+            oficio_rejeitado=payload.oficio_rejeitado,
+            motivo_rejeicao=payload.motivo_rejeicao
+        )
+        
+        try:
+            # Reparo usa o texto reduzido (os blocos juntos não cabem numa chamada)
+            oficio = self._validar_dados(dados, payload.texto)
+        except Exception as e:
+            with self._trava_estatisticas:
+                self.estatisticas_cascata["sem_solucao"] += 1
+            return dados, None, str(e), "mapreduce"
+        
+        problemas = campos_obrigatorios_ausentes(oficio) + verificar_consistencia(oficio)
+        if problemas:
+            with self._trava_estatisticas:
+                self.estatisticas_cascata["sem_solucao"] += 1
+            logger.warning(f"⚠️ Extração com pendências (mapreduce): {'; '.join(problemas)}")
+        else:
+            with self._trava_estatisticas:
+                self.estatisticas_cascata["resolvidos"]["rapido"] += 1
+        
+        return dados, oficio, None, "mapreduce"
+    
+    def _reduzir_blocos(
+        self,
+        blocos: List[str],
+        parciais: List[Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Reduce: mescla os parciais (None = bloco sem resposta), anexos à parte.
+        
+        Returns:
+            Dados mesclados ou None se nenhum bloco respondeu
+        """
+        parciais_oficio = [p for b, p in zip(blocos, parciais) if p is not None and not mapreduce.eh_bloco_anexos(b)]
+        parciais_anexos = [p for b, p in zip(blocos, parciais) if p is not None and mapreduce.eh_bloco_anexos(b)]
+        
+        falhas = parciais.count(None)
+        if falhas:
+            logger.warning(f"⚠️ Map-reduce: {falhas}/{len(blocos)} bloco(s) sem resposta")
+        if not parciais_oficio and not parciais_anexos:
+            return None
+        
+        return mapreduce.mesclar_parciais(parciais_oficio, parciais_anexos)
+    
+    def _ler_json_bloco(self, conteudo: str) -> Dict[str, Any]:
+        """JSON da resposta de um bloco (com uma chamada de reparo)."""
+        try:
+            return json.loads(conteudo)
+        except json.JSONDecodeError as e:
+            return json.loads(self._reparar_json(conteudo, str(e)))
+    
+    def _extrair_bloco(self, bloco: str, oficio_rejeitado: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Map: extrai o conjunto parcial de campos de um bloco.
+        
+        Args:
+            bloco: Texto do bloco
+            oficio_rejeitado: Se o ofício foi rejeitado
+            
+        Returns:
+            Dados do bloco ou None se a chamada falhar
+        """
+        try:
+            response = self._chamar_llm(montar_mensagens(bloco, oficio_rejeitado=oficio_rejeitado, trecho=True))
+            return self._ler_json_bloco(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Erro na extração do bloco: {e}")
+            return None
+    
+    def relatorio_cascata(self) -> Dict[str, Any]:
+        """
+        Taxa de resolução por nível da cascata.
+        
+        Returns:
+            Dicionário com contagens e percentuais por nível
+        """
+        with self._trava_estatisticas:
+            stats = {**self.estatisticas_cascata, "resolvidos": dict(self.estatisticas_cascata["resolvidos"])}
+        total = sum(stats["resolvidos"].values()) + stats["sem_solucao"]
+        relatorio = {"total": total, "escalonamentos": stats["escalonamentos"]}
+        
+        for nivel, quantidade in stats["resolvidos"].items():
+            relatorio[nivel] = quantidade
+            relatorio[f"taxa_{nivel}"] = quantidade / total * 100 if total else 0.0
+        relatorio["sem_solucao"] = stats["sem_solucao"]
+        
+        return relatorio
+    
+    def _validar_dados(
+        self,
+        dados: Dict[str, Any],
+        texto_oficio: Optional[str] = None,
+        modelo: Optional[str] = None
+    ) -> OficioRequisitorio:
+        """
+        Valida dados com Pydantic, com UMA chamada de reparo para campos inválidos.
+        
+        O reparo envia apenas os campos que falharam e as mensagens de erro,
+        em vez de repetir a extração inteira.
+        
+        Args:
+            dados: Dados extraídos pelo LLM
+            texto_oficio: Texto do documento (reenviado só se faltar campo)
+            modelo: Modelo usado no reparo (padrão: modelo_gpt)
+            
+        Returns:
+            OficioRequisitorio validado
+            
+        Raises:
+            ValidationError: Se os dados continuarem inválidos após o reparo
+        """
+        try:
+            return OficioRequisitorio(**dados)
+        except ValidationError as erro_validacao:
+            erros = erro_validacao.errors()
+            campos_invalidos = {
+                str(erro["loc"][0]): dados.get(str(erro["loc"][0]))
+                for erro in erros
+                if erro.get("loc") and erro["loc"][0] not in CAMPOS_FORA_DO_LLM
+            }
+            if not campos_invalidos:
+                raise
+            
+            mensagens_erro = [
+                f"{'.'.join(str(parte) for parte in erro['loc'])}: {erro['msg']}"
+                for erro in erros
+            ]
+            logger.warning(f"⚠️ Validação falhou em {list(campos_invalidos)}, tentando reparo")
+            
+            reparados = self._reparar_campos(campos_invalidos, mensagens_erro, texto_oficio, modelo)
+            if reparados is None:
+                raise
+        
+        for campo in campos_invalidos:
+            dados[campo] = reparados.get(campo)
+        
+        oficio = OficioRequisitorio(**dados)
+        logger.info(f"🔧 Reparo bem-sucedido: {list(campos_invalidos)}")
+        return oficio
+    
+    def _reparar_campos(
+        self,
+        campos_invalidos: Dict[str, Any],
+        erros: List[str],
+        texto_oficio: Optional[str] = None,
+        modelo: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Chamada de reparo restrita aos campos que falharam na validação.
+        
+        Args:
+            campos_invalidos: {campo: valor atual}
+            erros: Mensagens de erro da validação
+            texto_oficio: Texto do documento
+            modelo: Modelo a usar (padrão: modelo_gpt)
+            
+        Returns:
+            Dicionário com os campos corrigidos ou None
+        """
+        try:
+            with self._trava_estatisticas:
+                self.estatisticas_llm["reparos"] += 1
+            
+            # Corrigir formato não precisa do documento; campo ausente precisa
+            precisa_documento = any(valor in (None, "") for valor in campos_invalidos.values())
+            mensagens = montar_mensagens_reparo(
+                campos_invalidos,
+                erros,
+                texto_oficio if precisa_documento else None
+            )
+            
+            response = self._chamar_llm(mensagens, campos=list(campos_invalidos), modelo=modelo)
+            return json.loads(response.choices[0].message.content)
+            
+        except Exception as e:
+            logger.error(f"Erro no reparo de campos: {e}")
+            return None
+    
+    def _reparar_json(self, resposta: str, erro: str, modelo: Optional[str] = None) -> str:
+        """
+        Chamada de reparo para resposta que não é JSON válido.
+        
+        Args:
+            resposta: Resposta original do LLM
+            erro: Mensagem do erro de parse
+            modelo: Modelo a usar (padrão: modelo_gpt)
+            
+        Returns:
+            Conteúdo da nova resposta
+        """
+        with self._trava_estatisticas:
+            self.estatisticas_llm["reparos"] += 1
+        response = self._chamar_llm(montar_mensagens_reparo_json(resposta[:4000], erro), modelo=modelo)
+        return response.choices[0].message.content
+    
+    def montar_requisicao(
+        self,
+        payload: PayloadExtracao,
+        modelo: Optional[str] = None,
+        bloco: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Corpo da requisição de chat completion para um payload (ex: linha da Batch API).
+        
+        Args:
+            payload: Payload montado por preparar_payload
+            modelo: Modelo a usar (padrão: modelo_gpt)
+            bloco: Um dos payload.blocos (map-reduce: extração do trecho)
+            
+        Returns:
+            Dicionário com os parâmetros de chat.completions.create
+        """
+        if bloco is not None:
+            mensagens = montar_mensagens(bloco, oficio_rejeitado=payload.oficio_rejeitado, trecho=True)
+        else:
+            mensagens = montar_mensagens(payload.texto, oficio_rejeitado=payload.oficio_rejeitado)
+        return self._parametros_chamada(mensagens, modelo=modelo)
+    
+    def _parametros_chamada(
+        self,
+        mensagens: List[Dict[str, str]],
+        campos: Optional[List[str]] = None,
+        modelo: Optional[str] = None,
+        formato: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Parâmetros de chat.completions.create (formato de resposta conforme configuração)."""
+        if not self.usar_json_schema:
+            formato = {"type": "json_object"}
+        elif formato is None:
+            formato = formato_resposta(campos)
+        
+        return {
+            "model": modelo or self.modelo_gpt,
+            "messages": aplicar_variante(mensagens, self.variante_prompt),
+            "temperature": 0,  # Determinístico
+            "response_format": formato
+        }
+    
+    def _chamar_llm(
+        self,
+        mensagens: List[Dict[str, str]],
+        campos: Optional[List[str]] = None,
+        modelo: Optional[str] = None,
+        formato: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Executa a chamada de chat completion e registra o uso de tokens.
+        
+        Requisições idênticas simultâneas são coalescidas (single-flight pelo
+        hash do corpo): só a primeira vai à API, as demais recebem a mesma resposta.
+        Timeout e hedge: ver _executar_chamada.
+        
+        Args:
+            mensagens: Mensagens no formato OpenAI (prefixo estático primeiro)
+            campos: Restringe o schema de saída a estes campos (reparo)
+            modelo: Modelo a usar (padrão: modelo_gpt)
+            formato: response_format explícito (ex: pacote de documentos)
+            
+        Returns:
+            Resposta do cliente OpenAI
+        """
+        parametros = self._parametros_chamada(mensagens, campos, modelo, formato)
+        response, compartilhada = self.chamadas_em_voo.executar(
+            chave_requisicao(parametros),
+            lambda: self._executar_chamada(parametros)
+        )
+        
+        if compartilhada:
+            with self._trava_estatisticas:
+                self.estatisticas_llm["coalescidas"] += 1
+        else:
+            self._registrar_uso(response)
+        return response
+    
+    def _executar_chamada(self, parametros: Dict[str, Any]) -> Any:
+        """
+        Chamada à API com timeout adaptativo e hedge.
+        
+        Timeout = p99 das últimas chamadas × fator (padrão do módulo latencia
+        até haver histórico). Se a resposta passar do p95, uma duplicata é
+        disparada (dentro do orçamento de hedge) e vale a que chegar primeiro.
+        
+        Passa pelo disjuntor: recusada se aberto; erros de disponibilidade
+        (rede, timeout, 429, 5xx) contam para abri-lo.
+        
+        Args:
+            parametros: Parâmetros de chat.completions.create
+            
+        Returns:
+            Resposta do cliente OpenAI
+            
+        Raises:
+            LLMIndisponivel: Disjuntor aberto
+        """
+        if not self.disjuntor.permitir():
+            raise LLMIndisponivel("Disjuntor aberto: LLM indisponível")
+        
+        try:
+            response = self._chamar_com_hedge(parametros)
+        except Exception as e:
+            if isinstance(e, RateLimitError):
+                with self._trava_estatisticas:
+                    self.estatisticas_llm["limitadas"] += 1
+                if self.controle_concorrencia is not None:
+                    self.controle_concorrencia.limitada()
+            if erro_transitorio(e):
+                self.disjuntor.registrar_falha()
+            else:
+                # Servidor respondeu (ex: 400): disponível
+                self.disjuntor.registrar_sucesso()
+            raise
+        
+        self.disjuntor.registrar_sucesso()
+        return response
+    
+    def _chamar_com_hedge(self, parametros: Dict[str, Any]) -> Any:
+        """Chamada com timeout adaptativo e duplicata no p95 (ver _executar_chamada)."""
+        timeout = self.latencias.timeout()
+        
+        def chamar():
+            inicio = time.time()
+            response = self.client.chat.completions.create(**parametros, timeout=timeout)
+            self.latencias.registrar(time.time() - inicio)
+            return response
+        
+        if not self.usar_hedge:
+            return chamar()
+        
+        response, _ = executar_com_hedge(self._executor_llm, chamar, self.latencias)
+        return response
+    
+    def _registrar_uso(self, response: Any) -> None:
+        """
+        Acumula tokens do campo `usage` da resposta.
+        
+        `prompt_tokens_details.cached_tokens` indica quantos tokens do prompt
+        vieram do cache de prefixo do provedor.
+        
+        Args:
+            response: Resposta do chat completion
+        """
+        usage = getattr(response, "usage", None)
+        tokens_prompt = getattr(usage, "prompt_tokens", None)
+        tokens_resposta = getattr(usage, "completion_tokens", None)
+        detalhes = getattr(usage, "prompt_tokens_details", None)
+        tokens_cache = getattr(detalhes, "cached_tokens", None) if detalhes else None
+        
+        with self._trava_estatisticas:
+            self.estatisticas_llm["chamadas"] += 1
+            
+            # Servidores compatíveis podem omitir campos: contar apenas inteiros
+            if isinstance(tokens_prompt, int):
+                self.estatisticas_llm["tokens_prompt"] += tokens_prompt
+            if isinstance(tokens_resposta, int):
+                self.estatisticas_llm["tokens_resposta"] += tokens_resposta
+            if isinstance(tokens_cache, int):
+                self.estatisticas_llm["tokens_cache"] += tokens_cache
+        
+        if isinstance(tokens_cache, int):
+            logger.debug(f"Tokens em cache: {tokens_cache}/{tokens_prompt}")
+    
     def salvar_postgres(self, resultado: Dict[str, Any]) -> bool:
         """
         Salva dados no PostgreSQL (upsert).
@@ -0,0 +1,343 @@
+"""
+Prompts de extração - Bloco de instruções estático + partes variáveis por documento.
+
+O bloco de instruções vai SEMPRE primeiro e é byte-idêntico entre chamadas:
+servidores compatíveis com OpenAI fazem cache automático de prefixos longos
+idênticos (>= 1024 tokens), então tudo que varia por documento (notas de
+rejeição/anomalia, texto do ofício) fica DEPOIS dele.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .schemas import CAMPOS_OBRIGATORIOS_V2, gerar_schema_llm
+
+
+def _descrever_campos(schema: Dict[str, Any], nomes: List[str]) -> str:
+    """Lista "- campo: descrição" na ordem do schema."""
+    linhas = []
+    for nome in nomes:
+        propriedade = schema["properties"][nome]
+        linhas.append(f"- {nome}: {propriedade['description']}")
+    return "\n".join(linhas)
+
+
+# Schema strict gerado de OficioRequisitorio (fonte única dos campos)
+SCHEMA_EXTRACAO = gerar_schema_llm()
+
+_CAMPOS_OPCIONAIS = [
+    nome for nome in SCHEMA_EXTRACAO["properties"]
+    if nome not in CAMPOS_OBRIGATORIOS_V2
+]
+
+# ⚠️ NÃO interpolar nada por documento aqui: qualquer byte diferente invalida o cache de prefixo
+INSTRUCOES_EXTRACAO = """Você é um assistente especializado em extração de dados estruturados de documentos jurídicos. Retorne apenas JSON válido.
+
+Você extrai dados de Ofícios Requisitórios do Tribunal de Justiça de São Paulo (TJSP).
+
+IMPORTANTE: Retorne JSON com estrutura FLAT (campos no nível raiz), NÃO use objetos aninhados!
+
+=== CAMPOS OBRIGATÓRIOS (nível raiz do JSON) ===
+
+""" + _descrever_campos(SCHEMA_EXTRACAO, CAMPOS_OBRIGATORIOS_V2) + """
+
+=== CAMPOS OPCIONAIS (nível raiz do JSON) ===
+
+""" + _descrever_campos(SCHEMA_EXTRACAO, _CAMPOS_OPCIONAIS) + """
+
+=== NÚMERO DE ORDEM ===
+
+⚠️ ATENÇÃO - DIFERENÇA CRÍTICA:
+* CORRETO: "644/2015", "2913/2023", "12345/2024" (formato: números/ano)
+* ERRADO: "0181657-92.2021.8.26.0500" (isso é número do PROCESSO, não número de ordem!)
+* Buscar no TÍTULO: "OFÍCIO REQUISITÓRIO Nº XXX/YYYY"
+* OU na seção "PROCESSAMENTO": "Nº de Ordem: XXX/YYYY" ou "Ordem: XXX/YYYY"
+* Se NÃO encontrar o número de ordem, retorne null (não invente!)
+
+=== REGRAS CRÍTICAS ===
+
+1. ESTRUTURA: JSON FLAT (todos os campos no nível raiz, SEM objetos aninhados)
+2. Campos não encontrados = null
+3. Valores numéricos: SEM R$, SEM pontos de milhar, vírgula = ponto decimal
+4. Datas: formato YYYY-MM-DD
+5. Requerente: SEMPRE em MAIÚSCULAS
+6. Booleanos: true ou false (minúsculas)
+7. Número de ordem: buscar na seção "PROCESSAMENTO" (formato: XXX/YYYY)
+8. Se houver AVISOS antes do documento, siga-os (rejeição, formato anômalo)
+
+EXEMPLO DE ESTRUTURA CORRETA:
+{
+  "processo_origem": "0035938-67.2018.8.26.0053",
+  "requerente_caps": "REGINA APARECIDA NARDES GARCIA DIAS",
+  "numero_ordem": "2913/2023",
+  "valor_principal_liquido": 17753.80,
+  "valor_principal_bruto": 37993.13,
+  "juros_moratorios": 20239.33,
+  "valor_total_requisitado": 37993.13,
+  "banco": "341",
+  "agencia": "3740",
+  "conta": "00000001341-6",
+  "vara": "1ª VARA DE FAZENDA PÚBLICA",
+  "data_base_atualizacao": "2020-02-29",
+  "idoso": false
+}
+
+ATENÇÃO: numero_ordem é diferente de processo_origem!
+- processo_origem: 0035938-67.2018.8.26.0053 (número CNJ do processo)
+- numero_ordem: 2913/2023 (número do ofício/precatório)
+
+O documento será enviado na próxima mensagem. Retorne APENAS JSON FLAT válido."""
+
+# Variante para modelos locais menores: mesmos campos e regras, sem exemplo
+# (menos tokens de prefill a cada chamada; também estática)
+INSTRUCOES_EXTRACAO_COMPACTA = """Extraia dados de Ofícios Requisitórios do TJSP. Retorne APENAS um objeto JSON FLAT (todos os campos no nível raiz).
+
+CAMPOS OBRIGATÓRIOS:
+""" + _descrever_campos(SCHEMA_EXTRACAO, CAMPOS_OBRIGATORIOS_V2) + """
+
+CAMPOS OPCIONAIS:
+""" + _descrever_campos(SCHEMA_EXTRACAO, _CAMPOS_OPCIONAIS) + """
+
+REGRAS:
+1. Campos não encontrados = null
+2. Valores numéricos sem R$ e sem pontos de milhar (vírgula = ponto decimal)
+3. Datas no formato YYYY-MM-DD; requerente em MAIÚSCULAS; booleanos true/false
+4. numero_ordem no formato XXX/YYYY (título "OFÍCIO REQUISITÓRIO Nº" ou seção PROCESSAMENTO), NUNCA o número CNJ do processo
+5. Se houver AVISOS antes do documento, siga-os"""
+
+VARIANTES_PROMPT = {
+    "completa": INSTRUCOES_EXTRACAO,
+    "compacta": INSTRUCOES_EXTRACAO_COMPACTA
+}
+
+
+def formato_resposta(campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Monta `response_format` de structured outputs (json_schema strict).
+    
+    Args:
+        campos: Subconjunto de campos (reparo). None = schema completo
+        
+    Returns:
+        Dicionário para o parâmetro response_format
+    """
+    schema = SCHEMA_EXTRACAO if campos is None else gerar_schema_llm(campos)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "oficio_requisitorio",
+            "strict": True,
+            "schema": schema
+        }
+    }
+
+
+NOTA_REJEICAO = """⚠️ ATENÇÃO: Este ofício foi REJEITADO pelo DEPRE!
+- Extraia apenas os dados disponíveis no documento
+- Campos que não estiverem disponíveis devem ser null
+- Não invente valores
+- Marque rejeitado=true
+"""
+
+NOTA_ANOMALIA = """⚠️ ATENÇÃO: Documento muito curto ou com formato anômalo!
+- Se o documento não seguir o padrão esperado, marque anomalia=true
+- Descreva o problema encontrado em descricao_anomalia
+- Extraia o que for possível
+"""
+
+NOTA_TRECHO = """⚠️ ATENÇÃO: Este é apenas um TRECHO de um ofício muito longo!
+- Extraia somente o que estiver NESTE trecho
+- Campos que não aparecem no trecho devem ser null (outros trechos os trarão)
+- NÃO marque anomalia só por faltar campos no trecho
+"""
+
+# Abaixo disso o documento é considerado curto/anômalo
+LIMITE_DOCUMENTO_CURTO = 500
+
+
+def montar_mensagens(
+    texto_oficio: str,
+    oficio_rejeitado: bool = False,
+    trecho: bool = False
+) -> List[Dict[str, str]]:
+    """
+    Monta as mensagens de chat com o prefixo estático primeiro.
+
+    Args:
+        texto_oficio: Texto relevante (ofício + ANEXO II + PROCESSAMENTO)
+        oficio_rejeitado: Se o ofício foi rejeitado
+        trecho: Se o texto é um bloco de um ofício gigante (map-reduce)
+
+    Returns:
+        Lista de mensagens [system (estático), user (variável)]
+    """
+    avisos = ""
+    if oficio_rejeitado:
+        avisos += NOTA_REJEICAO
+    if trecho:
+        avisos += NOTA_TRECHO
+    elif len(texto_oficio) < LIMITE_DOCUMENTO_CURTO:
+        avisos += NOTA_ANOMALIA
+
+    conteudo = ""
+    if avisos:
+        conteudo += f"AVISOS:\n{avisos}\n"
+    conteudo += f"DOCUMENTO:\n{texto_oficio}\n\nRetorne APENAS JSON FLAT válido:"
+
+    return [
+        {"role": "system", "content": INSTRUCOES_EXTRACAO},
+        {"role": "user", "content": conteudo}
+    ]
+
+
+def aplicar_variante(mensagens: List[Dict[str, str]], variante: str = "completa") -> List[Dict[str, str]]:
+    """
+    Troca o bloco de instruções pela variante do backend.
+
+    Os montadores de mensagens usam sempre INSTRUCOES_EXTRACAO; a troca é feita
+    na chamada, então o prefixo continua idêntico entre chamadas do mesmo backend.
+
+    Args:
+        mensagens: Mensagens montadas (system = INSTRUCOES_EXTRACAO)
+        variante: Chave de VARIANTES_PROMPT
+
+    Returns:
+        Mensagens com o system da variante
+    """
+    instrucoes = VARIANTES_PROMPT[variante]
+    if instrucoes is INSTRUCOES_EXTRACAO:
+        return mensagens
+    return [
+        {**mensagem, "content": instrucoes}
+        if mensagem["role"] == "system" and mensagem["content"] == INSTRUCOES_EXTRACAO
+        else mensagem
+        for mensagem in mensagens
+    ]
+
+
+def montar_mensagens_reparo(
+    campos_invalidos: Dict[str, Any],
+    erros: List[str],
+    texto_oficio: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Monta chamada de reparo com APENAS os campos que falharam.
+    
+    O documento só é reenviado quando algum campo está ausente (null): para
+    corrigir formato (maiúsculas, CPF, datas) basta o valor atual e o erro.
+    
+    Args:
+        campos_invalidos: {campo: valor atual} dos campos com erro
+        erros: Mensagens de erro da validação
+        texto_oficio: Texto do documento (opcional)
+        
+    Returns:
+        Lista de mensagens [system (estático), user (reparo)]
+    """
+    valores = json.dumps(campos_invalidos, ensure_ascii=False, default=str)
+    conteudo = (
+        "CORREÇÃO: os campos abaixo falharam na validação.\n\n"
+        f"VALORES ATUAIS:\n{valores}\n\n"
+        "ERROS:\n" + "\n".join(f"- {erro}" for erro in erros) + "\n\n"
+    )
+    if texto_oficio:
+        conteudo += f"DOCUMENTO:\n{texto_oficio}\n\n"
+    conteudo += "Retorne APENAS JSON com estes campos corrigidos (null se não existir no documento):"
+    
+    return [
+        {"role": "system", "content": INSTRUCOES_EXTRACAO},
+        {"role": "user", "content": conteudo}
+    ]
+
+
+def montar_mensagens_reparo_json(resposta: str, erro: str) -> List[Dict[str, str]]:
+    """
+    Monta chamada de reparo para resposta que não é JSON válido.
+    
+    Args:
+        resposta: Resposta original do LLM
+        erro: Mensagem do erro de parse
+        
+    Returns:
+        Lista de mensagens [system (estático), user (reparo)]
+    """
+    conteudo = (
+        f"CORREÇÃO: a resposta abaixo não é JSON válido ({erro}).\n\n"
+        f"RESPOSTA:\n{resposta}\n\n"
+        "Retorne APENAS o mesmo conteúdo como JSON FLAT válido:"
+    )
+    return [
+        {"role": "system", "content": INSTRUCOES_EXTRACAO},
+        {"role": "user", "content": conteudo}
+    ]
+
+
+def formato_resposta_pacote() -> Dict[str, Any]:
+    """
+    `response_format` para vários documentos numa requisição (empacotamento).
+    
+    Cada item de "documentos" é o schema completo de extração + id_documento.
+    
+    Returns:
+        Dicionário para o parâmetro response_format
+    """
+    item = {
+        "type": "object",
+        "properties": {
+            "id_documento": {"type": "string", "description": "ID do documento (ex: doc1)"},
+            **SCHEMA_EXTRACAO["properties"]
+        },
+        "required": ["id_documento"] + SCHEMA_EXTRACAO["required"],
+        "additionalProperties": False
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "pacote_oficios",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"documentos": {"type": "array", "items": item}},
+                "required": ["documentos"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def montar_mensagens_pacote(documentos: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Monta UMA chamada para vários documentos curtos, mesmo prefixo estático.
+    
+    Args:
+        documentos: Lista de {"id": str, "texto": str, "oficio_rejeitado": bool}
+        
+    Returns:
+        Lista de mensagens [system (estático), user (documentos delimitados)]
+    """
+    conteudo = (
+        f"PACOTE: {len(documentos)} documentos independentes abaixo. Extraia CADA UM "
+        "separadamente, sem misturar dados entre documentos.\n\n"
+    )
+    
+    for documento in documentos:
+        avisos = ""
+        if documento.get("oficio_rejeitado"):
+            avisos += NOTA_REJEICAO
+        if len(documento["texto"]) < LIMITE_DOCUMENTO_CURTO:
+            avisos += NOTA_ANOMALIA
+        
+        conteudo += f"=== DOCUMENTO {documento['id']} ===\n"
+        if avisos:
+            conteudo += f"AVISOS:\n{avisos}\n"
+        conteudo += f"{documento['texto']}\n=== FIM {documento['id']} ===\n\n"
+    
+    conteudo += (
+        'Retorne APENAS JSON {"documentos": [...]} com um objeto FLAT por documento, '
+        "na mesma ordem, com id_documento igual ao ID do documento:"
+    )
+    
+    return [
+        {"role": "system", "content": INSTRUCOES_EXTRACAO},
+        {"role": "user", "content": conteudo}
+    ]
@@ -6,7 +6,8 @@ Conforme especificações do AGENTS.md.
 import re
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Literal
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 
@@ -29,7 +30,7 @@ class OficioRequisitorio(BaseModel):
     
     requerente_caps: str = Field(
         ..., 
-        description="Nome do requerente em MAIÚSCULAS",
+        description="Nome do requerente TODO EM MAIÚSCULAS",
         min_length=3,
         max_length=200
     )
@@ -111,7 +112,7 @@ class OficioRequisitorio(BaseModel):
     # Aceita tanto estrutura aninhada quanto campos diretos
     banco: Optional[str] = Field(
         None,
-        description="Código do banco (ex: 001, 341)",
+        description="Código do banco (apenas números, ex: 001, 341)",
         max_length=10
     )
 
@@ -166,12 +167,12 @@ class OficioRequisitorio(BaseModel):
     
     contrib_previdenciaria_iprem: Optional[Decimal] = Field(
         None, 
-        description="Contribuição previdenciária IPREM (sem R$, sem pontos de milhar)"
+        description="Contribuição previdenciária IPREM: INST.PREV. ou IPREMSAOPAULO (sem R$, sem pontos de milhar)"
     )
     
     contrib_previdenciaria_hspm: Optional[Decimal] = Field(
         None, 
-        description="Contribuição previdenciária HSPM (sem R$, sem pontos de milhar)"
+        description="Contribuição previdenciária HSPM: ASSIST.MÉD. ou HSPMSAOPAULO (sem R$, sem pontos de milhar)"
     )
     
     # ===== CAMPOS OPCIONAIS - PREFERÊNCIAS =====
@@ -510,6 +511,70 @@ class OficioRequisitorio(BaseModel):
         return self
 
 
+# Campos que a extração V2 trata como obrigatórios (o schema aceita null
+# para não perder ofícios rejeitados ou PDFs antigos)
+CAMPOS_OBRIGATORIOS_V2 = [
+    "processo_origem",
+    "requerente_caps",
+    "numero_ordem",
+    "valor_principal_liquido",
+    "valor_principal_bruto",
+    "juros_moratorios",
+    "valor_total_requisitado"
+]
+
+# Campos que não são pedidos ao LLM (objeto livre não é aceito em modo strict)
+CAMPOS_FORA_DO_LLM = {"anexo_ii"}
+
+
+def gerar_schema_llm(campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Gera JSON schema strict (structured outputs) a partir de OficioRequisitorio.
+    
+    Modo strict exige todos os campos em `required` e `additionalProperties`
+    false; campos opcionais viram tipos anuláveis. Decimais são pedidos como
+    number e restrições não suportadas (minLength, maxLength...) são removidas.
+    
+    Args:
+        campos: Subconjunto de campos (ex: reparo de campos inválidos). None = todos
+        
+    Returns:
+        Dicionário JSON schema
+    """
+    schema_modelo = OficioRequisitorio.model_json_schema()
+    obrigatorios = set(schema_modelo.get("required", []))
+    
+    propriedades = {}
+    for nome, definicao in schema_modelo["properties"].items():
+        if nome in CAMPOS_FORA_DO_LLM:
+            continue
+        if campos is not None and nome not in campos:
+            continue
+        
+        variantes = definicao.get("anyOf", [definicao])
+        tipos = [v["type"] for v in variantes if v.get("type") != "null"]
+        
+        # Decimal aceita number ou string na validação: pedir só number
+        tipo = "number" if "number" in tipos else tipos[0]
+        
+        propriedade = {"description": definicao.get("description", "")}
+        for variante in variantes:
+            if variante.get("type") == tipo:
+                for chave in ("pattern", "format"):
+                    if chave in variante:
+                        propriedade[chave] = variante[chave]
+        
+        propriedade["type"] = tipo if nome in obrigatorios else [tipo, "null"]
+        propriedades[nome] = propriedade
+    
+    return {
+        "type": "object",
+        "properties": propriedades,
+        "required": list(propriedades.keys()),
+        "additionalProperties": False
+    }
+
+
 class ProcessoMetadata(BaseModel):
     """Metadados do processo extraídos dos nomes de pastas e arquivos"""
     
@@ -570,3 +635,81 @@ class OficioCompleto(BaseModel):
         validate_assignment = True
         # Usa Enum por valor
         use_enum_values = True
+
+
+class PayloadExtracao(BaseModel):
+    """
+    Resultado da etapa de detecção: tudo que a etapa LLM precisa de um PDF.
+    
+    Serializável em JSON para envio em lote (Batch API) ou processamento posterior.
+    """
+    
+    cpf: str = Field(..., description="CPF do credor (apenas números)")
+    pdf: str = Field(..., description="Nome do arquivo PDF")
+    pdf_path: str = Field(..., description="Caminho do PDF")
+    hash_pdf: str = Field(..., description="SHA-256 do conteúdo do PDF")
+    
+    texto: str = Field(..., description="Texto relevante (ofício + ANEXO II + PROCESSAMENTO)")
+    
+    # Ofício gigante: blocos do map-reduce cobrindo TODAS as páginas
+    # (texto continua reduzido para Batch API e reparos)
+    blocos: List[str] = Field(default_factory=list, description="Blocos do map-reduce (vazio = extração única)")
+    
+    # Proveniência das páginas (1-indexed)
+    paginas_oficio: List[int] = Field(default_factory=list)
+    paginas_anexo: List[int] = Field(default_factory=list)
+    pagina_processamento: Optional[int] = None
+    num_oficios: int = 0
+    
+    # Flags da detecção
+    tem_anexo_ii: bool = False
+    tem_processamento: bool = False
+    numero_ordem_titulo: Optional[str] = None
+    oficio_rejeitado: bool = False
+    motivo_rejeicao: Optional[str] = None
+    
+    @property
+    def id_requisicao(self) -> str:
+        """
+        Identificador da requisição: hash do PDF + CPF + nome do arquivo (mesmo
+        PDF em várias pastas, ou com dois nomes na mesma pasta)
+        """
+        return f"{self.hash_pdf}-{self.cpf}-{Path(self.pdf).stem}"
+
+
+class BackendLLM(BaseModel):
+    """
+    Servidor de extração: OpenAI ou servidor compatível (ex: local na VPS via base_url).
+    """
+    
+    nome: str = Field(..., description="Identificador do backend (openai, local)")
+    base_url: Optional[str] = Field(None, description="URL da API compatível (None = api.openai.com)")
+    api_key: str = Field(..., description="Chave da API (servidores locais costumam aceitar qualquer valor)")
+    modelo: str = Field(..., description="Modelo da primeira extração")
+    modelo_escalonamento: Optional[str] = Field(None, description="Modelo forte da cascata (None = sem cascata)")
+    
+    # Modelos menores/contexto curto: variante compacta do bloco de instruções
+    variante_prompt: Literal["completa", "compacta"] = "completa"
+    
+    # Nem todo servidor compatível implementa response_format json_schema strict
+    json_schema: bool = Field(True, description="Servidor aceita structured outputs (senão json_object)")
+
+
+class VereditoPDF(BaseModel):
+    """
+    Preflight de um PDF (ver app/preflight.py): decide se o arquivo segue para a detecção.
+    
+    Depende só do conteúdo: guardado por hash e reaproveitado em cópias do mesmo PDF.
+    """
+    
+    valido: bool = Field(..., description="Arquivo segue para a detecção")
+    motivo: Optional[str] = Field(None, description="Motivo da recusa (None = válido)")
+    paginas: int = 0
+    tamanho: int = Field(0, description="Tamanho do arquivo (bytes)")
+    
+    criptografado: bool = False
+    trailer_ok: bool = Field(True, description="%%EOF no fim do arquivo (False = truncado)")
+    reparado: bool = Field(False, description="Tabela xref reconstruída ao abrir")
+    
+    # Amostra de páginas sem camada de texto (digitalizado)
+    sem_texto: bool = False
@@ -0,0 +1,242 @@
+"""
+Supervisor de trabalhador - PDFs problemáticos não travam o lote.
+
+Um PDF malformado pode fazer o pymupdf travar ou inflar a memória. A parte
+que abre PDFs roda num processo filho vigiado pelo processo principal:
+
+    - tempo limite por PDF (relógio de parede);
+    - limite de RSS do filho (medido enquanto o PDF roda);
+    - filho reciclado a cada N PDFs (vazamentos de memória não se acumulam).
+
+Filho morto ou interrompido vira FalhaTrabalhador para aquele PDF; o próximo
+PDF sobe um filho novo e o lote continua.
+
+O filho é criado com "spawn": o processo principal tem threads (cliente LLM,
+pools), e um fork no meio delas pode herdar travas presas.
+"""
+
+import logging
+import multiprocessing
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from .memoria import pico_rss_mb, rss_mb, zerar_pico
+
+logger = logging.getLogger(__name__)
+
+
+TIMEOUT_PDF_PADRAO = 300.0
+MAX_RSS_MB_PADRAO = 2048
+RECICLAR_APOS_PADRAO = 100
+
+# Intervalo entre verificações do filho (tempo e memória)
+INTERVALO_VERIFICACAO = 0.05
+
+
+class FalhaTrabalhador(Exception):
+    """PDF interrompido pelo supervisor (o lote continua)."""
+
+    @property
+    def classe(self) -> str:
+        """Classe do erro registrada no resultado do PDF."""
+        return type(self).__name__
+
+
+class TempoEsgotado(FalhaTrabalhador):
+    """PDF passou do tempo limite."""
+
+
+class MemoriaExcedida(FalhaTrabalhador):
+    """Filho passou do limite de RSS."""
+
+
+class TrabalhadorEncerrado(FalhaTrabalhador):
+    """Filho morreu sem responder (ex: segfault no pymupdf)."""
+
+
+class ErroNoTrabalhador(FalhaTrabalhador):
+    """Exceção da própria tarefa, repassada pelo filho."""
+
+    def __init__(self, classe: str, mensagem: str):
+        super().__init__(f"{classe}: {mensagem}")
+        self._classe = classe
+
+    @property
+    def classe(self) -> str:
+        return self._classe
+
+
+def _laco_trabalhador(conexao, tarefa: Callable, inicializador: Optional[Callable], argumentos_inicializador: Tuple):
+    """Processo filho: executa tarefas recebidas pelo pipe até receber None."""
+    if inicializador is not None:
+        inicializador(*argumentos_inicializador)
+    while True:
+        try:
+            argumentos = conexao.recv()
+        except EOFError:
+            break
+        if argumentos is None:
+            break
+        try:
+            conexao.send((True, tarefa(*argumentos)))
+        except Exception as e:
+            conexao.send((False, (type(e).__name__, str(e))))
+
+
+class Supervisor:
+    """
+    Tarefas em um processo filho vigiado (tempo, memória, reciclagem).
+
+    Example:
+        >>> supervisor = Supervisor(etapas.preparar_pdf, timeout_pdf=120)
+        >>> try:
+        ...     payload_json, resultado = supervisor.executar("processo.pdf")
+        ... except FalhaTrabalhador as e:
+        ...     print(e.classe)   # TempoEsgotado, MemoriaExcedida, ...
+    """
+
+    def __init__(
+        self,
+        tarefa: Callable,
+        inicializador: Optional[Callable] = None,
+        argumentos_inicializador: Tuple = (),
+        timeout_pdf: Optional[float] = TIMEOUT_PDF_PADRAO,
+        max_rss_mb: Optional[float] = MAX_RSS_MB_PADRAO,
+        reciclar_apos: Optional[int] = RECICLAR_APOS_PADRAO
+    ):
+        """
+        Args:
+            tarefa: Função de módulo (importável pelo filho) executada por PDF
+            inicializador: Configuração do filho ao subir (ex: etapas.configurar_trabalhador)
+            argumentos_inicializador: Argumentos do inicializador
+            timeout_pdf: Segundos por tarefa (None = sem limite)
+            max_rss_mb: RSS máximo do filho em MB (None = sem limite)
+            reciclar_apos: Tarefas por filho (None = nunca recicla)
+        """
+        self.tarefa = tarefa
+        self.inicializador = inicializador
+        self.argumentos_inicializador = argumentos_inicializador
+        self.timeout_pdf = timeout_pdf
+        self.max_rss_mb = max_rss_mb
+        self.reciclar_apos = reciclar_apos
+        self._contexto = multiprocessing.get_context("spawn")
+        self._processo = None
+        self._conexao = None
+        self._tarefas_filho = 0
+        self._processo_codigo: Optional[int] = None
+        self.ultimo_pico_mb: Optional[float] = None
+        self.estatisticas = {
+            "tarefas": 0,
+            "tempo_esgotado": 0,
+            "memoria_excedida": 0,
+            "encerrados": 0,
+            "reciclagens": 0
+        }
+
+    def executar(self, *argumentos) -> Any:
+        """
+        Executa a tarefa no filho e espera o resultado sob os limites.
+
+        Tempo limite conta a partir do envio (inclui subir o filho, se preciso).
+
+        Returns:
+            Retorno da tarefa
+
+        Raises:
+            TempoEsgotado, MemoriaExcedida, TrabalhadorEncerrado: Filho
+                interrompido (é descartado; o próximo PDF sobe outro)
+            ErroNoTrabalhador: A tarefa levantou exceção (filho continua)
+        """
+        inicio = time.time()
+        if self._processo is None:
+            self._iniciar()
+        elif self.reciclar_apos and self._tarefas_filho >= self.reciclar_apos:
+            self._parar()
+            self.estatisticas["reciclagens"] += 1
+            self._iniciar()
+
+        self.estatisticas["tarefas"] += 1
+        self._tarefas_filho += 1
+        self.ultimo_pico_mb = None
+        pid = self._processo.pid
+        zerar_pico(pid)
+        try:
+            self._conexao.send(argumentos)
+        except OSError:
+            self._encerrado()
+
+        pico_amostrado = None
+        while not self._conexao.poll(INTERVALO_VERIFICACAO):
+            if not self._processo.is_alive():
+                self._encerrado()
+
+            if self.timeout_pdf is not None and time.time() - inicio > self.timeout_pdf:
+                self._descartar()
+                self.estatisticas["tempo_esgotado"] += 1
+                raise TempoEsgotado(f"Tempo limite de {self.timeout_pdf:.0f}s excedido")
+
+            rss = rss_mb(pid)
+            if rss is not None:
+                pico_amostrado = max(pico_amostrado or 0, rss)
+                if self.max_rss_mb is not None and rss > self.max_rss_mb:
+                    self._descartar()
+                    self.estatisticas["memoria_excedida"] += 1
+                    raise MemoriaExcedida(f"Memória do trabalhador {rss:.0f} MB > {self.max_rss_mb:.0f} MB")
+
+        try:
+            sucesso, retorno = self._conexao.recv()
+        except (EOFError, OSError):
+            self._encerrado()
+
+        pico = pico_rss_mb(pid)
+        self.ultimo_pico_mb = round(pico, 1) if pico is not None else pico_amostrado
+        if not sucesso:
+            raise ErroNoTrabalhador(*retorno)
+        return retorno
+
+    def _iniciar(self) -> None:
+        self._conexao, conexao_filho = self._contexto.Pipe()
+        self._processo = self._contexto.Process(
+            target=_laco_trabalhador,
+            args=(conexao_filho, self.tarefa, self.inicializador, self.argumentos_inicializador),
+            daemon=True
+        )
+        self._processo.start()
+        conexao_filho.close()
+        self._tarefas_filho = 0
+
+    def _encerrado(self) -> None:
+        """Filho morreu (pipe fechado): descarta e levanta TrabalhadorEncerrado."""
+        self._descartar()
+        self.estatisticas["encerrados"] += 1
+        raise TrabalhadorEncerrado(f"Trabalhador encerrado (código {self._processo_codigo})")
+
+    def _descartar(self) -> None:
+        """Mata o filho (travado, estourado ou já morto)."""
+        processo = self._processo
+        if processo.is_alive():
+            processo.kill()
+        processo.join()
+        self._processo_codigo = processo.exitcode
+        logger.warning(f"💀 Trabalhador {processo.pid} descartado (código {processo.exitcode})")
+        self._conexao.close()
+        self._processo = None
+        self._conexao = None
+
+    def _parar(self) -> None:
+        """Encerra o filho de forma limpa (reciclagem ou fim do lote)."""
+        try:
+            self._conexao.send(None)
+        except OSError:
+            pass
+        self._processo.join(timeout=5)
+        if self._processo.is_alive():
+            self._processo.kill()
+            self._processo.join()
+        self._conexao.close()
+        self._processo = None
+        self._conexao = None
+
+    def encerrar(self) -> None:
+        if self._processo is not None:
+            self._parar()
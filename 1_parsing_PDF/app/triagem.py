@@ -0,0 +1,240 @@
+"""
+Triagem do acervo sem LLM (dry-run) - o que cada PDF vai exigir antes de gastar tokens.
+
+Por PDF: ofício com o CPF da pasta, ANEXO II, PROCESSAMENTO, rejeição, camada
+de texto e tokens estimados do prompt. No resumo: contagens e estimativa de
+tokens e tempo a partir da vazão de execuções anteriores.
+"""
+
+import csv
+import json
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from . import empacotamento
+from .agendamento import HistoricoCusto, contar_paginas, ordenar_maior_primeiro
+from .etapas import CHAVE_SEM_LLM
+from .memoria import MedicaoMemoria
+from .preflight import MINIMO_CARACTERES_PAGINA, PDFInvalido, farejar
+from .prompts import INSTRUCOES_EXTRACAO
+from .processador import ProcessadorOficio
+
+logger = logging.getLogger(__name__)
+
+
+# Resposta JSON típica de uma extração
+TOKENS_RESPOSTA_ESTIMADOS = 400
+
+# Sem histórico: segundos por PDF que chega ao LLM (chamada + validação)
+SEGUNDOS_POR_PDF_PADRAO = 10.0
+
+CAMPOS_TRIAGEM = [
+    "pdf", "cpf", "paginas", "paginas_sem_texto", "sem_texto",
+    "oficios", "oficio_cpf", "anexo_ii", "processamento", "rejeitado",
+    "resolvido_sem_llm", "blocos", "tokens_estimados", "tempo_s", "memoria_mb", "erro"
+]
+
+_processador_triagem: Optional[ProcessadorOficio] = None
+
+
+def _processador() -> ProcessadorOficio:
+    """Um processador por processo (só detecção: o cliente LLM nunca é usado)."""
+    global _processador_triagem
+    if _processador_triagem is None:
+        _processador_triagem = ProcessadorOficio(CHAVE_SEM_LLM, {})
+    return _processador_triagem
+
+
+def triar_pdf(pdf_path: str) -> Dict[str, Any]:
+    """
+    Detecção completa de um PDF, sem LLM.
+
+    Args:
+        pdf_path: Caminho do PDF (pasta = CPF)
+
+    Returns:
+        Linha da triagem (ver CAMPOS_TRIAGEM)
+    """
+    with MedicaoMemoria() as medicao:
+        linha = _triar_pdf(pdf_path)
+    linha["memoria_mb"] = medicao.pico_mb
+    return linha
+
+
+def _triar_pdf(pdf_path: str) -> Dict[str, Any]:
+    inicio = time.time()
+    processador = _processador()
+    linha: Dict[str, Any] = {campo: None for campo in CAMPOS_TRIAGEM}
+    linha.update({"pdf": Path(pdf_path).name, "cpf": Path(pdf_path).parent.name, "tokens_estimados": 0})
+
+    try:
+        farejo = farejar(pdf_path)
+        motivo = farejo[0]
+        if motivo:
+            linha["erro"] = f"PDF inválido: {motivo}"
+            return linha
+
+        cpf = processador._extrair_cpf_pasta(pdf_path)
+        if not cpf:
+            linha["erro"] = "CPF inválido na pasta"
+            return linha
+
+        hash_pdf = processador._hash_arquivo(pdf_path)
+        with processador._usar_layout(pdf_path, hash_pdf, farejo) as layout:
+            paginas = layout.paginas
+            linha["paginas"] = len(paginas)
+            # Texto já extraído na segmentação (cache do DocumentoPaginas)
+            linha["paginas_sem_texto"] = sum(
+                1 for i in range(len(paginas))
+                if len(paginas.texto(i).strip()) < MINIMO_CARACTERES_PAGINA
+            )
+            linha["sem_texto"] = linha["paginas_sem_texto"] == linha["paginas"]
+            linha["oficios"] = len(layout.oficios)
+
+            payload, resultado_erro = processador._montar_payload(pdf_path, cpf, hash_pdf, layout)
+
+        if payload is None:
+            linha["oficio_cpf"] = False
+            linha["erro"] = (resultado_erro or {}).get("erro")
+            return linha
+
+        linha.update({
+            "oficio_cpf": True,
+            "anexo_ii": payload.tem_anexo_ii,
+            "processamento": payload.tem_processamento,
+            "rejeitado": payload.oficio_rejeitado,
+            "resolvido_sem_llm": processador.rejeitados_sem_llm and processador.resolver_sem_llm(payload) is not None,
+            "blocos": len(payload.blocos)
+        })
+        if not linha["resolvido_sem_llm"]:
+            textos = payload.blocos or [payload.texto]
+            linha["tokens_estimados"] = sum(empacotamento.estimar_tokens(texto) for texto in textos)
+
+    except PDFInvalido as e:
+        linha["erro"] = f"PDF inválido: {e}"
+    except Exception as e:
+        linha["erro"] = str(e)
+    finally:
+        linha["tempo_s"] = round(time.time() - inicio, 3)
+
+    return linha
+
+
+def triar(
+    pdfs: List[Path],
+    trabalhadores: Optional[int] = None,
+    historico: Optional[HistoricoCusto] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Triagem em paralelo (processos), maior PDF primeiro (ver agendamento.py).
+
+    Args:
+        pdfs: PDFs do acervo
+        trabalhadores: Processos (padrão: todos os núcleos; 1 = no processo atual)
+        historico: Tempo por página de execuções anteriores (atualizado com
+            as linhas desta triagem)
+
+    Yields:
+        Linhas na ordem dos PDFs (1 trabalhador) ou na ordem de conclusão
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    historico = historico or HistoricoCusto()
+    caminhos = [str(pdf) for pdf in pdfs]
+
+    if trabalhadores == 1:
+        linhas = map(triar_pdf, caminhos)
+    else:
+        paginas = {caminho: contar_paginas(caminho) for caminho in caminhos}
+        ordem = ordenar_maior_primeiro(caminhos, lambda caminho: historico.estimar(paginas[caminho]))
+        executor = ProcessPoolExecutor(max_workers=trabalhadores)
+        # Um PDF por envio (sem chunksize): o pool segue a ordem maior-primeiro
+        linhas = (futuro.result() for futuro in as_completed(
+            [executor.submit(triar_pdf, caminho) for caminho in ordem]
+        ))
+
+    try:
+        for linha in linhas:
+            historico.registrar(linha["paginas"], linha["tempo_s"])
+            yield linha
+    finally:
+        if trabalhadores > 1:
+            executor.shutdown(cancel_futures=True)
+
+
+def vazao_historica(estatisticas: Iterable[Path]) -> Optional[float]:
+    """
+    Segundos por PDF de execuções anteriores (estatisticas_globais.json do runner).
+
+    Returns:
+        Média ponderada ou None sem histórico
+    """
+    tempo, total = 0.0, 0
+    for caminho in estatisticas:
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+            tempo += dados["tempo_total"]
+            total += dados["total_pdfs"]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Histórico ignorado ({caminho}): {e}")
+    return tempo / total if total else None
+
+
+def resumir(
+    linhas: List[Dict[str, Any]],
+    segundos_por_pdf: Optional[float] = None,
+    concorrencia: int = 1
+) -> Dict[str, Any]:
+    """
+    Contagens da triagem e estimativa de gasto da extração.
+
+    Args:
+        linhas: Linhas de triar_pdf
+        segundos_por_pdf: Vazão histórica (None = SEGUNDOS_POR_PDF_PADRAO)
+        concorrencia: PDFs em paralelo na extração
+
+    Returns:
+        Dicionário do resumo
+    """
+    com_llm = [l for l in linhas if l["oficio_cpf"] and not l["resolvido_sem_llm"]]
+    chamadas = sum(max(1, l["blocos"] or 0) for l in com_llm)
+    tokens_prefixo = empacotamento.estimar_tokens(INSTRUCOES_EXTRACAO)
+    segundos = segundos_por_pdf or SEGUNDOS_POR_PDF_PADRAO
+
+    return {
+        "total_pdfs": len(linhas),
+        "oficio_cpf": sum(1 for l in linhas if l["oficio_cpf"]),
+        "sem_oficio_cpf": sum(1 for l in linhas if l["oficio_cpf"] is False),
+        "anexo_ii": sum(1 for l in linhas if l["anexo_ii"]),
+        "processamento": sum(1 for l in linhas if l["processamento"]),
+        "rejeitados": sum(1 for l in linhas if l["rejeitado"]),
+        "resolvidos_sem_llm": sum(1 for l in linhas if l["resolvido_sem_llm"]),
+        "sem_texto": sum(1 for l in linhas if l["sem_texto"]),
+        "gigantes_mapreduce": sum(1 for l in linhas if l["blocos"]),
+        "erros": sum(1 for l in linhas if l["erro"] and l["oficio_cpf"] is not False),
+        "estimativa": {
+            "pdfs_llm": len(com_llm),
+            "chamadas": chamadas,
+            "tokens_prompt": sum(l["tokens_estimados"] for l in com_llm) + chamadas * tokens_prefixo,
+            "tokens_resposta": chamadas * TOKENS_RESPOSTA_ESTIMADOS,
+            "segundos_por_pdf": segundos,
+            "historico": segundos_por_pdf is not None,
+            "tempo_s": len(com_llm) * segundos / max(1, concorrencia)
+        },
+        "tempo_triagem_s": round(sum(l["tempo_s"] or 0 for l in linhas), 1),
+        "memoria_pico_mb": max((l["memoria_mb"] for l in linhas if l.get("memoria_mb")), default=None)
+    }
+
+
+def gravar_csv(linhas: List[Dict[str, Any]], caminho: Path) -> Path:
+    """Uma linha por PDF."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CAMPOS_TRIAGEM)
+        writer.writeheader()
+        writer.writerows(linhas)
+    return caminho
@@ -0,0 +1,72 @@
+"""
+Validação cruzada dos dados extraídos - decide se a extração precisa escalar.
+Pydantic garante formato; aqui verificamos completude e consistência numérica.
+"""
+
+import logging
+from decimal import Decimal
+from typing import List
+
+from .schemas import OficioRequisitorio, CAMPOS_OBRIGATORIOS_V2
+
+logger = logging.getLogger(__name__)
+
+
+# Diferença aceita entre valores (arredondamento de centavos no ofício)
+TOLERANCIA_VALORES = Decimal("0.05")
+
+# Número de ordem não existe em PDFs antigos sem PROCESSAMENTO: não exigir
+CAMPOS_EXIGIDOS = [campo for campo in CAMPOS_OBRIGATORIOS_V2 if campo != "numero_ordem"]
+
+# Ofício rejeitado não tem valores: basta identificar processo e requerente
+CAMPOS_EXIGIDOS_REJEITADO = ["processo_origem", "requerente_caps"]
+
+
+def campos_obrigatorios_ausentes(oficio: OficioRequisitorio) -> List[str]:
+    """
+    Lista campos obrigatórios V2 não preenchidos.
+
+    Args:
+        oficio: Dados validados
+
+    Returns:
+        Lista de nomes de campos ausentes (vazia se completo)
+    """
+    exigidos = CAMPOS_EXIGIDOS_REJEITADO if oficio.rejeitado else CAMPOS_EXIGIDOS
+    return [campo for campo in exigidos if getattr(oficio, campo) in (None, "")]
+
+
+def verificar_consistencia(oficio: OficioRequisitorio) -> List[str]:
+    """
+    Verifica consistência numérica entre os valores do ofício.
+
+    Regras:
+    - valor_principal_bruto = valor_principal_liquido + juros_moratorios
+    - valor_total_requisitado >= valor_principal_liquido
+
+    Args:
+        oficio: Dados validados
+
+    Returns:
+        Lista de inconsistências encontradas (vazia se consistente)
+    """
+    problemas = []
+
+    liquido = oficio.valor_principal_liquido
+    bruto = oficio.valor_principal_bruto
+    juros = oficio.juros_moratorios
+    total = oficio.valor_total_requisitado
+
+    if liquido is not None and bruto is not None and juros is not None:
+        if abs(bruto - (liquido + juros)) > TOLERANCIA_VALORES:
+            problemas.append(
+                f"bruto ({bruto}) ≠ líquido ({liquido}) + juros ({juros})"
+            )
+
+    if total is not None and liquido is not None and total + TOLERANCIA_VALORES < liquido:
+        problemas.append(f"total requisitado ({total}) < líquido ({liquido})")
+
+    for problema in problemas:
+        logger.debug(f"Inconsistência: {problema}")
+
+    return problemas
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Processador de Ofícios via Batch API
+Para reprocessamentos completos (backfills noturnos) sem latência síncrona:
+limites de taxa muito maiores e custo menor.
+
+Uso:
+    python processar_batch.py preparar --input ../data/consultas --dir ./batch
+    python processar_batch.py enviar --dir ./batch
+    python processar_batch.py mesclar --dir ./batch --output ./outputs_batch
+
+O endpoint segue OPENAI_BASE_URL (ex: servidor local que emula /v1/files e /v1/batches).
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List
+
+from tqdm import tqdm
+
+# Adicionar pasta app ao path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import batch
+from app.descoberta import ARQUIVO_MANIFESTO
+from processar_lotes_v2 import (
+    BASE_DIR,
+    TAMANHO_LOTE,
+    agrupar_por_conteudo,
+    criar_processador,
+    encontrar_pdfs,
+    gerar_csv_lote,
+    salvar_jsons_lote
+)
+
+logger = logging.getLogger(__name__)
+
+
+def comando_preparar(args):
+    """Etapa de detecção para todos os PDFs → JSONL de requisições"""
+    diretorio = Path(args.dir)
+    processador = criar_processador()
+
+    pdfs = encontrar_pdfs(args.input, diretorio / ARQUIVO_MANIFESTO)
+    if args.limite:
+        pdfs = pdfs[:args.limite]
+
+    print(f"📊 Total de PDFs: {len(pdfs)}")
+    agrupar_por_conteudo(pdfs, processador)
+
+    payloads = []
+    resultados: List[Dict[str, Any]] = []  # erros da detecção + rejeitados resolvidos sem LLM
+
+    for pdf in tqdm(pdfs, desc="🔍 Detecção", unit="PDF"):
+        try:
+            payload, resultado_erro = processador.preparar_payload(str(pdf), pdf.parent.name)
+        except Exception as e:
+            logger.error(f"Erro ao preparar {pdf.name}: {e}")
+            payload, resultado_erro = None, processador._criar_resultado_erro(pdf.parent.name, str(pdf), str(e))
+
+        if payload is None:
+            resultados.append(resultado_erro or processador._criar_resultado_erro(
+                pdf.parent.name, str(pdf), "PDF ou pasta de CPF inválidos"
+            ))
+            continue
+
+        resultado_regex = processador.resolver_sem_llm(payload)
+        if resultado_regex is not None:
+            resultados.append(resultado_regex)
+        else:
+            payloads.append(payload)
+
+    total = batch.escrever_requisicoes(payloads, processador, diretorio)
+    batch.gravar_resultados_preparacao(diretorio, resultados)
+
+    resolvidos = sum(1 for r in resultados if r["sucesso"])
+    print(f"✅ Requisições: {total}")
+    gigantes = sum(1 for payload in payloads if payload.blocos)
+    if gigantes:
+        print(f"🧩 Ofícios gigantes (uma requisição por bloco): {gigantes}")
+    print(f"⚡ Rejeitados resolvidos sem LLM: {resolvidos}")
+    print(f"❌ Falhas na detecção: {len(resultados) - resolvidos}")
+    print(f"📁 Diretório do batch: {diretorio}")
+
+
+def comando_enviar(args):
+    """Envia o JSONL (ou retoma um batch já criado) e aguarda o término"""
+    diretorio = Path(args.dir)
+    processador = criar_processador()
+    client = processador.client
+
+    estado = batch.ler_estado(diretorio)
+    if estado and estado["status"] not in batch.STATUS_FINAIS:
+        batch_id = estado["id"]
+        print(f"🔁 Retomando batch {batch_id} ({estado['status']})")
+    else:
+        batch_id = batch.enviar_lote(client, diretorio)
+        print(f"🚀 Batch enviado: {batch_id}")
+
+    lote = batch.aguardar_lote(client, batch_id, diretorio, intervalo=args.intervalo, timeout=args.timeout)
+    print(f"🏁 Batch {batch_id}: {lote.status}")
+
+    if lote.status != "completed" and not lote.output_file_id:
+        print("❌ Batch terminou sem arquivo de saída")
+        return
+
+    batch.baixar_respostas(client, lote, diretorio)
+
+
+def comando_mesclar(args):
+    """Respostas do batch → validação e saída (JSON + CSV por lote)"""
+    diretorio = Path(args.dir)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    processador = criar_processador()
+    payloads = batch.ler_payloads(diretorio)
+    respostas = batch.ler_respostas(diretorio)
+
+    resultados = batch.ler_resultados_preparacao(diretorio)
+
+    for payload in tqdm(payloads.values(), desc="🔗 Mesclagem", unit="PDF"):
+        resultados.append(batch.mesclar_payload(payload, respostas, processador))
+
+    # Mesma saída do processamento em lotes
+    for i in range(0, len(resultados), TAMANHO_LOTE):
+        lote_num = (i // TAMANHO_LOTE) + 1
+        resultados_lote = resultados[i:i + TAMANHO_LOTE]
+        salvar_jsons_lote(resultados_lote, output_dir / f"lote_{lote_num:03d}")
+        gerar_csv_lote(resultados_lote, lote_num, output_dir)
+
+    sucesso = sum(1 for r in resultados if r["sucesso"])
+    print(f"✅ Sucesso: {sucesso}/{len(resultados)}")
+    print(f"❌ Erros: {len(resultados) - sucesso}/{len(resultados)}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Processar ofícios via Batch API")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    p_preparar = subparsers.add_parser("preparar", help="Detecção + JSONL de requisições")
+    p_preparar.add_argument("--input", default=BASE_DIR, help="Diretório de entrada")
+    p_preparar.add_argument("--dir", required=True, help="Diretório do batch")
+    p_preparar.add_argument("--limite", type=int, help="Limitar número de PDFs")
+    p_preparar.set_defaults(funcao=comando_preparar)
+
+    p_enviar = subparsers.add_parser("enviar", help="Enviar batch e aguardar término")
+    p_enviar.add_argument("--dir", required=True, help="Diretório do batch")
+    p_enviar.add_argument("--intervalo", type=float, default=60, help="Segundos entre consultas")
+    p_enviar.add_argument("--timeout", type=float, help="Tempo máximo de espera (s)")
+    p_enviar.set_defaults(funcao=comando_enviar)
+
+    p_mesclar = subparsers.add_parser("mesclar", help="Validar respostas e gerar saída")
+    p_mesclar.add_argument("--dir", required=True, help="Diretório do batch")
+    p_mesclar.add_argument("--output", default="./outputs_batch", help="Diretório de saída")
+    p_mesclar.set_defaults(funcao=comando_mesclar)
+
+    args = parser.parse_args()
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Processamento em duas etapas independentes.
+
+Etapa A (detectar): validação, segmentação, CPF, rejeição e texto do prompt
+de cada PDF → um payload por PDF em disco. Sem LLM; usa todos os núcleos.
+
+Etapa B (extrair): payloads → LLM + validação → saída (JSON + CSV por lote).
+Não abre os PDFs: pode rodar depois, em outra máquina, e ser repetida.
+
+Uso:
+    python processar_etapas.py detectar --input ../data/consultas --dir ./etapas
+    python processar_etapas.py extrair --dir ./etapas --output ./outputs_etapas --concorrencia 8
+"""
+
+import os
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+from tqdm import tqdm
+
+# Adicionar pasta app ao path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import etapas
+from app.agendamento import ARQUIVO_HISTORICO, HistoricoCusto
+from app.concorrencia import ControleConcorrencia
+from app.descoberta import ARQUIVO_MANIFESTO
+from app.backends import BACKENDS
+from app.processador import ProcessadorOficio
+from processar_lotes_v2 import (
+    BASE_DIR,
+    LLM_BACKEND,
+    TAMANHO_LOTE,
+    agrupar_por_conteudo,
+    criar_processador,
+    encontrar_pdfs,
+    gerar_csv_lote,
+    salvar_jsons_lote
+)
+
+logger = logging.getLogger(__name__)
+
+
+def comando_detectar(args):
+    """Etapa A: PDFs → payloads"""
+    diretorio = Path(args.dir)
+
+    pdfs = encontrar_pdfs(args.input, diretorio / ARQUIVO_MANIFESTO)
+    if args.limite:
+        pdfs = pdfs[:args.limite]
+    print(f"📊 Total de PDFs: {len(pdfs)}")
+
+    # Cópias do mesmo PDF vão para o mesmo trabalhador (uma segmentação)
+    copias = agrupar_por_conteudo(pdfs, ProcessadorOficio(etapas.CHAVE_SEM_LLM, {}))
+    agrupados = {pdf for grupo in copias.values() for pdf in grupo}
+    grupos = [(hash_pdf, grupo) for hash_pdf, grupo in copias.items()]
+    grupos += [(None, [pdf]) for pdf in pdfs if pdf not in agrupados]
+
+    ocr_cache = (args.ocr_cache or diretorio / "ocr_cache") if args.ocr else None
+
+    # Maior PDF primeiro, com o tempo por página das detecções anteriores
+    historico = HistoricoCusto(diretorio / ARQUIVO_HISTORICO)
+
+    # Etapa de CPU: começa em um processo por núcleo e segue a vazão (CPU cheia é o objetivo)
+    controle = None
+    if args.concorrencia_adaptativa:
+        nucleos = args.trabalhadores or os.cpu_count() or 1
+        controle = ControleConcorrencia(inicial=nucleos, maximo=2 * nucleos, limite_cpu=None)
+
+    gravados, finais = 0, 0
+    try:
+        with tqdm(total=len(grupos), desc="🔍 Detecção", unit="arquivo") as barra:
+            for gravados, finais in etapas.detectar(
+                grupos, diretorio, args.trabalhadores, ocr_cache, args.classificacao_rapida,
+                args.max_paginas_memoria, historico, controle
+            ):
+                barra.update(1)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    historico.salvar()
+
+    print(f"✅ Payloads: {gravados}")
+    print(f"⚡ Resolvidos na detecção (falhas ou rejeitados por regex): {finais}")
+    print(f"📁 Diretório: {diretorio}")
+
+
+def comando_extrair(args):
+    """Etapa B: payloads → LLM → saída"""
+    diretorio = Path(args.dir)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    processador = criar_processador(args.backend)
+    total = len(list((diretorio / etapas.DIRETORIO_PAYLOADS).glob("*.json")))
+
+    # Concorrência do LLM ajustada por vazão, 429 e latência (--concorrencia = ponto de partida)
+    controle = None
+    if args.concorrencia_adaptativa:
+        controle = ControleConcorrencia(inicial=args.concorrencia, maximo=args.concorrencia_maxima)
+
+    resultados = etapas.ler_resultados_deteccao(diretorio)
+    for resultado in tqdm(etapas.extrair(diretorio, processador, args.concorrencia, controle),
+                          total=total, desc="🤖 Extração", unit="PDF"):
+        resultados.append(resultado)
+
+    # Mesma saída do processamento em lotes
+    for i in range(0, len(resultados), TAMANHO_LOTE):
+        lote_num = (i // TAMANHO_LOTE) + 1
+        resultados_lote = resultados[i:i + TAMANHO_LOTE]
+        salvar_jsons_lote(resultados_lote, output_dir / f"lote_{lote_num:03d}")
+        gerar_csv_lote(resultados_lote, lote_num, output_dir)
+
+    sucesso = sum(1 for r in resultados if r["sucesso"])
+    print(f"✅ Sucesso: {sucesso}/{len(resultados)}")
+    print(f"❌ Erros: {len(resultados) - sucesso}/{len(resultados)}")
+    if controle is not None:
+        relatorio = controle.relatorio()
+        print(f"🎚️ Concorrência: final {relatorio['limite_final']}, máxima {relatorio['limite_maximo_atingido']} "
+              f"({relatorio['ajustes']} ajustes, {relatorio['cortes_429']} cortes por 429)")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Processar ofícios em duas etapas (detecção / LLM)")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    p_detectar = subparsers.add_parser("detectar", help="Etapa A: PDFs → payloads (sem LLM)")
+    p_detectar.add_argument("--input", default=BASE_DIR, help="Diretório de entrada")
+    p_detectar.add_argument("--dir", required=True, help="Diretório das etapas")
+    p_detectar.add_argument("--limite", type=int, help="Limitar número de PDFs")
+    p_detectar.add_argument("--trabalhadores", type=int, help="Processos (padrão: todos os núcleos)")
+    p_detectar.add_argument("--ocr", action="store_true", help="OCR (Tesseract) das páginas sem camada de texto")
+    p_detectar.add_argument("--classificacao-rapida", action="store_true",
+                            help="Descartar páginas pelo cabeçalho (PDFs muito longos)")
+    p_detectar.add_argument("--ocr-cache", type=Path, help="Texto do OCR por hash de página (padrão: <dir>/ocr_cache)")
+    p_detectar.add_argument("--max-paginas-memoria", type=int,
+                            help="Textos de página guardados por PDF (padrão: todos)")
+    p_detectar.add_argument("--concorrencia-adaptativa", action="store_true",
+                            help="Processos em uso ajustados pela vazão (até 2x --trabalhadores)")
+    p_detectar.set_defaults(funcao=comando_detectar)
+
+    p_extrair = subparsers.add_parser("extrair", help="Etapa B: payloads → LLM → saída")
+    p_extrair.add_argument("--dir", required=True, help="Diretório das etapas")
+    p_extrair.add_argument("--output", default="./outputs_etapas", help="Diretório de saída")
+    p_extrair.add_argument("--concorrencia", type=int, default=4, help="Payloads em paralelo")
+    p_extrair.add_argument("--concorrencia-adaptativa", action="store_true",
+                           help="Ajustar a concorrência pela vazão, 429 e latência (começa em --concorrencia)")
+    p_extrair.add_argument("--concorrencia-maxima", type=int, default=32,
+                           help="Teto da concorrência adaptativa")
+    p_extrair.add_argument("--backend", choices=BACKENDS, default=LLM_BACKEND,
+                           help="Servidor de extração (local: LOCAL_LLM_* no .env)")
+    p_extrair.set_defaults(funcao=comando_extrair)
+
+    args = parser.parse_args()
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    main()
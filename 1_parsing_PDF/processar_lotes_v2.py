@@ -8,10 +8,12 @@ import os
 import sys
 import csv
 import json
+import time
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 from dotenv import load_dotenv
 from tqdm import tqdm  # Barra de progresso
 
@@ -19,6 +21,21 @@ from tqdm import tqdm  # Barra de progresso
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.processador import ProcessadorOficio
+from app import empacotamento
+from app.pool_clientes import PoolClientes, carregar_configuracao
+from app.backends import BACKENDS, carregar_backend, verificar_saude
+from app.disjuntor import CaixaSaida
+from app.ocr import CacheOCR, MotorOCR
+from app.agendamento import ARQUIVO_HISTORICO, HistoricoCusto
+from app.concorrencia import ControleConcorrencia, executar_adaptativo
+from app.descoberta import ARQUIVO_MANIFESTO, ManifestoCorpus, descobrir
+from app.paginas import ExtracaoParalela, LIMIAR_PAGINAS_PARALELO
+from app.schemas import PayloadExtracao
+from app.supervisor import (
+    FalhaTrabalhador, Supervisor,
+    MAX_RSS_MB_PADRAO, RECICLAR_APOS_PADRAO, TIMEOUT_PDF_PADRAO
+)
+from app import etapas, triagem
 
 # Carregar variáveis de ambiente
 load_dotenv(Path(__file__).parent.parent / ".env")
@@ -27,6 +44,11 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 BASE_DIR = os.getenv("BASE_DIR", "../data/consultas")
 OUTPUT_DIR = "./outputs"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_MODEL_ESCALONAMENTO = os.getenv("OPENAI_MODEL_ESCALONAMENTO")  # Cascata (opcional)
+OPENAI_API_KEYS = os.getenv("OPENAI_API_KEYS")  # Várias chaves (opcional)
+OPENAI_ENDPOINTS = os.getenv("OPENAI_ENDPOINTS")  # Endpoints com peso/limites, JSON (opcional)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # openai | local (servidor compatível na VPS)
 TAMANHO_LOTE = 5
 
 # Configurar logging
@@ -37,16 +59,92 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def encontrar_pdfs(base_dir: str) -> List[Path]:
-    """Encontra todos os PDFs na estrutura de pastas"""
+def encontrar_pdfs(base_dir: str, manifesto: Optional[Path] = None) -> List[Path]:
+    """
+    Encontra todos os PDFs na estrutura de pastas (<CPF>/*.pdf).
+    
+    Pastas lidas em paralelo; com `manifesto`, só as pastas alteradas desde a
+    última varredura são relidas (ver app/descoberta.py).
+    """
     base_path = Path(base_dir)
     if not base_path.exists():
         base_path = Path(__file__).parent.parent / base_dir
+    if not base_path.is_dir():
+        return []
     
-    pdfs = sorted(base_path.glob("*/*.pdf"))
+    cache = ManifestoCorpus(manifesto)
+    pdfs = sorted(descobrir(base_path, cache))
+    cache.salvar()
+    if manifesto is not None:
+        logger.info(f"📂 Descoberta: {cache.estatisticas['pastas_lidas']} pastas lidas, "
+                    f"{cache.estatisticas['pastas_reaproveitadas']} do manifesto")
     return pdfs
 
 
+def agrupar_por_conteudo(
+    pdfs: List[Path],
+    processador: ProcessadorOficio,
+    reservar: bool = True
+) -> Dict[str, List[Path]]:
+    """
+    Agrupa cópias do mesmo PDF (mesmo conteúdo em pastas de CPF diferentes) e
+    reserva o layout compartilhado no processador: cada arquivo único é
+    segmentado uma vez, e cada CPF resolve o seu ofício a partir dele.
+    
+    Só calcula hash de arquivos com tamanho repetido (cópia tem o mesmo tamanho).
+    
+    Args:
+        reservar: Reservar as cópias no processador (False = só agrupar)
+    
+    Returns:
+        Dicionário hash → cópias (apenas grupos com 2+ arquivos)
+    """
+    por_tamanho: Dict[int, List[Path]] = {}
+    for pdf in pdfs:
+        try:
+            por_tamanho.setdefault(pdf.stat().st_size, []).append(pdf)
+        except OSError:
+            continue
+    
+    grupos: Dict[str, List[Path]] = {}
+    for candidatos in por_tamanho.values():
+        if len(candidatos) < 2:
+            continue
+        for pdf in candidatos:
+            try:
+                grupos.setdefault(processador._hash_arquivo(str(pdf)), []).append(pdf)
+            except OSError as e:
+                logger.warning(f"Não foi possível ler {pdf}: {e}")
+    
+    grupos = {hash_pdf: copias for hash_pdf, copias in grupos.items() if len(copias) > 1}
+    if reservar:
+        for hash_pdf, copias in grupos.items():
+            processador.layouts.reservar(hash_pdf, [str(copia) for copia in copias])
+    
+    return grupos
+
+
+def juntar_copias(pdfs: List[Path], grupos: Dict[str, List[Path]]) -> List[Path]:
+    """
+    Ordem de processamento com as cópias de cada arquivo em sequência, na
+    posição da primeira: o layout compartilhado fica em memória só enquanto
+    as cópias passam (em ordem de pasta de CPF elas ficariam espalhadas pela
+    execução inteira).
+    
+    A ordem depende só da lista e dos grupos: --inicio aponta os mesmos lotes.
+    """
+    grupo_de = {pdf: copias for copias in grupos.values() for pdf in copias}
+    ordem: List[Path] = []
+    vistos = set()
+    for pdf in pdfs:
+        if pdf in vistos:
+            continue
+        copias = grupo_de.get(pdf, [pdf])
+        ordem.extend(copias)
+        vistos.update(copias)
+    return ordem
+
+
 def analisar_campo(valor: Any) -> str:
     """Retorna status do campo: ✓ (presente), ✗ (ausente)"""
     if valor is None:
@@ -151,8 +249,55 @@ def gerar_csv_lote(resultados: List[Dict[str, Any]], lote_num: int, output_dir:
     return csv_path
 
 
-def processar_pdf(pdf_path: Path, processador: ProcessadorOficio) -> Dict[str, Any]:
-    """Processa um único PDF"""
+def preparar_pdf(
+    pdf_path: Path,
+    processador: ProcessadorOficio,
+    supervisor: Optional[Supervisor] = None
+):
+    """
+    Detecção de um PDF (sem LLM): no processo atual ou no trabalhador supervisionado.
+    
+    Returns:
+        (payload, None) ou (None, resultado final) - como preparar_payload
+    """
+    cpf = pdf_path.parent.name
+    try:
+        if supervisor is None:
+            payload, resultado_erro = processador.preparar_payload(str(pdf_path), cpf)
+        else:
+            payload_json, resultado_erro = supervisor.executar(str(pdf_path))
+            payload = PayloadExtracao.model_validate_json(payload_json) if payload_json else None
+    except FalhaTrabalhador as e:
+        # Trabalhador travado/estourado/morto: PDF registrado com a classe do erro, lote segue
+        logger.error(f"💥 {pdf_path.name}: {e}")
+        resultado = processador._criar_resultado_erro(cpf, str(pdf_path), str(e))
+        resultado["classe_erro"] = e.classe
+        return None, resultado
+    except Exception as e:
+        logger.error(f"Erro ao preparar {pdf_path.name}: {e}")
+        return None, processador._criar_resultado_erro(cpf, str(pdf_path), str(e))
+    
+    if payload is None:
+        return None, resultado_erro or processador._criar_resultado_erro(
+            cpf, str(pdf_path), "PDF ou pasta de CPF inválidos"
+        )
+    return payload, None
+
+
+def processar_pdf(
+    pdf_path: Path,
+    processador: ProcessadorOficio,
+    supervisor: Optional[Supervisor] = None
+) -> Dict[str, Any]:
+    """Processa um único PDF (com supervisor: detecção no trabalhador, LLM aqui)"""
+    if supervisor is not None:
+        inicio = time.time()
+        payload, resultado = preparar_pdf(pdf_path, processador, supervisor)
+        if payload is not None:
+            resultado = processar_pdf_payload(payload, processador, inicio)
+        resultado["memoria_pico_mb"] = supervisor.ultimo_pico_mb
+        return resultado
+    
     resultado = {
         "pdf": pdf_path.name,
         "cpf": pdf_path.parent.name,
@@ -176,10 +321,97 @@ def processar_pdf(pdf_path: Path, processador: ProcessadorOficio) -> Dict[str, A
     return resultado
 
 
-def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1):
-    """Processa PDFs em lotes de 5"""
+def processar_lote_empacotado(
+    pdfs: List[Path],
+    processador: ProcessadorOficio,
+    supervisor: Optional[Supervisor] = None
+) -> List[Dict[str, Any]]:
+    """
+    Processa um lote empacotando documentos curtos (várias extrações por chamada).
     
-    # Criar processador
+    Detecção roda por PDF; os curtos são agrupados em pacotes sob o orçamento de
+    tokens e os demais seguem a extração individual (rejeitados também: são
+    resolvidos por regex, sem LLM).
+    
+    Returns:
+        Resultados na mesma ordem dos PDFs
+    """
+    resultados: List[Any] = [None] * len(pdfs)
+    curtos = []  # (índice, payload)
+    
+    for indice, pdf in enumerate(pdfs):
+        payload, resultado_erro = preparar_pdf(pdf, processador, supervisor)
+        
+        if payload is None:
+            resultados[indice] = resultado_erro
+        elif empacotamento.elegivel(payload) and not payload.oficio_rejeitado:
+            curtos.append((indice, payload))
+        else:
+            resultados[indice] = processar_pdf_payload(payload, processador)
+    
+    indices = {id(payload): indice for indice, payload in curtos}
+    for pacote in empacotamento.agrupar(payload for _, payload in curtos):
+        for payload, resultado in zip(pacote, processador.processar_pacote(pacote)):
+            resultados[indices[id(payload)]] = resultado
+    
+    return resultados
+
+
+def processar_fluxo_adaptativo(
+    pdfs: List[Path],
+    processador: ProcessadorOficio,
+    controle: ControleConcorrencia,
+    supervisor: Optional[Supervisor] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Detecção em sequência (neste processo ou no supervisor) e LLM em threads,
+    com `controle.limite` PDFs em voo.
+    
+    O próximo PDF só é detectado quando abre uma vaga; a fila vazia, 429 e a
+    latência do LLM ajustam o limite (ver app/concorrencia.py).
+    
+    Yields:
+        Resultados na ordem dos PDFs
+    """
+    def detectados():
+        for pdf in pdfs:
+            inicio = time.time()
+            payload, resultado = preparar_pdf(pdf, processador, supervisor)
+            pico = supervisor.ultimo_pico_mb if supervisor is not None else None
+            yield payload, resultado, inicio, pico
+    
+    def extrair(item) -> Dict[str, Any]:
+        payload, resultado, inicio, pico = item
+        if payload is not None:
+            resultado = processar_pdf_payload(payload, processador, inicio)
+        if pico is not None:
+            resultado["memoria_pico_mb"] = pico
+        return resultado
+    
+    processador.definir_concorrencia(controle.maximo, controle)
+    with ThreadPoolExecutor(max_workers=controle.maximo) as executor:
+        yield from executar_adaptativo(
+            executor, extrair, detectados(), controle,
+            sinais=etapas.sinais_llm(processador)
+        )
+
+
+def processar_pdf_payload(payload, processador: ProcessadorOficio, inicio: Optional[float] = None) -> Dict[str, Any]:
+    """Etapa LLM de um payload (erro vira resultado, como em processar_pdf)"""
+    try:
+        return processador.processar_payload(payload, inicio)
+    except Exception as e:
+        logger.error(f"Erro ao processar {payload.pdf}: {e}")
+        return processador._criar_resultado_erro(payload.cpf, payload.pdf_path, str(e))
+
+
+def criar_processador(backend: str = "openai") -> ProcessadorOficio:
+    """
+    Cria o processador com as configurações do .env.
+    
+    backend="local": servidor OpenAI-compatível (LOCAL_LLM_*), verificado antes
+    de processar; RuntimeError se não responder ou não servir o modelo.
+    """
     db_config = {
         "host": os.getenv("DB_HOST", "localhost"),
         "port": int(os.getenv("DB_PORT", "5432")),
@@ -188,7 +420,166 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
         "password": os.getenv("DB_PASSWORD", "")
     }
     
-    processador = ProcessadorOficio(OPENAI_API_KEY, db_config)
+    if backend != "openai":
+        configuracao = carregar_backend(backend)
+        processador = ProcessadorOficio(configuracao.api_key, db_config, backend=configuracao)
+        verificar_saude(processador.client, configuracao)
+        return processador
+    
+    endpoints = carregar_configuracao(OPENAI_API_KEY, OPENAI_API_KEYS, OPENAI_ENDPOINTS)
+    
+    return ProcessadorOficio(
+        OPENAI_API_KEY,
+        db_config,
+        modelo_gpt=OPENAI_MODEL,
+        modelo_escalonamento=OPENAI_MODEL_ESCALONAMENTO,
+        endpoints=endpoints if len(endpoints) > 1 else None
+    )
+
+
+def salvar_jsons_lote(resultados: List[Dict[str, Any]], lote_dir: Path):
+    """Salva um JSON por PDF processado com sucesso"""
+    lote_dir.mkdir(parents=True, exist_ok=True)
+    for resultado in resultados:
+        if resultado["sucesso"] and resultado["dados"]:
+            json_path = lote_dir / f"{resultado['cpf']}_{resultado['pdf'].replace('.pdf', '.json')}"
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(resultado["dados"], f, indent=2, ensure_ascii=False, default=str)
+
+
+def drenar_caixa_saida(
+    processador: ProcessadorOficio,
+    output_dir: Path,
+    estatisticas: Dict[str, Any],
+    espera: float = 0.0
+) -> int:
+    """
+    Processa os payloads adiados (LLM fora do ar) quando o disjuntor libera.
+    
+    espera: segundos que se aceita aguardar o disjuntor fechar (0 = só o que
+    der para drenar agora; o restante fica para a próxima execução)
+    
+    Returns:
+        Número de payloads processados
+    """
+    caixa = processador.caixa_saida
+    limite = time.time() + espera
+    processados = 0
+    
+    while len(caixa):
+        resultados = processador.drenar_caixa_saida()
+        if resultados:
+            salvar_jsons_lote(resultados, output_dir / "caixa_saida_processados")
+            processados += len(resultados)
+            estatisticas["drenados"] += len(resultados)
+            estatisticas["drenados_sucesso"] += sum(1 for r in resultados if r["sucesso"])
+            for resultado in resultados:
+                if not resultado["sucesso"]:
+                    tqdm.write(f"      ❌ {resultado['pdf']} (caixa de saída): {resultado.get('erro', 'N/A')[:60]}")
+        
+        if not len(caixa):
+            break
+        aguardar = max(processador.disjuntor.segundos_para_sonda(), 1.0)
+        if time.time() + aguardar > limite:
+            break
+        print(f"⏳ Caixa de saída: {len(caixa)} pendente(s), aguardando LLM ({aguardar:.0f}s)")
+        time.sleep(aguardar)
+    
+    return processados
+
+
+def processar_em_lotes(
+    pdfs: List[Path],
+    output_dir: Path,
+    inicio_lote: int = 1,
+    empacotar: bool = False,
+    backend: str = "openai",
+    caixa_saida: Optional[Path] = None,
+    espera_llm: float = 0.0,
+    ocr: bool = False,
+    ocr_cache: Optional[Path] = None,
+    classificacao_rapida: bool = False,
+    trabalhadores_paginas: Optional[int] = None,
+    limiar_paginas: int = LIMIAR_PAGINAS_PARALELO,
+    max_paginas_memoria: Optional[int] = None,
+    supervisionar: bool = False,
+    timeout_pdf: Optional[float] = TIMEOUT_PDF_PADRAO,
+    max_rss_mb: Optional[float] = MAX_RSS_MB_PADRAO,
+    reciclar_apos: Optional[int] = RECICLAR_APOS_PADRAO,
+    concorrencia_adaptativa: bool = False,
+    concorrencia_inicial: int = 4,
+    concorrencia_maxima: int = 32
+):
+    """
+    Processa PDFs em lotes de 5 (empacotar: documentos curtos do lote numa só chamada).
+    
+    Com o LLM fora do ar, os payloads já detectados vão para a caixa de saída
+    (padrão: <output>/caixa_saida) e são drenados quando o disjuntor fecha,
+    inclusive na próxima execução.
+    
+    ocr: páginas sem camada de texto passam pelo Tesseract antes da detecção
+    (texto guardado por hash da página em <output>/ocr_cache).
+    
+    classificacao_rapida: detectores descartam páginas pelo texto do cabeçalho;
+    o texto inteiro só é extraído das páginas candidatas e das usadas no prompt.
+    
+    PDFs com `limiar_paginas` páginas ou mais são extraídos em faixas paralelas
+    (trabalhadores_paginas processos; padrão: todos os núcleos; 1 = desligado).
+    
+    max_paginas_memoria: textos de página guardados por PDF (os usados há mais
+    tempo são descartados e relidos se preciso); memória do processo estável
+    em PDFs de milhares de páginas. Pico de memória registrado por PDF.
+    
+    supervisionar: detecção (a parte que abre PDFs) num processo filho com
+    tempo limite por PDF, limite de RSS e reciclagem a cada `reciclar_apos`
+    PDFs; PDF interrompido vira erro com `classe_erro` e o lote continua.
+    O LLM segue no processo principal. Cópias do mesmo PDF são segmentadas
+    uma vez por cópia (o cache de layouts fica no processo principal).
+    
+    Cópias do mesmo PDF em pastas de CPF diferentes são processadas em
+    sequência (na posição da primeira) e segmentadas uma vez.
+    
+    concorrencia_adaptativa: chamadas ao LLM em paralelo (a detecção segue um
+    PDF por vez), começando em `concorrencia_inicial` e ajustadas pela vazão,
+    429 e latência até `concorrencia_maxima`. Os lotes de TAMANHO_LOTE
+    continuam sendo só a unidade de saída (JSON + CSV). Não combina com
+    `empacotar` (pacotes são montados por lote).
+    """
+    
+    # Criar processador
+    processador = criar_processador(backend)
+    processador.caixa_saida = CaixaSaida(caixa_saida or output_dir / "caixa_saida")
+    processador.classificacao_rapida = classificacao_rapida
+    processador.extracao_paralela = ExtracaoParalela(trabalhadores_paginas, limiar_paginas)
+    processador.max_paginas_memoria = max_paginas_memoria
+    if ocr:
+        processador.ocr = MotorOCR(cache=CacheOCR(ocr_cache or output_dir / "ocr_cache"))
+    supervisor = None
+    if supervisionar:
+        supervisor = Supervisor(
+            etapas.preparar_pdf,
+            inicializador=etapas.configurar_trabalhador,
+            argumentos_inicializador=(
+                (ocr_cache or output_dir / "ocr_cache") if ocr else None,
+                classificacao_rapida,
+                max_paginas_memoria
+            ),
+            timeout_pdf=timeout_pdf,
+            max_rss_mb=max_rss_mb,
+            reciclar_apos=reciclar_apos
+        )
+    controle = None
+    if concorrencia_adaptativa:
+        if empacotar:
+            logger.warning("⚠️ Concorrência adaptativa ignorada com --empacotar")
+        else:
+            controle = ControleConcorrencia(inicial=concorrencia_inicial, maximo=concorrencia_maxima)
+    estatisticas_caixa = {"drenados": 0, "drenados_sucesso": 0}
+    
+    # Pendências de execuções anteriores
+    if len(processador.caixa_saida):
+        print(f"📬 Caixa de saída com {len(processador.caixa_saida)} payload(s) de execução anterior")
+        drenar_caixa_saida(processador, output_dir, estatisticas_caixa)
     
     # Processar em lotes
     total_lotes = (len(pdfs) + TAMANHO_LOTE - 1) // TAMANHO_LOTE
@@ -196,14 +587,33 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
     print(f"\n📊 Total de PDFs: {len(pdfs)}")
     print(f"📦 Total de lotes: {total_lotes} (tamanho: {TAMANHO_LOTE})")
     print(f"🎯 Iniciando do lote: {inicio_lote}")
+    
+    # Cópias do mesmo PDF em várias pastas de CPF: em sequência, segmentadas uma vez.
+    # Com supervisor a detecção é no trabalhador: nada a reservar aqui
+    grupos = agrupar_por_conteudo(pdfs, processador, reservar=False)
+    pdfs = juntar_copias(pdfs, grupos)
+    if supervisor is None:
+        restantes = {str(pdf) for pdf in pdfs[(inicio_lote - 1) * TAMANHO_LOTE:]}
+        for hash_pdf, copias in grupos.items():
+            processador.layouts.reservar(hash_pdf, [str(c) for c in copias if str(c) in restantes])
+    if grupos:
+        copias = sum(len(g) for g in grupos.values())
+        print(f"🧬 PDFs repetidos entre CPFs: {copias} cópias de {len(grupos)} arquivo(s) único(s)")
     print()
     
+    # Concorrência adaptativa: um fluxo contínuo para todos os lotes (o limite não zera a cada lote)
+    fluxo = None
+    if controle is not None:
+        fluxo = processar_fluxo_adaptativo(pdfs[(inicio_lote - 1) * TAMANHO_LOTE:], processador, controle, supervisor)
+    
     estatisticas_globais = {
         "total_pdfs": 0,
         "sucesso": 0,
         "erros": 0,
+        "adiados": 0,
         "cpf_validado": 0,
-        "tempo_total": 0
+        "tempo_total": 0,
+        "memoria_pico_mb": None
     }
     
     # Barra de progresso global
@@ -227,15 +637,25 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
             lote_dir = output_dir / f"lote_{lote_num:03d}"
             lote_dir.mkdir(parents=True, exist_ok=True)
             
+            # Modo empacotado: lote inteiro de uma vez (pacotes de documentos curtos)
+            resultados_empacotados = processar_lote_empacotado(lote_pdfs, processador, supervisor) if empacotar else None
+            
             # Barra de progresso do lote
-            for pdf in tqdm(lote_pdfs, desc=f"  Lote {lote_num}", unit="PDF", leave=False):
-                resultado = processar_pdf(pdf, processador)
+            for indice, pdf in enumerate(tqdm(lote_pdfs, desc=f"  Lote {lote_num}", unit="PDF", leave=False)):
+                if resultados_empacotados is not None:
+                    resultado = resultados_empacotados[indice]
+                elif fluxo is not None:
+                    resultado = next(fluxo)
+                else:
+                    resultado = processar_pdf(pdf, processador, supervisor)
                 resultados_lote.append(resultado)
                 
                 # Atualizar estatísticas
                 estatisticas_globais["total_pdfs"] += 1
                 if resultado["sucesso"]:
                     estatisticas_globais["sucesso"] += 1
+                elif resultado.get("adiado"):
+                    estatisticas_globais["adiados"] += 1
                 else:
                     estatisticas_globais["erros"] += 1
                 
@@ -243,29 +663,42 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
                     estatisticas_globais["cpf_validado"] += 1
                 
                 estatisticas_globais["tempo_total"] += resultado["tempo_processamento"]
+                if resultado.get("memoria_pico_mb") is not None:
+                    estatisticas_globais["memoria_pico_mb"] = max(
+                        estatisticas_globais["memoria_pico_mb"] or 0, resultado["memoria_pico_mb"]
+                    )
                 
                 # Atualizar barra global
                 pbar_global.update(1)
                 
                 # Log de erro (se houver)
-                if not resultado["sucesso"]:
+                if resultado.get("adiado"):
+                    tqdm.write(f"      📮 {pdf.name}: adiado (LLM indisponível)")
+                elif not resultado["sucesso"]:
                     erro_msg = resultado.get('erro', 'N/A')
                     tqdm.write(f"      ❌ {pdf.name}: {erro_msg[:60]}")
             
             # Salvar JSONs individuais
-            for resultado in resultados_lote:
-                if resultado["sucesso"] and resultado["dados"]:
-                    json_path = lote_dir / f"{resultado['cpf']}_{resultado['pdf'].replace('.pdf', '.json')}"
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(resultado["dados"], f, indent=2, ensure_ascii=False, default=str)
+            salvar_jsons_lote(resultados_lote, lote_dir)
             
             # Gerar CSV do lote
             csv_path = gerar_csv_lote(resultados_lote, lote_num, output_dir)
             
             # Resumo do lote
             sucesso_lote = sum(1 for r in resultados_lote if r["sucesso"])
+            adiados_lote = sum(1 for r in resultados_lote if r.get("adiado"))
             print(f"\n   ✅ Sucesso: {sucesso_lote}/{len(lote_pdfs)}")
-            print(f"   ❌ Erros: {len(lote_pdfs) - sucesso_lote}/{len(lote_pdfs)}")
+            print(f"   ❌ Erros: {len(lote_pdfs) - sucesso_lote - adiados_lote}/{len(lote_pdfs)}")
+            if adiados_lote:
+                print(f"   📮 Adiados: {adiados_lote}/{len(lote_pdfs)}")
+            
+            # LLM de volta: drenar o que ficou para trás
+            if len(processador.caixa_saida) and not processador.disjuntor.instavel():
+                drenar_caixa_saida(processador, output_dir, estatisticas_caixa)
+    
+    # Última drenagem (aguarda o disjuntor até espera_llm segundos)
+    if len(processador.caixa_saida):
+        drenar_caixa_saida(processador, output_dir, estatisticas_caixa, espera=espera_llm)
     
     # Estatísticas finais
     print(f"{'='*60}")
@@ -274,11 +707,114 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
     print(f"Total processado: {estatisticas_globais['total_pdfs']}")
     print(f"Sucesso: {estatisticas_globais['sucesso']} ({estatisticas_globais['sucesso']/estatisticas_globais['total_pdfs']*100:.1f}%)")
     print(f"Erros: {estatisticas_globais['erros']}")
+    if estatisticas_globais["adiados"]:
+        print(f"Adiados (LLM indisponível): {estatisticas_globais['adiados']}")
     print(f"CPF validado: {estatisticas_globais['cpf_validado']}")
     print(f"Tempo total: {estatisticas_globais['tempo_total']:.1f}s")
     print(f"Tempo médio: {estatisticas_globais['tempo_total']/estatisticas_globais['total_pdfs']:.1f}s/PDF")
+    if estatisticas_globais["memoria_pico_mb"] is not None:
+        print(f"Pico de memória por PDF (máximo): {estatisticas_globais['memoria_pico_mb']:.0f} MB")
     print()
     
+    # Uso de tokens do LLM (cache de prompt)
+    uso_llm = processador.estatisticas_llm
+    estatisticas_globais["llm"] = uso_llm
+    if uso_llm["tokens_prompt"]:
+        taxa_cache = uso_llm["tokens_cache"] / uso_llm["tokens_prompt"] * 100
+        print(f"Tokens prompt: {uso_llm['tokens_prompt']:,} (cache: {uso_llm['tokens_cache']:,} = {taxa_cache:.1f}%)")
+        print(f"Tokens resposta: {uso_llm['tokens_resposta']:,}")
+        if uso_llm["coalescidas"]:
+            print(f"Chamadas coalescidas (prompt idêntico em voo): {uso_llm['coalescidas']}")
+        print()
+    
+    # Distribuição entre chaves/endpoints
+    if isinstance(processador.client, PoolClientes):
+        estatisticas_globais["endpoints"] = processador.client.relatorio()
+        for nome, uso in estatisticas_globais["endpoints"].items():
+            quarentena = " (em quarentena)" if uso["em_quarentena"] else ""
+            print(f"{nome}: {uso['requisicoes']} requisições, {uso['erros']} erros{quarentena}")
+        print()
+    
+    # Latência do LLM (timeouts adaptativos e hedge)
+    latencia = processador.latencias.relatorio()
+    estatisticas_globais["latencia_llm"] = latencia
+    if latencia["p95"] is not None:
+        print(f"Latência LLM: p50 {latencia['p50']:.1f}s | p95 {latencia['p95']:.1f}s | p99 {latencia['p99']:.1f}s")
+        print(f"Requisições duplicadas (hedge): {latencia['hedges']} (venceram: {latencia['hedges_vencedores']})")
+        print()
+    
+    # Cascata de modelos: onde cada PDF foi resolvido
+    cascata = processador.relatorio_cascata()
+    estatisticas_globais["cascata"] = cascata
+    if cascata["total"]:
+        if cascata["regex"]:
+            print(f"Rejeitados resolvidos sem LLM: {cascata['regex']} ({cascata['taxa_regex']:.1f}%)")
+        print(f"Resolvidos no modelo rápido: {cascata['rapido']} ({cascata['taxa_rapido']:.1f}%)")
+        if OPENAI_MODEL_ESCALONAMENTO:
+            print(f"Resolvidos no modelo forte: {cascata['forte']} ({cascata['taxa_forte']:.1f}%)")
+            print(f"Escalonamentos: {cascata['escalonamentos']}")
+        print(f"Com pendências: {cascata['sem_solucao']}")
+        print()
+    
+    # Segmentação compartilhada entre cópias
+    layouts = processador.layouts
+    estatisticas_globais["segmentacao"] = {
+        "construidas": layouts.construidos,
+        "reaproveitadas": layouts.reaproveitados
+    }
+    if layouts.reaproveitados:
+        print(f"Segmentações: {layouts.construidos} (reaproveitadas: {layouts.reaproveitados})")
+        print()
+    
+    # Empacotamento de documentos curtos
+    if empacotar:
+        pacotes = processador.estatisticas_pacotes
+        estatisticas_globais["empacotamento"] = pacotes
+        print(f"Pacotes: {pacotes['pacotes']} ({pacotes['documentos']} documentos, {pacotes['fallbacks']} individuais)")
+        print()
+    
+    # Extração paralela de PDFs grandes
+    processador.extracao_paralela.encerrar()
+    if processador.extracao_paralela.documentos:
+        estatisticas_globais["extracao_paralela"] = processador.extracao_paralela.documentos
+        print(f"PDFs grandes extraídos em paralelo: {processador.extracao_paralela.documentos}")
+        print()
+    
+    # Concorrência adaptativa
+    if controle is not None:
+        estatisticas_globais["concorrencia"] = controle.relatorio()
+        print(f"Concorrência do LLM: final {controle.limite}, máxima {controle.maximo_atingido} "
+              f"({controle.ajustes} ajustes, {controle.cortes} cortes por 429)")
+        print()
+    
+    # Trabalhador supervisionado
+    if supervisor is not None:
+        supervisor.encerrar()
+        estatisticas_globais["supervisor"] = supervisor.estatisticas
+        print(f"Trabalhador supervisionado: {supervisor.estatisticas['tempo_esgotado']} por tempo, "
+              f"{supervisor.estatisticas['memoria_excedida']} por memória, "
+              f"{supervisor.estatisticas['encerrados']} encerrados, "
+              f"{supervisor.estatisticas['reciclagens']} reciclagens")
+        print()
+    
+    # OCR de páginas digitalizadas
+    if processador.ocr is not None:
+        processador.ocr.encerrar()
+        estatisticas_globais["ocr"] = processador.ocr.estatisticas
+        print(f"OCR: {processador.ocr.estatisticas['paginas_ocr']} páginas reconhecidas "
+              f"({processador.ocr.estatisticas['paginas_cache']} em cache)")
+        print()
+    
+    # Caixa de saída (LLM indisponível)
+    estatisticas_caixa["pendentes"] = len(processador.caixa_saida)
+    estatisticas_caixa["aberturas_disjuntor"] = processador.disjuntor.aberturas
+    estatisticas_globais["caixa_saida"] = estatisticas_caixa
+    if estatisticas_globais["adiados"] or estatisticas_caixa["drenados"] or estatisticas_caixa["pendentes"]:
+        print(f"Caixa de saída: {estatisticas_caixa['drenados']} drenados "
+              f"({estatisticas_caixa['drenados_sucesso']} com sucesso), "
+              f"{estatisticas_caixa['pendentes']} pendentes em {processador.caixa_saida.diretorio}")
+        print()
+    
     # Salvar estatísticas
     stats_path = output_dir / "estatisticas_globais.json"
     with open(stats_path, 'w', encoding='utf-8') as f:
@@ -287,6 +823,61 @@ def processar_em_lotes(pdfs: List[Path], output_dir: Path, inicio_lote: int = 1)
     print(f"💾 Estatísticas salvas em: {stats_path}")
 
 
+def executar_triagem(
+    pdfs: List[Path],
+    output_dir: Path,
+    trabalhadores: Optional[int] = None,
+    historico: Optional[List[Path]] = None
+) -> Dict[str, Any]:
+    """
+    Dry-run: detecção de todos os PDFs (sem LLM) → triagem.csv + triagem.json.
+    
+    Estimativa de tempo usa a vazão de estatisticas_globais.json anteriores
+    (padrão: o da pasta de saída, se existir).
+    """
+    # Maior PDF primeiro, com o tempo por página das triagens anteriores
+    historico_custo = HistoricoCusto(output_dir / ARQUIVO_HISTORICO)
+    linhas = list(tqdm(
+        triagem.triar(pdfs, trabalhadores, historico_custo), total=len(pdfs), desc="🔎 Triagem", unit="PDF"
+    ))
+    historico_custo.salvar()
+    posicoes = {(pdf.parent.name, pdf.name): indice for indice, pdf in enumerate(pdfs)}
+    linhas.sort(key=lambda linha: posicoes[(linha["cpf"], linha["pdf"])])
+    
+    csv_path = triagem.gravar_csv(linhas, output_dir / "triagem.csv")
+    
+    if historico is None:
+        historico = [p for p in [output_dir / "estatisticas_globais.json"] if p.exists()]
+    resumo = triagem.resumir(linhas, triagem.vazao_historica(historico))
+    with open(output_dir / "triagem.json", 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, indent=2)
+    
+    estimativa = resumo["estimativa"]
+    total = resumo["total_pdfs"] or 1
+    print(f"{'='*60}")
+    print("🔎 TRIAGEM (sem LLM)")
+    print(f"{'='*60}")
+    print(f"PDFs: {resumo['total_pdfs']}")
+    print(f"Ofício do CPF encontrado: {resumo['oficio_cpf']} ({resumo['oficio_cpf']/total*100:.1f}%)")
+    print(f"Sem ofício do CPF: {resumo['sem_oficio_cpf']}")
+    print(f"Com ANEXO II: {resumo['anexo_ii']} | Com PROCESSAMENTO: {resumo['processamento']}")
+    print(f"Rejeitados: {resumo['rejeitados']} (sem LLM: {resumo['resolvidos_sem_llm']})")
+    print(f"Sem camada de texto: {resumo['sem_texto']}")
+    print(f"Gigantes (map-reduce): {resumo['gigantes_mapreduce']}")
+    print(f"Erros: {resumo['erros']}")
+    if resumo["memoria_pico_mb"] is not None:
+        print(f"Pico de memória por PDF (máximo): {resumo['memoria_pico_mb']:.0f} MB")
+    print()
+    origem = "histórico" if estimativa["historico"] else "padrão"
+    print(f"Estimativa: {estimativa['pdfs_llm']} PDFs no LLM, {estimativa['chamadas']} chamadas")
+    print(f"Tokens: ~{estimativa['tokens_prompt']:,} prompt + ~{estimativa['tokens_resposta']:,} resposta")
+    print(f"Tempo: ~{estimativa['tempo_s']/60:.0f} min ({estimativa['segundos_por_pdf']:.1f}s/PDF, {origem})")
+    print()
+    print(f"💾 Triagem salva em: {csv_path}")
+    
+    return resumo
+
+
 def main():
     """Função principal"""
     import argparse
@@ -296,6 +887,45 @@ def main():
     parser.add_argument("--output", default=OUTPUT_DIR, help="Diretório de saída")
     parser.add_argument("--inicio", type=int, default=1, help="Número do lote inicial")
     parser.add_argument("--limite", type=int, help="Limitar número de PDFs")
+    parser.add_argument("--empacotar", action="store_true",
+                        help="Agrupar documentos curtos do lote numa única chamada ao LLM")
+    parser.add_argument("--backend", choices=BACKENDS, default=LLM_BACKEND,
+                        help="Servidor de extração (local: LOCAL_LLM_* no .env)")
+    parser.add_argument("--caixa-saida", type=Path,
+                        help="Payloads adiados com o LLM fora do ar (padrão: <output>/caixa_saida)")
+    parser.add_argument("--espera-llm", type=float, default=0,
+                        help="Segundos para aguardar o LLM voltar e drenar a caixa de saída no fim")
+    parser.add_argument("--ocr", action="store_true",
+                        help="OCR (Tesseract) das páginas sem camada de texto")
+    parser.add_argument("--ocr-cache", type=Path,
+                        help="Texto do OCR por hash de página (padrão: <output>/ocr_cache)")
+    parser.add_argument("--classificacao-rapida", action="store_true",
+                        help="Descartar páginas pelo cabeçalho (PDFs muito longos)")
+    parser.add_argument("--trabalhadores-paginas", type=int,
+                        help="Processos por PDF grande (padrão: todos os núcleos; 1 = desligado)")
+    parser.add_argument("--limiar-paginas", type=int, default=LIMIAR_PAGINAS_PARALELO,
+                        help="Páginas a partir das quais o PDF é extraído em faixas paralelas")
+    parser.add_argument("--max-paginas-memoria", type=int,
+                        help="Textos de página guardados por PDF (padrão: todos; ex: 200 em PDFs gigantes)")
+    parser.add_argument("--supervisionar", action="store_true",
+                        help="Detecção em processo filho vigiado (tempo limite, memória, reciclagem)")
+    parser.add_argument("--timeout-pdf", type=float, default=TIMEOUT_PDF_PADRAO,
+                        help="Segundos por PDF com --supervisionar")
+    parser.add_argument("--max-rss-mb", type=float, default=MAX_RSS_MB_PADRAO,
+                        help="Memória máxima do processo filho (MB) com --supervisionar")
+    parser.add_argument("--reciclar-apos", type=int, default=RECICLAR_APOS_PADRAO,
+                        help="PDFs por processo filho antes de reciclar, com --supervisionar")
+    parser.add_argument("--concorrencia-adaptativa", action="store_true",
+                        help="Chamadas ao LLM em paralelo, ajustadas pela vazão, 429 e latência")
+    parser.add_argument("--concorrencia", type=int, default=4,
+                        help="Concorrência inicial com --concorrencia-adaptativa")
+    parser.add_argument("--concorrencia-maxima", type=int, default=32,
+                        help="Teto da concorrência com --concorrencia-adaptativa")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Só triagem (detecção sem LLM): triagem.csv + estimativa de tokens e tempo")
+    parser.add_argument("--trabalhadores", type=int, help="Processos da triagem (padrão: todos os núcleos)")
+    parser.add_argument("--historico", type=Path, nargs="*",
+                        help="estatisticas_globais.json de execuções anteriores (vazão da estimativa)")
     
     args = parser.parse_args()
     
@@ -309,10 +939,11 @@ def main():
     print(f"📁 Input: {args.input}")
     print(f"📁 Output: {args.output}")
     print(f"📦 Tamanho do lote: {TAMANHO_LOTE}")
+    print(f"🧠 Backend: {args.backend}")
     print()
     
     # Encontrar PDFs
-    pdfs = encontrar_pdfs(args.input)
+    pdfs = encontrar_pdfs(args.input, output_path / ARQUIVO_MANIFESTO)
     
     if args.limite:
         pdfs = pdfs[:args.limite]
@@ -322,8 +953,35 @@ def main():
         print("❌ Nenhum PDF encontrado!")
         return
     
+    if args.dry_run:
+        executar_triagem(pdfs, output_path, args.trabalhadores, args.historico)
+        return
+    
     # Processar
-    processar_em_lotes(pdfs, output_path, args.inicio)
+    try:
+        processar_em_lotes(
+            pdfs, output_path, args.inicio,
+            empacotar=args.empacotar,
+            backend=args.backend,
+            caixa_saida=args.caixa_saida,
+            espera_llm=args.espera_llm,
+            ocr=args.ocr,
+            ocr_cache=args.ocr_cache,
+            classificacao_rapida=args.classificacao_rapida,
+            trabalhadores_paginas=args.trabalhadores_paginas,
+            limiar_paginas=args.limiar_paginas,
+            max_paginas_memoria=args.max_paginas_memoria,
+            supervisionar=args.supervisionar,
+            timeout_pdf=args.timeout_pdf,
+            max_rss_mb=args.max_rss_mb,
+            reciclar_apos=args.reciclar_apos,
+            concorrencia_adaptativa=args.concorrencia_adaptativa,
+            concorrencia_inicial=args.concorrencia,
+            concorrencia_maxima=args.concorrencia_maxima
+        )
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return
     
     print("="*60)
     print("✅ PROCESSAMENTO V2 CONCLUÍDO")
@@ -121,8 +121,12 @@ def reprocessar_pdfs():
     
     print(f"📁 Diretório de PDFs: {data_dir}")
     
-    # Contar PDFs
-    pdf_count = len(list(data_dir.rglob("*.pdf")))
+    # Contar PDFs (mesma descoberta e manifesto do processador: aquece o cache da execução)
+    sys.path.insert(0, str(parsing_dir))
+    from app.descoberta import ARQUIVO_MANIFESTO, ManifestoCorpus, descobrir
+    manifesto = ManifestoCorpus(parsing_dir / "outputs" / ARQUIVO_MANIFESTO)
+    pdf_count = sum(1 for _ in descobrir(data_dir, manifesto)) if data_dir.is_dir() else 0
+    manifesto.salvar()
     print(f"📄 Total de PDFs: {pdf_count}")
     print(f"⏱️  Tempo estimado: ~{pdf_count * 30 // 60} minutos\n")
     
@@ -0,0 +1,47 @@
+"""
+Dados de teste compartilhados: resposta do LLM, payload da etapa de detecção
+e resposta do client OpenAI mockada.
+"""
+
+import json
+from typing import Optional, Union
+from unittest.mock import Mock
+
+from app.schemas import PayloadExtracao
+
+
+RESPOSTA_LLM = {
+    "processo_origem": "0035938-67.2018.8.26.0053",
+    "requerente_caps": "REGINA APARECIDA NARDES GARCIA DIAS",
+    "numero_ordem": "644/2015",
+    "valor_principal_liquido": 17753.80,
+    "valor_principal_bruto": 37993.13,
+    "juros_moratorios": 20239.33,
+    "valor_total_requisitado": 37993.13
+}
+
+
+def criar_payload(cpf: str, texto: str = "OFÍCIO REQUISITÓRIO ... " * 50, **campos) -> PayloadExtracao:
+    """Payload mínimo como sairia da etapa de detecção (`campos` substituem os padrões)"""
+    return PayloadExtracao(**{
+        "cpf": cpf,
+        "pdf": "0035938-67.2018.8.26.0053.pdf",
+        "pdf_path": f"/dados/{cpf}/0035938-67.2018.8.26.0053.pdf",
+        "hash_pdf": "abc123",
+        "texto": texto,
+        "paginas_oficio": [1, 2],
+        "num_oficios": 1,
+        **campos
+    })
+
+
+def resposta(conteudo: Union[str, dict], prompt_tokens: Optional[int] = None, completion_tokens: int = 0) -> Mock:
+    """Resposta de chat.completions.create (dict vira JSON; com prompt_tokens, uso numérico)"""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = conteudo if isinstance(conteudo, str) else json.dumps(conteudo)
+    if prompt_tokens is not None:
+        response.usage.prompt_tokens = prompt_tokens
+        response.usage.completion_tokens = completion_tokens
+        response.usage.prompt_tokens_details.cached_tokens = 0
+    return response
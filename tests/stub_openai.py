@@ -0,0 +1,176 @@
+"""
+Servidor local que emula endpoints OpenAI-compatíveis para testes.
+
+Endpoints: /v1/chat/completions, /v1/models, /v1/files, /v1/files/{id}/content,
+/v1/batches, /v1/batches/{id}. Toda completion devolve o mesmo JSON enlatado.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorOpenAIFalso:
+    """Servidor HTTP em thread com respostas enlatadas"""
+
+    def __init__(self, resposta: dict, modelo: str = "modelo-local"):
+        self.resposta = resposta
+        self.modelo = modelo
+        self.arquivos = {}
+        self.lotes = {}
+        self.requisicoes = []
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._criar_handler())
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self._servidor.server_address
+        return f"http://{host}:{porta}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def completion(self, corpo: dict) -> dict:
+        """Chat completion enlatada"""
+        return {
+            "id": f"chatcmpl-{len(self.requisicoes)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": corpo.get("model", self.modelo),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(self.resposta)}
+            }],
+            "usage": {
+                "prompt_tokens": 2000,
+                "completion_tokens": 100,
+                "total_tokens": 2100,
+                "prompt_tokens_details": {"cached_tokens": 1024}
+            }
+        }
+
+    def _arquivo(self, arquivo_id: str, nome: str, conteudo: bytes, finalidade: str) -> dict:
+        self.arquivos[arquivo_id] = conteudo
+        return {
+            "id": arquivo_id,
+            "object": "file",
+            "bytes": len(conteudo),
+            "created_at": int(time.time()),
+            "filename": nome,
+            "purpose": finalidade,
+            "status": "processed"
+        }
+
+    def _criar_lote(self, corpo: dict) -> dict:
+        entrada = self.arquivos[corpo["input_file_id"]].decode("utf-8")
+        linhas_saida = []
+        for linha in entrada.splitlines():
+            if not linha.strip():
+                continue
+            requisicao = json.loads(linha)
+            self.requisicoes.append(requisicao["body"])
+            linhas_saida.append(json.dumps({
+                "id": f"req-{len(linhas_saida)}",
+                "custom_id": requisicao["custom_id"],
+                "response": {"status_code": 200, "body": self.completion(requisicao["body"])},
+                "error": None
+            }))
+
+        lote_id = f"batch_{len(self.lotes) + 1}"
+        saida_id = f"file-saida-{lote_id}"
+        self._arquivo(saida_id, "saida.jsonl", ("\n".join(linhas_saida) + "\n").encode("utf-8"), "batch_output")
+
+        self.lotes[lote_id] = {
+            "id": lote_id,
+            "object": "batch",
+            "endpoint": corpo["endpoint"],
+            "input_file_id": corpo["input_file_id"],
+            "completion_window": corpo["completion_window"],
+            "created_at": int(time.time()),
+            "status": "in_progress",
+            "output_file_id": None,
+            "_saida": saida_id,
+            "request_counts": {"total": len(linhas_saida), "completed": 0, "failed": 0}
+        }
+        return self._lote_publico(lote_id)
+
+    def _consultar_lote(self, lote_id: str) -> dict:
+        # Termina na primeira consulta: simula o processamento assíncrono
+        lote = self.lotes[lote_id]
+        lote["status"] = "completed"
+        lote["output_file_id"] = lote["_saida"]
+        lote["request_counts"]["completed"] = lote["request_counts"]["total"]
+        return self._lote_publico(lote_id)
+
+    def _lote_publico(self, lote_id: str) -> dict:
+        return {k: v for k, v in self.lotes[lote_id].items() if not k.startswith("_")}
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, corpo, status=200, bruto=False):
+                dados = corpo if bruto else json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if bruto else "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _ler_corpo(self) -> bytes:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(tamanho)
+
+            def do_GET(self):
+                caminho = self.path.split("?")[0]
+                if caminho == "/v1/models":
+                    self._responder({"object": "list", "data": [
+                        {"id": servidor.modelo, "object": "model", "created": 0, "owned_by": "stub"}
+                    ]})
+                elif caminho.startswith("/v1/batches/"):
+                    self._responder(servidor._consultar_lote(caminho.rsplit("/", 1)[1]))
+                elif caminho.startswith("/v1/files/") and caminho.endswith("/content"):
+                    arquivo_id = caminho.split("/")[3]
+                    self._responder(servidor.arquivos[arquivo_id], bruto=True)
+                else:
+                    self._responder({"error": {"message": "not found"}}, status=404)
+
+            def do_POST(self):
+                caminho = self.path.split("?")[0]
+                corpo = self._ler_corpo()
+
+                if caminho == "/v1/chat/completions":
+                    requisicao = json.loads(corpo)
+                    servidor.requisicoes.append(requisicao)
+                    self._responder(servidor.completion(requisicao))
+                elif caminho == "/v1/files":
+                    # multipart/form-data: extrair parte "file"
+                    fronteira = self.headers["Content-Type"].split("boundary=")[1].encode()
+                    conteudo, finalidade = b"", "batch"
+                    for parte in corpo.split(b"--" + fronteira):
+                        if b"\r\n\r\n" not in parte:
+                            continue
+                        cabecalho, valor = parte.split(b"\r\n\r\n", 1)
+                        valor = valor.rsplit(b"\r\n", 1)[0]
+                        if b'name="file"' in cabecalho:
+                            conteudo = valor
+                        elif b'name="purpose"' in cabecalho:
+                            finalidade = valor.decode()
+                    arquivo_id = f"file-{len(servidor.arquivos) + 1}"
+                    self._responder(servidor._arquivo(arquivo_id, "entrada.jsonl", conteudo, finalidade))
+                elif caminho == "/v1/batches":
+                    self._responder(servidor._criar_lote(json.loads(corpo)))
+                else:
+                    self._responder({"error": {"message": "not found"}}, status=404)
+
+        return Handler
@@ -0,0 +1,92 @@
+"""
+Testes do agendamento maior-primeiro (custo por páginas e histórico).
+"""
+
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import pymupdf
+
+from app import etapas
+from app.agendamento import (
+    HistoricoCusto, contar_paginas, ordenar_maior_primeiro, simular_duracao,
+    SEGUNDOS_POR_PAGINA_PADRAO, SEGUNDOS_POR_TAREFA
+)
+from tests.test_paginas import criar_pdf_dois_oficios, criar_pdf_longo
+
+
+class ExecutorImediato:
+    """Pool falso: executa no envio e guarda a ordem"""
+
+    enviados = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, funcao, *args):
+        ExecutorImediato.enviados.append(args[0])
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+
+class TestAgendamento:
+    """Testes da ordem maior-primeiro"""
+
+    def test_maior_primeiro_reduz_duracao(self):
+        """Teste PDF grande no fim da fila define o lote; primeiro, não"""
+        custos = [1.0] * 12 + [10.0]
+
+        ordenados = ordenar_maior_primeiro(custos, lambda custo: custo)
+
+        assert ordenados[0] == 10.0
+        assert simular_duracao(custos, 4) == 13.0
+        assert simular_duracao(ordenados, 4) == 10.0
+
+    def test_contar_paginas(self, tmp_path):
+        """Teste páginas pelo xref e arquivo inválido sem erro"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho)
+        invalido = tmp_path / "invalido.pdf"
+        invalido.write_bytes(b"nada")
+
+        assert contar_paginas(str(caminho)) == pymupdf.open(str(caminho)).page_count
+        assert contar_paginas(str(invalido)) is None
+
+    def test_historico_persistido(self, tmp_path):
+        """Teste tempo por página medido, salvo e relido"""
+        caminho = tmp_path / "custo_paginas.json"
+        historico = HistoricoCusto(caminho)
+        assert historico.estimar(100) == SEGUNDOS_POR_TAREFA + 100 * SEGUNDOS_POR_PAGINA_PADRAO
+
+        historico.registrar(100, 2.0 + SEGUNDOS_POR_TAREFA)
+        historico.registrar(None, 50.0)
+        historico.salvar()
+
+        relido = HistoricoCusto(caminho)
+        assert relido.tarefas == 1
+        assert abs(relido.segundos_por_pagina - 0.02) < 1e-9
+        assert relido.estimar(1000) > relido.estimar(10)
+
+    def test_detectar_envia_maior_primeiro(self, tmp_path):
+        """Teste etapa A: PDF longo vai para o pool antes dos curtos"""
+        curtos = [tmp_path / f"1049382986{i}" / "curto.pdf" for i in range(3)]
+        for caminho in curtos:
+            criar_pdf_dois_oficios(caminho)
+        longo = tmp_path / "11671377877" / "longo.pdf"
+        criar_pdf_longo(longo)
+        historico = HistoricoCusto()
+
+        ExecutorImediato.enviados = []
+        with patch.object(etapas, "ProcessPoolExecutor", ExecutorImediato):
+            grupos = [(None, [caminho]) for caminho in curtos + [longo]]
+            list(etapas.detectar(grupos, tmp_path / "etapas", trabalhadores=2, historico=historico))
+
+        assert ExecutorImediato.enviados[0] == [str(longo)]
+        assert historico.tarefas == 4
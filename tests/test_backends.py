@@ -0,0 +1,72 @@
+"""
+Testes do backend local OpenAI-compatível (servidor stub com JSON enlatado).
+"""
+
+import pytest
+
+from app.backends import carregar_backend, verificar_saude
+from app.processador import ProcessadorOficio
+from app.prompts import INSTRUCOES_EXTRACAO, INSTRUCOES_EXTRACAO_COMPACTA
+from tests.fabricas import RESPOSTA_LLM
+from tests.stub_openai import ServidorOpenAIFalso
+
+
+class TestBackendLocal:
+    """Testes de configuração, verificação de saúde e extração no backend local"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.ambiente = {
+            "LOCAL_LLM_BASE_URL": "http://127.0.0.1:1/v1",
+            "LOCAL_LLM_MODEL": "modelo-local"
+        }
+
+    def test_configuracao_local(self):
+        """Teste padrões do backend local e variáveis obrigatórias"""
+        backend = carregar_backend("local", self.ambiente)
+
+        assert backend.modelo == "modelo-local"
+        assert backend.variante_prompt == "compacta"
+        assert backend.json_schema is False
+
+        backend = carregar_backend("local", {**self.ambiente, "LOCAL_LLM_JSON_SCHEMA": "true",
+                                             "LOCAL_LLM_PROMPT": "completa"})
+        assert backend.json_schema is True
+        assert backend.variante_prompt == "completa"
+
+        with pytest.raises(ValueError):
+            carregar_backend("local", {"LOCAL_LLM_MODEL": "modelo-local"})
+        with pytest.raises(ValueError):
+            carregar_backend("outro", self.ambiente)
+
+    def test_verificacao_de_saude(self):
+        """Teste servidor no ar com o modelo passa; modelo ausente ou servidor fora falham"""
+        with ServidorOpenAIFalso(RESPOSTA_LLM) as servidor:
+            backend = carregar_backend("local", {**self.ambiente, "LOCAL_LLM_BASE_URL": servidor.base_url})
+            processador = ProcessadorOficio(backend.api_key, {}, backend=backend)
+            assert verificar_saude(processador.client, backend) == ["modelo-local"]
+
+            outro = backend.model_copy(update={"modelo": "outro-modelo"})
+            with pytest.raises(RuntimeError, match="outro-modelo"):
+                verificar_saude(processador.client, outro)
+
+        fora = carregar_backend("local", self.ambiente)
+        processador = ProcessadorOficio(fora.api_key, {}, backend=fora)
+        processador.client = processador.client.with_options(max_retries=0, timeout=2)
+        with pytest.raises(RuntimeError, match="inacessível"):
+            verificar_saude(processador.client, fora)
+
+    def test_extracao_no_backend_local(self):
+        """Teste extração usa modelo, json_object e instruções compactas do backend"""
+        with ServidorOpenAIFalso(RESPOSTA_LLM) as servidor:
+            backend = carregar_backend("local", {**self.ambiente, "LOCAL_LLM_BASE_URL": servidor.base_url})
+            processador = ProcessadorOficio(backend.api_key, {}, backend=backend)
+
+            dados = processador._extrair_dados_llm("OFÍCIO REQUISITÓRIO " + "x" * 1000)
+
+        assert dados["requerente_caps"] == "REGINA APARECIDA NARDES GARCIA DIAS"
+        requisicao = servidor.requisicoes[0]
+        assert requisicao["model"] == "modelo-local"
+        assert requisicao["response_format"] == {"type": "json_object"}
+        assert requisicao["messages"][0]["content"] == INSTRUCOES_EXTRACAO_COMPACTA
+        assert len(INSTRUCOES_EXTRACAO_COMPACTA) < len(INSTRUCOES_EXTRACAO)
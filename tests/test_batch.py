@@ -0,0 +1,141 @@
+"""
+Testes do modo Batch API (preparar → enviar/aguardar → mesclar).
+Usa servidor local que emula /v1/files e /v1/batches.
+"""
+
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from openai import OpenAI
+
+from app import batch
+from app.processador import ProcessadorOficio
+from app.schemas import PayloadExtracao
+from tests import fabricas
+from tests.stub_openai import ServidorOpenAIFalso
+
+
+# Número de ordem só do título: a extração síncrona e a do batch completam igual
+RESPOSTA_LLM = {**fabricas.RESPOSTA_LLM, "numero_ordem": None}
+
+
+def criar_payload(cpf: str) -> PayloadExtracao:
+    """Payload da detecção com o número de ordem do título"""
+    return fabricas.criar_payload(cpf, numero_ordem_titulo="644/2015")
+
+
+class TestBatch:
+    """Testes do ciclo de vida do batch"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        with patch('app.processador.OpenAI'):
+            self.processador = ProcessadorOficio("sk-test-key", {})
+
+    def test_ciclo_completo_com_servidor_local(self, tmp_path):
+        """Teste preparar → enviar → aguardar → baixar → mesclar"""
+        payloads = [criar_payload("11671377877"), criar_payload("10493829865")]
+
+        with ServidorOpenAIFalso(RESPOSTA_LLM) as servidor:
+            client = OpenAI(api_key="sk-test", base_url=servidor.base_url)
+            self.processador.client = client
+
+            total = batch.escrever_requisicoes(payloads, self.processador, tmp_path)
+            batch_id = batch.enviar_lote(client, tmp_path)
+            lote = batch.aguardar_lote(client, batch_id, tmp_path, intervalo=0)
+            batch.baixar_respostas(client, lote, tmp_path)
+
+        assert total == 2
+        assert lote.status == "completed"
+        assert batch.ler_estado(tmp_path)["status"] == "completed"
+
+        payloads_lidos = batch.ler_payloads(tmp_path)
+        respostas = batch.ler_respostas(tmp_path)
+        assert set(respostas) == set(payloads_lidos) == {p.id_requisicao for p in payloads}
+
+        for custom_id, payload in payloads_lidos.items():
+            resultado = self.processador.concluir_resposta_llm(payload, respostas[custom_id]["conteudo"])
+            assert resultado["sucesso"] is True
+            assert resultado["modelo"] == "batch"
+            assert resultado["cpf"] == payload.cpf
+            # Número de ordem do título entra pelo mesmo complemento da extração síncrona
+            assert resultado["dados"]["numero_ordem"] == "644/2015"
+            assert resultado["dados"]["valor_principal_bruto"] == Decimal("37993.13")
+
+    def test_requisicao_usa_schema_strict(self, tmp_path):
+        """Teste corpo da requisição do batch usa structured outputs"""
+        batch.escrever_requisicoes([criar_payload("11671377877")], self.processador, tmp_path)
+
+        with open(tmp_path / batch.ARQUIVO_REQUISICOES, encoding='utf-8') as f:
+            requisicao = json.loads(f.readline())
+
+        assert requisicao["url"] == batch.ENDPOINT_CHAT
+        assert requisicao["custom_id"] == "abc123-11671377877-0035938-67.2018.8.26.0053"
+        assert requisicao["body"]["response_format"]["type"] == "json_schema"
+        assert requisicao["body"]["model"] == self.processador.modelo_gpt
+
+    def test_mesmo_pdf_com_dois_nomes_na_pasta(self, tmp_path):
+        """Teste cópias idênticas na mesma pasta de CPF: um custom_id por arquivo"""
+        payloads = [
+            criar_payload("11671377877"),
+            criar_payload("11671377877").model_copy(update={"pdf": "copia.pdf"})
+        ]
+
+        batch.escrever_requisicoes(payloads, self.processador, tmp_path)
+
+        with open(tmp_path / batch.ARQUIVO_REQUISICOES, encoding='utf-8') as f:
+            custom_ids = [json.loads(linha)["custom_id"] for linha in f]
+        assert len(set(custom_ids)) == 2
+        assert set(batch.ler_payloads(tmp_path)) == set(custom_ids)
+
+    def test_ler_respostas_com_erro(self, tmp_path):
+        """Teste linha de erro do batch vira resposta sem conteúdo"""
+        linha = {
+            "custom_id": "abc123-11671377877",
+            "response": {"status_code": 429, "body": {"error": {"message": "rate limit"}}},
+            "error": None
+        }
+        (tmp_path / batch.ARQUIVO_RESPOSTAS).write_text(json.dumps(linha) + "\n", encoding='utf-8')
+
+        respostas = batch.ler_respostas(tmp_path)
+
+        assert respostas["abc123-11671377877"]["conteudo"] is None
+        assert "rate limit" in respostas["abc123-11671377877"]["erro"]
+
+    def test_oficio_gigante_uma_requisicao_por_bloco(self, tmp_path):
+        """Teste payload com blocos: requisição por bloco e parciais mesclados na mesclagem"""
+        payload = criar_payload("11671377877")
+        payload.blocos = ["OFÍCIO ... páginas 1-40", "OFÍCIO ... páginas 41-80"]
+
+        total = batch.escrever_requisicoes([payload], self.processador, tmp_path)
+
+        with open(tmp_path / batch.ARQUIVO_REQUISICOES, encoding='utf-8') as f:
+            requisicoes = [json.loads(linha) for linha in f]
+        assert total == 2
+        assert [r["custom_id"] for r in requisicoes] == [
+            "abc123-11671377877-0035938-67.2018.8.26.0053#bloco0",
+            "abc123-11671377877-0035938-67.2018.8.26.0053#bloco1"
+        ]
+        assert "páginas 41-80" in json.dumps(requisicoes[1]["body"]["messages"], ensure_ascii=False)
+
+        campos_bloco0 = ("processo_origem", "requerente_caps")
+        respostas = {
+            requisicoes[0]["custom_id"]: {
+                "conteudo": json.dumps({k: v for k, v in RESPOSTA_LLM.items() if k in campos_bloco0}),
+                "erro": None
+            },
+            requisicoes[1]["custom_id"]: {
+                "conteudo": json.dumps({k: v for k, v in RESPOSTA_LLM.items() if k not in campos_bloco0}),
+                "erro": None
+            }
+        }
+        payload_lido = batch.ler_payloads(tmp_path)[payload.id_requisicao]
+        resultado = batch.mesclar_payload(payload_lido, respostas, self.processador)
+
+        assert resultado["sucesso"] is True
+        assert resultado["dados"]["requerente_caps"] == RESPOSTA_LLM["requerente_caps"]
+        assert resultado["dados"]["valor_principal_bruto"] == Decimal("37993.13")
+
+        sem_resposta = batch.mesclar_payload(payload_lido, {}, self.processador)
+        assert sem_resposta["sucesso"] is False
@@ -0,0 +1,119 @@
+"""
+Testes da coalescência de chamadas em voo (single-flight).
+"""
+
+import json
+import time
+import threading
+from unittest.mock import Mock, patch
+
+from app.coalescencia import ChamadasEmVoo, chave_requisicao
+from app.processador import ProcessadorOficio
+
+
+def aguardar(condicao, timeout: float = 5.0):
+    """Espera ativa até a condição valer (threads do teste)"""
+    limite = time.time() + timeout
+    while not condicao():
+        assert time.time() < limite, "timeout aguardando condição"
+        time.sleep(0.01)
+
+
+class TestCoalescencia:
+    """Testes do single-flight"""
+
+    def test_chamadas_identicas_compartilham_execucao(self):
+        """Teste segunda chamada com a mesma chave espera e recebe o mesmo resultado"""
+        voo = ChamadasEmVoo()
+        liberar = threading.Event()
+        execucoes = []
+
+        def funcao():
+            execucoes.append(1)
+            liberar.wait(5)
+            return {"ok": True}
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(voo.executar("chave", funcao)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        aguardar(lambda: voo.coalescidas == 2)
+        liberar.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(execucoes) == 1
+        assert sorted(compartilhado for _, compartilhado in resultados) == [False, True, True]
+        assert all(resultado == {"ok": True} for resultado, _ in resultados)
+        assert voo.em_voo() == 0
+
+        # Sem cache: terminada a chamada, a próxima executa de novo
+        voo.executar("chave", funcao)
+        assert len(execucoes) == 2
+
+    def test_erro_propagado_para_quem_aguarda(self):
+        """Teste exceção da execução compartilhada chega a todos"""
+        voo = ChamadasEmVoo()
+        liberar = threading.Event()
+        erros = []
+
+        def funcao():
+            liberar.wait(5)
+            raise RuntimeError("429 rate limit")
+
+        def chamar():
+            try:
+                voo.executar("chave", funcao)
+            except RuntimeError as e:
+                erros.append(str(e))
+
+        threads = [threading.Thread(target=chamar) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        aguardar(lambda: voo.coalescidas == 1)
+        liberar.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert erros == ["429 rate limit", "429 rate limit"]
+
+    def test_processador_mesmo_texto_em_cpfs_diferentes(self):
+        """Teste mesmo texto em duas threads → uma chamada à API, tokens contados uma vez"""
+        with patch('app.processador.OpenAI'):
+            processador = ProcessadorOficio("sk-test-key", {})
+
+        liberar = threading.Event()
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = json.dumps({"processo_origem": "0035938-67.2018.8.26.0053"})
+        mock_response.usage.prompt_tokens = 2000
+        mock_response.usage.completion_tokens = 100
+        mock_response.usage.prompt_tokens_details.cached_tokens = 0
+
+        def criar(**kwargs):
+            liberar.wait(5)
+            return mock_response
+
+        processador.client = Mock()
+        processador.client.chat.completions.create.side_effect = criar
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(processador._extrair_dados_llm("MESMO TEXTO")))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        aguardar(lambda: processador.chamadas_em_voo.coalescidas == 1)
+        liberar.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert processador.client.chat.completions.create.call_count == 1
+        assert [r["processo_origem"] for r in resultados] == ["0035938-67.2018.8.26.0053"] * 2
+        assert processador.estatisticas_llm["tokens_prompt"] == 2000
+        assert processador.estatisticas_llm["coalescidas"] == 1
+        assert chave_requisicao({"a": 1, "b": 2}) == chave_requisicao({"b": 2, "a": 1})
@@ -0,0 +1,131 @@
+"""
+Testes da concorrência adaptativa (ajuste do limite e execução com limite).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.concorrencia import ControleConcorrencia, executar_adaptativo
+from app.processador import ProcessadorOficio
+
+
+class RelogioFalso:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class TestControleConcorrencia:
+    """Testes das regras de ajuste"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.relogio = RelogioFalso()
+        self.controle = ControleConcorrencia(inicial=4, maximo=16, janela=10, relogio=self.relogio)
+
+    def janela(self, concluidas, **sinais):
+        """Fecha uma janela de 10s com `concluidas` tarefas"""
+        for _ in range(concluidas):
+            self.controle.concluida()
+        self.relogio.agora += 10
+        assert self.controle.hora_de_avaliar()
+        return self.controle.avaliar(**sinais)
+
+    def test_sobe_enquanto_vazao_melhora(self):
+        """Teste vazão crescente aumenta o limite uma unidade por janela"""
+        assert self.janela(10) == 5
+        assert self.janela(20) == 6
+        assert self.janela(30) == 7
+
+    def test_vazao_caiu_inverte_direcao(self):
+        """Teste passou do ponto ótimo: recua e continua recuando se melhorar"""
+        self.janela(10)
+        self.janela(20)
+
+        assert self.janela(15) == 5
+        assert self.janela(18) == 4
+
+    def test_429_corta_pela_metade(self):
+        """Teste throttling do LLM corta o limite pela metade"""
+        self.janela(10)
+        self.controle.limitada()
+
+        assert self.janela(10) == 2
+        assert self.controle.relatorio()["cortes_429"] == 1
+
+    def test_cpu_e_latencia_recuam(self):
+        """Teste CPU saturada e latência p95 acima do dobro da referência"""
+        assert self.janela(10, latencia_p95=1.0) == 5
+        assert self.janela(20, uso_cpu=0.97) == 4
+        assert self.janela(30, latencia_p95=2.5) == 3
+
+    def test_fila_vazia_mantem(self):
+        """Teste sem tarefas esperando o limite não sobe"""
+        assert self.janela(10, fila=0) == 4
+        assert self.controle.ajustes == 0
+
+    def test_limites(self):
+        """Teste limite preso entre mínimo e máximo"""
+        controle = ControleConcorrencia(inicial=50, maximo=8, relogio=self.relogio)
+        assert controle.limite == 8
+
+        controle.limitada()
+        self.relogio.agora += 100
+        assert controle.avaliar() == 4
+        for _ in range(3):
+            controle.limitada()
+            self.relogio.agora += 100
+            controle.avaliar()
+        assert controle.limite == 1
+
+
+class TestExecutarAdaptativo:
+    """Testes da execução com limite de tarefas em voo"""
+
+    def test_ordem_e_limite_em_voo(self):
+        """Teste resultados na ordem dos itens e no máximo `limite` simultâneas"""
+        controle = ControleConcorrencia(inicial=3, maximo=8, janela=3600)
+        trava = threading.Lock()
+        estado = {"em_voo": 0, "maximo": 0}
+
+        def tarefa(item):
+            with trava:
+                estado["em_voo"] += 1
+                estado["maximo"] = max(estado["maximo"], estado["em_voo"])
+            time.sleep(0.01 * (item % 3))
+            with trava:
+                estado["em_voo"] -= 1
+            return item * 2
+
+        with ThreadPoolExecutor(max_workers=controle.maximo) as executor:
+            resultados = list(executar_adaptativo(executor, tarefa, range(20), controle))
+
+        assert resultados == [item * 2 for item in range(20)]
+        assert estado["maximo"] <= 3
+
+    def test_ordem_de_conclusao_entrega_cada_item_uma_vez(self):
+        """Teste ordenado=False: um resultado por item, sem repetir"""
+        controle = ControleConcorrencia(inicial=2, maximo=4, janela=3600)
+
+        with ThreadPoolExecutor(max_workers=controle.maximo) as executor:
+            resultados = list(executar_adaptativo(executor, lambda x: x * 10, range(5), controle, ordenado=False))
+
+        assert len(resultados) == 5
+        assert sorted(resultados) == [0, 10, 20, 30, 40]
+
+    def test_pool_do_llm_acompanha_concorrencia(self):
+        """Teste pool do LLM com vaga para cada bloco e duplicata no limite máximo"""
+        with patch("app.processador.OpenAI"):
+            processador = ProcessadorOficio("sk-test-key", {})
+        controle = ControleConcorrencia(inicial=4, maximo=32)
+
+        processador.definir_concorrencia(controle.maximo, controle)
+
+        assert processador.controle_concorrencia is controle
+        assert processador._executor_llm._max_workers == 2 * 32 * processador.maximo_blocos_paralelos
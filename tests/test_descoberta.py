@@ -0,0 +1,81 @@
+"""
+Testes da descoberta do corpus (scandir paralelo + manifesto por mtime).
+"""
+
+import os
+from unittest.mock import patch
+
+from app import descoberta
+from app.descoberta import ManifestoCorpus, descobrir
+
+
+def criar_corpus(raiz, pastas):
+    """Cria <raiz>/<pasta>/<pdf> com conteúdo vazio"""
+    for pasta, pdfs in pastas.items():
+        (raiz / pasta).mkdir(parents=True, exist_ok=True)
+        for pdf in pdfs:
+            (raiz / pasta / pdf).write_bytes(b"%PDF-1.4")
+
+
+def envelhecer(raiz):
+    """mtime das pastas no passado (fora da margem de mudança recente)"""
+    for pasta in raiz.iterdir():
+        os.utime(pasta, ns=(10**18, 10**18))
+
+
+class TestDescoberta:
+    """Testes da descoberta de PDFs"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.pastas = {
+            "10493829865": ["a.pdf", "b.pdf", "notas.txt"],
+            "11671377877": ["c.pdf"],
+        }
+
+    def test_mesmo_resultado_do_glob(self, tmp_path):
+        """Teste mesmos PDFs que glob("*/*.pdf")"""
+        criar_corpus(tmp_path, {**self.pastas, ".cache": ["d.pdf", ".oculto.pdf"], "x.pdf": []})
+        (tmp_path / "solto.pdf").write_bytes(b"%PDF-1.4")
+
+        assert sorted(descobrir(tmp_path)) == sorted(tmp_path.glob("*/*.pdf"))
+
+    def test_manifesto_rele_so_pastas_alteradas(self, tmp_path):
+        """Teste segunda varredura: só a pasta com PDF novo é relida"""
+        corpus = tmp_path / "consultas"
+        criar_corpus(corpus, self.pastas)
+        envelhecer(corpus)
+        caminho = tmp_path / "manifesto_pdfs.json"
+
+        manifesto = ManifestoCorpus(caminho)
+        list(descobrir(corpus, manifesto))
+        manifesto.salvar()
+        assert manifesto.estatisticas["pastas_lidas"] == 2
+
+        (corpus / "11671377877" / "e.pdf").write_bytes(b"%PDF-1.4")
+        os.utime(corpus / "11671377877", ns=(10**18 + 1, 10**18 + 1))
+
+        relido = ManifestoCorpus(caminho)
+        with patch.object(descoberta, "_listar_pdfs", wraps=descoberta._listar_pdfs) as listar:
+            pdfs = sorted(descobrir(corpus, relido))
+
+        assert listar.call_count == 1
+        assert relido.estatisticas == {"pastas_lidas": 1, "pastas_reaproveitadas": 1}
+        assert corpus / "11671377877" / "e.pdf" in pdfs
+        assert len(pdfs) == 4
+
+    def test_pasta_removida_e_mudanca_recente(self, tmp_path):
+        """Teste pasta apagada sai do manifesto; pasta recém-alterada é relida sempre"""
+        criar_corpus(tmp_path, self.pastas)
+        manifesto = ManifestoCorpus()
+        list(descobrir(tmp_path, manifesto))
+
+        assert manifesto.pastas["10493829865"]["mtime_ns"] is None
+
+        for arquivo in (tmp_path / "11671377877").iterdir():
+            arquivo.unlink()
+        (tmp_path / "11671377877").rmdir()
+        list(descobrir(tmp_path, manifesto))
+
+        assert set(manifesto.pastas) == {"10493829865"}
+        assert manifesto.estatisticas["pastas_reaproveitadas"] == 0
@@ -243,3 +243,16 @@ class TestDetectorOficio:
         for texto in textos_invalidos:
             matches = self.detector.padrao_cnj.findall(texto)
             assert len(matches) == 0, f"Não deveria encontrar CNJ em: {texto}"
+    
+    def test_extrair_requerente_e_processo(self):
+        """Teste extração por regex usada em ofícios rejeitados (sem LLM)"""
+        texto = (
+            "Ref. 1111111-11.2011.8.26.0053\n"
+            "Processo nº: 0035938-67.2018.8.26.0053\n"
+            "Credor(a): Regina Aparecida Dias - CPF 116.713.778-77\n"
+        )
+        
+        assert self.detector.extrair_processo_origem(texto) == "0035938-67.2018.8.26.0053"
+        assert self.detector.extrair_requerente(texto) == "REGINA APARECIDA DIAS"
+        assert self.detector.extrair_requerente("Requerente: 123\n") is None
+        assert self.detector.extrair_processo_origem("sem número") is None
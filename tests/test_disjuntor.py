@@ -0,0 +1,88 @@
+"""
+Testes do disjuntor do LLM e da caixa de saída (store-and-forward).
+"""
+
+from unittest.mock import Mock, patch
+from openai import APIConnectionError
+
+from app.disjuntor import ABERTO, FECHADO, MEIO_ABERTO, CaixaSaida, Disjuntor
+from app.processador import ProcessadorOficio
+from tests.fabricas import RESPOSTA_LLM, criar_payload, resposta
+
+
+class TestDisjuntor:
+    """Testes dos estados do disjuntor e da drenagem da caixa"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.agora = 0.0
+        self.disjuntor = Disjuntor(limite_falhas=2, espera_inicial=10, relogio=lambda: self.agora)
+
+    def test_abre_sonda_e_fecha(self):
+        """Teste falhas seguidas abrem; passada a espera, uma sonda; sucesso fecha"""
+        self.disjuntor.registrar_falha()
+        assert self.disjuntor.estado == FECHADO and self.disjuntor.instavel()
+        self.disjuntor.registrar_falha()
+        assert self.disjuntor.estado == ABERTO
+        assert not self.disjuntor.permitir()
+
+        self.agora = 10
+        assert self.disjuntor.permitir()
+        assert self.disjuntor.estado == MEIO_ABERTO
+        assert not self.disjuntor.permitir()
+
+        # Sonda falhou: reabre com espera dobrada
+        self.disjuntor.registrar_falha()
+        assert self.disjuntor.segundos_para_sonda() == 20
+
+        self.agora = 30
+        assert self.disjuntor.permitir()
+        self.disjuntor.registrar_sucesso()
+        assert self.disjuntor.estado == FECHADO and not self.disjuntor.instavel()
+        assert self.disjuntor.aberturas == 2
+
+    def test_payload_adiado_e_drenado(self, tmp_path):
+        """Teste queda do LLM guarda o payload; com o LLM de volta a caixa é drenada"""
+        with patch('app.processador.OpenAI'):
+            processador = ProcessadorOficio("sk-test-key", {})
+        processador.disjuntor = self.disjuntor
+        processador.caixa_saida = CaixaSaida(tmp_path / "caixa")
+        processador.client = Mock()
+        processador.client.chat.completions.create.side_effect = APIConnectionError(request=Mock())
+
+        resultados = [processador.processar_payload(criar_payload(cpf)) for cpf in ["11671377877", "10493829865"]]
+
+        assert all(r["adiado"] and not r["sucesso"] for r in resultados)
+        assert self.disjuntor.estado == ABERTO
+        assert len(processador.caixa_saida) == 2
+
+        # Aberto: nem chama a API, terceiro PDF vai direto para a caixa
+        chamadas = processador.client.chat.completions.create.call_count
+        assert processador.processar_payload(criar_payload("12345678909"))["adiado"]
+        assert processador.client.chat.completions.create.call_count == chamadas
+        assert processador.drenar_caixa_saida() == []
+
+        # LLM de volta: passada a espera, a sonda fecha o disjuntor e a caixa esvazia
+        processador.client.chat.completions.create.side_effect = None
+        processador.client.chat.completions.create.return_value = resposta(RESPOSTA_LLM, prompt_tokens=2000, completion_tokens=100)
+        self.agora = 10
+
+        drenados = processador.drenar_caixa_saida()
+
+        assert [r["sucesso"] for r in drenados] == [True, True, True]
+        assert len(processador.caixa_saida) == 0
+        assert processador.estatisticas_caixa == {"adiados": 3, "drenados": 3}
+
+    def test_erro_do_pedido_nao_adia(self, tmp_path):
+        """Teste erro que não é de disponibilidade continua sendo falha normal"""
+        with patch('app.processador.OpenAI'):
+            processador = ProcessadorOficio("sk-test-key", {})
+        processador.caixa_saida = CaixaSaida(tmp_path / "caixa")
+        processador.client = Mock()
+        processador.client.chat.completions.create.side_effect = ValueError("resposta inesperada")
+
+        resultado = processador.processar_payload(criar_payload("11671377877"))
+
+        assert resultado["erro"] == "Falha na extração LLM"
+        assert not resultado.get("adiado")
+        assert len(processador.caixa_saida) == 0
@@ -0,0 +1,97 @@
+"""
+Testes do empacotamento de documentos curtos (vários ofícios por chamada).
+"""
+
+import json
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from app import empacotamento
+from app.processador import ProcessadorOficio
+from tests.fabricas import criar_payload, resposta
+
+
+def dados_oficio(requerente: str, bruto: float = 150) -> dict:
+    """Resposta válida e consistente para um documento"""
+    return {
+        "processo_origem": "0035938-67.2018.8.26.0053",
+        "requerente_caps": requerente,
+        "valor_principal_liquido": 100,
+        "valor_principal_bruto": bruto,
+        "juros_moratorios": 50,
+        "valor_total_requisitado": bruto
+    }
+
+
+class TestEmpacotamento:
+    """Testes de agrupamento e demultiplexação"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        with patch('app.processador.OpenAI'):
+            self.processador = ProcessadorOficio("sk-test-key", {})
+        self.client = Mock()
+        self.processador.client = self.client
+
+    def test_agrupar_respeita_orcamento(self):
+        """Teste pacotes não passam do orçamento de tokens nem do máximo de documentos"""
+        payloads = [criar_payload(str(i), "x" * 2000) for i in range(5)]  # ~500 tokens cada
+
+        pacotes = empacotamento.agrupar(payloads, orcamento_tokens=1100, maximo_documentos=8)
+
+        assert [len(p) for p in pacotes] == [2, 2, 1]
+        assert [p.cpf for pacote in pacotes for p in pacote] == [str(i) for i in range(5)]
+        assert not empacotamento.elegivel(criar_payload("1", "x" * 10000))
+
+    def test_separar_respostas_descarta_id_desconhecido(self):
+        """Teste demultiplexação por id_documento"""
+        conteudo = json.dumps({"documentos": [
+            {"id_documento": "doc2", **dados_oficio("MARIA")},
+            {"id_documento": "doc9", **dados_oficio("INTRUSO")},
+            {"id_documento": "doc1", **dados_oficio("JOSE")}
+        ]})
+
+        respostas = empacotamento.separar_respostas(conteudo, ["doc1", "doc2"])
+
+        assert set(respostas) == {"doc1", "doc2"}
+        assert respostas["doc1"]["requerente_caps"] == "JOSE"
+        assert "id_documento" not in respostas["doc2"]
+
+    def test_processar_pacote_uma_chamada(self):
+        """Teste pacote resolve todos os documentos numa única chamada"""
+        payloads = [criar_payload("11671377877"), criar_payload("10493829865")]
+        self.client.chat.completions.create.return_value = resposta(json.dumps({"documentos": [
+            {"id_documento": "doc1", **dados_oficio("JOSE")},
+            {"id_documento": "doc2", **dados_oficio("MARIA")}
+        ]}))
+
+        resultados = self.processador.processar_pacote(payloads)
+
+        assert self.client.chat.completions.create.call_count == 1
+        assert [r["cpf"] for r in resultados] == ["11671377877", "10493829865"]
+        assert [r["dados"]["requerente_caps"] for r in resultados] == ["JOSE", "MARIA"]
+        assert all(r["modelo"] == "pacote" for r in resultados)
+
+        kwargs = self.client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["json_schema"]["name"] == "pacote_oficios"
+        assert "DOCUMENTO doc2" in kwargs["messages"][1]["content"]
+
+    def test_processar_pacote_fallback_individual(self):
+        """Teste documento ausente/inconsistente no pacote cai para chamada individual"""
+        payloads = [criar_payload("11671377877"), criar_payload("10493829865")]
+        self.client.chat.completions.create.side_effect = [
+            # Pacote: doc1 inconsistente (bruto ≠ líquido + juros), doc2 ausente
+            resposta(json.dumps({"documentos": [
+                {"id_documento": "doc1", **dados_oficio("JOSE", bruto=999)}
+            ]})),
+            resposta(json.dumps(dados_oficio("JOSE"))),
+            resposta(json.dumps(dados_oficio("MARIA")))
+        ]
+
+        resultados = self.processador.processar_pacote(payloads)
+
+        assert self.client.chat.completions.create.call_count == 3
+        assert [r["sucesso"] for r in resultados] == [True, True]
+        assert resultados[0]["dados"]["valor_principal_bruto"] == Decimal("150.00")
+        assert resultados[1]["dados"]["requerente_caps"] == "MARIA"
+        assert self.processador.estatisticas_pacotes == {"pacotes": 1, "documentos": 0, "fallbacks": 2}
@@ -0,0 +1,70 @@
+"""
+Testes das etapas desacopladas (A: detecção → payloads, B: payloads → LLM).
+"""
+
+import json
+import shutil
+from unittest.mock import Mock, patch
+
+from app import etapas
+from app.preflight import farejar
+from app.processador import ProcessadorOficio
+from tests import fabricas
+from tests.test_paginas import criar_pdf_dois_oficios
+
+
+RESPOSTA_LLM = {**fabricas.RESPOSTA_LLM, "requerente_caps": "JOSE SILVA"}
+
+
+class TestEtapas:
+    """Testes da etapa A em disco e da etapa B sem PDFs"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        with patch('app.processador.OpenAI'):
+            self.processador = ProcessadorOficio("sk-test-key", {})
+
+    def test_etapa_b_sem_pdfs(self, tmp_path):
+        """Teste payloads gravados na etapa A bastam para a etapa B (PDFs apagados)"""
+        entrada = tmp_path / "entrada"
+        original = entrada / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(original)
+        invalido = entrada / "00000000000" / original.name
+        invalido.parent.mkdir()
+        shutil.copy(original, invalido)
+
+        diretorio = tmp_path / "etapas"
+        progresso = list(etapas.detectar([(None, [original]), (None, [invalido])], diretorio, trabalhadores=1))
+
+        assert progresso[-1] == (1, 1)
+        payload_json = next((diretorio / etapas.DIRETORIO_PAYLOADS).glob("*.json")).read_text()
+        assert "blocos" not in json.loads(payload_json)  # padrões omitidos
+        assert len(etapas.ler_resultados_deteccao(diretorio)) == 1
+
+        shutil.rmtree(entrada)
+
+        self.processador.client = Mock()
+        self.processador.client.chat.completions.create.return_value = fabricas.resposta(RESPOSTA_LLM)
+
+        resultados = list(etapas.extrair(diretorio, self.processador, concorrencia=2))
+
+        assert len(resultados) == 1
+        assert resultados[0]["sucesso"]
+        assert resultados[0]["cpf"] == "10493829865"
+        assert resultados[0]["dados"]["requerente_caps"] == "JOSE SILVA"
+
+        # Etapa B pode ser repetida: payloads continuam no diretório
+        assert len(list(etapas.extrair(diretorio, self.processador))) == 1
+
+    def test_etapa_a_fareja_uma_vez(self, tmp_path):
+        """Teste cabeçalho/trailer lidos só no processo principal (trabalhador recebe o farejo)"""
+        original = tmp_path / "entrada" / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(original)
+        contador = Mock(wraps=farejar)
+
+        with patch("app.etapas.farejar", contador), patch("app.processador.farejar", contador), \
+                patch("app.preflight.farejar", contador):
+            progresso = list(etapas.detectar([(None, [original])], tmp_path / "etapas", trabalhadores=1))
+
+        assert progresso[-1] == (1, 0)
+        assert contador.call_count == 1
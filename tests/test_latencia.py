@@ -0,0 +1,103 @@
+"""
+Testes de timeouts adaptativos e requisições com hedge.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.latencia import (
+    ControleLatencia, executar_com_hedge,
+    TIMEOUT_PADRAO, TIMEOUT_MINIMO, TIMEOUT_MAXIMO
+)
+
+
+class TestLatencia:
+    """Testes do histograma e do hedge"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def teardown_method(self):
+        self.executor.shutdown(wait=False)
+
+    def test_timeout_adaptativo(self):
+        """Teste timeout padrão sem histórico, depois p99 × fator dentro dos limites"""
+        controle = ControleLatencia(minimo_amostras=5)
+        assert controle.timeout() == TIMEOUT_PADRAO
+        assert controle.atraso_hedge() is None
+
+        for segundos in [2, 2, 3, 3, 10]:
+            controle.registrar(segundos)
+        assert controle.percentil(50) == 3
+        assert controle.timeout() == 30
+
+        rapido = ControleLatencia(minimo_amostras=1)
+        rapido.registrar(0.5)
+        assert rapido.timeout() == TIMEOUT_MINIMO
+
+        lento = ControleLatencia(minimo_amostras=1)
+        lento.registrar(500)
+        assert lento.timeout() == TIMEOUT_MAXIMO
+
+    def test_orcamento_limita_duplicatas(self):
+        """Teste duplicatas limitadas à fração das chamadas"""
+        controle = ControleLatencia(fracao_hedge=0.1)
+        controle.chamadas = 20
+
+        assert controle.reservar_hedge()
+        assert controle.reservar_hedge()
+        assert not controle.reservar_hedge()
+        assert controle.hedges == 2
+
+    def test_duplicata_vence_chamada_lenta(self):
+        """Teste primeira chamada presa passa do p95 → duplicata responde primeiro"""
+        controle = ControleLatencia(minimo_amostras=1, fracao_hedge=1.0)
+        controle.registrar(0.05)
+        liberar = threading.Event()
+        chamadas = []
+
+        def funcao():
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                liberar.wait(5)
+                return "lenta"
+            return "duplicata"
+
+        inicio = time.time()
+        resultado, veio_do_hedge = executar_com_hedge(self.executor, funcao, controle)
+        liberar.set()
+
+        assert resultado == "duplicata"
+        assert veio_do_hedge
+        assert time.time() - inicio < 2
+        assert controle.hedges == 1
+        assert controle.hedges_vencedores == 1
+
+    def test_sem_orcamento_espera_original(self):
+        """Teste sem orçamento de hedge a chamada original é aguardada"""
+        controle = ControleLatencia(minimo_amostras=1, fracao_hedge=0.0)
+        controle.registrar(0.01)
+
+        def funcao():
+            time.sleep(0.1)
+            return "original"
+
+        assert executar_com_hedge(self.executor, funcao, controle) == ("original", False)
+        assert controle.hedges == 0
+
+    def test_fila_do_pool_nao_dispara_duplicata(self):
+        """Teste chamada parada na fila do pool cheio não conta para o p95"""
+        controle = ControleLatencia(minimo_amostras=1, fracao_hedge=1.0)
+        controle.registrar(0.05)
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(time.sleep, 0.3)
+
+        def funcao():
+            time.sleep(0.01)
+            return "original"
+
+        assert executar_com_hedge(executor, funcao, controle) == ("original", False)
+        assert controle.hedges == 0
+        executor.shutdown()
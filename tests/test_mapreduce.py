@@ -0,0 +1,91 @@
+"""
+Testes do map-reduce para ofícios gigantes.
+"""
+
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from app import mapreduce
+from app.processador import ProcessadorOficio
+from app.schemas import PayloadExtracao
+from tests.fabricas import resposta
+
+
+class TestMapReduce:
+    """Testes de divisão em blocos, mesclagem e extração paralela"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        with patch('app.processador.OpenAI'):
+            self.processador = ProcessadorOficio("sk-test-key", {})
+
+    def test_dividir_paginas_sem_descartar(self):
+        """Teste blocos respeitam o orçamento e cobrem todas as páginas"""
+        paginas = [(numero, "x" * 4000) for numero in range(1, 121)]  # ~1000 tokens cada
+
+        blocos = mapreduce.dividir_paginas(paginas, orcamento_tokens=10_000)
+
+        assert len(blocos) > 1
+        assert all(mapreduce.estimar_tokens(bloco) <= 10_000 for bloco in blocos)
+        texto = "".join(blocos)
+        assert all(f"--- PÁGINA {numero} ---" in texto for numero in range(1, 121))
+
+    def test_mesclar_valores_do_mesmo_bloco(self):
+        """Teste valores vêm juntos do bloco consistente; banco prefere seções anexas"""
+        parciais = [
+            {"processo_origem": "0035938-67.2018.8.26.0053", "requerente_caps": None,
+             "valor_principal_liquido": 100, "valor_principal_bruto": 999,
+             "juros_moratorios": None, "valor_total_requisitado": None, "banco": "001", "idoso": False},
+            {"processo_origem": None, "requerente_caps": "REGINA DIAS",
+             "valor_principal_liquido": 100, "valor_principal_bruto": 150,
+             "juros_moratorios": 50, "valor_total_requisitado": 150, "banco": None, "idoso": True}
+        ]
+        anexos = [{"banco": "341", "numero_ordem": "644/2015"}]
+
+        dados = mapreduce.mesclar_parciais(parciais, anexos)
+
+        assert dados["processo_origem"] == "0035938-67.2018.8.26.0053"
+        assert dados["requerente_caps"] == "REGINA DIAS"
+        assert dados["valor_principal_bruto"] == 150
+        assert dados["juros_moratorios"] == 50
+        assert dados["banco"] == "341"
+        assert dados["numero_ordem"] == "644/2015"
+        assert dados["idoso"] is True
+
+    def test_extrair_mapreduce_blocos_em_paralelo(self):
+        """Teste cada bloco vira uma chamada e o resultado é mesclado"""
+        def responder(**kwargs):
+            conteudo = kwargs["messages"][1]["content"]
+            assert "TRECHO" in conteudo
+            if mapreduce.MARCADOR_ANEXOS in conteudo:
+                return resposta({"numero_ordem": "644/2015", "banco": "341"})
+            if "PÁGINA 1 ---" in conteudo:
+                return resposta({"processo_origem": "0035938-67.2018.8.26.0053",
+                                 "requerente_caps": "REGINA DIAS"})
+            return resposta({"valor_principal_liquido": 100, "valor_principal_bruto": 150,
+                             "juros_moratorios": 50, "valor_total_requisitado": 150})
+
+        self.processador.client = Mock()
+        self.processador.client.chat.completions.create.side_effect = responder
+
+        payload = PayloadExtracao(
+            cpf="11671377877",
+            pdf="gigante.pdf",
+            pdf_path="/dados/11671377877/gigante.pdf",
+            hash_pdf="abc123",
+            texto="texto reduzido",
+            blocos=[
+                "--- PÁGINA 1 ---\n\ncabeçalho",
+                "--- PÁGINA 150 ---\n\nvalores",
+                mapreduce.bloco_anexos("=== ANEXO II ===\nBanco 341")
+            ]
+        )
+
+        resultado = self.processador.processar_payload(payload)
+
+        assert self.processador.client.chat.completions.create.call_count == 3
+        assert self.processador.estatisticas_llm["chamadas"] == 3
+        assert resultado["sucesso"] is True
+        assert resultado["modelo"] == "mapreduce"
+        assert resultado["dados"]["numero_ordem"] == "644/2015"
+        assert resultado["dados"]["valor_principal_bruto"] == Decimal("150.00")
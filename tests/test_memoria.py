@@ -0,0 +1,88 @@
+"""
+Testes do modo de memória limitada (faixas de páginas, LRU de textos, pico por PDF).
+"""
+
+from unittest.mock import patch
+
+from app.detector import DetectorOficio
+from app.memoria import MedicaoMemoria, pico_rss_mb
+from app.paginas import DocumentoPaginas, FaixaOficio
+from app.processador import ProcessadorOficio
+from tests.test_paginas import criar_pdf_dois_oficios, criar_pdf_longo
+
+
+class TestMemoriaLimitada:
+    """Testes dos ofícios como faixas de páginas e do limite de textos guardados"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.detector = DetectorOficio()
+
+    def test_faixa_junta_texto_no_formato_de_sempre(self, tmp_path):
+        """Teste texto da faixa igual ao concatenado página a página"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho)
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            faixa = FaixaOficio(documento, [21, 22, 23])
+            esperado = (
+                documento.texto(20)
+                + f"\n\n--- PÁGINA 22 ---\n\n{documento.texto(21)}"
+                + f"\n\n--- PÁGINA 23 ---\n\n{documento.texto(22)}"
+            )
+
+            assert faixa["texto"] == esperado
+            assert faixa["pagina_inicio"] == 21
+            assert dict(faixa) == {"pagina_inicio": 21, "paginas": [21, 22, 23], "texto": esperado}
+
+    def test_limite_de_paginas_mesmos_oficios(self, tmp_path):
+        """Teste LRU de textos: no máximo N páginas guardadas e mesmo resultado da detecção"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho)
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            completo = [dict(oficio) for oficio in self.detector.buscar_todos_oficios(str(caminho), paginas=documento)]
+
+        with DocumentoPaginas(str(caminho), max_paginas_memoria=4) as documento:
+            oficios = self.detector.buscar_todos_oficios(str(caminho), paginas=documento)
+            assert len(documento._textos) <= 4
+            assert oficios == completo
+            assert len(documento._textos) <= 4
+
+    def test_texto_definido_nao_e_descartado(self, tmp_path):
+        """Teste texto do OCR fica guardado mesmo com o limite estourado"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho)
+
+        with DocumentoPaginas(str(caminho), max_paginas_memoria=2) as documento:
+            documento.definir_texto(0, "texto do OCR")
+            for indice in range(1, 10):
+                documento.texto(indice)
+
+            assert documento.texto(0) == "texto do OCR"
+            assert len(documento._textos) == 2
+
+    def test_resultado_com_pico_de_memoria(self, tmp_path):
+        """Teste pico de memória registrado no resultado do PDF"""
+        caminho = tmp_path / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(caminho)
+        with patch('app.processador.OpenAI'):
+            processador = ProcessadorOficio("sk-test-key", {})
+        processador.max_paginas_memoria = 1
+
+        with patch.object(processador, 'processar_payload', return_value={"sucesso": True}):
+            resultado = processador.processar_arquivo(str(caminho), "10493829865")
+
+        assert resultado["sucesso"]
+        if pico_rss_mb() is not None:
+            assert resultado["memoria_pico_mb"] > 0
+
+    def test_medicao_sem_suporte(self):
+        """Teste sem /proc nem resource: pico desconhecido, sem erro"""
+        with patch('app.memoria.zerar_pico', return_value=False), \
+             patch('app.memoria.pico_rss_mb', return_value=None):
+            with MedicaoMemoria() as medicao:
+                pass
+
+        assert medicao.pico_mb is None
+        assert not medicao.isolado
@@ -0,0 +1,53 @@
+"""
+Testes do texto normalizado (sem acentos, minúsculas, espaços colapsados).
+"""
+
+from app.detector import DetectorOficio
+from app.detector_processamento import DetectorProcessamento
+from app.normalizacao import TextoNormalizado, normalizar, normalizar_termos
+from app.paginas import DocumentoPaginas
+from tests.test_paginas import criar_pdf_dois_oficios
+
+
+class TestNormalizacao:
+    """Testes da forma normalizada, do mapa de posições e do uso pelos detectores"""
+
+    def test_forma_normalizada_e_mapa(self):
+        """Teste acentos, caixa e quebras de linha; trecho original pela posição"""
+        pagina = TextoNormalizado("  OFÍCIO\n  REQUISITÓRIO Nº 644/2015\tAção")
+
+        assert pagina.texto == "oficio requisitorio nº 644/2015 acao"
+        assert len(pagina.mapa) == len(pagina.texto)
+
+        inicio = pagina.texto.index("requisitorio")
+        assert pagina.trecho_original(inicio, inicio + len("requisitorio")) == "REQUISITÓRIO"
+        assert pagina.trecho_original(0, len("oficio requisitorio")) == "OFÍCIO\n  REQUISITÓRIO"
+
+        assert normalizar_termos(["OFÍCIO", "OFICIO", "Ofício"]) == ["oficio"]
+        assert normalizar(pagina) is pagina
+
+    def test_detectores_sem_variantes_acentuadas(self):
+        """Teste uma grafia por palavra-chave encontra texto sem acentos e quebrado em linhas"""
+        detector = DetectorOficio()
+        texto = (
+            "TRIBUNAL DE JUSTICA DO ESTADO DE SAO PAULO\n"
+            "OFICIO\nREQUISITORIO\n"
+            "AO JUIZO DA 1a VARA DA FAZENDA PUBLICA\n"
+            "Processo: 0035938-67.2018.8.26.0053\n"
+        )
+
+        assert detector._avaliar_criterios(texto) == 3
+        assert DetectorProcessamento().processamento_com_informacao("Processamento com Informacao")
+
+    def test_documento_guarda_normalizado(self, tmp_path):
+        """Teste forma normalizada calculada uma vez e refeita quando o texto muda (OCR)"""
+        caminho = tmp_path / "11671377877" / "p.pdf"
+        criar_pdf_dois_oficios(caminho)
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            primeira = documento.normalizado(0)
+            assert documento.normalizado(0) is primeira
+            assert "oficio requisitorio" in primeira
+
+            documento.definir_texto(0, "Texto do OCR")
+            assert documento.normalizado(0).texto == "texto do ocr"
@@ -0,0 +1,95 @@
+"""
+Testes do OCR seletivo (só páginas sem camada de texto).
+"""
+
+from unittest.mock import patch
+
+import pymupdf
+
+from app.ocr import CacheOCR, MotorOCR
+from app.paginas import DocumentoPaginas
+from app.processador import ProcessadorOficio
+
+
+TEXTO_OCR = (
+    "TRIBUNAL DE JUSTIÇA DO ESTADO DE SÃO PAULO\n"
+    "OFÍCIO REQUISITÓRIO\n"
+    "AO JUÍZO DA 1ª VARA DA FAZENDA PÚBLICA\n"
+    "Processo: 0035938-67.2018.8.26.0053\n"
+    "Requerente: JOSE SILVA\n"
+    "CPF: 104.938.298-65\n"
+)
+
+
+def criar_pdf_misto(caminho):
+    """Página 1 digital (com texto), página 2 digitalizada (só imagem)"""
+    doc = pymupdf.open()
+    doc.new_page().insert_text((50, 60), "Despacho do juízo " * 20, fontsize=8)
+    digitalizada = doc.new_page()
+    imagem = pymupdf.Pixmap(pymupdf.csGRAY, pymupdf.IRect(0, 0, 40, 40), False)
+    imagem.clear_with(200)
+    digitalizada.insert_image(digitalizada.rect, pixmap=imagem)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(caminho))
+    doc.close()
+
+
+def ocr_falso(pdf_path, indices, idioma, dpi):
+    return {indice: TEXTO_OCR for indice in indices}
+
+
+class TestOCR:
+    """Testes da seleção de páginas, cache por hash de página e integração com a detecção"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tessdata = patch("app.ocr.tessdata_disponivel", return_value="/tessdata")
+        self.tessdata.start()
+
+    def teardown_method(self):
+        self.tessdata.stop()
+
+    def test_so_paginas_sem_texto_e_cache(self, tmp_path):
+        """Teste página digital não passa pelo OCR; mesma página em outro PDF vem do cache em disco"""
+        primeiro = tmp_path / "a" / "processo.pdf"
+        criar_pdf_misto(primeiro)
+        segundo = tmp_path / "b" / "outro.pdf"
+        criar_pdf_misto(segundo)
+
+        motor = MotorOCR(trabalhadores=1, cache=CacheOCR(tmp_path / "cache"))
+        with patch("app.ocr.reconhecer_paginas", side_effect=ocr_falso) as reconhecer:
+            with DocumentoPaginas(str(primeiro)) as documento:
+                assert motor.completar(documento) == 1
+                assert documento.texto(1) == TEXTO_OCR
+                assert "Despacho" in documento.texto(0)
+            reconhecer.assert_called_once()
+            assert reconhecer.call_args[0][1] == [1]
+
+            # Outro processo (e outra execução): cache em disco por hash da página
+            outro_motor = MotorOCR(trabalhadores=1, cache=CacheOCR(tmp_path / "cache"))
+            with DocumentoPaginas(str(segundo)) as documento:
+                outro_motor.completar(documento)
+                assert documento.texto(1) == TEXTO_OCR
+            assert reconhecer.call_count == 1
+
+        assert motor.estatisticas == {"paginas_ocr": 1, "paginas_cache": 0}
+        assert outro_motor.estatisticas == {"paginas_ocr": 0, "paginas_cache": 1}
+
+    def test_detectores_leem_texto_do_ocr(self, tmp_path):
+        """Teste ofício digitalizado detectado com OCR (sem OCR: nenhum ofício)"""
+        pdf = tmp_path / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_misto(pdf)
+
+        with patch('app.processador.OpenAI'):
+            processador = ProcessadorOficio("sk-test-key", {})
+
+        payload, resultado_erro = processador.preparar_payload(str(pdf), "10493829865")
+        assert payload is None
+        assert "Nenhum ofício" in resultado_erro["erro"]
+
+        processador.ocr = MotorOCR(trabalhadores=1)
+        with patch("app.ocr.reconhecer_paginas", side_effect=ocr_falso):
+            payload, resultado_erro = processador.preparar_payload(str(pdf), "10493829865")
+
+        assert resultado_erro is None
+        assert payload.paginas_oficio == [2]
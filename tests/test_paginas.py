@@ -0,0 +1,262 @@
+"""
+Testes da segmentação compartilhada entre cópias do mesmo PDF.
+"""
+
+import shutil
+import pytest
+import pymupdf
+from unittest.mock import Mock, patch
+
+from app.detector import DetectorOficio
+from app.detector_anexo import DetectorAnexoII
+from app.detector_processamento import DetectorProcessamento
+from app.paginas import CacheLayouts, DocumentoPaginas, ExtracaoParalela, LayoutPDF, FRACAO_CABECALHO
+from app.processador import ProcessadorOficio
+from processar_lotes_v2 import agrupar_por_conteudo, juntar_copias
+
+
+def criar_pdf_dois_oficios(caminho):
+    """PDF de processo com um ofício por credor (mesmo arquivo para os dois CPFs)"""
+    doc = pymupdf.open()
+    for requerente, cpf in [("REGINA DIAS", "116.713.778-77"), ("JOSE SILVA", "104.938.298-65")]:
+        pagina = doc.new_page()
+        pagina.insert_text((50, 60), (
+            "TRIBUNAL DE JUSTIÇA DO ESTADO DE SÃO PAULO\n"
+            "OFÍCIO REQUISITÓRIO\n"
+            "AO JUÍZO DA 1ª VARA DA FAZENDA PÚBLICA\n"
+            "Processo: 0035938-67.2018.8.26.0053\n"
+            f"Requerente: {requerente}\n"
+            f"CPF: {cpf}\n"
+        ), fontsize=10)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(caminho))
+    doc.close()
+
+
+class TestSegmentacaoCompartilhada:
+    """Testes do cache de layouts"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        with patch('app.processador.OpenAI'):
+            self.processador = ProcessadorOficio("sk-test-key", {})
+
+    def test_layout_sem_reserva_nao_fica_em_memoria(self):
+        """Teste arquivo sem cópias é segmentado e liberado"""
+        cache = CacheLayouts()
+        layout = Mock(spec=LayoutPDF)
+
+        with cache.usar("hash", lambda: layout) as usado:
+            assert usado is layout
+
+        layout.fechar.assert_called_once()
+        assert cache.construidos == 1
+
+    def test_copias_segmentadas_uma_vez(self, tmp_path):
+        """Teste mesmo PDF em duas pastas de CPF: uma segmentação, cada CPF com seu ofício"""
+        original = tmp_path / "11671377877" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(original)
+        copia = tmp_path / "10493829865" / original.name
+        copia.parent.mkdir()
+        shutil.copy(original, copia)
+
+        grupos = agrupar_por_conteudo([original, copia], self.processador)
+        assert list(grupos.values()) == [[original, copia]]
+
+        with patch.object(self.processador.detector, 'buscar_todos_oficios',
+                          wraps=self.processador.detector.buscar_todos_oficios) as buscar:
+            payload_1, _ = self.processador.preparar_payload(str(original), "11671377877")
+            payload_2, _ = self.processador.preparar_payload(str(copia), "10493829865")
+
+        assert buscar.call_count == 1
+        assert self.processador.layouts.construidos == 1
+        assert self.processador.layouts.reaproveitados == 1
+        assert payload_1.paginas_oficio == [1]
+        assert payload_2.paginas_oficio == [2]
+        assert "JOSE SILVA" in payload_2.texto
+        assert payload_1.hash_pdf == payload_2.hash_pdf
+
+        # Última cópia consumida: layout sai da memória
+        assert self.processador.layouts._layouts == {}
+
+    def test_layout_guardado_so_com_segmentacao(self, tmp_path):
+        """Teste entre uma cópia e outra o documento fica fechado e sem textos"""
+        original = tmp_path / "11671377877" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(original)
+        copia = tmp_path / "10493829865" / original.name
+        copia.parent.mkdir()
+        shutil.copy(original, copia)
+        agrupar_por_conteudo([original, copia], self.processador)
+
+        self.processador.preparar_payload(str(original), "11671377877")
+
+        layout, = self.processador.layouts._layouts.values()
+        assert layout.paginas._doc is None
+        assert not layout.paginas._textos and not layout.paginas._cabecalhos
+
+    def test_reserva_liberada_sem_uso(self, tmp_path):
+        """Teste cópia em pasta de CPF inválida libera a reserva e o layout sai da memória"""
+        original = tmp_path / "11671377877" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(original)
+        copia = tmp_path / "sem_cpf" / original.name
+        copia.parent.mkdir()
+        shutil.copy(original, copia)
+        agrupar_por_conteudo([original, copia], self.processador)
+
+        self.processador.preparar_payload(str(original), "11671377877")
+        assert len(self.processador.layouts._layouts) == 1
+
+        assert self.processador.preparar_payload(str(copia), "sem_cpf") == (None, None)
+        assert self.processador.layouts._layouts == {}
+        assert self.processador.layouts._reservas == {}
+
+    def test_limite_de_layouts(self):
+        """Teste com o cache cheio o layout usado há mais tempo é fechado"""
+        cache = CacheLayouts(maximo=1)
+        cache.reservar("a", ["1/a.pdf", "2/a.pdf"])
+        cache.reservar("b", ["1/b.pdf", "2/b.pdf"])
+        layout_a, layout_b = Mock(spec=LayoutPDF), Mock(spec=LayoutPDF)
+
+        with cache.usar("a", lambda: layout_a, "1/a.pdf"):
+            pass
+        layout_a.aliviar.assert_called_once()
+        layout_a.fechar.assert_not_called()
+
+        with cache.usar("b", lambda: layout_b, "1/b.pdf"):
+            pass
+        layout_a.fechar.assert_called_once()
+        assert list(cache._layouts) == ["b"]
+
+    def test_copias_em_sequencia(self):
+        """Teste cópias vão para a posição da primeira, o resto mantém a ordem"""
+        pdfs = ["1/x.pdf", "1/y.pdf", "2/z.pdf", "3/x.pdf", "4/w.pdf"]
+
+        assert juntar_copias(pdfs, {"h": ["1/x.pdf", "3/x.pdf"]}) == [
+            "1/x.pdf", "3/x.pdf", "1/y.pdf", "2/z.pdf", "4/w.pdf"
+        ]
+
+    def test_documento_paginas_le_sob_demanda(self, tmp_path):
+        """Teste texto da página é extraído uma vez e continua disponível após fechar"""
+        caminho = tmp_path / "11671377877" / "p.pdf"
+        criar_pdf_dois_oficios(caminho)
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            assert len(documento) == 2
+            texto = documento.texto(1)
+
+        assert documento.texto(1) == texto
+        assert "JOSE SILVA" in documento.texto(1)
+        with pytest.raises(IndexError):
+            documento.texto(2)
+
+
+def criar_pdf_longo(caminho, paginas_peticao=30):
+    """Petições (texto no corpo) seguidas de ofício, ANEXO II e PROCESSAMENTO"""
+    doc = pymupdf.open()
+    for i in range(paginas_peticao):
+        pagina = doc.new_page()
+        pagina.insert_text((50, 60), f"Fls. {i + 1}", fontsize=10)
+        pagina.insert_text((50, 400), (
+            "Excelentíssimo Senhor Doutor Juiz de Direito. Requer a expedição do "
+            "ofício requisitório do processo 0035938-67.2018.8.26.0053 com ANEXO II\n"
+        ) * 5, fontsize=8)
+    doc.new_page().insert_text((50, 60), (
+        "TRIBUNAL DE JUSTIÇA DO ESTADO DE SÃO PAULO\n"
+        "OFÍCIO REQUISITÓRIO\n"
+        "AO JUÍZO DA 1ª VARA DA FAZENDA PÚBLICA\n"
+        "Processo: 0035938-67.2018.8.26.0053\n"
+        "Requerente: JOSE SILVA\n"
+    ), fontsize=10)
+    doc.new_page().insert_text((50, 60), (
+        "ANEXO II\nNOME: JOSE SILVA\nCPF/CNPJ/RNE: 104.938.298-65\nBANCO: 001\nAGÊNCIA: 1234\n"
+    ), fontsize=10)
+    doc.new_page().insert_text((50, 60), (
+        "PROCESSAMENTO\nDEPRE - Diretoria de Execuções de Precatórios\nNº de Ordem: 822/2026\n"
+    ), fontsize=10)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(caminho))
+    doc.close()
+
+
+class TestClassificacaoRapida:
+    """Testes da classificação pelo cabeçalho (extração recortada)"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.detector = DetectorOficio()
+        self.detector_anexo = DetectorAnexoII()
+        self.detector_proc = DetectorProcessamento()
+
+    def detectar(self, caminho, documento):
+        return (
+            self.detector.buscar_todos_oficios(str(caminho), paginas=documento),
+            self.detector_anexo.detectar_anexo_ii(str(caminho), paginas=documento),
+            self.detector_proc.detectar_processamento(str(caminho), inicio=0, limite=100, paginas=documento)
+        )
+
+    def test_mesmo_resultado_sem_texto_inteiro_das_peticoes(self, tmp_path):
+        """Teste páginas descartadas pelo cabeçalho não têm o texto inteiro extraído"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho)
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            completo = self.detectar(caminho, documento)
+
+        with DocumentoPaginas(str(caminho), fracao_cabecalho=FRACAO_CABECALHO) as documento:
+            rapido = self.detectar(caminho, documento)
+            extraidas = set(documento._textos)
+
+        assert rapido == completo
+        assert completo[0][0]["paginas"] == [31, 32, 33]
+        assert completo[1][0] == [32]
+        assert completo[2][0] == 33
+        # Só ofício, ANEXO II e PROCESSAMENTO: nenhuma das 30 petições
+        assert extraidas == {30, 31, 32}
+
+
+class TestExtracaoParalela:
+    """Testes da extração em faixas de páginas (um processo por faixa)"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.extracao = ExtracaoParalela(trabalhadores=2, limiar_paginas=10)
+
+    def teardown_method(self):
+        self.extracao.encerrar()
+
+    def test_faixas_juntadas_em_ordem(self, tmp_path):
+        """Teste textos das faixas iguais à extração sequencial; abaixo do limiar, nada muda"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho, paginas_peticao=20)
+
+        with DocumentoPaginas(str(caminho)) as sequencial:
+            esperado = [sequencial.texto(i) for i in range(len(sequencial))]
+
+        with DocumentoPaginas(str(caminho)) as documento:
+            assert self.extracao.extrair(documento)
+            assert sorted(documento._textos) == list(range(23))
+            assert [documento.texto(i) for i in range(len(documento))] == esperado
+
+        curto = tmp_path / "11671377877" / "curto.pdf"
+        criar_pdf_dois_oficios(curto)
+        with DocumentoPaginas(str(curto)) as documento:
+            assert not self.extracao.extrair(documento)
+            assert documento._textos == {}
+
+    def test_faixas_com_classificacao_rapida(self, tmp_path):
+        """Teste faixas extraem só o cabeçalho das páginas não candidatas"""
+        caminho = tmp_path / "10493829865" / "longo.pdf"
+        criar_pdf_longo(caminho, paginas_peticao=20)
+        detector = DetectorOficio()
+
+        with DocumentoPaginas(str(caminho), fracao_cabecalho=FRACAO_CABECALHO) as documento:
+            termos = (
+                detector.termos_cabecalho
+                + DetectorAnexoII().termos_cabecalho
+                + DetectorProcessamento().termos_cabecalho
+            )
+            self.extracao.extrair(documento, termos)
+            assert sorted(documento._textos) == [20, 21, 22]
+            oficios = detector.buscar_todos_oficios(str(caminho), paginas=documento)
+
+        assert oficios[0]["paginas"] == [21, 22, 23]
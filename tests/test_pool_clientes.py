@@ -0,0 +1,104 @@
+"""
+Testes do pool de clientes (várias chaves/endpoints).
+"""
+
+import pytest
+from unittest.mock import Mock
+from openai import APIConnectionError, BadRequestError
+
+from app.pool_clientes import (
+    Endpoint, PoolClientes, carregar_configuracao, LIMITE_ERROS_CONSECUTIVOS
+)
+
+
+def criar_endpoint(nome, peso=1.0, rpm=None, tpm=None):
+    """Endpoint com cliente falso que devolve o próprio nome"""
+    client = Mock()
+    response = Mock()
+    response.nome = nome
+    response.usage.total_tokens = 100
+    client.chat.completions.create.return_value = response
+    return Endpoint(nome, client, peso=peso, rpm=rpm, tpm=tpm)
+
+
+def erro_conexao():
+    return APIConnectionError(request=Mock())
+
+
+class TestPoolClientes:
+    """Testes de roteamento e quarentena"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.mensagens = [{"role": "user", "content": "texto"}]
+
+    def test_distribui_pelo_orcamento_restante(self):
+        """Teste requisições vão para o endpoint com mais RPM livre, proporcional aos limites"""
+        pool = PoolClientes([criar_endpoint("a", rpm=10), criar_endpoint("b", rpm=30)])
+
+        nomes = [pool.chat.completions.create(model="m", messages=self.mensagens).nome for _ in range(20)]
+
+        assert nomes.count("b") == 15
+        assert nomes.count("a") == 5
+
+    def test_sem_limites_alterna_endpoints(self):
+        """Teste sem RPM/TPM declarados a carga recente alterna as chaves"""
+        pool = PoolClientes([criar_endpoint("a"), criar_endpoint("b")])
+
+        nomes = [pool.criar(model="m", messages=self.mensagens).nome for _ in range(4)]
+
+        assert sorted(nomes) == ["a", "a", "b", "b"]
+
+    def test_erro_transitorio_tenta_outro_e_quarentena(self):
+        """Teste falha de conexão passa para outro endpoint; erros seguidos → quarentena"""
+        ruim = criar_endpoint("ruim", peso=10)
+        ruim.client.chat.completions.create.side_effect = erro_conexao()
+        bom = criar_endpoint("bom")
+        pool = PoolClientes([ruim, bom])
+
+        for _ in range(LIMITE_ERROS_CONSECUTIVOS):
+            assert pool.criar(model="m", messages=self.mensagens).nome == "bom"
+
+        assert pool.relatorio()["ruim"]["em_quarentena"]
+        chamadas_ruim = ruim.client.chat.completions.create.call_count
+        pool.criar(model="m", messages=self.mensagens)
+        assert ruim.client.chat.completions.create.call_count == chamadas_ruim
+        assert ruim.em_voo == 0 and bom.em_voo == 0
+
+    def test_erro_do_pedido_nao_troca_endpoint(self):
+        """Teste erro 400 é propagado sem tentar outro endpoint nem contar para quarentena"""
+        resposta = Mock(status_code=400, headers={})
+        a = criar_endpoint("a", peso=2)
+        a.client.chat.completions.create.side_effect = BadRequestError("schema", response=resposta, body=None)
+        b = criar_endpoint("b")
+        pool = PoolClientes([a, b])
+
+        with pytest.raises(BadRequestError):
+            pool.criar(model="m", messages=self.mensagens)
+
+        b.client.chat.completions.create.assert_not_called()
+        assert a.erros == 0
+
+    def test_sucesso_atualiza_a_propria_requisicao(self):
+        """Teste requisições simultâneas: tokens reais vão para a entrada de quem respondeu"""
+        endpoint = criar_endpoint("a", tpm=100000)
+        pool = PoolClientes([endpoint])
+        primeira = pool.escolher(1000)
+        segunda = pool.escolher(5000)
+
+        pool.registrar_sucesso(primeira, endpoint.client.chat.completions.create())
+
+        assert [tokens for _, tokens in endpoint._uso] == [100, 5000]
+        assert endpoint.em_voo == 1
+        pool.registrar_erro(segunda, transitorio=False)
+        assert endpoint.em_voo == 0
+
+    def test_carregar_configuracao(self):
+        """Teste precedência OPENAI_ENDPOINTS > OPENAI_API_KEYS > OPENAI_API_KEY"""
+        assert carregar_configuracao("sk-1") == [{"api_key": "sk-1"}]
+        assert carregar_configuracao("sk-1", "sk-a, sk-b") == [{"api_key": "sk-a"}, {"api_key": "sk-b"}]
+        assert carregar_configuracao("sk-1", "sk-a", '[{"api_key": "sk-x", "peso": 2}]') == [
+            {"api_key": "sk-x", "peso": 2}
+        ]
+        with pytest.raises(ValueError):
+            carregar_configuracao(None, None, '[{"base_url": "http://x"}]')
@@ -0,0 +1,90 @@
+"""
+Testes do preflight de PDFs (recusa antes da detecção, documento aberto uma vez).
+"""
+
+from unittest.mock import patch
+
+import pymupdf
+
+from app.preflight import Preflight, farejar, indices_amostra
+from tests.test_paginas import criar_pdf_dois_oficios
+from tests.test_triagem import criar_pdf_digitalizado
+
+
+class TestPreflight:
+    """Testes de farejar, veredito em cache e reaproveitamento do documento"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.preflight = Preflight()
+
+    def test_farejar_recusa_sem_abrir(self, tmp_path):
+        """Teste arquivos ruins recusados só pelos bytes de cabeçalho/trailer"""
+        vazio = tmp_path / "vazio.pdf"
+        vazio.write_bytes(b"")
+        html = tmp_path / "erro.pdf"
+        html.write_bytes(b"<html>Sessao expirada</html>")
+        truncado = tmp_path / "truncado.pdf"
+        criar_pdf_dois_oficios(truncado)
+        truncado.write_bytes(truncado.read_bytes().replace(b"%%EOF", b""))
+
+        with patch("app.preflight.pymupdf.open") as abrir:
+            assert farejar(str(vazio))[0] == "arquivo vazio"
+            assert farejar(str(html))[0] == "cabeçalho %PDF- ausente"
+            assert farejar(str(tmp_path / "inexistente.pdf"))[0] == "arquivo não encontrado"
+            assert farejar(str(tmp_path / "texto.txt"))[0] == "extensão diferente de .pdf"
+            abrir.assert_not_called()
+
+        motivo, trailer_ok, _ = farejar(str(truncado))
+        assert motivo is None
+        assert trailer_ok is False
+
+    def test_veredito_e_documento_reaproveitado(self, tmp_path):
+        """Teste PDF válido: amostra guardada no documento devolvido, aberto uma única vez"""
+        pdf = tmp_path / "10493829865" / "processo.pdf"
+        criar_pdf_dois_oficios(pdf)
+
+        with patch("app.preflight.pymupdf.open", wraps=pymupdf.open) as abrir:
+            veredito, documento = self.preflight.verificar(str(pdf), "h1")
+            assert abrir.call_count == 1
+
+        assert veredito.valido
+        assert veredito.paginas == len(documento)
+        assert not veredito.sem_texto
+        # Página amostrada já extraída (a segmentação não relê)
+        assert 0 in documento._textos
+        assert indices_amostra(10) == [0, 4, 9]
+        documento.fechar()
+
+    def test_recusados_e_cache_por_hash(self, tmp_path):
+        """Teste senha, corrompido e digitalizado; recusado em cache não reabre o arquivo"""
+        protegido = tmp_path / "protegido.pdf"
+        doc = pymupdf.open()
+        doc.new_page().insert_text((72, 72), "conteudo sigiloso")
+        doc.save(str(protegido), encryption=pymupdf.PDF_ENCRYPT_AES_256, user_pw="senha", owner_pw="dono")
+        doc.close()
+
+        corrompido = tmp_path / "corrompido.pdf"
+        corrompido.write_bytes(b"%PDF-1.7\n" + b"\x00lixo" * 200 + b"\n%%EOF")
+
+        digitalizado = tmp_path / "digitalizado.pdf"
+        criar_pdf_digitalizado(digitalizado)
+
+        veredito, documento = self.preflight.verificar(str(protegido), "h-senha")
+        assert documento is None
+        assert veredito.criptografado and veredito.motivo == "protegido por senha"
+
+        veredito, documento = self.preflight.verificar(str(corrompido), "h-corrompido")
+        assert documento is None and not veredito.valido
+
+        veredito, documento = self.preflight.verificar(str(digitalizado), "h-digitalizado")
+        assert veredito.valido and veredito.sem_texto
+        documento.fechar()
+
+        # Cópia do PDF protegido: veredito por hash, sem abrir
+        with patch("app.preflight.pymupdf.open") as abrir:
+            veredito, documento = self.preflight.verificar(str(protegido), "h-senha")
+            abrir.assert_not_called()
+        assert documento is None
+        assert self.preflight.estatisticas["recusados"] == 2
+        assert self.preflight.estatisticas["em_cache"] == 1
@@ -295,3 +295,157 @@ class TestProcessadorOficio:
                 assert stats["processados_erro"] == 1
                 assert stats["oficios_detectados"] == 1
                 assert stats["oficios_salvos"] == 1
+    
+    def test_prompt_prefixo_estatico_identico(self):
+        """Teste prefixo de instruções idêntico entre documentos (cache de prompt)"""
+        from app.prompts import montar_mensagens, INSTRUCOES_EXTRACAO
+        
+        msgs_normal = montar_mensagens("OFÍCIO REQUISITÓRIO " + "x" * 1000)
+        msgs_rejeitado = montar_mensagens("curto", oficio_rejeitado=True)
+        
+        assert msgs_normal[0]["content"] == INSTRUCOES_EXTRACAO
+        assert msgs_rejeitado[0]["content"] == INSTRUCOES_EXTRACAO
+        assert "REJEITADO" in msgs_rejeitado[1]["content"]
+        assert "anômalo" in msgs_rejeitado[1]["content"]
+        assert "REJEITADO" not in msgs_normal[1]["content"]
+    
+    @patch('app.processador.OpenAI')
+    def test_registrar_tokens_cache(self, mock_openai_class):
+        """Teste registro de tokens em cache a partir do campo usage"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"processo_origem": "0035938-67.2018.8.26.0053"}'
+        mock_response.usage.prompt_tokens = 2500
+        mock_response.usage.completion_tokens = 300
+        mock_response.usage.prompt_tokens_details.cached_tokens = 2048
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+        
+        processador = ProcessadorOficio(self.api_key, self.db_config)
+        processador._extrair_dados_llm("texto teste")
+        
+        assert processador.estatisticas_llm["chamadas"] == 1
+        assert processador.estatisticas_llm["tokens_prompt"] == 2500
+        assert processador.estatisticas_llm["tokens_cache"] == 2048
+        assert processador.estatisticas_llm["tokens_resposta"] == 300
+    
+    @patch('app.processador.OpenAI')
+    def test_validar_dados_reparo_apenas_campos_invalidos(self, mock_openai_class):
+        """Teste reparo envia só os campos que falharam na validação"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"requerente_caps": "FERNANDO SANTOS ERNESTO"}'
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+        
+        processador = ProcessadorOficio(self.api_key, self.db_config)
+        dados = {
+            "processo_origem": "0035938-67.2018.8.26.0053",
+            "requerente_caps": "Fernando Santos Ernesto",
+            "vara": "1ª VARA DE FAZENDA PÚBLICA"
+        }
+        
+        oficio = processador._validar_dados(dados, "DOCUMENTO COMPLETO")
+        
+        assert oficio.requerente_caps == "FERNANDO SANTOS ERNESTO"
+        assert processador.estatisticas_llm["reparos"] == 1
+        
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        schema = kwargs["response_format"]["json_schema"]["schema"]
+        assert list(schema["properties"]) == ["requerente_caps"]
+        # Erro de formato não precisa reenviar o documento
+        assert "DOCUMENTO COMPLETO" not in kwargs["messages"][1]["content"]
+    
+    def test_schema_llm_strict(self):
+        """Teste schema strict gerado a partir de OficioRequisitorio"""
+        from app.schemas import gerar_schema_llm
+        
+        schema = gerar_schema_llm()
+        
+        assert schema["additionalProperties"] is False
+        assert set(schema["required"]) == set(schema["properties"])
+        assert "anexo_ii" not in schema["properties"]
+        assert schema["properties"]["processo_origem"]["type"] == "string"
+        assert schema["properties"]["valor_principal_bruto"]["type"] == ["number", "null"]
+    
+    @patch('app.processador.OpenAI')
+    def test_cascata_escala_quando_valores_inconsistentes(self, mock_openai_class):
+        """Teste cascata: bruto ≠ líquido + juros escala para o modelo forte"""
+        def resposta(conteudo):
+            mock_response = Mock()
+            mock_response.choices = [Mock()]
+            mock_response.choices[0].message.content = conteudo
+            return mock_response
+        
+        base = '"processo_origem": "0035938-67.2018.8.26.0053", "requerente_caps": "REGINA DIAS", '
+        inconsistente = resposta('{' + base + '"valor_principal_liquido": 100, "valor_principal_bruto": 500, '
+                                 '"juros_moratorios": 50, "valor_total_requisitado": 500}')
+        consistente = resposta('{' + base + '"valor_principal_liquido": 100, "valor_principal_bruto": 150, '
+                               '"juros_moratorios": 50, "valor_total_requisitado": 150}')
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = [inconsistente, consistente]
+        mock_openai_class.return_value = mock_client
+        
+        processador = ProcessadorOficio(
+            self.api_key, self.db_config,
+            modelo_gpt="modelo-barato", modelo_escalonamento="modelo-forte"
+        )
+        dados, oficio, erro, nivel = processador._extrair_em_cascata("texto teste")
+        
+        assert nivel == "forte"
+        assert oficio.valor_principal_bruto == Decimal("150.00")
+        modelos = [c.kwargs["model"] for c in mock_client.chat.completions.create.call_args_list]
+        assert modelos == ["modelo-barato", "modelo-forte"]
+        
+        relatorio = processador.relatorio_cascata()
+        assert relatorio["forte"] == 1
+        assert relatorio["escalonamentos"] == 1
+    
+    @patch('app.processador.OpenAI')
+    def test_cascata_nao_escala_falha_de_chamada(self, mock_openai_class):
+        """Teste cascata: falha na chamada do modelo barato não vai para o modelo forte"""
+        mock_openai_class.return_value = Mock()
+        
+        processador = ProcessadorOficio(
+            self.api_key, self.db_config,
+            modelo_gpt="modelo-barato", modelo_escalonamento="modelo-forte"
+        )
+        with patch.object(processador, "_extrair_dados_llm", return_value=None) as extrair:
+            dados, oficio, erro, nivel = processador._extrair_em_cascata("texto teste")
+        
+        assert dados is None
+        assert [c.kwargs["modelo"] for c in extrair.call_args_list] == ["modelo-barato"]
+        assert processador.relatorio_cascata()["escalonamentos"] == 0
+    
+    def test_rejeitado_resolvido_por_regex_sem_llm(self):
+        """Teste ofício rejeitado com processo e requerente no texto não chama o LLM"""
+        from app.schemas import PayloadExtracao
+        
+        payload = PayloadExtracao(
+            cpf="11671377877",
+            pdf="0035938-67.2018.8.26.0053.pdf",
+            pdf_path="/dados/11671377877/0035938-67.2018.8.26.0053.pdf",
+            hash_pdf="abc123",
+            texto="Processo: 0035938-67.2018.8.26.0053\nRequerente: Regina Dias\nCPF: 116.713.778-77",
+            oficio_rejeitado=True,
+            motivo_rejeicao="ausência de documentos"
+        )
+        
+        resultado = self.processador.processar_payload(payload)
+        
+        assert resultado["sucesso"] is True
+        assert resultado["modelo"] == "regex"
+        assert resultado["dados"]["requerente_caps"] == "REGINA DIAS"
+        assert resultado["dados"]["credor_cpf_cnpj"] == "116.713.778-77"
+        assert resultado["dados"]["rejeitado"] is True
+        assert resultado["dados"]["motivo_rejeicao"] == "ausência de documentos"
+        self.processador.client.chat.completions.create.assert_not_called()
+        
+        # Sem requerente no texto → fallback para o LLM
+        payload.texto = "Processo: 0035938-67.2018.8.26.0053"
+        assert self.processador._extrair_dados_rejeitado(payload) is None
@@ -0,0 +1,89 @@
+"""
+Testes do supervisor de trabalhador (tempo limite, memória, reciclagem).
+"""
+
+import os
+import time
+
+import pytest
+
+from app.supervisor import (
+    ErroNoTrabalhador, MemoriaExcedida, Supervisor, TempoEsgotado, TrabalhadorEncerrado
+)
+from app.memoria import rss_mb
+
+
+def tarefa_teste(acao, valor=None):
+    """Tarefa executada no processo filho"""
+    if acao == "pid":
+        return os.getpid()
+    if acao == "dormir":
+        time.sleep(valor)
+    elif acao == "alocar":
+        bloco = bytearray(b"x") * (valor * 1024 * 1024)
+        time.sleep(5)
+        return len(bloco)
+    elif acao == "erro":
+        raise ValueError(valor)
+    elif acao == "morrer":
+        os._exit(3)
+    return valor
+
+
+class TestSupervisor:
+    """Testes das proteções do lote"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.supervisor = Supervisor(tarefa_teste, timeout_pdf=10, max_rss_mb=None, reciclar_apos=None)
+
+    def teardown_method(self):
+        self.supervisor.encerrar()
+
+    def test_erro_da_tarefa_nao_derruba_o_trabalhador(self):
+        """Teste exceção da tarefa vira ErroNoTrabalhador com a classe original"""
+        pid = self.supervisor.executar("pid")
+
+        with pytest.raises(ErroNoTrabalhador) as erro:
+            self.supervisor.executar("erro", "PDF corrompido")
+
+        assert erro.value.classe == "ValueError"
+        assert self.supervisor.executar("pid") == pid
+
+    def test_tempo_esgotado_e_lote_continua(self):
+        """Teste PDF travado é interrompido e o próximo sobe um trabalhador novo"""
+        self.supervisor.timeout_pdf = 3
+        pid = self.supervisor.executar("pid")
+
+        with pytest.raises(TempoEsgotado) as erro:
+            self.supervisor.executar("dormir", 30)
+
+        assert erro.value.classe == "TempoEsgotado"
+        assert self.supervisor.executar("pid") != pid
+        assert self.supervisor.estatisticas["tempo_esgotado"] == 1
+
+    def test_trabalhador_morto(self):
+        """Teste filho que morre (ex: segfault) vira TrabalhadorEncerrado"""
+        with pytest.raises(TrabalhadorEncerrado):
+            self.supervisor.executar("morrer")
+
+        assert self.supervisor.executar("eco", 7) == 7
+
+    @pytest.mark.skipif(rss_mb() is None, reason="RSS só medido via /proc")
+    def test_memoria_excedida(self):
+        """Teste filho acima do limite de RSS é interrompido"""
+        self.supervisor.max_rss_mb = rss_mb() + 150
+
+        with pytest.raises(MemoriaExcedida):
+            self.supervisor.executar("alocar", 400)
+
+        assert self.supervisor.estatisticas["memoria_excedida"] == 1
+
+    def test_reciclagem(self):
+        """Teste trabalhador trocado a cada N PDFs"""
+        self.supervisor.reciclar_apos = 2
+
+        pids = [self.supervisor.executar("pid") for _ in range(3)]
+
+        assert pids[0] == pids[1] != pids[2]
+        assert self.supervisor.estatisticas["reciclagens"] == 1
@@ -0,0 +1,74 @@
+"""
+Testes da triagem sem LLM (dry-run).
+"""
+
+import json
+import pymupdf
+from unittest.mock import Mock, patch
+
+from app import triagem
+from app.preflight import farejar
+from tests.test_paginas import criar_pdf_dois_oficios
+
+
+def criar_pdf_digitalizado(caminho):
+    """PDF só com páginas sem texto (imagem digitalizada)"""
+    doc = pymupdf.open()
+    doc.new_page()
+    doc.new_page()
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(caminho))
+    doc.close()
+
+
+class TestTriagem:
+    """Testes das linhas por PDF e do resumo"""
+
+    def test_linhas_e_resumo(self, tmp_path):
+        """Teste ofício do CPF, CPF ausente e PDF sem camada de texto"""
+        com_oficio = tmp_path / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(com_oficio)
+        sem_oficio = tmp_path / "12345678909" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(sem_oficio)
+        digitalizado = tmp_path / "11671377877" / "1000000-00.2020.8.26.0053.pdf"
+        criar_pdf_digitalizado(digitalizado)
+
+        linhas = list(triagem.triar([com_oficio, sem_oficio, digitalizado], trabalhadores=1))
+
+        assert [l["cpf"] for l in linhas] == ["10493829865", "12345678909", "11671377877"]
+        assert linhas[0]["oficio_cpf"] is True
+        assert linhas[0]["tokens_estimados"] > 0
+        assert linhas[1]["oficio_cpf"] is False
+        assert linhas[2]["sem_texto"] is True
+
+        resumo = triagem.resumir(linhas, segundos_por_pdf=6.0, concorrencia=2)
+
+        assert resumo["total_pdfs"] == 3
+        assert resumo["oficio_cpf"] == 1
+        assert resumo["sem_texto"] == 1
+        assert resumo["estimativa"]["pdfs_llm"] == 1
+        assert resumo["estimativa"]["tempo_s"] == 3.0
+        assert resumo["estimativa"]["tokens_prompt"] > linhas[0]["tokens_estimados"]
+
+        csv_path = triagem.gravar_csv(linhas, tmp_path / "saida" / "triagem.csv")
+        assert len(csv_path.read_text(encoding="utf-8").splitlines()) == 4
+
+    def test_fareja_uma_vez(self, tmp_path):
+        """Teste cabeçalho/trailer lidos uma vez: o preflight completo reaproveita o farejo"""
+        pdf = tmp_path / "10493829865" / "0035938-67.2018.8.26.0053.pdf"
+        criar_pdf_dois_oficios(pdf)
+        contador = Mock(wraps=farejar)
+
+        with patch("app.triagem.farejar", contador), patch("app.preflight.farejar", contador):
+            linha = triagem.triar_pdf(str(pdf))
+
+        assert linha["oficio_cpf"] is True
+        assert contador.call_count == 1
+
+    def test_vazao_historica(self, tmp_path):
+        """Teste vazão média ponderada de execuções anteriores"""
+        for nome, tempo, total in [("a.json", 100.0, 10), ("b.json", 20.0, 10)]:
+            (tmp_path / nome).write_text(json.dumps({"tempo_total": tempo, "total_pdfs": total}))
+
+        assert triagem.vazao_historica([tmp_path / "a.json", tmp_path / "b.json"]) == 6.0
+        assert triagem.vazao_historica([tmp_path / "inexistente.json"]) is None